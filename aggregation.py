@@ -0,0 +1,524 @@
+import numpy as np
+import pandas as pd
+
+from data_structures import (
+    EARTH_RADIUS_KM,
+    NetworkData,
+    SpatialIndex,
+    get_coordinates,
+    get_values,
+)
+
+# Methods available to cluster the customers
+METHODS = ("grid", "kmeans")
+
+# Above this number of locations x clusters the k-means++ seeding (whose cost is proportional
+# to it) is replaced by centers drawn with probability proportional to the weights
+KMEANS_PLUS_PLUS_LIMIT = 50_000_000
+
+# Length of one degree of latitude (km)
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+
+# Maximum number of grids tried to find the cell size giving num_clusters non-empty cells
+MAX_CELL_SIZE_STEPS = 40
+
+
+def _to_points(
+    latitude: np.ndarray, longitude: np.ndarray, use_haversine: bool
+) -> np.ndarray:
+    """Map the locations to 3D points on the unit sphere (haversine) or to (lat, lon) pairs"""
+    if not use_haversine:
+        return np.column_stack((latitude, longitude))
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    return np.column_stack(
+        (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat))
+    )
+
+
+def _from_points(
+    points: np.ndarray, use_haversine: bool
+) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse of _to_points: the points on the sphere are projected back to the surface"""
+    if not use_haversine:
+        return points[:, 0].copy(), points[:, 1].copy()
+    norm = np.linalg.norm(points, axis=1)
+    norm[norm == 0] = 1.0
+    x, y, z = (points / norm[:, None]).T
+    return np.degrees(np.arcsin(np.clip(z, -1.0, 1.0))), np.degrees(np.arctan2(y, x))
+
+
+def pair_distances(
+    lat_1: np.ndarray,
+    lon_1: np.ndarray,
+    lat_2: np.ndarray,
+    lon_2: np.ndarray,
+    use_haversine: bool = True,
+) -> np.ndarray:
+    """Return the distances between the pairs of points (lat_1[i], lon_1[i]), (lat_2[i], lon_2[i])
+    :param lat_1: latitudes of the origins
+    :param lon_1: longitudes of the origins
+    :param lat_2: latitudes of the destinations
+    :param lon_2: longitudes of the destinations
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :return: array of distances, same kernels of calculate_dm
+    """
+    if not use_haversine:
+        return np.hypot(lat_1 - lat_2, lon_1 - lon_2)
+    lat_1, lon_1, lat_2, lon_2 = map(np.radians, (lat_1, lon_1, lat_2, lon_2))
+    d = (
+        np.sin((lat_2 - lat_1) * 0.5) ** 2
+        + np.cos(lat_1) * np.cos(lat_2) * np.sin((lon_2 - lon_1) * 0.5) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(d), 1.0))
+
+
+def _centroids(
+    points: np.ndarray, labels: np.ndarray, weights: np.ndarray, k: int
+) -> np.ndarray:
+    """Weighted mean of the points of each cluster (plain mean for clusters with no weight)"""
+    totals = np.bincount(labels, weights=weights, minlength=k)
+    counts = np.bincount(labels, minlength=k).astype(float)
+    unweighted = totals <= 0
+    weights = np.where(unweighted[labels], 1.0, weights)
+    totals = np.where(unweighted, counts, totals)
+    totals[totals == 0] = 1.0
+    return (
+        np.column_stack(
+            [
+                np.bincount(labels, weights=weights * points[:, axis], minlength=k)
+                for axis in range(points.shape[1])
+            ]
+        )
+        / totals[:, None]
+    )
+
+
+def grid_labels(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    cell_size: float,
+    use_haversine: bool = True,
+) -> np.ndarray:
+    """Cluster the locations by the cells of a regular grid
+    :param latitude: latitudes of the locations
+    :param longitude: longitudes of the locations
+    :param cell_size: side of the cells, km with haversine (the width in degrees of longitude
+        grows with the latitude to keep the cells square), degrees otherwise
+    :param use_haversine: if True cell_size is in km, otherwise in degrees
+    :return: array with the cluster (0, 1, 2, ...) of each location
+    """
+    if not cell_size or cell_size <= 0:
+        raise ValueError("cell_size must be positive")
+    if not use_haversine:
+        rows = np.floor(latitude / cell_size)
+        cols = np.floor(longitude / cell_size)
+    else:
+        lat_step = cell_size / KM_PER_DEGREE
+        rows = np.floor((latitude + 90) / lat_step)
+        center = np.clip(-90 + (rows + 0.5) * lat_step, -89.9, 89.9)
+        lon_step = np.minimum(lat_step / np.cos(np.radians(center)), 360.0)
+        cols = np.floor((longitude + 180) / lon_step)
+    _, labels = np.unique(np.column_stack((rows, cols)), axis=0, return_inverse=True)
+    return labels.reshape(-1)
+
+
+def grid_cell_size(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    num_clusters: int,
+    use_haversine: bool = True,
+) -> float:
+    """Return the side of the grid cells giving about num_clusters non-empty cells
+
+    The first guess divides the bounding box of the locations in num_clusters cells, which
+    gives far fewer clusters when the locations are concentrated in a few areas; the size
+    is then halved or doubled until the target is bracketed, and bisected. The largest size
+    giving at least num_clusters cells is returned (the smallest size tried if there are
+    fewer distinct locations).
+    :param latitude: latitudes of the locations
+    :param longitude: longitudes of the locations
+    :param num_clusters: target number of non-empty cells
+    :param use_haversine: if True the size is in km, otherwise in degrees
+    :return: side of the cells
+    """
+    height = np.ptp(latitude)
+    width = np.ptp(longitude)
+    if use_haversine:
+        height *= KM_PER_DEGREE
+        width *= KM_PER_DEGREE * np.cos(np.radians(np.median(latitude)))
+    if height and width:
+        size = np.sqrt(height * width / num_clusters)
+    else:
+        # Locations along a line (or a single location)
+        size = max(height, width) / num_clusters or 1.0
+
+    def count(size):
+        return int(grid_labels(latitude, longitude, size, use_haversine).max()) + 1
+
+    # Largest size with at least num_clusters cells, smallest size with fewer
+    small, large = None, None
+    for _ in range(MAX_CELL_SIZE_STEPS):
+        n = count(size)
+        if n == num_clusters:
+            return float(size)
+        if n > num_clusters:
+            small = size
+        else:
+            large = size
+        if small is None:
+            size /= 2
+        elif large is None:
+            size *= 2
+        else:
+            size = np.sqrt(small * large)
+    return float(small if small is not None else size)
+
+
+def _nearest(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    center_lat: np.ndarray,
+    center_lon: np.ndarray,
+    k: int,
+    use_haversine: bool,
+) -> np.ndarray:
+    """Return the k nearest centers of each location, as an array with shape (n, k)"""
+    index = SpatialIndex(
+        NetworkData("customer", latitude=center_lat, longitude=center_lon),
+        use_haversine=use_haversine,
+    )
+    rows, nearest, distance = index.query(latitude, longitude, k=k)
+    order = np.lexsort((distance, rows))
+    return nearest[order].reshape(len(latitude), k)
+
+
+def _kmeans_plus_plus(
+    points: np.ndarray, weights: np.ndarray, k: int, seed: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Choose k initial centers with the weighted k-means++ seeding
+
+    Each new center is drawn with probability proportional to weight x squared distance from
+    the nearest center already chosen. Fewer centers are returned if all the locations
+    coincide with a center.
+
+    :return: tuple (positions of the centers, nearest center of each location)
+    """
+    rng = np.random.default_rng(seed)
+    if not weights.any():
+        weights = np.ones(len(points))
+    nearest = np.full(len(points), np.inf)
+    labels = np.zeros(len(points), dtype=np.intp)
+    scores = weights
+    centers = []
+    while len(centers) < k:
+        cumulative = np.cumsum(scores)
+        if cumulative[-1] <= 0:
+            break
+        center = int(
+            np.searchsorted(cumulative, rng.random() * cumulative[-1], "right")
+        )
+        center = min(center, len(points) - 1)
+        d = ((points - points[center]) ** 2).sum(axis=1)
+        closer = d < nearest
+        nearest[closer] = d[closer]
+        labels[closer] = len(centers)
+        centers.append(center)
+        scores = weights * nearest
+    return np.array(centers), labels
+
+
+def kmeans_labels(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    weights: np.ndarray,
+    num_clusters: int,
+    max_iterations: int = 20,
+    seed: int = 0,
+    use_haversine: bool = True,
+    num_neighbors: int = 10,
+) -> np.ndarray:
+    """Cluster the locations with the weighted k-means (Lloyd) algorithm
+
+    With the haversine metric the locations are clustered as points on the unit sphere. The
+    initial centers are chosen with the weighted k-means++ seeding (see KMEANS_PLUS_PLUS_LIMIT
+    for large instances). Since the centers move little at each iteration, a location is
+    only compared with the num_neighbors centers nearest to the center of its cluster (found
+    with a SpatialIndex), so the cost of an iteration is proportional to locations x
+    num_neighbors instead of locations x clusters.
+
+    :param latitude: latitudes of the locations
+    :param longitude: longitudes of the locations
+    :param weights: weights of the locations (e.g. the demands)
+    :param num_clusters: number of clusters
+    :param max_iterations: maximum number of iterations
+    :param seed: seed of the random seeding
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :param num_neighbors: number of centers compared with each location at each iteration
+    :return: array with the cluster (0, 1, 2, ...) of each location, empty clusters removed
+    """
+    n = len(latitude)
+    if num_clusters < 1:
+        raise ValueError("num_clusters must be a positive integer")
+    if num_clusters >= n:
+        return np.arange(n)
+
+    weights = np.nan_to_num(np.asarray(weights, dtype=float)).clip(min=0)
+    points = _to_points(latitude, longitude, use_haversine)
+    if n * num_clusters <= KMEANS_PLUS_PLUS_LIMIT:
+        centers, labels = _kmeans_plus_plus(points, weights, num_clusters, seed)
+    else:
+        # Centers drawn with probability proportional to the weights
+        rng = np.random.default_rng(seed)
+        positive = np.count_nonzero(weights)
+        probability = weights / weights.sum() if positive >= num_clusters else None
+        centers = rng.choice(n, size=num_clusters, replace=False, p=probability)
+        labels = _nearest(
+            latitude, longitude, latitude[centers], longitude[centers], 1, use_haversine
+        )[:, 0]
+    num_clusters = len(centers)
+    num_neighbors = min(num_neighbors, num_clusters)
+
+    center_points = points[centers]
+    for _ in range(max_iterations):
+        # Empty clusters keep their center
+        moved = np.bincount(labels, minlength=num_clusters) > 0
+        center_points[moved] = _centroids(points, labels, weights, num_clusters)[moved]
+        center_lat, center_lon = _from_points(center_points, use_haversine)
+        center_points = _to_points(center_lat, center_lon, use_haversine)
+
+        # Chord (or euclidean) distances are monotone in the distances of the metric
+        candidates = _nearest(
+            center_lat, center_lon, center_lat, center_lon, num_neighbors, use_haversine
+        )[labels]
+        d = ((points[:, None, :] - center_points[candidates]) ** 2).sum(axis=2)
+        new_labels = candidates[np.arange(n), d.argmin(axis=1)]
+        if np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels.reshape(-1)
+
+
+class Aggregation:
+    """Customers merged into demand-weighted centroid customers
+
+    Each original customer belongs to one cluster, represented in the reduced problem by a
+    customer located at the demand-weighted centroid of its members, with their total demand.
+    The offset of a customer is its distance from the centroid: since distances satisfy the
+    triangle inequality, serving the customer instead of its centroid changes the distance
+    to any warehouse by at most the offset, and the weighted distance of any solution by at
+    most the sum of demand x offset (see error_bound).
+    """
+
+    def __init__(
+        self,
+        customers: dict,
+        labels: np.ndarray,
+        method: str = "",
+        use_haversine: bool = True,
+    ):
+        """
+        :param customers: dict of the original customers, or NetworkData
+        :param labels: cluster (0, 1, 2, ...) of each customer, ordered as the dict
+        :param method: description of the clustering method
+        :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+        """
+        self.original = NetworkData.from_dict(customers)
+        self.customers_id = np.empty(len(customers), dtype=object)
+        self.customers_id[:] = list(customers.keys())
+        self.labels = np.asarray(labels, dtype=np.intp)
+        if len(self.labels) != len(customers):
+            raise ValueError("There must be one label for each customer")
+        self.method = method
+        self.use_haversine = use_haversine
+
+        self.latitude, self.longitude = get_coordinates(customers)
+        self.demand = np.nan_to_num(get_values(customers, "demand"))
+        self.num_clusters = int(self.labels.max()) + 1 if len(self.labels) else 0
+
+        points = _to_points(self.latitude, self.longitude, use_haversine)
+        centers = _centroids(points, self.labels, self.demand, self.num_clusters)
+        center_lat, center_lon = _from_points(centers, use_haversine)
+        self.offsets = pair_distances(
+            self.latitude,
+            self.longitude,
+            center_lat[self.labels],
+            center_lon[self.labels],
+            use_haversine,
+        )
+
+        # The member with the largest demand names the city of the cluster
+        order = np.lexsort((-self.demand, self.labels))
+        first = order[np.searchsorted(self.labels[order], np.arange(self.num_clusters))]
+        self.customers = NetworkData(
+            "customer",
+            name=[f"Cluster {k}" for k in range(self.num_clusters)],
+            city=self.original.column("city")[first],
+            state=self.original.column("state")[first],
+            latitude=center_lat,
+            longitude=center_lon,
+            demand=np.bincount(
+                self.labels, weights=self.demand, minlength=self.num_clusters
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Aggregation({self.method}: {len(self.labels)} customers in "
+            f"{self.num_clusters} clusters)"
+        )
+
+    def members(self, cluster: int) -> list:
+        """Return the ids of the customers of a cluster"""
+        return self.customers_id[self.labels == cluster].tolist()
+
+    def error_bound(self, factor: float = 1.0) -> float:
+        """Bound on the change of the weighted distance of any solution due to the aggregation
+        :param factor: multiplier of the weighted distance in the objective (e.g. the unit
+            transport cost, or 1 / total demand for the average weighted distance)
+        :return: factor x sum of demand x offset over the customers
+        """
+        return float(factor * np.dot(self.demand, self.offsets))
+
+    def summary(self) -> dict:
+        """Size of the aggregation and offsets of the customers from their centroids"""
+        total = self.demand.sum()
+        return {
+            "method": self.method,
+            "customers": len(self.labels),
+            "clusters": self.num_clusters,
+            "max_offset": float(self.offsets.max()) if len(self.offsets) else 0.0,
+            "avg_offset": (
+                float(np.dot(self.demand, self.offsets) / total) if total else 0.0
+            ),
+        }
+
+    def disaggregate(
+        self,
+        flows: dict,
+        warehouses: dict,
+        open_warehouses=None,
+    ) -> pd.DataFrame:
+        """Map the assignments of the clusters back to the original customers
+        :param flows: dict (warehouse_id, cluster) -> assigned share of the cluster demand
+        :param warehouses: dict of warehouses, or NetworkData
+        :param open_warehouses: if given, each customer is reassigned to its nearest open
+            warehouse (exact for uncapacitated models); otherwise it inherits the shares of
+            its cluster
+        :return: DataFrame with columns Warehouse_id, Customer_id, Customer Demand, Share,
+            Distance
+        """
+        w_lat, w_lon = get_coordinates(warehouses)
+        w_ids = np.empty(len(warehouses), dtype=object)
+        w_ids[:] = list(warehouses.keys())
+
+        if open_warehouses is not None:
+            positions = NetworkData.from_dict(warehouses).positions(
+                list(open_warehouses)
+            )
+            index = SpatialIndex(
+                NetworkData(
+                    "warehouse",
+                    latitude=w_lat[positions],
+                    longitude=w_lon[positions],
+                ),
+                use_haversine=self.use_haversine,
+            )
+            customers, nearest, distance = index.query(
+                self.latitude, self.longitude, k=1
+            )
+            return pd.DataFrame(
+                {
+                    "Warehouse_id": w_ids[positions[nearest]],
+                    "Customer_id": self.customers_id[customers],
+                    "Customer Demand": self.demand[customers],
+                    "Share": 1.0,
+                    "Distance": distance,
+                }
+            )
+
+        w_index = {w: n for n, w in enumerate(w_ids)}
+        arcs = sorted(flows.items(), key=lambda item: item[0][1])
+        flow_w = np.array([w_index[w] for (w, _), _ in arcs], dtype=np.intp)
+        flow_k = np.array([k for (_, k), _ in arcs], dtype=np.intp)
+        flow_share = np.array([share for _, share in arcs], dtype=float)
+
+        # Each customer gets one row for each flow of its cluster
+        starts = np.searchsorted(flow_k, np.arange(self.num_clusters))
+        counts = np.bincount(flow_k, minlength=self.num_clusters)[self.labels]
+        customers = np.repeat(np.arange(len(self.labels)), counts)
+        first_row = np.cumsum(counts) - counts
+        rows = starts[self.labels][customers] + (
+            np.arange(len(customers)) - np.repeat(first_row, counts)
+        )
+        w = flow_w[rows]
+        return pd.DataFrame(
+            {
+                "Warehouse_id": w_ids[w],
+                "Customer_id": self.customers_id[customers],
+                "Customer Demand": self.demand[customers],
+                "Share": flow_share[rows],
+                "Distance": pair_distances(
+                    w_lat[w],
+                    w_lon[w],
+                    self.latitude[customers],
+                    self.longitude[customers],
+                    self.use_haversine,
+                ),
+            }
+        )
+
+
+def aggregate_customers(
+    customers: dict,
+    method: str = "grid",
+    cell_size: float | None = None,
+    num_clusters: int | None = None,
+    use_haversine: bool = True,
+    max_iterations: int = 20,
+    seed: int = 0,
+) -> Aggregation:
+    """Cluster the customers on their locations and merge each cluster into one customer
+    :param customers: dict of customers, or NetworkData
+    :param method: 'grid' (cells of a regular grid) or 'kmeans' (demand-weighted k-means)
+    :param cell_size: side of the grid cells (km with haversine, degrees otherwise). By
+        default it is chosen to give about num_clusters non-empty cells (see grid_cell_size)
+    :param num_clusters: number of clusters of k-means (or target number of grid cells)
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :param max_iterations: maximum number of iterations of k-means
+    :param seed: seed of the k-means seeding
+    :return: Aggregation of the customers
+    """
+    if method not in METHODS:
+        raise ValueError(
+            f"Unknown method: {method}. Must be one of: {', '.join(METHODS)}."
+        )
+    if not customers:
+        raise Exception("You must pass the customers to be aggregated")
+    latitude, longitude = get_coordinates(customers)
+
+    if method == "kmeans":
+        if not num_clusters:
+            raise ValueError("num_clusters must be specified for k-means aggregation")
+        labels = kmeans_labels(
+            latitude,
+            longitude,
+            get_values(customers, "demand"),
+            num_clusters,
+            max_iterations=max_iterations,
+            seed=seed,
+            use_haversine=use_haversine,
+        )
+        return Aggregation(customers, labels, f"kmeans k={num_clusters}", use_haversine)
+
+    if cell_size is None:
+        if not num_clusters:
+            raise ValueError(
+                "cell_size or num_clusters must be specified for grid aggregation"
+            )
+        cell_size = grid_cell_size(latitude, longitude, num_clusters, use_haversine)
+    labels = grid_labels(latitude, longitude, cell_size, use_haversine)
+    unit = "km" if use_haversine else "degrees"
+    return Aggregation(customers, labels, f"grid {cell_size:.4g} {unit}", use_haversine)
@@ -0,0 +1,11 @@
+from benchmarks.generator import generate_instance
+from benchmarks.runner import (
+    MODELS,
+    SIZES,
+    compare_results,
+    load_results,
+    results_table,
+    run_benchmark,
+    run_instance,
+    save_results,
+)
@@ -0,0 +1,124 @@
+"""Run the benchmarks or compare two runs
+
+    python -m benchmarks run --sizes small --output results/run.json
+    python -m benchmarks compare results/base.json results/run.json
+
+A JSON file keeps the environment of the run (commit, versions), a CSV file with one row per
+run is written next to it. compare exits with status 1 if a phase is slower than the
+threshold, so that it can be used in a CI job.
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+# The modules of the repository are imported as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.runner import (
+    METRICS,
+    MODELS,
+    SIZES,
+    SOLVER_BACKENDS,
+    compare_results,
+    load_results,
+    run_benchmark,
+    save_results,
+)
+
+
+def _size(value: str):
+    """A size preset or warehouses x customers (e.g. 100x5000)"""
+    if value in SIZES:
+        return value
+    try:
+        num_warehouses, num_customers = value.lower().split("x")
+        return int(num_warehouses), int(num_customers)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"{value} is neither a size preset ({', '.join(SIZES)}) nor WxC"
+        )
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the phases of the models")
+    run.add_argument("--sizes", nargs="+", type=_size, default=["small"])
+    run.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    run.add_argument(
+        "--layouts",
+        nargs="+",
+        choices=("uniform", "clustered"),
+        default=["uniform", "clustered"],
+    )
+    run.add_argument("--backend", choices=SOLVER_BACKENDS, default="pulp")
+    run.add_argument("--capacity-tightness", type=float, default=0.5)
+    run.add_argument("--fixed-cost", default="uniform")
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--time-limit", type=float, default=60)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument(
+        "--max-arcs-per-customer",
+        type=int,
+        default=None,
+        help="sparse models with the closest warehouses of each customer",
+    )
+    run.add_argument("--output", default="benchmark_results/results.json")
+
+    compare = commands.add_parser("compare", help="compare two runs")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--metric", choices=METRICS, default="wall_time")
+    compare.add_argument("--threshold", type=float, default=1.25)
+    compare.add_argument("--min-value", type=float, default=0.05)
+
+    args = parser.parse_args(args)
+    if args.command == "run":
+        params = {}
+        if args.max_arcs_per_customer:
+            params["max_arcs_per_customer"] = args.max_arcs_per_customer
+        results = run_benchmark(
+            sizes=args.sizes,
+            models=args.models,
+            layouts=args.layouts,
+            backend=args.backend,
+            capacity_tightness=args.capacity_tightness,
+            fixed_cost=args.fixed_cost,
+            repeat=args.repeat,
+            time_limit=args.time_limit,
+            seed=args.seed,
+            params=params,
+        )
+        save_results(results, args.output)
+        save_results(results, os.path.splitext(args.output)[0] + ".csv")
+        print(f"Results written to {args.output}")
+        return 0
+
+    baseline, baseline_environment = load_results(args.baseline)
+    current, current_environment = load_results(args.current)
+    table = compare_results(
+        baseline,
+        current,
+        metric=args.metric,
+        threshold=args.threshold,
+        min_value=args.min_value,
+    )
+    print(
+        f"{args.metric}: {baseline_environment.get('commit')} (baseline) -> "
+        f"{current_environment.get('commit')}"
+    )
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(table.to_string(index=False, float_format="{:.3f}".format))
+    regressions = table[table["regression"]]
+    if len(regressions):
+        print(f"\n{len(regressions)} regressions above {args.threshold:.2f}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
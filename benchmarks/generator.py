@@ -0,0 +1,148 @@
+import numpy as np
+
+from data_structures import NetworkData
+
+LAYOUTS = ("uniform", "clustered")
+FIXED_COST_PROFILES = ("uniform", "constant", "capacity", "none")
+
+# Bounding box of the generated locations (latitude and longitude ranges, continental US)
+DEFAULT_BOUNDS = ((25.0, 49.0), (-124.0, -67.0))
+
+
+def _locations(
+    rng: np.random.Generator,
+    n: int,
+    layout: str,
+    centers: np.ndarray,
+    spread: float,
+    bounds: tuple,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Draw n locations, uniform in the bounds or around the centers of the clusters
+    :return: tuple (latitudes, longitudes)
+    """
+    (lat_min, lat_max), (lon_min, lon_max) = bounds
+    if layout == "uniform":
+        return rng.uniform(lat_min, lat_max, n), rng.uniform(lon_min, lon_max, n)
+    # Clusters of different sizes (e.g. metropolitan areas)
+    sizes = rng.dirichlet(np.full(len(centers), 0.7))
+    cluster = rng.choice(len(centers), size=n, p=sizes)
+    latitude = centers[cluster, 0] + rng.normal(0, spread, n)
+    longitude = centers[cluster, 1] + rng.normal(0, spread, n)
+    return np.clip(latitude, lat_min, lat_max), np.clip(longitude, lon_min, lon_max)
+
+
+def generate_instance(
+    num_warehouses: int,
+    num_customers: int,
+    layout: str = "uniform",
+    capacity_tightness: float | None = None,
+    fixed_cost: str = "uniform",
+    fixed_cost_level: float = 50.0,
+    num_clusters: int | None = None,
+    cluster_spread: float = 1.0,
+    bounds: tuple = DEFAULT_BOUNDS,
+    seed: int = 0,
+) -> tuple[NetworkData, NetworkData]:
+    """Generate a random instance of warehouses and customers, the same for a given seed
+
+    Customers have log-normal demands (mean about 100). In the clustered layout customers
+    are drawn around num_clusters centers of different sizes, and half of the warehouses
+    around the same centers (the others are uniform in the bounds).
+
+    :param num_warehouses: number of candidate warehouses
+    :param num_customers: number of customers
+    :param layout: 'uniform' or 'clustered'
+    :param capacity_tightness: total demand / total capacity (e.g. 0.8 for a tight instance,
+        where most warehouses must be opened, 0.2 for a loose one). None for uncapacitated
+        warehouses
+    :param fixed_cost: profile of the fixed costs: 'uniform' (uniform around the mean),
+        'constant', 'capacity' (proportional to the square root of the capacity, economies of
+        scale) or 'none' (zero)
+    :param fixed_cost_level: total fixed cost of all the warehouses per unit of demand
+    :param num_clusters: number of clusters of the clustered layout (default: one every 5000
+        customers, between 5 and 50)
+    :param cluster_spread: standard deviation of the locations around the centers (degrees)
+    :param bounds: ((latitude min, max), (longitude min, max)) of the locations
+    :param seed: seed of the random generator
+    :return: tuple (warehouses, customers) as NetworkData
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(
+            f"Unknown layout: {layout}. Must be one of: {', '.join(LAYOUTS)}."
+        )
+    if fixed_cost not in FIXED_COST_PROFILES:
+        raise ValueError(
+            f"Unknown fixed cost profile: {fixed_cost}. "
+            f"Must be one of: {', '.join(FIXED_COST_PROFILES)}."
+        )
+    if capacity_tightness is not None and not 0 < capacity_tightness <= 1:
+        raise ValueError("capacity_tightness must be in (0, 1]")
+    if num_warehouses < 1 or num_customers < 1:
+        raise ValueError(
+            "The instance must have at least one warehouse and one customer"
+        )
+
+    rng = np.random.default_rng(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = bounds
+    if num_clusters is None:
+        num_clusters = min(max(num_customers // 5000, 5), 50)
+    centers = np.column_stack(
+        [
+            rng.uniform(lat_min, lat_max, num_clusters),
+            rng.uniform(lon_min, lon_max, num_clusters),
+        ]
+    )
+
+    c_lat, c_lon = _locations(
+        rng, num_customers, layout, centers, cluster_spread, bounds
+    )
+    demand = np.maximum(np.round(rng.lognormal(4.4, 0.6, num_customers)), 1)
+
+    w_lat = rng.uniform(lat_min, lat_max, num_warehouses)
+    w_lon = rng.uniform(lon_min, lon_max, num_warehouses)
+    if layout == "clustered":
+        near = rng.random(num_warehouses) < 0.5
+        w_lat[near], w_lon[near] = _locations(
+            rng, int(near.sum()), layout, centers, cluster_spread, bounds
+        )
+
+    if capacity_tightness is None:
+        capacity = np.full(num_warehouses, np.nan)
+    else:
+        shares = rng.uniform(0.5, 1.5, num_warehouses)
+        capacity = np.ceil(
+            demand.sum() / capacity_tightness * shares / shares.sum()
+        ).clip(min=demand.max())
+
+    mean_cost = fixed_cost_level * demand.sum() / num_warehouses
+    if fixed_cost == "uniform":
+        costs = rng.uniform(0.5, 1.5, num_warehouses) * mean_cost
+    elif fixed_cost == "constant":
+        costs = np.full(num_warehouses, mean_cost)
+    elif fixed_cost == "capacity":
+        if capacity_tightness is None:
+            size = rng.uniform(0.5, 1.5, num_warehouses)
+        else:
+            size = capacity
+        costs = np.sqrt(size) / np.sqrt(size).mean() * mean_cost
+    else:
+        costs = np.zeros(num_warehouses)
+
+    warehouses = NetworkData(
+        "warehouse",
+        name=[f"W{n}" for n in range(num_warehouses)],
+        city=[f"W{n}" for n in range(num_warehouses)],
+        latitude=w_lat,
+        longitude=w_lon,
+        capacity=capacity,
+        fixed_cost=np.round(costs, 2),
+    )
+    customers = NetworkData(
+        "customer",
+        name=[f"C{n}" for n in range(num_customers)],
+        city=[f"C{n}" for n in range(num_customers)],
+        latitude=c_lat,
+        longitude=c_lon,
+        demand=demand,
+    )
+    return warehouses, customers
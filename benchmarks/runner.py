@@ -0,0 +1,361 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import generate_instance
+from instrumentation import PHASES, Instrumentation
+from network_factory import BACKENDS, create_network_optimizer
+
+MODELS = ("p-median", "p-cover", "UFLP", "CFLP")
+SOLVER_BACKENDS = ("pulp", "mps", "heuristic", "lagrangian")
+
+# (warehouses, customers) of each size preset
+SIZES = {
+    "tiny": [(10, 100)],
+    "small": [(10, 100), (50, 1000), (100, 2000)],
+    "medium": [(200, 10_000), (500, 20_000)],
+    "large": [(1000, 100_000), (2000, 200_000)],
+}
+
+# Metrics of each phase written to the CSV files and compared across runs
+METRICS = ("wall_time", "cpu_time", "solver_cpu_time", "peak_rss_mb")
+
+
+def model_params(
+    model: str,
+    num_warehouses: int,
+    open_ratio: float = 0.1,
+    high_service_distance: float = 300,
+) -> dict:
+    """Parameters of a model of the benchmark: p-median and p-cover open open_ratio of the
+    warehouses and ignore the capacities, UFLP and CFLP include the fixed costs
+    :param model: 'p-median', 'p-cover', 'UFLP' or 'CFLP'
+    :param num_warehouses: number of candidate warehouses of the instance
+    :param open_ratio: ratio of the warehouses opened by p-median and p-cover
+    :param high_service_distance: coverage distance of p-cover (km)
+    :return: dict of parameters of create_network_optimizer
+    """
+    p = max(1, round(num_warehouses * open_ratio))
+    if model == "p-median":
+        return {
+            "objective_function": "mindistance",
+            "num_warehouses": p,
+            "force_uncapacitated": True,
+        }
+    if model == "p-cover":
+        return {
+            "objective_function": None,
+            "num_warehouses": p,
+            "high_service_distance": high_service_distance,
+            "force_uncapacitated": True,
+        }
+    if model in ("UFLP", "CFLP"):
+        return {"objective_function": None}
+    raise ValueError(f"Unknown model: {model}. Must be one of: {', '.join(MODELS)}.")
+
+
+def _solve(optimizer, backend: str):
+    """Build and solve the model of an optimizer with a backend"""
+    if backend == "pulp":
+        optimizer.build_model()
+        return optimizer.solve()
+    if backend == "mps":
+        return optimizer.solve_mps()
+    if backend == "heuristic":
+        return optimizer.solve_heuristic()
+    return optimizer.solve_lagrangian()
+
+
+def run_instance(
+    warehouses,
+    customers,
+    model: str,
+    backend: str = "pulp",
+    time_limit: float | None = 60,
+    params: dict | None = None,
+) -> dict:
+    """Solve one model on an instance and return the metrics of its phases
+    :param warehouses: warehouses of the instance
+    :param customers: customers of the instance
+    :param model: 'p-median', 'p-cover', 'UFLP' or 'CFLP'
+    :param backend: 'pulp', 'mps', 'heuristic' or 'lagrangian'
+    :param time_limit: time limit of CBC in seconds
+    :param params: parameters of create_network_optimizer, overriding the ones of model_params
+    :return: dict with status, objective_value, wall_time, phases (metrics of each phase),
+        model_size (variables, constraints, nonzeros) and error (message of the exception
+        raised, if any)
+    """
+    params = {**model_params(model, len(warehouses)), **(params or {})}
+    stats = Instrumentation()
+    row = {"status": None, "objective_value": None, "error": None}
+    start = time.perf_counter()
+    try:
+        # The distance matrix is computed, not read from the cache
+        with contextlib.redirect_stdout(io.StringIO()):
+            optimizer = create_network_optimizer(
+                objective=model,
+                warehouses=warehouses,
+                customers=customers,
+                distance_cache=None,
+                time_limit=time_limit,
+                stats=stats,
+                **params,
+            )
+            solution = _solve(optimizer, backend)
+        row["status"] = optimizer._solution_status()[0]
+        if solution is not None:
+            row["objective_value"] = float(solution["objective_value"])
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    result = stats.to_dict()
+    row.update(
+        {
+            "wall_time": time.perf_counter() - start,
+            "phases": result["phases"],
+            "model_size": result["model"],
+        }
+    )
+    return row
+
+
+def run_benchmark(
+    sizes=("tiny",),
+    models=MODELS,
+    layouts=("uniform", "clustered"),
+    backend: str = "pulp",
+    capacity_tightness: float = 0.5,
+    fixed_cost: str = "uniform",
+    repeat: int = 1,
+    time_limit: float | None = 60,
+    seed: int = 0,
+    params: dict | None = None,
+    verbose: bool = True,
+) -> list[dict]:
+    """Time the phases of the models on generated instances of increasing size
+
+    For each size, layout and model a seeded instance is generated (the same at every run,
+    so that results of different commits can be compared) and solved repeat times. The
+    distance matrix, the model building, the solve and the extraction and analysis of the
+    solution are timed by the Instrumentation of the optimizer.
+
+    :param sizes: names of SIZES presets and/or (warehouses, customers) pairs
+    :param models: models to solve, among MODELS
+    :param layouts: layouts of the instances, 'uniform' and/or 'clustered'
+    :param backend: backend of the solves, among SOLVER_BACKENDS (models without the backend
+        are skipped)
+    :param capacity_tightness: total demand / total capacity of the instances (CFLP)
+    :param fixed_cost: profile of the fixed costs (see generate_instance)
+    :param repeat: number of runs of each solve
+    :param time_limit: time limit of CBC in seconds
+    :param seed: seed of the instance generator
+    :param params: additional parameters of create_network_optimizer (e.g.
+        max_arcs_per_customer for the large instances)
+    :param verbose: whether to print a line for each solve
+    :return: list of results, one dict per run (see run_instance), with the instance and the
+        model
+    """
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(
+            f"Unknown backend: {backend}. Must be one of: {', '.join(SOLVER_BACKENDS)}."
+        )
+    instances = []
+    for size in [sizes] if isinstance(sizes, str) else sizes:
+        if isinstance(size, str):
+            if size not in SIZES:
+                raise ValueError(
+                    f"Unknown size: {size}. Must be one of: {', '.join(SIZES)}."
+                )
+            instances.extend(SIZES[size])
+        else:
+            instances.append(tuple(size))
+    models = [m for m in models if not BACKENDS[backend] or m in BACKENDS[backend]]
+
+    results = []
+    for num_warehouses, num_customers in instances:
+        for layout in layouts:
+            warehouses, customers = generate_instance(
+                num_warehouses,
+                num_customers,
+                layout=layout,
+                capacity_tightness=capacity_tightness,
+                fixed_cost=fixed_cost,
+                seed=seed,
+            )
+            instance = f"{layout}-{num_warehouses}x{num_customers}-s{seed}"
+            for model in models:
+                for run in range(repeat):
+                    row = {
+                        "instance": instance,
+                        "layout": layout,
+                        "num_warehouses": num_warehouses,
+                        "num_customers": num_customers,
+                        "capacity_tightness": capacity_tightness,
+                        "fixed_cost": fixed_cost,
+                        "seed": seed,
+                        "model": model,
+                        "backend": backend,
+                        "run": run,
+                    }
+                    row.update(
+                        run_instance(
+                            warehouses,
+                            customers,
+                            model,
+                            backend=backend,
+                            time_limit=time_limit,
+                            params=params,
+                        )
+                    )
+                    results.append(row)
+                    if verbose:
+                        phases = ", ".join(
+                            f"{name} {values['wall_time']:.2f}s"
+                            for name, values in row["phases"].items()
+                        )
+                        print(
+                            f"{instance} {model} ({backend}, run {run}): "
+                            f"{row['error'] or row['status']} in {row['wall_time']:.2f}s "
+                            f"[{phases}]"
+                        )
+    return results
+
+
+def _git_commit() -> str | None:
+    """Return the commit of the working directory, None outside a git repository"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """Commit, date and versions of Python and of the main libraries of a benchmark run"""
+    import pulp
+
+    return {
+        "commit": _git_commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pulp": pulp.__version__,
+    }
+
+
+def results_table(results: list[dict]) -> pd.DataFrame:
+    """Flatten the results, one row per run and one column per metric of each phase
+    (e.g. solve_wall_time) and per dimension of the model (e.g. model_variables)"""
+    rows = []
+    for result in results:
+        row = {k: v for k, v in result.items() if k not in ("phases", "model_size")}
+        for phase in PHASES:
+            values = result["phases"].get(phase, {})
+            for metric in METRICS:
+                row[f"{phase}_{metric}"] = values.get(metric)
+        for key, value in result["model_size"].items():
+            row[f"model_{key}"] = value
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def save_results(results: list[dict], path: str, metadata: dict | None = None):
+    """Write the results to a JSON file (with the environment of the run) or, if the path
+    ends with .csv, to a CSV file with one row per run
+    :param results: results of run_benchmark
+    :param path: path of the file
+    :param metadata: environment of the run (default: the current one)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.lower().endswith(".csv"):
+        results_table(results).to_csv(path, index=False)
+        return
+    with open(path, "w") as f:
+        json.dump(
+            {"environment": metadata or environment(), "results": results},
+            f,
+            indent=1,
+            default=float,
+        )
+
+
+def load_results(path: str) -> tuple[list[dict], dict]:
+    """Read the results written by save_results to a JSON file
+    :return: tuple (results, environment)
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return data["results"], data.get("environment", {})
+
+
+def _phase_times(results: list[dict], metric: str) -> pd.DataFrame:
+    """Median of a metric by instance, model, backend and phase (total: the whole run)"""
+    rows = []
+    for result in results:
+        key = {k: result[k] for k in ("instance", "model", "backend")}
+        if result.get("error"):
+            continue
+        for phase, values in result["phases"].items():
+            rows.append({**key, "phase": phase, "value": values.get(metric)})
+        if metric == "wall_time":
+            rows.append({**key, "phase": "total", "value": result["wall_time"]})
+    if not rows:
+        return pd.DataFrame(columns=["instance", "model", "backend", "phase", "value"])
+    return (
+        pd.DataFrame(rows)
+        .groupby(["instance", "model", "backend", "phase"], sort=False)["value"]
+        .median()
+        .reset_index()
+    )
+
+
+def compare_results(
+    baseline: list[dict],
+    current: list[dict],
+    metric: str = "wall_time",
+    threshold: float = 1.25,
+    min_value: float = 0.05,
+) -> pd.DataFrame:
+    """Compare a metric of the phases of two benchmark runs (e.g. of two commits)
+    :param baseline: results of the reference run
+    :param current: results of the new run
+    :param metric: metric compared, among METRICS
+    :param threshold: ratio current / baseline above which a phase is a regression
+    :param min_value: phases below this value in both runs are not flagged (timer noise)
+    :return: DataFrame with instance, model, backend, phase, baseline, current, ratio and
+        regression (bool), for the phases in both runs
+    """
+    if metric not in METRICS:
+        raise ValueError(
+            f"Unknown metric: {metric}. Must be one of: {', '.join(METRICS)}."
+        )
+    keys = ["instance", "model", "backend", "phase"]
+    table = pd.merge(
+        _phase_times(baseline, metric),
+        _phase_times(current, metric),
+        on=keys,
+        suffixes=("_baseline", "_current"),
+    ).rename(columns={"value_baseline": "baseline", "value_current": "current"})
+    table["ratio"] = table["current"] / table["baseline"].where(table["baseline"] > 0)
+    table["regression"] = (table["ratio"] > threshold) & (
+        table[["baseline", "current"]].max(axis=1) >= min_value
+    )
+    return table
@@ -0,0 +1,360 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_structures import NetworkData
+
+# Number of rows read and validated at a time
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Accepted column names of each field (case insensitive), the first one is the default
+COLUMN_ALIASES = {
+    "id": ("id",),
+    "name": ("name", "identifier"),
+    "city": ("city",),
+    "state": ("state",),
+    "zipcode": ("zipcode", "zip"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "capacity": ("capacity",),
+    "fixed_cost": ("fixed_cost", "fixed cost", "yearly fixed cost"),
+    "demand": ("demand", "yearly demand"),
+}
+
+REQUIRED_FIELDS = {
+    "warehouse": ("name", "latitude", "longitude", "capacity"),
+    "customer": ("name", "latitude", "longitude", "demand"),
+}
+
+
+class LoadReport:
+    """Errors and warnings collected while loading warehouses or customers
+
+    Each issue refers to a row of the source (0-based, header excluded), a column and the
+    offending value. Rows with errors are not loaded; warnings (e.g. a missing fixed cost
+    set to zero) do not prevent the row from being loaded.
+    """
+
+    COLUMNS = ["row", "column", "value", "message"]
+
+    def __init__(self, source: str = ""):
+        """
+        :param source: description of the source (e.g. the file path)
+        """
+        self.source = source
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self._errors = []
+        self._warnings = []
+
+    def add(self, rows, column: str, values, message: str, warning: bool = False):
+        """Add an issue for several rows
+        :param rows: source row numbers
+        :param column: name of the column
+        :param values: offending values, one per row
+        :param message: description of the issue
+        :param warning: if True the issue is a warning, otherwise an error
+        """
+        if not len(rows):
+            return
+        issues = pd.DataFrame(
+            {"row": rows, "column": column, "value": values, "message": message}
+        )
+        (self._warnings if warning else self._errors).append(issues)
+
+    def _table(self, issues: list) -> pd.DataFrame:
+        if not issues:
+            return pd.DataFrame(columns=self.COLUMNS)
+        return pd.concat(issues, ignore_index=True).sort_values(
+            "row", kind="stable", ignore_index=True
+        )
+
+    @property
+    def errors(self) -> pd.DataFrame:
+        """Table of the errors (row, column, value, message)"""
+        return self._table(self._errors)
+
+    @property
+    def warnings(self) -> pd.DataFrame:
+        """Table of the warnings (row, column, value, message)"""
+        return self._table(self._warnings)
+
+    @property
+    def ok(self) -> bool:
+        """Whether all the rows were loaded"""
+        return not self._errors
+
+    def __repr__(self) -> str:
+        num_errors = sum(len(each) for each in self._errors)
+        num_warnings = sum(len(each) for each in self._warnings)
+        return (
+            f"LoadReport({self.source!r}: {self.rows_loaded}/{self.rows_read} rows loaded, "
+            f"{num_errors} errors, {num_warnings} warnings)"
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """Number of errors and warnings by column and message"""
+        table = pd.concat(
+            [self.errors.assign(kind="error"), self.warnings.assign(kind="warning")]
+        )
+        return (
+            table.groupby(["kind", "column", "message"])
+            .size()
+            .rename("rows")
+            .reset_index()
+        )
+
+
+def _column_map(columns, datatype: str, names: dict | None) -> dict:
+    """Map each field to the column of the source
+    :param columns: column names of the source
+    :param datatype: 'warehouse' or 'customer'
+    :param names: optional mapping field -> column name given by the user
+    :return: dict field -> column name
+    """
+    lower = {str(c).strip().lower(): c for c in columns}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        if names and field in names:
+            if names[field] not in columns:
+                raise Exception(f"Column {names[field]} not found in the data")
+            mapping[field] = names[field]
+            continue
+        for alias in aliases:
+            if alias in lower:
+                mapping[field] = lower[alias]
+                break
+    missing = [f for f in REQUIRED_FIELDS[datatype] if f not in mapping]
+    if missing:
+        raise Exception(
+            f"Missing columns for {datatype} data: {', '.join(missing)} "
+            f"(found: {', '.join(map(str, columns))})"
+        )
+    return mapping
+
+
+def _validate_chunk(
+    chunk: pd.DataFrame,
+    first_row: int,
+    datatype: str,
+    mapping: dict,
+    report: LoadReport,
+) -> dict:
+    """Validate a chunk of rows and return the columns of its valid rows
+    :param chunk: rows of the source
+    :param first_row: source row number of the first row of the chunk
+    :param datatype: 'warehouse' or 'customer'
+    :param mapping: dict field -> column name
+    :param report: report where the issues are collected
+    :return: dict field -> array of the valid rows
+    """
+    rows = first_row + np.arange(len(chunk))
+    valid = np.ones(len(chunk), dtype=bool)
+    columns = {}
+
+    def numeric(field):
+        raw = chunk[mapping[field]]
+        values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=float)
+        return raw.to_numpy(), values
+
+    def error(mask, field, raw, message):
+        nonlocal valid
+        report.add(rows[mask], mapping.get(field, field), raw[mask], message)
+        valid &= ~mask
+
+    names = chunk[mapping["name"]]
+    missing_name = names.isna().to_numpy() | (names.astype(str).str.strip() == "")
+    error(missing_name, "name", names.to_numpy(), "missing name")
+    columns["name"] = names.astype(str).to_numpy(dtype=object)
+
+    for field, limit in (("latitude", 90), ("longitude", 180)):
+        raw, values = numeric(field)
+        error(
+            ~(np.abs(values) <= limit),
+            field,
+            raw,
+            f"{field} must be in [-{limit}, {limit}]",
+        )
+        columns[field] = values
+
+    if datatype == "warehouse":
+        raw, capacity = numeric("capacity")
+        # -1 means uncapacitated
+        unlimited = capacity == -1
+        error(
+            ~unlimited & ~(capacity >= 0),
+            "capacity",
+            raw,
+            "capacity must be non negative or -1 (uncapacitated)",
+        )
+        columns["capacity"] = np.where(unlimited, np.nan, capacity)
+
+        if "fixed_cost" in mapping:
+            raw, fixed_cost = numeric("fixed_cost")
+        else:
+            raw, fixed_cost = np.full(len(chunk), None), np.full(len(chunk), np.nan)
+        invalid = ~(fixed_cost >= 0)
+        report.add(
+            rows[invalid & valid],
+            mapping.get("fixed_cost", "fixed_cost"),
+            raw[invalid & valid],
+            "fixed cost not valid or missing: set to zero",
+            warning=True,
+        )
+        columns["fixed_cost"] = np.where(invalid, 0.0, fixed_cost)
+    else:
+        raw, demand = numeric("demand")
+        error(~(demand >= 0), "demand", raw, "demand must be non negative")
+        columns["demand"] = demand
+
+    for field in ("city", "state", "zipcode"):
+        if field in mapping:
+            values = chunk[mapping[field]].fillna("").astype(str).to_numpy(dtype=object)
+        elif field == "city":
+            values = columns["name"]
+        else:
+            values = np.full(len(chunk), "", dtype=object)
+        columns[field] = values
+
+    if "id" in mapping:
+        columns["id"] = chunk[mapping["id"]].to_numpy()
+    else:
+        columns["id"] = rows
+
+    report.rows_read += len(chunk)
+    report.rows_loaded += int(valid.sum())
+    return {field: values[valid] for field, values in columns.items()}
+
+
+def _csv_chunks(path: str, chunk_size: int, **kwargs):
+    for chunk in pd.read_csv(path, chunksize=chunk_size, **kwargs):
+        yield chunk
+
+
+def _excel_chunks(path: str, chunk_size: int, sheet_name=None, **kwargs):
+    """Read an Excel sheet in chunks with the streaming (read only) mode of openpyxl"""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(each) if each is not None else "" for each in header]
+        block = []
+        for row in rows:
+            if all(each is None for each in row):
+                continue
+            block.append(row)
+            if len(block) == chunk_size:
+                yield pd.DataFrame(block, columns=header)
+                block = []
+        if block:
+            yield pd.DataFrame(block, columns=header)
+    finally:
+        workbook.close()
+
+
+def _parquet_chunks(path: str, chunk_size: int, **kwargs):
+    """Read a Parquet file by record batches (requires pyarrow)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Reading Parquet files requires pyarrow (pip install pyarrow)")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, **kwargs):
+        yield batch.to_pandas()
+
+
+_READERS = {
+    ".csv": _csv_chunks,
+    ".txt": _csv_chunks,
+    ".xlsx": _excel_chunks,
+    ".xlsm": _excel_chunks,
+    ".parquet": _parquet_chunks,
+    ".pq": _parquet_chunks,
+}
+
+
+def load_data(
+    source,
+    datatype: str,
+    columns: dict | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    errors: str = "collect",
+    **kwargs,
+) -> tuple[NetworkData, LoadReport]:
+    """Load warehouses or customers from a CSV, Excel or Parquet file, chunk by chunk
+
+    Each chunk is validated with vectorized checks: latitude in [-90, 90], longitude in
+    [-180, 180], capacity non negative or -1 (uncapacitated), demand non negative. Invalid
+    fixed costs are set to zero with a warning, as in import_data. Rows with errors are
+    skipped and collected in the report.
+
+    :param source: path of the file (format from the extension) or an iterable of DataFrames
+    :param datatype: 'warehouse' or 'customer'
+    :param columns: optional mapping field -> column name (default: columns named as the
+        fields, e.g. name/identifier, latitude/lat, longitude/lon, capacity, fixed_cost,
+        demand, and optionally id, city, state, zipcode)
+    :param chunk_size: number of rows read at a time
+    :param errors: 'collect' (skip the invalid rows) or 'raise' (raise at the first chunk
+        with errors)
+    :param kwargs: additional parameters of the reader (e.g. sep=";" for CSV files,
+        sheet_name for Excel files)
+    :return: tuple (NetworkData of the valid rows, LoadReport)
+    """
+    if datatype not in REQUIRED_FIELDS:
+        raise Exception("Parameter datatype must be either warehouse or customer")
+    if errors not in ("collect", "raise"):
+        raise ValueError(f"Unknown errors: {errors}. Must be 'collect' or 'raise'.")
+
+    if isinstance(source, (str, os.PathLike)):
+        extension = os.path.splitext(str(source))[1].lower()
+        if extension not in _READERS:
+            raise Exception(
+                f"Unknown file format {extension}: use one of {', '.join(_READERS)}"
+            )
+        chunks = _READERS[extension](source, chunk_size, **kwargs)
+        report = LoadReport(str(source))
+    else:
+        chunks = iter(source)
+        report = LoadReport()
+
+    blocks = []
+    mapping = None
+    first_row = 0
+    for chunk in chunks:
+        if mapping is None:
+            mapping = _column_map(list(chunk.columns), datatype, columns)
+        blocks.append(_validate_chunk(chunk, first_row, datatype, mapping, report))
+        first_row += len(chunk)
+        if errors == "raise" and not report.ok:
+            raise Exception(f"Invalid {datatype} data:\n{report.errors.to_string()}")
+
+    fields = NetworkData.RECORDS[datatype]._fields
+    data = {
+        field: (
+            np.concatenate([block[field] for block in blocks])
+            if blocks
+            else np.empty(0, dtype=object)
+        )
+        for field in ("id",) + fields
+    }
+    ids = data.pop("id")
+    try:
+        result = NetworkData(datatype, ids=ids.tolist(), **data)
+    except ValueError as e:
+        raise Exception(f"Invalid {datatype} data: {e}")
+    return result, report
+
+
+def load_warehouses(source, **kwargs) -> tuple[NetworkData, LoadReport]:
+    """Load warehouses from a CSV, Excel or Parquet file, see load_data"""
+    return load_data(source, "warehouse", **kwargs)
+
+
+def load_customers(source, **kwargs) -> tuple[NetworkData, LoadReport]:
+    """Load customers from a CSV, Excel or Parquet file, see load_data"""
+    return load_data(source, "customer", **kwargs)
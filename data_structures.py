@@ -7,12 +7,14 @@
 # ==============================================================================
 
 from collections import namedtuple
+from collections.abc import Mapping, MutableMapping
 from math import sqrt
 from typing import Optional
+import numpy as np
 import pandas as pd
-from haversine import haversine, Unit
 import folium
 
+from solution import assignments_frame
 
 Warehouse = namedtuple(
     "Warehouse", "name, city, state, zipcode, latitude, longitude, capacity, fixed_cost"
@@ -28,6 +30,316 @@ Factory = namedtuple(
 )
 
 
+class NetworkData(MutableMapping):
+    """Columnar container of warehouses, customers or factories
+
+    The attributes are stored as numpy arrays, one per field of the Warehouse, Customer or
+    Factory namedtuple (numeric fields as float arrays, missing values as NaN; text fields as
+    object arrays), together with an index mapping ids to positions. The class behaves as the
+    dict of namedtuples used elsewhere (data[id] returns a namedtuple built on the fly), while
+    vectors of demands, capacities, fixed costs and coordinates are available without looping
+    over the entries.
+    """
+
+    RECORDS = {"warehouse": Warehouse, "customer": Customer, "factory": Factory}
+    NUMERIC_FIELDS = ("latitude", "longitude", "demand", "capacity", "fixed_cost")
+
+    def __init__(self, kind: str, ids=None, **columns):
+        """
+        :param kind: 'warehouse', 'customer' or 'factory'
+        :param ids: ids of the entries (default: 0, 1, 2, ...)
+        :param columns: values of the fields of the namedtuple (e.g. latitude=[...]); missing
+            text fields are set to "" and missing numeric fields to NaN
+        """
+        if kind not in self.RECORDS:
+            raise ValueError(
+                f"Unknown kind: {kind}. Must be one of: {', '.join(self.RECORDS)}."
+            )
+        self.kind = kind
+        self.record = self.RECORDS[kind]
+        unknown = set(columns) - set(self.record._fields)
+        if unknown:
+            raise ValueError(f"Unknown fields for {kind}: {sorted(unknown)}")
+
+        lengths = {len(values) for values in columns.values() if values is not None}
+        if ids is None:
+            ids = range(lengths.pop() if lengths else 0)
+        ids = list(ids)
+        if lengths - {len(ids)}:
+            raise ValueError("All the columns must have the same length of ids")
+
+        self._ids = ids
+        self.index = {each: n for n, each in enumerate(ids)}
+        if len(self.index) != len(ids):
+            raise ValueError("The ids must be unique")
+        self._columns = {
+            field: self._to_column(field, columns.get(field), len(ids))
+            for field in self.record._fields
+        }
+        self.frozen = False
+        self.changed_fields = frozenset()
+
+    def _to_column(self, field: str, values, n: int) -> np.ndarray:
+        """Convert the values of a field to its column array"""
+        if field in self.NUMERIC_FIELDS:
+            if values is None:
+                return np.full(n, np.nan)
+            # None (e.g. unlimited capacity) becomes NaN
+            return np.array(values, dtype=float)
+        column = np.empty(n, dtype=object)
+        column[:] = "" if values is None else list(values)
+        return column
+
+    @classmethod
+    def from_dict(cls, data: dict, kind: str | None = None) -> "NetworkData":
+        """Build a NetworkData from a dict of Warehouse, Customer or Factory objects
+        :param data: dict of warehouses, customers or factories
+        :param kind: 'warehouse', 'customer' or 'factory' (default: inferred from the values)
+        :return: NetworkData with the same content
+        """
+        if isinstance(data, NetworkData):
+            return data
+        values = list(data.values())
+        if kind is None:
+            kind = cls._infer_kind(values[0]) if values else "customer"
+        fields = cls.RECORDS[kind]._fields
+        columns = {
+            field: [getattr(each, field, None) for each in values]
+            for field in fields
+            if field in cls.NUMERIC_FIELDS
+        }
+        for field in fields:
+            if field not in cls.NUMERIC_FIELDS:
+                columns[field] = [
+                    "" if getattr(each, field, None) is None else getattr(each, field)
+                    for each in values
+                ]
+        return cls(kind, ids=data.keys(), **columns)
+
+    @classmethod
+    def from_dataframe(
+        cls, df: pd.DataFrame, kind: str, id_column: str | None = None
+    ) -> "NetworkData":
+        """Build a NetworkData from a DataFrame with one column per field
+        :param df: DataFrame (columns named as the fields of the namedtuple)
+        :param kind: 'warehouse', 'customer' or 'factory'
+        :param id_column: column with the ids (default: the index of the DataFrame)
+        """
+        ids = df.index if id_column is None else df[id_column]
+        columns = {
+            field: df[field].to_numpy()
+            for field in cls.RECORDS[kind]._fields
+            if field in df.columns
+        }
+        return cls(kind, ids=ids, **columns)
+
+    @staticmethod
+    def _infer_kind(entry) -> str:
+        for kind, record in NetworkData.RECORDS.items():
+            if isinstance(entry, record):
+                return kind
+        return "customer" if hasattr(entry, "demand") else "warehouse"
+
+    def to_dict(self) -> dict:
+        """Return the data as a dict of namedtuples"""
+        return {each: self[each] for each in self._ids}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the data as a DataFrame indexed by id"""
+        return pd.DataFrame(self._columns, index=pd.Index(self._ids, name="id"))
+
+    def __getitem__(self, key):
+        n = self.index[key]
+        values = {}
+        for field, column in self._columns.items():
+            value = column[n]
+            if field in self.NUMERIC_FIELDS:
+                value = None if np.isnan(value) else float(value)
+            values[field] = value
+        return self.record(**values)
+
+    def _check_mutable(self):
+        if self.frozen:
+            raise TypeError(
+                "NetworkData snapshots are immutable, use the bulk set/scale functions"
+            )
+
+    def __setitem__(self, key, value):
+        self._check_mutable()
+        n = self.index.get(key)
+        if n is None:
+            n = len(self._ids)
+            self._ids.append(key)
+            self.index[key] = n
+            for field, column in self._columns.items():
+                self._columns[field] = np.append(
+                    column, np.nan if field in self.NUMERIC_FIELDS else ""
+                )
+        for field, column in self._columns.items():
+            v = getattr(value, field, None)
+            if field in self.NUMERIC_FIELDS:
+                column[n] = np.nan if v is None else v
+            else:
+                column[n] = "" if v is None else v
+
+    def __delitem__(self, key):
+        self._check_mutable()
+        n = self.index.pop(key)
+        del self._ids[n]
+        for field, column in self._columns.items():
+            self._columns[field] = np.delete(column, n)
+        self.index = {each: n for n, each in enumerate(self._ids)}
+
+    def extend(self, ids, records) -> None:
+        """Append several entries at once (one concatenation per column)
+        :param ids: ids of the new entries (not already present)
+        :param records: Warehouse/Customer/Factory objects, one per id
+        """
+        self._check_mutable()
+        ids, records = list(ids), list(records)
+        if len(ids) != len(records):
+            raise ValueError("ids and records must have the same length")
+        if any(each in self.index for each in ids) or len(set(ids)) != len(ids):
+            raise ValueError("The ids must be unique")
+        for field, column in self._columns.items():
+            values = [getattr(each, field, None) for each in records]
+            if field not in self.NUMERIC_FIELDS:
+                values = ["" if v is None else v for v in values]
+            self._columns[field] = np.concatenate(
+                (column, self._to_column(field, values, len(ids)))
+            )
+        start = len(self._ids)
+        self._ids.extend(ids)
+        self.index.update((each, start + n) for n, each in enumerate(ids))
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        return f"NetworkData({self.kind}, {len(self)} entries)"
+
+    def snapshot(self, **columns) -> "NetworkData":
+        """Return an immutable copy, with some columns replaced
+        The arrays of a frozen container are read-only and shared with its snapshots;
+        changed_fields holds the fields whose values differ from this container.
+        :param columns: new values of some fields (arrays aligned with the entries)
+        """
+        data = object.__new__(NetworkData)
+        data.kind, data.record = self.kind, self.record
+        data._ids = self._ids if self.frozen else list(self._ids)
+        data.index = self.index if self.frozen else dict(self.index)
+        data._columns = {}
+        changed = set()
+        for field, column in self._columns.items():
+            if field in columns:
+                new = self._to_column(field, columns[field], len(self._ids))
+                if not _same_values(new, column):
+                    changed.add(field)
+                column = new
+            elif not self.frozen:
+                column = column.copy()
+            column.flags.writeable = False
+            data._columns[field] = column
+        data.frozen = True
+        data.changed_fields = frozenset(changed)
+        return data
+
+    def freeze(self) -> "NetworkData":
+        """Make the container immutable in place (read-only arrays) and return it"""
+        for column in self._columns.values():
+            column.flags.writeable = False
+        self.frozen = True
+        return self
+
+    def diff(self, other: "NetworkData") -> set:
+        """Return the fields whose values differ from those of other (same ids required)"""
+        if self._ids != other._ids:
+            raise ValueError("The containers have different ids")
+        return {
+            field
+            for field, column in self._columns.items()
+            if column is not other._columns[field]
+            and not _same_values(column, other._columns[field])
+        }
+
+    @property
+    def ids(self) -> list:
+        return self._ids
+
+    def positions(self, ids) -> np.ndarray:
+        """Return the positions of the given ids"""
+        return np.fromiter((self.index[each] for each in ids), dtype=np.int64)
+
+    def column(self, field: str, ids=None) -> np.ndarray:
+        """Return the values of a field, for all the entries (in order) or for the given ids
+        :param field: name of the field (e.g. 'demand')
+        :param ids: optional ids of the entries
+        """
+        if field not in self._columns:
+            raise ValueError(f"{self.kind} has no field {field}")
+        column = self._columns[field]
+        if ids is None:
+            return column
+        return column[self.positions(ids)]
+
+    @property
+    def latitude(self) -> np.ndarray:
+        return self.column("latitude")
+
+    @property
+    def longitude(self) -> np.ndarray:
+        return self.column("longitude")
+
+    @property
+    def demand(self) -> np.ndarray:
+        return self.column("demand")
+
+    @property
+    def capacity(self) -> np.ndarray:
+        return self.column("capacity")
+
+    @property
+    def fixed_cost(self) -> np.ndarray:
+        return self.column("fixed_cost")
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the numeric columns"""
+        return int(
+            sum(
+                column.nbytes
+                for field, column in self._columns.items()
+                if field in self.NUMERIC_FIELDS
+            )
+        )
+
+
+def _same_values(a: np.ndarray, b: np.ndarray) -> bool:
+    """Whether two columns hold the same values (NaN equal to NaN)"""
+    if a.dtype == object or b.dtype == object:
+        return bool(np.array_equal(a, b))
+    return bool(np.array_equal(a, b, equal_nan=True))
+
+
+def get_values(data: dict, field: str, ids=None) -> np.ndarray:
+    """Return the values of a field (e.g. 'demand') of warehouses or customers as a float array
+    :param data: dict of warehouses or customers, or NetworkData
+    :param field: name of the field
+    :param ids: optional ids of the entries (default: all, in the order of data)
+    :return: array of values, NaN where the value is None
+    """
+    if isinstance(data, NetworkData):
+        return data.column(field, ids)
+    keys = data.keys() if ids is None else ids
+    return np.array([getattr(data[each], field) for each in keys], dtype=float)
+
+
 def import_data(data, datatype):
     """Importa data from a variable.
     The <data> parameter must be a list of strings containing values separated by ';'
@@ -102,36 +414,665 @@ def dist(origin: Warehouse, destination: Customer) -> float:
         )
 
 
-def calculate_dm(warehouses: dict, customers: dict, use_haversine: bool = True) -> dict:
-    """Calculate the distance matrix between warehouses and customers using the haversine formula
+EARTH_RADIUS_KM = 6371.0088  # same mean radius used by the haversine package
+
+# Number of customers processed per block when filling the distance matrix.
+# It bounds the size of the temporary arrays created by the broadcasting.
+DM_BLOCK_SIZE = 4096
+
+
+class DistanceMatrix(Mapping):
+    """Dense distance matrix between warehouses and customers
+
+    Distances are stored in a contiguous 2D numpy array (rows = warehouses, columns = customers),
+    the index maps translate warehouse and customer ids into row and column positions.
+    The class behaves as a read-only dict keyed by (warehouse_id, customer_id), so it can
+    be used wherever the tuple-keyed distance dict is expected, at a fraction of its memory
+    (8 bytes per pair with float64, 4 bytes with float32).
+    """
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        warehouses_index: dict,
+        customers_index: dict,
+        dtype=None,
+    ):
+        """
+        :param data: 2D array of distances with shape (num. warehouses, num. customers)
+        :param warehouses_index: dict mapping warehouse ids to row positions
+        :param customers_index: dict mapping customer ids to column positions
+        :param dtype: optional dtype of the stored data (e.g. np.float32 to halve the memory)
+        """
+        data = np.ascontiguousarray(data, dtype=dtype)
+        if data.shape != (len(warehouses_index), len(customers_index)):
+            raise Exception(
+                "The shape of the distance data does not match the warehouses and customers indexes"
+            )
+        self.data = data
+        self.warehouses_index = warehouses_index
+        self.customers_index = customers_index
+        self._warehouses_id = np.array(list(warehouses_index.keys()))
+        self._customers_id = np.array(list(customers_index.keys()))
+
+    @classmethod
+    def from_dict(
+        cls,
+        distance: dict,
+        warehouses_id: list | None = None,
+        customers_id: list | None = None,
+        dtype=np.float64,
+    ) -> "DistanceMatrix":
+        """Build a DistanceMatrix from a dict keyed by (warehouse_id, customer_id)
+        :param distance: tuple-keyed distance dict
+        :param warehouses_id: optional ordered list of warehouse ids (default: order of appearance)
+        :param customers_id: optional ordered list of customer ids (default: order of appearance)
+        :param dtype: dtype of the stored data
+        :return: DistanceMatrix with the same content
+        """
+        if isinstance(distance, DistanceMatrix):
+            return distance.astype(dtype)
+
+        if warehouses_id is None:
+            warehouses_id = list(dict.fromkeys(w for w, _ in distance.keys()))
+        if customers_id is None:
+            customers_id = list(dict.fromkeys(c for _, c in distance.keys()))
+        warehouses_index = {w: n for n, w in enumerate(warehouses_id)}
+        customers_index = {c: n for n, c in enumerate(customers_id)}
+
+        data = np.full(
+            (len(warehouses_index), len(customers_index)), np.nan, dtype=dtype
+        )
+        for (w, c), value in distance.items():
+            data[warehouses_index[w], customers_index[c]] = value
+        if np.isnan(data).any():
+            raise Exception("The distance dict does not contain all the pairs")
+
+        return cls(data, warehouses_index, customers_index)
+
+    def __getitem__(self, key: tuple) -> float:
+        w, c = key
+        return self.data.item(self.warehouses_index[w], self.customers_index[c])
+
+    def __iter__(self):
+        for w in self.warehouses_index:
+            for c in self.customers_index:
+                yield (w, c)
+
+    def __len__(self) -> int:
+        return self.data.size
+
+    def __repr__(self) -> str:
+        return (
+            f"DistanceMatrix({len(self.warehouses_index)} warehouses x "
+            f"{len(self.customers_index)} customers, {self.data.dtype})"
+        )
+
+    @property
+    def warehouses_id(self) -> np.ndarray:
+        """Warehouse ids in row order"""
+        return self._warehouses_id
+
+    @property
+    def customers_id(self) -> np.ndarray:
+        """Customer ids in column order"""
+        return self._customers_id
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the distance data"""
+        return self.data.nbytes
+
+    def astype(self, dtype) -> "DistanceMatrix":
+        """Return the matrix with the data converted to dtype (no copy if already of that dtype)"""
+        if self.data.dtype == np.dtype(dtype):
+            return self
+        return DistanceMatrix(
+            self.data.astype(dtype), self.warehouses_index, self.customers_index
+        )
+
+    def row(self, w_id) -> np.ndarray:
+        """Return the distances from warehouse w_id to all the customers (view, column order)"""
+        return self.data[self.warehouses_index[w_id]]
+
+    def column(self, c_id) -> np.ndarray:
+        """Return the distances from all the warehouses to customer c_id (row order)"""
+        return self.data[:, self.customers_index[c_id]]
+
+    def _rows(self, warehouses_id) -> np.ndarray:
+        """Return the row positions of a subset of warehouses (all rows if None)"""
+        if warehouses_id is None:
+            return np.arange(len(self.warehouses_index))
+        return np.fromiter(
+            (self.warehouses_index[w] for w in warehouses_id),
+            dtype=np.intp,
+        )
+
+    def min(self, warehouses_id=None) -> np.ndarray:
+        """Return, for each customer (column order), the distance to the closest warehouse
+        :param warehouses_id: optional subset of warehouses to be considered (e.g. the open ones)
+        """
+        if warehouses_id is None:
+            return self.data.min(axis=0)
+        return self.data[self._rows(warehouses_id)].min(axis=0)
+
+    def argmin(self, warehouses_id=None) -> np.ndarray:
+        """Return, for each customer (column order), the id of the closest warehouse
+        :param warehouses_id: optional subset of warehouses to be considered (e.g. the open ones)
+        """
+        rows = self._rows(warehouses_id)
+        if warehouses_id is None:
+            positions = self.data.argmin(axis=0)
+        else:
+            positions = rows[self.data[rows].argmin(axis=0)]
+        return self._warehouses_id[positions]
+
+    def mask(self, condition: np.ndarray) -> "DistanceMatrix":
+        """Wrap a boolean array with the same shape as the data (e.g. dm.data <= 100) as a
+        matrix of 0/1 parameters indexed by (warehouse_id, customer_id)"""
+        return DistanceMatrix(
+            condition.astype(np.int8), self.warehouses_index, self.customers_index
+        )
+
+
+def get_coordinates(data: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Return the latitudes and longitudes of a dict of warehouses or customers as numpy arrays
+    :param data: dict of warehouses or customers, or NetworkData
+    :return: tuple (latitudes, longitudes), ordered as the dict
+    """
+    if isinstance(data, NetworkData):
+        return data.latitude, data.longitude
+    latitude = np.fromiter(
+        (each.latitude for each in data.values()), dtype=float, count=len(data)
+    )
+    longitude = np.fromiter(
+        (each.longitude for each in data.values()), dtype=float, count=len(data)
+    )
+    return latitude, longitude
+
+
+def haversine_matrix(
+    lat_1: np.ndarray,
+    lon_1: np.ndarray,
+    lat_2: np.ndarray,
+    lon_2: np.ndarray,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Return the matrix of haversine distances (km) between two sets of points
+    :param lat_1: latitudes of the origins (rows of the matrix)
+    :param lon_1: longitudes of the origins
+    :param lat_2: latitudes of the destinations (columns of the matrix)
+    :param lon_2: longitudes of the destinations
+    :param out: optional array where the result is stored
+    :return: array with shape (len(lat_1), len(lat_2))
+    """
+    lat_1 = np.radians(lat_1)[:, None]
+    lon_1 = np.radians(lon_1)[:, None]
+    lat_2 = np.radians(lat_2)[None, :]
+    lon_2 = np.radians(lon_2)[None, :]
+
+    d = (
+        np.sin((lat_2 - lat_1) * 0.5) ** 2
+        + np.cos(lat_1) * np.cos(lat_2) * np.sin((lon_2 - lon_1) * 0.5) ** 2
+    )
+    np.sqrt(d, out=d)
+    np.minimum(d, 1.0, out=d)  # guard against rounding errors for antipodal points
+    np.arcsin(d, out=d)
+    return np.multiply(d, 2 * EARTH_RADIUS_KM, out=out)
+
+
+def euclidean_matrix(
+    lat_1: np.ndarray,
+    lon_1: np.ndarray,
+    lat_2: np.ndarray,
+    lon_2: np.ndarray,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Return the matrix of euclidean distances between two sets of points (same as dist())
+    :param lat_1: latitudes of the origins (rows of the matrix)
+    :param lon_1: longitudes of the origins
+    :param lat_2: latitudes of the destinations (columns of the matrix)
+    :param lon_2: longitudes of the destinations
+    :param out: optional array where the result is stored
+    :return: array with shape (len(lat_1), len(lat_2))
+    """
+    return np.hypot(
+        lat_1[:, None] - lat_2[None, :], lon_1[:, None] - lon_2[None, :], out=out
+    )
+
+
+def calculate_dm_array(
+    warehouses: dict,
+    customers: dict,
+    use_haversine: bool = True,
+    dtype=np.float64,
+    circuity_factor: float = 1.0,
+) -> tuple[np.ndarray, dict, dict]:
+    """Calculate the distance matrix between warehouses and customers as a dense numpy array
     :param warehouses: dict of warehouses
     :param customers: dict of customers
-    :return: distance matrix
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :param dtype: dtype of the returned array (np.float32 halves the memory)
+    :param circuity_factor: ratio between road and straight-line distances (1 = straight line)
+    :return: tuple (distances, warehouses index, customers index), where the indexes map ids to
+        row/column positions of the distances array
     """
 
     if not all([warehouses, customers]):
         raise Exception("You must pass the location of warehouses and customers")
 
-    dm = {}
+    w_lat, w_lon = get_coordinates(warehouses)
+    c_lat, c_lon = get_coordinates(customers)
+    kernel = haversine_matrix if use_haversine else euclidean_matrix
+
+    data = np.empty((len(warehouses), len(customers)), dtype=dtype)
+    for start in range(0, len(customers), DM_BLOCK_SIZE):
+        end = start + DM_BLOCK_SIZE
+        kernel(w_lat, w_lon, c_lat[start:end], c_lon[start:end], out=data[:, start:end])
+    if circuity_factor != 1.0:
+        data *= circuity_factor
+
+    warehouses_index = {w: n for n, w in enumerate(warehouses.keys())}
+    customers_index = {c: n for n, c in enumerate(customers.keys())}
+
+    return data, warehouses_index, customers_index
+
+
+def calculate_dm(
+    warehouses: dict,
+    customers: dict,
+    use_haversine: bool = True,
+    dtype=np.float64,
+    circuity_factor: float = 1.0,
+) -> DistanceMatrix:
+    """Calculate the distance matrix between warehouses and customers using the haversine formula
+    :param warehouses: dict of warehouses
+    :param customers: dict of customers
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :param dtype: dtype of the stored distances (np.float32 halves the memory)
+    :param circuity_factor: ratio between road and straight-line distances (1 = straight line)
+    :return: distance matrix, indexed by (warehouse_id, customer_id) as a dict
+    """
+
+    data, warehouses_index, customers_index = calculate_dm_array(
+        warehouses,
+        customers,
+        use_haversine=use_haversine,
+        dtype=dtype,
+        circuity_factor=circuity_factor,
+    )
+    return DistanceMatrix(data, warehouses_index, customers_index)
+
+
+class SparseDistanceMatrix(Mapping):
+    """Sparse distance matrix between warehouses and customers
+
+    Only the admissible (warehouse, customer) pairs are stored, e.g. the k nearest warehouses
+    of each customer or the warehouses within a radius. Data are stored by customer (column)
+    in compressed form: the pairs of customer c are at positions indptr[c]:indptr[c + 1] of the
+    rows (warehouse positions, sorted) and data (distances) arrays.
+    The class behaves as a read-only dict keyed by (warehouse_id, customer_id) containing only
+    the stored pairs, so memory scales with the number of customers times k rather than the
+    number of warehouses.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        data: np.ndarray,
+        warehouses_index: dict,
+        customers_index: dict,
+    ):
+        """
+        :param indptr: array of len(customers) + 1 offsets of each customer's pairs
+        :param rows: warehouse positions of the pairs, sorted within each customer
+        :param data: distances of the pairs
+        :param warehouses_index: dict mapping warehouse ids to positions
+        :param customers_index: dict mapping customer ids to positions
+        """
+        if len(indptr) != len(customers_index) + 1 or len(rows) != len(data):
+            raise Exception(
+                "The shape of the sparse distance data does not match the warehouses and customers indexes"
+            )
+        self.indptr = indptr
+        self.rows = rows
+        self.data = data
+        self.warehouses_index = warehouses_index
+        self.customers_index = customers_index
+        self._warehouses_id = np.array(list(warehouses_index.keys()))
+        self._customers_id = np.array(list(customers_index.keys()))
+
+    def _position(self, w, c) -> int:
+        """Return the position of the pair (w, c) in the data array, -1 if not stored"""
+        row = self.warehouses_index[w]
+        start, end = (
+            self.indptr[self.customers_index[c]],
+            self.indptr[self.customers_index[c] + 1],
+        )
+        i = start + np.searchsorted(self.rows[start:end], row)
+        if i < end and self.rows[i] == row:
+            return i
+        return -1
+
+    def __getitem__(self, key: tuple) -> float:
+        w, c = key
+        i = self._position(w, c)
+        if i < 0:
+            raise KeyError(key)
+        return self.data.item(i)
+
+    def __contains__(self, key) -> bool:
+        try:
+            w, c = key
+            return self._position(w, c) >= 0
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return self.arcs()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return (
+            f"SparseDistanceMatrix({len(self.warehouses_index)} warehouses x "
+            f"{len(self.customers_index)} customers, {len(self.data)} pairs)"
+        )
+
+    @property
+    def warehouses_id(self) -> np.ndarray:
+        """Warehouse ids in position order"""
+        return self._warehouses_id
+
+    @property
+    def customers_id(self) -> np.ndarray:
+        """Customer ids in position order"""
+        return self._customers_id
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the sparse data"""
+        return self.indptr.nbytes + self.rows.nbytes + self.data.nbytes
+
+    def arcs(self):
+        """Iterate over the stored (warehouse_id, customer_id) pairs, customer by customer"""
+        w_ids = self._warehouses_id[self.rows].tolist()
+        for n, c in enumerate(self.customers_index):
+            for i in range(self.indptr[n], self.indptr[n + 1]):
+                yield (w_ids[i], c)
+
+    def customer_arcs(self, c_id) -> tuple[np.ndarray, np.ndarray]:
+        """Return the ids of the warehouses stored for customer c_id and their distances"""
+        n = self.customers_index[c_id]
+        start, end = self.indptr[n], self.indptr[n + 1]
+        return self._warehouses_id[self.rows[start:end]], self.data[start:end]
+
+    def counts(self) -> np.ndarray:
+        """Return the number of stored warehouses for each customer (position order)"""
+        return np.diff(self.indptr)
+
+    def min(self) -> np.ndarray:
+        """Return, for each customer, the distance to the closest stored warehouse
+        (inf if the customer has no stored warehouse)"""
+        result = np.full(len(self.customers_index), np.inf)
+        nonempty = self.counts() > 0
+        if nonempty.any():
+            result[nonempty] = np.minimum.reduceat(
+                self.data, self.indptr[:-1][nonempty]
+            )
+        return result
+
+    def argmin(self) -> np.ndarray:
+        """Return, for each customer, the id of the closest stored warehouse"""
+        counts = self.counts()
+        if (counts == 0).any():
+            raise Exception("Some customers have no warehouse within reach")
+        columns = np.repeat(np.arange(len(counts)), counts)
+        order = np.lexsort((self.data, columns))
+        return self._warehouses_id[self.rows[order[self.indptr[:-1]]]]
+
+    def mask(self, condition: np.ndarray) -> "SparseDistanceMatrix":
+        """Wrap a boolean array aligned with the data (e.g. dm.data <= 100) as a sparse
+        matrix of 0/1 parameters indexed by (warehouse_id, customer_id)"""
+        return SparseDistanceMatrix(
+            self.indptr,
+            self.rows,
+            condition.astype(np.int8),
+            self.warehouses_index,
+            self.customers_index,
+        )
+
+    def to_dense(self, fill_value: float = np.inf) -> DistanceMatrix:
+        """Return the equivalent DistanceMatrix, missing pairs are set to fill_value"""
+        data = np.full(
+            (len(self.warehouses_index), len(self.customers_index)),
+            fill_value,
+            dtype=self.data.dtype,
+        )
+        data[
+            self.rows, np.repeat(np.arange(len(self.customers_index)), self.counts())
+        ] = self.data
+        return DistanceMatrix(data, self.warehouses_index, self.customers_index)
+
+
+class SpatialIndex:
+    """Uniform grid index over warehouse locations
+
+    With the haversine metric the warehouses are mapped to 3D points on the unit sphere and
+    bucketed in a regular grid of cubic cells; with the euclidean metric a 2D grid on
+    (latitude, longitude) is used. Points in cells whose indexes differ by d (on any axis)
+    are at least (d - 1) * cell_size apart, which is used to prune the candidate warehouses
+    of the k-nearest and radius queries. Exact distances are computed with the same kernels
+    of calculate_dm.
+    """
+
+    def __init__(
+        self,
+        warehouses: dict,
+        use_haversine: bool = True,
+        cell_size: float | None = None,
+    ):
+        """
+        :param warehouses: dict of warehouses
+        :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+        :param cell_size: size of the grid cells (chord length on the unit sphere with haversine,
+            degrees otherwise). By default about 4 warehouses per cell
+        """
+        if not warehouses:
+            raise Exception("You must pass the location of the warehouses")
+
+        self.use_haversine = use_haversine
+        self.kernel = haversine_matrix if use_haversine else euclidean_matrix
+        self.warehouses_index = {w: n for n, w in enumerate(warehouses.keys())}
+        self.latitude, self.longitude = get_coordinates(warehouses)
+
+        points = self._to_points(self.latitude, self.longitude)
+        if cell_size is None:
+            extent = np.ptp(points, axis=0).max() or 1.0
+            cell_size = extent / max(1.0, np.sqrt(len(warehouses) / 4))
+        self.cell_size = cell_size
+
+        self.cells, inverse = np.unique(
+            self._to_cells(points), axis=0, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        self._members = np.argsort(inverse, kind="stable")
+        self._counts = np.bincount(inverse, minlength=len(self.cells))
+        self._starts = np.concatenate(([0], np.cumsum(self._counts)))
+
+    def _to_points(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        if not self.use_haversine:
+            return np.column_stack((latitude, longitude))
+        lat = np.radians(latitude)
+        lon = np.radians(longitude)
+        return np.column_stack(
+            (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat))
+        )
+
+    def _to_cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    def _to_distance(self, chord: np.ndarray) -> np.ndarray:
+        """Convert a grid (chord) length into a distance of the metric"""
+        if not self.use_haversine:
+            return chord
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+    def _members_of(self, cells: np.ndarray) -> np.ndarray:
+        """Return the warehouse positions contained in the given cells"""
+        if not len(cells):
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(
+            [self._members[self._starts[n] : self._starts[n + 1]] for n in cells]
+        )
 
-    for kw, w in warehouses.items():
-        for kc, c in customers.items():
-            if use_haversine:
-                dm[(kw, kc)] = haversine(
-                    (w.latitude, w.longitude),
-                    (c.latitude, c.longitude),
-                    unit=Unit.KILOMETERS,
+    def query(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        k: int | None = None,
+        radius: float | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the k nearest warehouses and/or the warehouses within radius of each point
+        :param latitude: latitudes of the query points
+        :param longitude: longitudes of the query points
+        :param k: number of nearest warehouses to be returned for each point
+        :param radius: maximum distance of the returned warehouses
+        :return: tuple (points, warehouses, distances) of arrays listing the pairs found, where
+            points are positions in the query arrays and warehouses are positions in the index
+        """
+        if k is None and radius is None:
+            raise Exception("You must specify k and/or radius")
+        if k is not None:
+            k = min(int(k), len(self.warehouses_index))
+            if k < 1:
+                raise Exception("k must be a positive integer")
+
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        query_cells, inverse = np.unique(
+            self._to_cells(self._to_points(latitude, longitude)),
+            axis=0,
+            return_inverse=True,
+        )
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        group_starts = np.concatenate(([0], np.cumsum(np.bincount(inverse))))
+
+        points, warehouses, distances = [], [], []
+        for n, cell in enumerate(query_cells):
+            group = order[group_starts[n] : group_starts[n + 1]]
+
+            # Lower bound of the distance between the group and each cell of the index
+            offset = np.abs(self.cells - cell).max(axis=1)
+            bounds = self._to_distance(np.maximum(offset - 1, 0) * self.cell_size)
+
+            if k is None:
+                candidates = self._members_of(np.flatnonzero(bounds <= radius))
+                if not len(candidates):
+                    continue
+            else:
+                # Take the closest cells until there are at least k candidates...
+                by_bound = np.argsort(bounds, kind="stable")
+                enough = np.searchsorted(np.cumsum(self._counts[by_bound]), k) + 1
+                candidates = self._members_of(by_bound[:enough])
+                d = self.kernel(
+                    latitude[group],
+                    longitude[group],
+                    self.latitude[candidates],
+                    self.longitude[candidates],
                 )
+                kth = np.partition(d, k - 1, axis=1)[:, k - 1].max()
+                if radius is not None:
+                    kth = min(kth, radius)
+                # ...then add all the cells that may contain closer warehouses
+                closer = by_bound[enough:][bounds[by_bound[enough:]] <= kth]
+                if len(closer):
+                    candidates = self._members_of(
+                        np.concatenate((by_bound[:enough], closer))
+                    )
+
+            d = self.kernel(
+                latitude[group],
+                longitude[group],
+                self.latitude[candidates],
+                self.longitude[candidates],
+            )
+            if k is None:
+                rows, cols = np.nonzero(d <= radius)
             else:
-                dm[(kw, kc)] = dist(w, c)
+                cols = np.argpartition(d, k - 1, axis=1)[:, :k].ravel()
+                rows = np.repeat(np.arange(len(group)), k)
+                if radius is not None:
+                    within = d[rows, cols] <= radius
+                    rows, cols = rows[within], cols[within]
+
+            points.append(group[rows])
+            warehouses.append(candidates[cols])
+            distances.append(d[rows, cols])
+
+        if not points:
+            return (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+        return (
+            np.concatenate(points),
+            np.concatenate(warehouses),
+            np.concatenate(distances),
+        )
 
-    return dm
+
+def calculate_sparse_dm(
+    warehouses: dict,
+    customers: dict,
+    k: int | None = None,
+    radius: float | None = None,
+    use_haversine: bool = True,
+    dtype=np.float64,
+    index: SpatialIndex | None = None,
+) -> SparseDistanceMatrix:
+    """Calculate the distances between each customer and its k nearest warehouses and/or the
+    warehouses within radius, using a spatial index on the warehouses
+    :param warehouses: dict of warehouses
+    :param customers: dict of customers
+    :param k: number of nearest warehouses stored for each customer
+    :param radius: maximum distance of the stored warehouses
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :param dtype: dtype of the stored distances
+    :param index: optional SpatialIndex of the warehouses, to be reused across calls
+    :return: sparse distance matrix, indexed by (warehouse_id, customer_id) as a dict
+    """
+
+    if not all([warehouses, customers]):
+        raise Exception("You must pass the location of warehouses and customers")
+
+    if index is None:
+        index = SpatialIndex(warehouses, use_haversine=use_haversine)
+    elif index.use_haversine != use_haversine:
+        raise Exception("The spatial index uses a different distance metric")
+
+    c_lat, c_lon = get_coordinates(customers)
+    points, rows, distances = index.query(c_lat, c_lon, k=k, radius=radius)
+
+    # Sort the pairs by customer, then by warehouse
+    order = np.lexsort((rows, points))
+    indptr = np.concatenate(
+        ([0], np.cumsum(np.bincount(points, minlength=len(customers))))
+    )
+
+    return SparseDistanceMatrix(
+        indptr=indptr,
+        rows=rows[order],
+        data=distances[order].astype(dtype),
+        warehouses_index=index.warehouses_index,
+        customers_index={c: n for n, c in enumerate(customers.keys())},
+    )
 
 
 def show_data(data: dict) -> None:
     """Print the data in a readable format"""
     with pd.option_context("display.max_rows", 100):
-        if not isinstance(data, dict):
+        if not isinstance(data, (dict, NetworkData)):
             raise Exception("Param data must be a dict")
         df = []
         for k, v in data.items():
@@ -307,42 +1248,129 @@ def set_all_demands(customers: dict, demand: int | float = 0) -> None:
         set_demand(customers, k, demand)
 
 
+def _field_values(data: NetworkData, values, current: np.ndarray) -> np.ndarray:
+    """Return the new values of a column from a scalar, an array aligned with the entries or
+    a mapping id -> value (unknown ids are ignored, missing ids keep the current value)
+    """
+    if isinstance(values, Mapping):
+        known = [each for each in values if each in data.index]
+        new = current.astype(float)
+        new[data.positions(known)] = np.array(
+            [values[each] for each in known], dtype=float
+        )
+        return new
+    values = np.asarray(values, dtype=float)
+    if values.ndim and len(values) != len(data):
+        raise ValueError(
+            f"Expected {len(data)} values, got {len(values)}: pass a mapping id -> value "
+            "to change a subset of the entries"
+        )
+    return np.broadcast_to(values, current.shape).copy()
+
+
+def _selection(data: NetworkData, where) -> np.ndarray | None:
+    """Return the boolean mask of the selected entries (None = all)"""
+    if where is None:
+        return None
+    mask = where(data) if callable(where) else where
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape != (len(data),):
+        raise ValueError("where must select the entries with a boolean array")
+    return mask
+
+
+def _bulk_source(data) -> NetworkData:
+    """Return the container the bulk functions start from: dicts are converted (and frozen,
+    so that the snapshot shares their arrays)"""
+    if isinstance(data, NetworkData):
+        return data
+    return NetworkData.from_dict(data).freeze()
+
+
+def set_values(data: dict, field: str, values, where=None) -> NetworkData:
+    """Set the values of a field of all or some entries in one vectorized pass
+    :param data: dict of warehouses or customers, or NetworkData
+    :param field: field to change (e.g. 'capacity')
+    :param values: scalar, array aligned with the entries or mapping id -> value
+    :param where: optional boolean array, or function of the NetworkData returning it
+        (e.g. lambda c: c.latitude > 45), selecting the entries to change
+    :return: immutable NetworkData snapshot; changed_fields holds the fields that changed
+    """
+    data = _bulk_source(data)
+    current = data.column(field)
+    new = _field_values(data, values, current)
+    mask = _selection(data, where)
+    if mask is not None:
+        new = np.where(mask, new, current)
+    return data.snapshot(**{field: new})
+
+
+def scale_values(data: dict, field: str, factor, where=None, decimals=0) -> NetworkData:
+    """Multiply the values of a field of all or some entries in one vectorized pass
+    :param data: dict of warehouses or customers, or NetworkData
+    :param field: field to change (e.g. 'demand')
+    :param factor: scalar, array aligned with the entries or mapping id -> factor
+        (e.g. regional growth factors)
+    :param where: optional selection of the entries to change, as in set_values
+    :param decimals: decimals of the rounded result (None = no rounding)
+    :return: immutable NetworkData snapshot; changed_fields holds the fields that changed
+    """
+    data = _bulk_source(data)
+    current = data.column(field)
+    factor = _field_values(data, factor, np.ones(len(data)))
+    mask = _selection(data, where)
+    if mask is not None:
+        factor = np.where(mask, factor, 1.0)
+    new = current * factor
+    if decimals is not None:
+        new = np.round(new, decimals)
+    return data.snapshot(**{field: new})
+
+
+def set_capacities(warehouses: dict, capacity, where=None) -> NetworkData:
+    """Set the capacity of the warehouses (None/NaN = unlimited), see set_values"""
+    return set_values(warehouses, "capacity", capacity, where)
+
+
+def set_fixed_costs(warehouses: dict, fixed_cost, where=None) -> NetworkData:
+    """Set the fixed cost of the warehouses, see set_values"""
+    return set_values(warehouses, "fixed_cost", fixed_cost, where)
+
+
+def set_demands(customers: dict, demand, where=None) -> NetworkData:
+    """Set the demand of the customers, see set_values"""
+    return set_values(customers, "demand", demand, where)
+
+
+def scale_demands(customers: dict, factor, where=None) -> NetworkData:
+    """Scale the demand of the customers (rounded to integer as scale_demand), see
+    scale_values"""
+    return scale_values(customers, "demand", factor, where)
+
+
 def show_assignments(results):
     """Display the customers assigned to each active warehouse in a tabular format
     :param results: the results of an optimization run
     """
-    data = []
-    for each in results["customers_assignment"]:
-        data.append(
-            [
-                each["Warehouse_id"],
-                each["Warehouse"],
-                each["Customer_id"],
-                each["Customer"],
-                each["Customer Demand"],
-                each["Distance"],
-                each["Flow"],
-            ]
-        )
-
-    data = pd.DataFrame(
-        data=data,
-        columns=[
+    data = assignments_frame(results)[
+        [
             "Warehouse_id",
             "Warehouse",
             "Customer_id",
             "Customer",
-            "Customer_demand",
+            "Customer Demand",
             "Distance",
             "Flow",
-        ],
-    )
+        ]
+    ].rename(columns={"Customer Demand": "Customer_demand"})
     with pd.option_context("display.max_rows", 100):
         print(data.to_markdown())
 
 
 def get_demand(customers: dict) -> float:
     """Return the demand of a set of customers"""
+    if isinstance(customers, NetworkData):
+        return float(customers.demand.sum())
     tot = 0
     for each in customers.values():
         tot += each.demand
@@ -351,6 +1379,8 @@ def get_demand(customers: dict) -> float:
 
 def get_capacity(warehouses: dict) -> float:
     """Return the capacity of a set of warehouses"""
+    if isinstance(warehouses, NetworkData):
+        return float(warehouses.capacity.sum())
     tot = 0
     for each in warehouses.values():
         tot += each.capacity
@@ -434,22 +1464,160 @@ def show_geo_map(
     return map
 
 
+class Registry(MutableMapping):
+    """Warehouses or customers with unique names and managed ids
+
+    Wraps a dict of namedtuples (or a NetworkData) keeping a name -> id index, so the
+    uniqueness of the names is checked in constant time, and a monotonic id allocator:
+    ids are never reused, even after a deletion. It behaves as the wrapped dict and can be
+    passed wherever warehouses or customers are expected.
+    """
+
+    def __init__(self, data: dict | NetworkData | None = None):
+        """
+        :param data: optional initial warehouses or customers (the object is wrapped, not copied)
+        """
+        self.data = {} if data is None else data
+        if isinstance(self.data, NetworkData):
+            names = self.data.column("name").tolist()
+        else:
+            names = [each.name for each in self.data.values()]
+        self.names = dict(zip(names, self.data.keys()))
+        if len(self.names) != len(self.data):
+            duplicates = sorted({n for n in names if names.count(n) > 1})
+            raise Exception(f"Names must be unique, duplicated: {duplicates}")
+        self.next_id = max(
+            (k + 1 for k in self.data.keys() if isinstance(k, (int, np.integer))),
+            default=0,
+        )
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        other = self.names.get(value.name)
+        if other is not None and other != key:
+            raise Exception(
+                f"The name {value.name} already exists (id {other}). Names must be unique"
+            )
+        if key in self.data:
+            self.names.pop(self.data[key].name, None)
+        self.data[key] = value
+        self.names[value.name] = key
+        if isinstance(key, (int, np.integer)) and key >= self.next_id:
+            self.next_id = key + 1
+
+    def __delitem__(self, key):
+        self.names.pop(self.data[key].name, None)
+        del self.data[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"Registry({len(self)} entries, next id {self.next_id})"
+
+    def allocate_id(self) -> int:
+        """Return a new id, never used before"""
+        new_id = self.next_id
+        self.next_id += 1
+        return new_id
+
+    def id_of(self, name: str):
+        """Return the id of the entry with the given name, None if not present"""
+        return self.names.get(name)
+
+    def add(self, record):
+        """Add a warehouse or a customer with a new id
+        :param record: Warehouse or Customer object
+        :return: the id, or None if the name already exists (the record is not added)
+        """
+        if record.name in self.names:
+            print(f"The name {record.name} already exists. Names must be unique")
+            return None
+        new_id = self.allocate_id()
+        self[new_id] = record
+        return new_id
+
+    def add_many(self, records) -> list:
+        """Add several warehouses or customers at once, with new ids
+        Records whose name already exists, or repeats a name of the batch, are skipped.
+        :param records: iterable of Warehouse or Customer objects
+        :return: list with the id of each record, None for the skipped ones
+        """
+        records = list(records)
+        latitude = np.array([each.latitude for each in records], dtype=float)
+        longitude = np.array([each.longitude for each in records], dtype=float)
+        invalid = ~(np.abs(latitude) <= 90) | ~(np.abs(longitude) <= 180)
+        if invalid.any():
+            raise Exception(
+                f"Latitude must be between -90 and 90 and longitude between -180 and 180: "
+                f"records {np.flatnonzero(invalid).tolist()}"
+            )
+
+        ids, added, seen = [], [], set()
+        for each in records:
+            if each.name in self.names or each.name in seen:
+                ids.append(None)
+                continue
+            seen.add(each.name)
+            new_id = self.allocate_id()
+            ids.append(new_id)
+            added.append((new_id, each))
+
+        if isinstance(self.data, NetworkData):
+            self.data.extend([i for i, _ in added], [r for _, r in added])
+        else:
+            self.data.update(added)
+        self.names.update((r.name, i) for i, r in added)
+
+        skipped = len(records) - len(added)
+        if skipped:
+            print(f"{skipped} records skipped: names must be unique")
+        return ids
+
+
+def _next_id(data) -> int:
+    """Return the id of a new entry: allocated by a Registry, otherwise the number of
+    entries unless already used (e.g. after a deletion), then the largest id + 1"""
+    if isinstance(data, Registry):
+        return data.allocate_id()
+    if len(data) not in data:
+        return len(data)
+    return max(k for k in data.keys() if isinstance(k, (int, np.integer))) + 1
+
+
+def _name_exists(data, name: str) -> bool:
+    """Whether an entry with the given name exists (constant time with a Registry)"""
+    if isinstance(data, Registry):
+        return name in data.names
+    if isinstance(data, NetworkData):
+        return bool((data.column("name") == name).any())
+    return any(each.name == name for each in data.values())
+
+
 def add_warehouse(warehouses: dict | None, new_warehouse: Warehouse) -> None:
     """Add a warehouse to the list of warehouses
     :param warehouses: current set of warehouses
     :param new_warehouse: new warehouse to be added"""
-    if warehouses is None or not isinstance(warehouses, dict):
+    if warehouses is None or not isinstance(warehouses, (dict, NetworkData, Registry)):
         raise Exception("<add_warehouse> The parameter warehouses must be a dictionary")
-    warehouses[len(warehouses)] = new_warehouse
+    warehouses[_next_id(warehouses)] = new_warehouse
 
 
 def add_customer(customers: dict | None, new_customer: Customer) -> None:
     """Add a customer to the list of customers
     :param customers: current set of customers
     :param new_customer: new customer to be added"""
-    if customers is None or not isinstance(customers, dict):
+    if customers is None or not isinstance(customers, (dict, NetworkData, Registry)):
         raise Exception("The parameter customers must be a dictionary")
-    customers[len(customers)] = new_customer
+    customers[_next_id(customers)] = new_customer
 
 
 def add_warehouse_from_data(
@@ -464,9 +1632,10 @@ def add_warehouse_from_data(
     fixed_cost: float = 0.0,
 ) -> None:
     """Add a warehouse to the list of warehouses from data
-    :param warehouses: current set of warehouses"""
+    :param warehouses: current set of warehouses; with a Registry the uniqueness of the name
+        is checked in constant time"""
 
-    if not isinstance(warehouses, dict):
+    if not isinstance(warehouses, (dict, NetworkData, Registry)):
         raise Exception("The parameter warehouses must be a dictionary")
 
     if not all([name, latitude, longitude]):
@@ -479,7 +1648,7 @@ def add_warehouse_from_data(
     if longitude < -180 or longitude > 180:
         raise Exception("Longitude must be between -180 and 180")
 
-    if list(filter(lambda x: x.name == name, warehouses.values())):
+    if _name_exists(warehouses, name):
         print(
             f"The warehouse name {name} already exists. Warehouse's name must be unique"
         )
@@ -510,9 +1679,10 @@ def add_customer_from_data(
     demand: float = 0.0,
 ) -> None:
     """Add a customer to the list of customers from data
-    :param customers: current set of customers"""
+    :param customers: current set of customers; with a Registry the uniqueness of the name
+        is checked in constant time"""
 
-    if not isinstance(customers, dict):
+    if not isinstance(customers, (dict, NetworkData, Registry)):
         raise Exception("The parameter customers must be a dictionary")
 
     if not all([name, latitude, longitude]):
@@ -524,7 +1694,7 @@ def add_customer_from_data(
     if longitude < -180 or longitude > 180:
         raise Exception("Longitude must be between -180 and 180")
 
-    if list(filter(lambda x: x.name == name, customers.values())):
+    if _name_exists(customers, name):
         print(
             f"The customer name {name} already exists. Customer's name must be unique"
         )
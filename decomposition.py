@@ -0,0 +1,368 @@
+import heapq
+
+import numpy as np
+
+from data_structures import NetworkData, SpatialIndex
+
+# Default number of customers of each region
+DEFAULT_REGION_SIZE = 2000
+
+
+def subset(data: dict, positions: np.ndarray) -> NetworkData:
+    """Return the entries of data at the given positions as a NetworkData
+    :param data: dict of warehouses or customers, or NetworkData
+    :param positions: positions of the entries, in the order of the dict
+    """
+    data = NetworkData.from_dict(data)
+    ids = np.empty(len(data), dtype=object)
+    ids[:] = list(data.keys())
+    return NetworkData(
+        data.kind,
+        ids=ids[positions].tolist(),
+        **{field: data.column(field)[positions] for field in data.record._fields},
+    )
+
+
+def _weighted_cut(values: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, float]:
+    """Split the values at their weighted median
+    :return: tuple (positions of the lower half, cut value between the two halves)
+    """
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    split = np.searchsorted(cumulative, cumulative[-1] / 2) + 1
+    split = min(max(split, 1), len(values) - 1)
+    cut = (values[order[split - 1]] + values[order[split]]) / 2
+    return order[:split], cut
+
+
+def bisect_regions(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    weights: np.ndarray,
+    num_regions: int,
+    w_latitude: np.ndarray,
+    w_longitude: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Partition customers and warehouses in regions by recursive bisection
+
+    The region with the largest weight is split in two halves of equal weight along its
+    longest side (latitude or longitude), and the warehouses are split by the same cut.
+    Regions are split only if both halves have at least one warehouse, so fewer regions
+    than requested may be returned.
+
+    :param latitude: latitudes of the customers
+    :param longitude: longitudes of the customers
+    :param weights: weights of the customers (e.g. the demands)
+    :param num_regions: number of regions
+    :param w_latitude: latitudes of the warehouses
+    :param w_longitude: longitudes of the warehouses
+    :return: tuple (region of each customer, region of each warehouse), regions numbered 0, 1, ...
+    """
+    weights = np.nan_to_num(np.asarray(weights, dtype=float)).clip(min=0)
+    if not weights.any():
+        weights = np.ones(len(latitude))
+    coordinates = (latitude, longitude)
+    w_coordinates = (w_latitude, w_longitude)
+
+    customers = np.arange(len(latitude))
+    warehouses = np.arange(len(w_latitude))
+    heap = [(-weights.sum(), 0, customers, warehouses)]
+    done = []
+    counter = 1
+    while heap and len(heap) + len(done) < num_regions:
+        weight, _, customers, warehouses = heapq.heappop(heap)
+        # Longest side first, with longitudes shortened by the cosine of the latitude
+        spans = np.array(
+            [
+                np.ptp(latitude[customers]),
+                np.ptp(longitude[customers])
+                * np.cos(np.radians(np.mean(latitude[customers]))),
+            ]
+        )
+        halves = None
+        if len(customers) > 1 and len(warehouses) > 1:
+            for axis in np.argsort(-spans):
+                if spans[axis] == 0:
+                    continue
+                lower, cut = _weighted_cut(
+                    coordinates[axis][customers], weights[customers]
+                )
+                is_lower = np.zeros(len(customers), dtype=bool)
+                is_lower[lower] = True
+                w_lower = w_coordinates[axis][warehouses] <= cut
+                if w_lower.all() or not w_lower.any():
+                    continue
+                halves = (
+                    (customers[is_lower], warehouses[w_lower]),
+                    (customers[~is_lower], warehouses[~w_lower]),
+                )
+                break
+        if halves is None:
+            done.append((customers, warehouses))
+            continue
+        for c, w in halves:
+            heapq.heappush(heap, (-weights[c].sum(), counter, c, w))
+            counter += 1
+
+    c_labels = np.empty(len(latitude), dtype=np.intp)
+    w_labels = np.empty(len(w_latitude), dtype=np.intp)
+    regions = done + [(c, w) for _, _, c, w in heap]
+    for n, (c, w) in enumerate(regions):
+        c_labels[c] = n
+        w_labels[w] = n
+    return c_labels, w_labels
+
+
+def allocate_facilities(
+    weights: np.ndarray,
+    total: int,
+    available: np.ndarray,
+    minimum: np.ndarray | None = None,
+) -> np.ndarray:
+    """Allocate a number of facilities to regions proportionally to their weight
+    (largest remainder method)
+    :param weights: weight (e.g. demand) of each region
+    :param total: number of facilities to allocate
+    :param available: maximum number of facilities of each region (its warehouses)
+    :param minimum: minimum number of facilities of each region (default: 1)
+    :return: array with the number of facilities of each region
+    """
+    weights = np.asarray(weights, dtype=float)
+    available = np.asarray(available, dtype=int)
+    minimum = (
+        np.ones(len(weights), dtype=int)
+        if minimum is None
+        else np.asarray(minimum, dtype=int)
+    )
+    minimum = np.minimum(minimum, available)
+    if minimum.sum() > total:
+        raise Exception(
+            f"Cannot allocate {total} facilities to {len(weights)} regions: at least "
+            f"{minimum.sum()} are needed"
+        )
+    if available.sum() < total:
+        raise Exception(f"Not enough warehouses to open {total}")
+
+    share = (
+        total * weights / weights.sum() if weights.sum() > 0 else np.ones(len(weights))
+    )
+    counts = np.clip(np.floor(share).astype(int), minimum, available)
+    # Add to the regions most below their share, remove from the ones most above it
+    while counts.sum() < total:
+        room = np.where(counts < available, share - counts, -np.inf)
+        counts[np.argmax(room)] += 1
+    while counts.sum() > total:
+        excess = np.where(counts > minimum, counts - share, -np.inf)
+        counts[np.argmax(excess)] -= 1
+    return counts
+
+
+def _nearest_open(
+    knn_w: np.ndarray,
+    knn_d: np.ndarray,
+    is_open: np.ndarray,
+    w_latitude: np.ndarray,
+    w_longitude: np.ndarray,
+    c_latitude: np.ndarray,
+    c_longitude: np.ndarray,
+    use_haversine: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return, for each customer, the distance and position of the closest open warehouse
+    and the distance of the second closest
+
+    The open warehouses are searched in the lists of nearest warehouses of the customers;
+    customers with less than two open warehouses in their list are queried exactly.
+    """
+    n, k = knn_w.shape
+    is_open_arc = is_open[knn_w]
+    rank = np.where(is_open_arc, np.arange(k), k)
+    first = rank.min(axis=1)
+    rank[np.arange(n), np.minimum(first, k - 1)] = k
+    second = rank.min(axis=1)
+
+    rows = np.arange(n)
+    d1 = np.where(first < k, knn_d[rows, np.minimum(first, k - 1)], np.inf)
+    nearest = np.where(first < k, knn_w[rows, np.minimum(first, k - 1)], -1)
+    d2 = np.where(second < k, knn_d[rows, np.minimum(second, k - 1)], np.inf)
+
+    missing = np.flatnonzero(second == k)
+    open_positions = np.flatnonzero(is_open)
+    if len(missing) and len(open_positions):
+        index = SpatialIndex(
+            NetworkData(
+                "warehouse",
+                latitude=w_latitude[open_positions],
+                longitude=w_longitude[open_positions],
+            ),
+            use_haversine=use_haversine,
+        )
+        num = min(2, len(open_positions))
+        points, found, distance = index.query(
+            c_latitude[missing], c_longitude[missing], k=num
+        )
+        order = np.lexsort((distance, points))
+        found = open_positions[found[order].reshape(-1, num)]
+        distance = distance[order].reshape(-1, num)
+        d1[missing], nearest[missing] = distance[:, 0], found[:, 0]
+        d2[missing] = distance[:, 1] if num > 1 else np.inf
+    return d1, nearest, d2
+
+
+def interchange_repair(
+    w_latitude: np.ndarray,
+    w_longitude: np.ndarray,
+    c_latitude: np.ndarray,
+    c_longitude: np.ndarray,
+    weight: np.ndarray,
+    is_open: np.ndarray,
+    fixed_cost: np.ndarray | None = None,
+    fixed_number: bool = True,
+    force_open=(),
+    force_closed=(),
+    num_neighbors: int | None = None,
+    max_iterations: int = 20,
+    use_haversine: bool = True,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, float, float, int]:
+    """Local search on the open warehouses of a full instance, with sparse neighborhoods
+
+    Each customer is served by its closest open warehouse. For each open warehouse, the
+    swaps with the closed warehouses among the num_neighbors nearest of its customers, and
+    with the num_neighbors closed warehouses whose opening saves the most, are evaluated
+    from the closest and second closest open warehouse of each customer (fast interchange)
+    and the best improving one is applied. Without a fixed number of warehouses (UFLP)
+    closing a warehouse and opening the best new one are also evaluated. Since only nearby
+    warehouses are compared, the cost of a pass grows with customers x num_neighbors, which
+    makes it suitable to repair the solutions of regional subproblems across their borders.
+
+    :param w_latitude: latitudes of the warehouses
+    :param w_longitude: longitudes of the warehouses
+    :param c_latitude: latitudes of the customers
+    :param c_longitude: longitudes of the customers
+    :param weight: weight of each customer (demand x cost per unit of distance)
+    :param is_open: boolean array of the initially open warehouses
+    :param fixed_cost: optional fixed cost of each warehouse, added to the objective
+    :param fixed_number: if True only swaps are evaluated (p-median), otherwise also
+        openings and closings (UFLP)
+    :param force_open: positions of the warehouses that cannot be closed
+    :param force_closed: positions of the warehouses that cannot be opened
+    :param num_neighbors: number of nearest warehouses of each customer considered (default:
+        three times the ratio of warehouses to open warehouses, at least 10)
+    :param max_iterations: maximum number of passes
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :return: tuple (positions of the open warehouses, warehouse serving each customer,
+        distances of the customers, objective, initial objective, number of moves)
+    """
+    num_warehouses = len(w_latitude)
+    weight = np.asarray(weight, dtype=float)
+    if fixed_cost is None:
+        fixed_cost = np.zeros(num_warehouses)
+    is_open = np.array(is_open, dtype=bool)
+    is_forced = np.zeros(num_warehouses, dtype=bool)
+    is_forced[list(force_open)] = True
+    allowed = np.ones(num_warehouses, dtype=bool)
+    allowed[list(force_closed)] = False
+
+    # Nearest warehouses of each customer, sorted by distance...
+    if num_neighbors is None:
+        num_neighbors = max(10, 3 * -(-num_warehouses // max(1, is_open.sum())))
+    k = min(num_neighbors, num_warehouses)
+    index = SpatialIndex(
+        NetworkData("warehouse", latitude=w_latitude, longitude=w_longitude),
+        use_haversine=use_haversine,
+    )
+    points, rows, distance = index.query(c_latitude, c_longitude, k=k)
+    order = np.lexsort((distance, points))
+    knn_w = rows[order].reshape(-1, k)
+    knn_d = distance[order].reshape(-1, k)
+    # ...and the same arcs grouped by warehouse
+    by_warehouse = np.argsort(knn_w, axis=None, kind="stable")
+    arc_customer = by_warehouse // k
+    arc_distance = knn_d.ravel()[by_warehouse]
+    starts = np.concatenate(
+        ([0], np.cumsum(np.bincount(knn_w.ravel(), minlength=num_warehouses)))
+    )
+
+    def nearest_open():
+        return _nearest_open(
+            knn_w,
+            knn_d,
+            is_open,
+            w_latitude,
+            w_longitude,
+            c_latitude,
+            c_longitude,
+            use_haversine,
+        )
+
+    def gains(candidates, base):
+        """Reduction of the weighted distance obtained by opening each candidate"""
+        counts = starts[candidates + 1] - starts[candidates]
+        group = np.repeat(np.arange(len(candidates)), counts)
+        arcs = np.repeat(starts[candidates] - np.cumsum(counts) + counts, counts) + (
+            np.arange(counts.sum())
+        )
+        customers = arc_customer[arcs]
+        saving = weight[customers] * np.maximum(base[customers] - arc_distance[arcs], 0)
+        return np.bincount(group, weights=saving, minlength=len(candidates))
+
+    d1, nearest, d2 = nearest_open()
+    initial = float(np.dot(weight, d1) + fixed_cost[is_open].sum())
+    moves = 0
+    for _ in range(max_iterations):
+        improved = False
+        # The best places for a new warehouse anywhere, to move warehouses across regions
+        closed = np.flatnonzero(~is_open & allowed)
+        savings = gains(closed, d1) - fixed_cost[closed]
+        best_added = closed[np.argsort(-savings)[:num_neighbors]]
+        for i in np.flatnonzero(is_open & ~is_forced):
+            if not is_open[i]:
+                continue
+            served = np.flatnonzero(nearest == i)
+            # Increase of the objective when i is closed
+            closing = (
+                np.dot(weight[served], d2[served] - d1[served]) - fixed_cost[i]
+                if len(served)
+                else -fixed_cost[i]
+            )
+            if not np.isfinite(closing):
+                # i is the only open warehouse of some customers
+                continue
+            base = d1.copy()
+            base[served] = d2[served]
+
+            candidates = np.unique(np.concatenate((knn_w[served].ravel(), best_added)))
+            candidates = candidates[~is_open[candidates] & allowed[candidates]]
+            best_delta, best = np.inf, None
+            if len(candidates):
+                delta = closing - gains(candidates, base) + fixed_cost[candidates]
+                n = np.argmin(delta)
+                best_delta, best = delta[n], candidates[n]
+            if not fixed_number and closing < best_delta:
+                best_delta, best = closing, None
+
+            objective = np.dot(weight, d1) + fixed_cost[is_open].sum()
+            if np.isfinite(best_delta) and best_delta < -1e-9 * max(1.0, objective):
+                is_open[i] = False
+                if best is not None:
+                    is_open[best] = True
+                d1, nearest, d2 = nearest_open()
+                moves += 1
+                improved = True
+
+        if not fixed_number:
+            # Open the warehouse with the largest net saving
+            candidates = np.flatnonzero(~is_open & allowed)
+            if len(candidates):
+                delta = fixed_cost[candidates] - gains(candidates, d1)
+                n = np.argmin(delta)
+                objective = np.dot(weight, d1) + fixed_cost[is_open].sum()
+                if delta[n] < -1e-9 * max(1.0, objective):
+                    is_open[candidates[n]] = True
+                    d1, nearest, d2 = nearest_open()
+                    moves += 1
+                    improved = True
+        if not improved:
+            break
+
+    objective = float(np.dot(weight, d1) + fixed_cost[is_open].sum())
+    return np.flatnonzero(is_open), nearest, d1, objective, initial, moves
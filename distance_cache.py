@@ -0,0 +1,204 @@
+import hashlib
+import os
+import numpy as np
+
+from data_structures import DistanceMatrix, calculate_dm, get_coordinates
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "NETOPT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "network_optimization"),
+)
+DEFAULT_MAX_SIZE_MB = 2048
+
+
+class DistanceCache:
+    """On-disk cache of distance matrices
+
+    Each matrix is stored as a .npy file named after a hash of the warehouses and customers
+    (ids and coordinates) and of the metric. Cached matrices are reopened as read-only
+    memory maps, so repeated runs do not recompute them and several processes share the
+    same pages. When the cache grows beyond max_size_mb the least recently used files
+    are removed.
+    """
+
+    def __init__(
+        self, cache_dir: str | None = None, max_size_mb: float = DEFAULT_MAX_SIZE_MB
+    ):
+        """
+        :param cache_dir: directory where the matrices are stored
+        :param max_size_mb: maximum size of the cache in MB
+        """
+        self.cache_dir = cache_dir if cache_dir else DEFAULT_CACHE_DIR
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(
+        warehouses: dict,
+        customers: dict,
+        use_haversine: bool = True,
+        circuity_factor: float = 1.0,
+        dtype=np.float64,
+    ) -> str:
+        """Return the cache key of a distance matrix
+        :param warehouses: dict of warehouses
+        :param customers: dict of customers
+        :param use_haversine: metric used (haversine or euclidean)
+        :param circuity_factor: circuity factor applied to the distances
+        :param dtype: dtype of the stored distances
+        :return: hex digest identifying the matrix
+        """
+        h = hashlib.sha256()
+        h.update(
+            f"{use_haversine}|{float(circuity_factor)!r}|{np.dtype(dtype).str}".encode()
+        )
+        for data in (warehouses, customers):
+            h.update(repr(list(data.keys())).encode())
+            for array in get_coordinates(data):
+                h.update(array.tobytes())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"dm_{key}.npy")
+
+    def get(self, key: str, warehouses: dict, customers: dict) -> DistanceMatrix | None:
+        """Return the cached distance matrix (memory mapped) or None if not cached"""
+        path = self._path(key)
+        try:
+            data = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        if data.shape != (len(warehouses), len(customers)):
+            return None
+
+        # Mark the entry as recently used
+        os.utime(path)
+        return DistanceMatrix(
+            data,
+            {w: n for n, w in enumerate(warehouses.keys())},
+            {c: n for n, c in enumerate(customers.keys())},
+        )
+
+    def put(self, key: str, distance: DistanceMatrix) -> None:
+        """Store a distance matrix in the cache"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, distance.data)
+        # Atomic rename, other processes never see a partially written file
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self) -> list[tuple[str, int, float]]:
+        """Return the cached files as (path, size, last use), least recently used first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not (name.startswith("dm_") and name.endswith(".npy")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda x: x[2])
+
+    def size(self) -> int:
+        """Return the size of the cache in bytes"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """Remove the least recently used matrices until the cache fits max_size"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # Always keep the most recent entry, even if it is larger than max_size
+        for path, size, _ in entries[:-1]:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all the cached matrices"""
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get_or_compute(
+        self,
+        warehouses: dict,
+        customers: dict,
+        use_haversine: bool = True,
+        circuity_factor: float = 1.0,
+        dtype=np.float64,
+    ) -> DistanceMatrix:
+        """Return the distance matrix from the cache, computing and storing it if missing"""
+        key = self.key(warehouses, customers, use_haversine, circuity_factor, dtype)
+        distance = self.get(key, warehouses, customers)
+        if distance is not None:
+            return distance
+
+        distance = calculate_dm(
+            warehouses,
+            customers,
+            use_haversine=use_haversine,
+            dtype=dtype,
+            circuity_factor=circuity_factor,
+        )
+        self.put(key, distance)
+        # Reopen the stored copy, so the memory is shared with the other processes
+        cached = self.get(key, warehouses, customers)
+        return cached if cached is not None else distance
+
+
+def get_distance_cache(distance_cache) -> DistanceCache | None:
+    """Return a DistanceCache from the value of a distance_cache parameter
+    :param distance_cache: None/False (no cache), True (default cache), a directory or a DistanceCache
+    """
+    if not distance_cache:
+        return None
+    if isinstance(distance_cache, DistanceCache):
+        return distance_cache
+    if distance_cache is True:
+        return DistanceCache()
+    return DistanceCache(cache_dir=distance_cache)
+
+
+def cached_dm(
+    warehouses: dict,
+    customers: dict,
+    use_haversine: bool = True,
+    circuity_factor: float = 1.0,
+    dtype=np.float64,
+    distance_cache=True,
+) -> DistanceMatrix:
+    """Calculate the distance matrix between warehouses and customers, using the on-disk cache
+    :param warehouses: dict of warehouses
+    :param customers: dict of customers
+    :param use_haversine: if True use the haversine formula (km), otherwise the euclidean distance
+    :param circuity_factor: ratio between road and straight-line distances (1 = straight line)
+    :param dtype: dtype of the stored distances
+    :param distance_cache: True (default cache), a directory or a DistanceCache; None/False disables the cache
+    :return: distance matrix
+    """
+    cache = get_distance_cache(distance_cache)
+    if cache is None:
+        return calculate_dm(
+            warehouses,
+            customers,
+            use_haversine=use_haversine,
+            dtype=dtype,
+            circuity_factor=circuity_factor,
+        )
+    return cache.get_or_compute(
+        warehouses,
+        customers,
+        use_haversine=use_haversine,
+        circuity_factor=circuity_factor,
+        dtype=dtype,
+    )
@@ -0,0 +1,141 @@
+import numpy as np
+
+# Maximum number of distance values evaluated at once when scoring candidate warehouses
+EVALUATION_BLOCK_SIZE = 2**22
+
+
+def nearest_two(distance: np.ndarray, open_positions: np.ndarray):
+    """Return, for each customer, the closest and the second closest open warehouse
+    :param distance: (warehouses, customers) array of distances
+    :param open_positions: positions (rows) of the open warehouses
+    :return: tuple (distance to the closest, position of the closest, distance to the second closest)
+    """
+    sub = distance[open_positions]
+    if len(open_positions) == 1:
+        return (
+            sub[0],
+            np.full(sub.shape[1], open_positions[0]),
+            np.full(sub.shape[1], np.inf),
+        )
+    order = np.argpartition(sub, 1, axis=0)[:2]
+    d1 = np.take_along_axis(sub, order[:1], axis=0)[0]
+    d2 = np.take_along_axis(sub, order[1:], axis=0)[0]
+    return d1, open_positions[order[0]], d2
+
+
+def evaluate_candidates(
+    distance: np.ndarray, candidates: np.ndarray, base: np.ndarray, weight: np.ndarray
+) -> np.ndarray:
+    """Return the weighted distance obtained by adding each candidate warehouse
+    :param distance: (warehouses, customers) array of distances
+    :param candidates: positions of the candidate warehouses
+    :param base: distance of each customer from the current set of warehouses
+    :param weight: weight (demand) of each customer
+    :return: array with the total weighted distance for each candidate
+    """
+    totals = np.empty(len(candidates))
+    step = max(1, EVALUATION_BLOCK_SIZE // max(1, distance.shape[1]))
+    for start in range(0, len(candidates), step):
+        rows = candidates[start : start + step]
+        totals[start : start + step] = np.minimum(distance[rows], base) @ weight
+    return totals
+
+
+def greedy_interchange(
+    distance: np.ndarray,
+    weight: np.ndarray,
+    p: int,
+    fixed_cost: np.ndarray | None = None,
+    force_open=(),
+    force_closed=(),
+    exclusive: np.ndarray | None = None,
+    max_iterations: int = 100,
+) -> tuple[np.ndarray, float, int]:
+    """Greedy add and Teitz-Bart vertex substitution heuristic for the p-median problem
+
+    The greedy phase opens, one at a time, the warehouse that most reduces the weighted
+    distance. The interchange phase then tries, for each open warehouse, the best swap
+    with a closed one (fast interchange evaluation: closest and second closest open
+    warehouse of each customer) and applies it when it improves the objective, until a
+    full pass brings no improvement.
+
+    :param distance: (warehouses, customers) array of distances, np.inf for forbidden pairs
+    :param weight: weight (demand) of each customer
+    :param p: number of warehouses to open
+    :param fixed_cost: optional fixed cost of each warehouse, added to the objective
+    :param force_open: positions of the warehouses that must be open
+    :param force_closed: positions of the warehouses that must be closed
+    :param exclusive: optional (warehouses, warehouses) boolean array, True for pairs of
+        warehouses that cannot be open simultaneously
+    :param max_iterations: maximum number of interchange passes
+    :return: tuple (positions of the open warehouses, objective, number of interchange passes)
+    """
+    num_warehouses = distance.shape[0]
+    weight = np.asarray(weight, dtype=float)
+    if fixed_cost is None:
+        fixed_cost = np.zeros(num_warehouses)
+
+    # Forbidden pairs get a penalty larger than any feasible assignment
+    finite = np.isfinite(distance)
+    penalty = 10 * (distance[finite].max(initial=0) + 1)
+    distance = np.where(finite, distance, penalty)
+
+    is_forced = np.zeros(num_warehouses, dtype=bool)
+    is_forced[list(force_open)] = True
+    allowed = np.ones(num_warehouses, dtype=bool)
+    allowed[list(force_closed)] = False
+    if (is_forced & ~allowed).any():
+        raise Exception("A warehouse is forced both open and closed")
+    if is_forced.sum() > p:
+        raise Exception(f"More than {p} warehouses are forced open")
+    if exclusive is not None and exclusive[np.ix_(is_forced, is_forced)].any():
+        raise Exception("Mutually exclusive warehouses are forced open")
+
+    def candidates(is_open):
+        mask = allowed & ~is_open
+        if exclusive is not None:
+            mask &= ~exclusive[:, is_open].any(axis=1)
+        return np.flatnonzero(mask)
+
+    # Greedy add
+    is_open = is_forced.copy()
+    best = distance[is_open].min(axis=0, initial=np.inf)
+    while is_open.sum() < p:
+        cand = candidates(is_open)
+        if not len(cand):
+            raise Exception(f"Not enough admissible warehouses to open {p}")
+        totals = evaluate_candidates(distance, cand, best, weight) + fixed_cost[cand]
+        pick = cand[np.argmin(totals)]
+        is_open[pick] = True
+        best = np.minimum(best, distance[pick])
+
+    # Vertex substitution
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        improved = False
+        for i in np.flatnonzero(is_open & ~is_forced):
+            d1, nearest, d2 = nearest_two(distance, np.flatnonzero(is_open))
+            current = d1 @ weight + fixed_cost[is_open].sum()
+            others = is_open.copy()
+            others[i] = False
+            cand = candidates(others)
+            cand = cand[cand != i]
+            if not len(cand):
+                continue
+            base = np.where(nearest == i, d2, d1)
+            totals = (
+                evaluate_candidates(distance, cand, base, weight)
+                + fixed_cost[cand]
+                + fixed_cost[others].sum()
+            )
+            k = np.argmin(totals)
+            if totals[k] < current - 1e-9 * max(1.0, abs(current)):
+                is_open[i] = False
+                is_open[cand[k]] = True
+                improved = True
+        if not improved:
+            break
+
+    open_positions = np.flatnonzero(is_open)
+    objective = distance[open_positions].min(axis=0) @ weight
+    return open_positions, float(objective + fixed_cost[is_open].sum()), iterations
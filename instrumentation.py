@@ -0,0 +1,178 @@
+import functools
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Phases of a solve, in the order they run
+PHASES = (
+    "distance_matrix",
+    "build_model",
+    "solve",
+    "extract_solution",
+    "analyze_solution",
+)
+
+MB = 1024 * 1024
+
+
+def _rusage() -> tuple[float, float, float | None, float | None]:
+    """Return the CPU time of the process and of its terminated children (e.g. CBC), and
+    their peak resident set sizes in MB (None where not available)"""
+    if resource is None:
+        return time.process_time(), 0.0, None, None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (
+        own.ru_utime + own.ru_stime,
+        children.ru_utime + children.ru_stime,
+        own.ru_maxrss * unit / MB,
+        children.ru_maxrss * unit / MB,
+    )
+
+
+class Instrumentation:
+    """Wall time, CPU time and memory of the phases of an optimization, and size of its model
+
+    For each phase the following metrics are recorded (summed over the runs of the phase,
+    e.g. when the model is solved again after update_model):
+    - wall_time: elapsed seconds
+    - cpu_time: CPU seconds of this process
+    - solver_cpu_time: CPU seconds of the child processes that ended during the phase (CBC)
+    - peak_rss_mb: peak resident set size of the process at the end of the phase (the peak
+      is a high-water mark: peak_rss_increase_mb tells how much the phase raised it)
+    - solver_peak_rss_mb: peak resident set size of the child processes
+    - peak_traced_mb: peak of the memory allocated by Python during the phase (only with
+      trace_memory, since tracemalloc slows down the allocations)
+    - calls: number of runs of the phase
+
+    Hooks are called as hook(name, metrics) at the end of each phase and when the size of
+    the model is recorded (name 'model'), e.g. to push the metrics into a monitoring system.
+    """
+
+    def __init__(self, hooks: list | None = None, trace_memory: bool = False):
+        """
+        :param hooks: callables hook(name, metrics)
+        :param trace_memory: whether to trace the peak of the Python allocations
+        """
+        self.hooks = list(hooks) if hooks else []
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.model = {}
+        self._active = []
+
+    def add_hook(self, hook):
+        """Add a callable hook(name, metrics) called with the metrics of each phase"""
+        self.hooks.append(hook)
+
+    def _notify(self, name: str, metrics: dict):
+        for hook in self.hooks:
+            hook(name, dict(metrics))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Context manager recording the metrics of a phase. A phase started again while it is
+        running (e.g. by the build_model of a subclass calling the one of its parent) is
+        recorded only once"""
+        if name in (frame["name"] for frame in self._active):
+            yield
+            return
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            # The peak of the enclosing phases is kept before resetting it
+            peak = tracemalloc.get_traced_memory()[1]
+            for frame in self._active:
+                frame["traced"] = max(frame["traced"], peak)
+            tracemalloc.reset_peak()
+        frame = {"name": name, "traced": 0}
+        self._active.append(frame)
+        cpu, solver_cpu, rss, _ = _rusage()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            end_cpu, end_solver_cpu, end_rss, solver_rss = _rusage()
+            self._active.pop()
+            metrics = {
+                "wall_time": wall_time,
+                "cpu_time": end_cpu - cpu,
+                "solver_cpu_time": end_solver_cpu - solver_cpu,
+                "peak_rss_mb": end_rss,
+                "peak_rss_increase_mb": None if rss is None else end_rss - rss,
+                "solver_peak_rss_mb": solver_rss,
+            }
+            if self.trace_memory:
+                traced = max(frame["traced"], tracemalloc.get_traced_memory()[1])
+                for each in self._active:
+                    each["traced"] = max(each["traced"], traced)
+                metrics["peak_traced_mb"] = traced / MB
+                if started_tracing:
+                    tracemalloc.stop()
+            self._add(name, metrics)
+            self._notify(name, metrics)
+
+    def _add(self, name: str, metrics: dict):
+        """Add the metrics of a run to the totals of the phase"""
+        total = self.phases.get(name)
+        if total is None:
+            self.phases[name] = dict(metrics, calls=1)
+            return
+        for key, value in metrics.items():
+            if value is None or total.get(key) is None:
+                total[key] = value
+            elif key in ("peak_rss_mb", "solver_peak_rss_mb", "peak_traced_mb"):
+                total[key] = max(total[key], value)
+            else:
+                total[key] += value
+        total["calls"] += 1
+
+    def record_model(self, **size):
+        """Record the size of the model (e.g. variables, constraints, nonzeros)"""
+        self.model = dict(size)
+        self._notify("model", self.model)
+
+    def to_dict(self) -> dict:
+        """Return the metrics of the phases (in the order they run), the size of the model and
+        the totals"""
+        order = {name: n for n, name in enumerate(PHASES)}
+        phases = {
+            name: dict(self.phases[name])
+            for name in sorted(self.phases, key=lambda p: order.get(p, len(order)))
+        }
+        return {
+            "phases": phases,
+            "model": dict(self.model),
+            "wall_time": sum(p["wall_time"] for p in phases.values()),
+            "cpu_time": sum(
+                p["cpu_time"] + p["solver_cpu_time"] for p in phases.values()
+            ),
+        }
+
+    def __repr__(self) -> str:
+        times = ", ".join(f"{n} {p['wall_time']:.2f}s" for n, p in self.phases.items())
+        return f"Instrumentation({times})"
+
+
+def timed_phase(name: str):
+    """Decorator recording the calls of a method of an optimizer as a phase of its stats"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.stats.phase(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,466 @@
+from collections import namedtuple
+
+import numpy as np
+
+LagrangianResult = namedtuple(
+    "LagrangianResult",
+    "lower_bound, upper_bound, open_positions, flows, iterations, multipliers",
+)
+
+
+def uncapacitated_subproblem(
+    reduced_cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    forced: np.ndarray,
+    allowed: np.ndarray,
+):
+    """Solve the Lagrangian subproblem of the uncapacitated FLP
+
+    With the customer service constraints relaxed, each warehouse is opened if its fixed
+    cost plus the negative reduced costs of its customers is negative.
+
+    :param reduced_cost: (warehouses, customers) array of cost minus multiplier
+    :param fixed_cost: fixed cost of each warehouse
+    :param forced: boolean array of the warehouses forced open
+    :param allowed: boolean array of the warehouses that can be opened
+    :return: tuple (value of each warehouse, opening of each warehouse, assignment fractions)
+    """
+    negative = np.minimum(reduced_cost, 0)
+    value = fixed_cost + negative.sum(axis=1)
+    is_open = allowed & (forced | (value < 0))
+    x = (reduced_cost < 0) & is_open[:, None]
+    return value, is_open.astype(float), x.astype(float)
+
+
+def capacitated_subproblem(
+    reduced_cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    demand: np.ndarray,
+    capacity: np.ndarray,
+    forced: np.ndarray,
+    allowed: np.ndarray,
+):
+    """Solve the Lagrangian subproblem of the capacitated FLP
+
+    Each warehouse solves a continuous knapsack: the customers with negative reduced cost
+    are served in increasing order of reduced cost per unit of demand until the capacity
+    is exhausted. The warehouses with negative value are opened; if their capacity does
+    not cover the total demand (surrogate constraint sum_w capacity * Open >= demand,
+    which strengthens the bound) the others are opened, possibly fractionally, in
+    increasing order of value per unit of capacity.
+
+    :param reduced_cost: (warehouses, customers) array of cost minus multiplier
+    :param fixed_cost: fixed cost of each warehouse
+    :param demand: demand of each customer
+    :param capacity: capacity of each warehouse
+    :param forced: boolean array of the warehouses forced open
+    :param allowed: boolean array of the warehouses that can be opened
+    :return: tuple (value of each warehouse, opening of each warehouse, assignment fractions)
+    """
+    negative = reduced_cost < 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(negative, reduced_cost / demand, np.inf)
+    # Customers without demand do not use capacity
+    ratio[negative & (demand == 0)] = -np.inf
+    order = np.argsort(ratio, axis=1, kind="stable")
+
+    sorted_demand = demand[order]
+    used_before = np.cumsum(sorted_demand, axis=1) - sorted_demand
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip((capacity[:, None] - used_before) / sorted_demand, 0, 1)
+    fraction[sorted_demand == 0] = 1
+    fraction *= np.take_along_axis(negative, order, axis=1)
+
+    sorted_cost = np.take_along_axis(reduced_cost, order, axis=1)
+    with np.errstate(invalid="ignore"):
+        value = fixed_cost + np.where(fraction > 0, sorted_cost * fraction, 0).sum(
+            axis=1
+        )
+    opening = (allowed & (forced | (value < 0))).astype(float)
+    missing = demand.sum() - capacity @ opening
+    if missing > 0:
+        closed = np.flatnonzero(allowed & (opening == 0) & (capacity > 0))
+        closed = closed[np.argsort(value[closed] / capacity[closed], kind="stable")]
+        cumulative = np.cumsum(capacity[closed])
+        before = cumulative - capacity[closed]
+        opening[closed] = np.clip((missing - before) / capacity[closed], 0, 1)
+
+    x = np.zeros_like(reduced_cost)
+    np.put_along_axis(x, order, fraction, axis=1)
+    x *= opening[:, None]
+    return value, opening, x
+
+
+def select_open(
+    candidates: np.ndarray, priority: np.ndarray, forced: np.ndarray, exclusive
+) -> np.ndarray:
+    """Return the candidate warehouses, dropping those conflicting with mutually exclusive
+    warehouses already selected (forced ones first, then in order of priority)"""
+    selected = forced.copy()
+    if exclusive is None:
+        return selected | candidates
+    for w in np.flatnonzero(candidates & ~forced)[
+        np.argsort(priority[candidates & ~forced], kind="stable")
+    ]:
+        if not exclusive[w, selected].any():
+            selected[w] = True
+    return selected
+
+
+def repair_uncapacitated(
+    cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    is_open: np.ndarray,
+    forced: np.ndarray,
+    allowed: np.ndarray,
+    exclusive=None,
+):
+    """Turn a set of open warehouses into a feasible uncapacitated solution
+
+    Customers are assigned to the cheapest open warehouse; customers that no open
+    warehouse can serve open their cheapest admissible warehouse, and warehouses left
+    without customers are closed (unless forced open).
+
+    :return: tuple (cost, open warehouses, warehouse of each customer), cost is np.inf if
+        no feasible solution is found
+    """
+    is_open = is_open.copy()
+    for _ in range(cost.shape[0]):
+        if not is_open.any():
+            totals = np.where(allowed, fixed_cost + cost.sum(axis=1), np.inf)
+            is_open[np.argmin(totals)] = True
+        open_positions = np.flatnonzero(is_open)
+        assignment = open_positions[np.argmin(cost[open_positions], axis=0)]
+        unserved = np.flatnonzero(
+            ~np.isfinite(cost[assignment, np.arange(cost.shape[1])])
+        )
+        if not len(unserved):
+            break
+        admissible = allowed & ~is_open
+        if exclusive is not None:
+            admissible &= ~exclusive[:, is_open].any(axis=1)
+        column = np.where(admissible, cost[:, unserved[0]], np.inf)
+        if not np.isfinite(column).any():
+            return np.inf, is_open, None
+        is_open[np.argmin(column)] = True
+
+    used = np.zeros_like(is_open)
+    used[assignment] = True
+    is_open &= used | forced
+    open_positions = np.flatnonzero(is_open)
+    assignment = open_positions[np.argmin(cost[open_positions], axis=0)]
+    total = cost[assignment, np.arange(cost.shape[1])].sum() + fixed_cost[is_open].sum()
+    return float(total), is_open, assignment
+
+
+def repair_capacitated(
+    cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    demand: np.ndarray,
+    capacity: np.ndarray,
+    is_open: np.ndarray,
+    forced: np.ndarray,
+    allowed: np.ndarray,
+    exclusive=None,
+    single_sourcing: bool = True,
+):
+    """Turn a set of open warehouses into a feasible capacitated solution
+
+    Warehouses with the lowest fixed cost per unit of capacity are opened until the open
+    capacity covers the demand. Customers, in order of decreasing regret (extra cost of
+    their second cheapest open warehouse), are then assigned to the cheapest open
+    warehouses with residual capacity (split among several warehouses without single
+    sourcing).
+
+    :return: tuple (cost, open warehouses, (warehouse, customer, fraction) arrays), cost is
+        np.inf if no feasible solution is found
+    """
+    is_open = is_open.copy()
+    total_demand = demand.sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_fixed_cost = np.where(capacity > 0, fixed_cost / capacity, np.inf)
+    while capacity[is_open].sum() < total_demand:
+        admissible = allowed & ~is_open & (capacity > 0)
+        if exclusive is not None:
+            admissible &= ~exclusive[:, is_open].any(axis=1)
+        if not admissible.any():
+            return np.inf, is_open, None
+        is_open[np.flatnonzero(admissible)[np.argmin(unit_fixed_cost[admissible])]] = (
+            True
+        )
+
+    residual = np.where(is_open, capacity, 0.0)
+    open_positions = np.flatnonzero(is_open)
+    ranked = open_positions[np.argsort(cost[open_positions], axis=0, kind="stable")]
+    flows_w, flows_c, flows_x = [], [], []
+    total = fixed_cost[is_open].sum()
+    if len(open_positions) > 1:
+        costs = np.take_along_axis(cost, ranked[:2], axis=0)
+        with np.errstate(invalid="ignore"):
+            regret = np.nan_to_num(costs[1] - costs[0], nan=np.inf)
+    else:
+        regret = demand
+    for c in np.argsort(-regret, kind="stable"):
+        remaining = demand[c]
+        if remaining == 0:
+            # Customers without demand go to the cheapest open warehouse
+            w = ranked[0, c]
+            if not np.isfinite(cost[w, c]):
+                return np.inf, is_open, None
+            flows_w.append(w), flows_c.append(c), flows_x.append(1.0)
+            total += cost[w, c]
+            continue
+        for w in ranked[:, c]:
+            if not np.isfinite(cost[w, c]):
+                break
+            if single_sourcing:
+                if residual[w] >= remaining:
+                    residual[w] -= remaining
+                    flows_w.append(w), flows_c.append(c), flows_x.append(1.0)
+                    total += cost[w, c]
+                    remaining = 0
+                    break
+                continue
+            amount = min(residual[w], remaining)
+            if amount > 0:
+                residual[w] -= amount
+                fraction = amount / demand[c]
+                flows_w.append(w), flows_c.append(c), flows_x.append(fraction)
+                total += cost[w, c] * fraction
+                remaining -= amount
+            if remaining <= 1e-9 * demand[c]:
+                remaining = 0
+                break
+        if remaining > 0:
+            return np.inf, is_open, None
+
+    flows = (np.array(flows_w), np.array(flows_c), np.array(flows_x))
+    return float(total), is_open, flows
+
+
+def improve_capacitated(
+    cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    demand: np.ndarray,
+    capacity: np.ndarray,
+    is_open: np.ndarray,
+    forced: np.ndarray,
+    allowed: np.ndarray,
+    exclusive=None,
+    single_sourcing: bool = True,
+    max_evaluations: int = 500,
+):
+    """Improve a capacitated solution with drop moves (close an open warehouse) and swap
+    moves (close an open warehouse and open a closed one), repairing each candidate and
+    accepting the first cheaper one, until no move improves or max_evaluations repairs
+    are done
+
+    :return: tuple (cost, open warehouses, flows) as repair_capacitated
+    """
+
+    def repair(candidate):
+        return repair_capacitated(
+            cost,
+            fixed_cost,
+            demand,
+            capacity,
+            candidate,
+            forced,
+            allowed,
+            exclusive,
+            single_sourcing,
+        )
+
+    def moves(current):
+        removable = np.flatnonzero(current & ~forced)
+        for w in removable[np.argsort(-fixed_cost[removable], kind="stable")]:
+            candidate = current.copy()
+            candidate[w] = False
+            yield candidate
+            addable = allowed & ~current
+            if exclusive is not None:
+                addable &= ~exclusive[:, candidate].any(axis=1)
+            for v in np.flatnonzero(addable):
+                swapped = candidate.copy()
+                swapped[v] = True
+                yield swapped
+
+    best = repair(is_open)
+    evaluations = 0
+    improved = True
+    while improved and np.isfinite(best[0]) and evaluations < max_evaluations:
+        improved = False
+        for candidate in moves(best[1]):
+            if capacity[candidate].sum() < demand.sum():
+                continue
+            evaluations += 1
+            result = repair(candidate)
+            if result[0] < best[0] - 1e-9 * abs(best[0]):
+                best = result
+                improved = True
+                break
+            if evaluations >= max_evaluations:
+                break
+    return best
+
+
+def lagrangian_flp(
+    cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    demand: np.ndarray | None = None,
+    capacity: np.ndarray | None = None,
+    force_open=(),
+    force_closed=(),
+    exclusive: np.ndarray | None = None,
+    single_sourcing: bool = True,
+    max_iterations: int = 300,
+    gap_tolerance: float = 1e-3,
+    theta: float = 2.0,
+    patience: int = 20,
+    repair_every: int = 1,
+) -> LagrangianResult:
+    """Lagrangian relaxation of the facility location problem with subgradient optimization
+
+    The constraints requiring each customer to be fully served are relaxed with a
+    multiplier per customer; the subproblem decomposes per warehouse (see
+    uncapacitated_subproblem and capacitated_subproblem) and gives a lower bound. The open
+    warehouses of each subproblem are repaired into a feasible solution, giving an upper
+    bound. The multipliers follow the subgradient direction with the Polyak step
+    theta * (upper bound - lower bound) / ||subgradient||^2; theta is halved after
+    patience iterations without improvement of the lower bound.
+
+    Mutually exclusive warehouses are enforced by the repair only, and with single sourcing
+    the capacitated subproblem is solved as a continuous knapsack: the lower bound is still
+    valid, but weaker.
+
+    :param cost: (warehouses, customers) array of assignment costs, np.inf for forbidden pairs
+    :param fixed_cost: fixed cost of each warehouse
+    :param demand: demand of each customer (capacitated problem only)
+    :param capacity: capacity of each warehouse, None for the uncapacitated problem
+    :param force_open: positions of the warehouses that must be open
+    :param force_closed: positions of the warehouses that must be closed
+    :param exclusive: optional (warehouses, warehouses) boolean array, True for pairs of
+        warehouses that cannot be open simultaneously
+    :param single_sourcing: whether each customer must be served by a single warehouse
+    :param max_iterations: maximum number of subgradient iterations
+    :param gap_tolerance: stop when (upper bound - lower bound) / upper bound is below this value
+    :param theta: initial step parameter
+    :param patience: iterations without improvement before halving theta
+    :param repair_every: run the repair heuristic every repair_every iterations
+    :return: LagrangianResult; flows is a tuple of (warehouse, customer, fraction) arrays
+    """
+    num_warehouses, num_customers = cost.shape
+    fixed_cost = np.asarray(fixed_cost, dtype=float)
+    capacitated = capacity is not None
+    if capacitated:
+        demand = np.asarray(demand, dtype=float)
+        capacity = np.asarray(capacity, dtype=float)
+
+    forced = np.zeros(num_warehouses, dtype=bool)
+    forced[list(force_open)] = True
+    allowed = np.ones(num_warehouses, dtype=bool)
+    allowed[list(force_closed)] = False
+    if (forced & ~allowed).any():
+        raise Exception("A warehouse is forced both open and closed")
+    cost = np.where(allowed[:, None], cost, np.inf)
+    if not np.isfinite(cost).any(axis=0).all():
+        raise Exception("Some customers have no admissible warehouse")
+
+    # Start from the cost of the cheapest admissible warehouse of each customer
+    multipliers = cost.min(axis=0)
+    lower_bound, upper_bound = -np.inf, np.inf
+    best = (None, None)
+    repaired = set()
+    stall = 0
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        reduced_cost = cost - multipliers
+        if capacitated:
+            value, opening, x = capacitated_subproblem(
+                reduced_cost, fixed_cost, demand, capacity, forced, allowed
+            )
+        else:
+            value, opening, x = uncapacitated_subproblem(
+                reduced_cost, fixed_cost, forced, allowed
+            )
+        bound = multipliers.sum() + value @ opening
+        is_open = opening > 0
+        if bound > lower_bound + 1e-9 * max(1.0, abs(bound)):
+            lower_bound = bound
+            stall = 0
+        else:
+            stall += 1
+            if stall >= patience:
+                theta /= 2
+                stall = 0
+
+        # Repair the open warehouses into a feasible solution
+        key = is_open.tobytes()
+        if iterations % repair_every == 0 and key not in repaired:
+            repaired.add(key)
+            candidates = select_open(is_open, value, forced, exclusive)
+            if capacitated:
+                total, open_set, flows = repair_capacitated(
+                    cost,
+                    fixed_cost,
+                    demand,
+                    capacity,
+                    candidates,
+                    forced,
+                    allowed,
+                    exclusive,
+                    single_sourcing,
+                )
+            else:
+                total, open_set, assignment = repair_uncapacitated(
+                    cost, fixed_cost, candidates, forced, allowed, exclusive
+                )
+                flows = (
+                    None
+                    if assignment is None
+                    else (assignment, np.arange(num_customers), np.ones(num_customers))
+                )
+            if total < upper_bound:
+                upper_bound = total
+                best = (np.flatnonzero(open_set), flows)
+
+        if (
+            upper_bound - lower_bound <= gap_tolerance * abs(upper_bound)
+            or theta < 1e-4
+        ):
+            break
+
+        subgradient = 1 - x.sum(axis=0)
+        norm = subgradient @ subgradient
+        if norm == 0:
+            break
+        target = upper_bound if np.isfinite(upper_bound) else 1.05 * abs(bound) + 1
+        multipliers = multipliers + theta * (target - bound) / norm * subgradient
+
+    # Local search on the best capacitated solution
+    if capacitated and best[0] is not None:
+        is_open = np.zeros(num_warehouses, dtype=bool)
+        is_open[best[0]] = True
+        total, open_set, flows = improve_capacitated(
+            cost,
+            fixed_cost,
+            demand,
+            capacity,
+            is_open,
+            forced,
+            allowed,
+            exclusive,
+            single_sourcing,
+        )
+        if total < upper_bound:
+            upper_bound = total
+            best = (np.flatnonzero(open_set), flows)
+
+    return LagrangianResult(
+        lower_bound=float(lower_bound),
+        upper_bound=float(upper_bound),
+        open_positions=best[0],
+        flows=best[1],
+        iterations=iterations,
+        multipliers=multipliers,
+    )
@@ -0,0 +1,310 @@
+import os
+import subprocess
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pulp as pl
+
+# Value of a variable read from the solver, exposes the same varValue attribute of pl.LpVariable
+SolutionValue = namedtuple("SolutionValue", "varValue")
+
+_SENSES = {
+    pl.LpConstraintEQ: "E",
+    pl.LpConstraintLE: "L",
+    pl.LpConstraintGE: "G",
+}
+
+
+class ModelMatrix:
+    """Mixed integer model stored as arrays
+
+    Columns (variables) and rows (constraints) are added in blocks; the coefficients of the
+    constraint matrix are stored in coordinate (COO) form. The model is written directly in
+    MPS format and solved with CBC, without building PuLP expressions.
+    """
+
+    def __init__(self, sense: int = pl.LpMinimize):
+        """
+        :param sense: pl.LpMinimize or pl.LpMaximize
+        """
+        self.sense = sense
+        self.num_columns = 0
+        self.num_rows = 0
+        self._cost, self._lower, self._upper, self._integer = [], [], [], []
+        self._row_sense, self._rhs = [], []
+        self._entries_rows, self._entries_cols, self._entries_vals = [], [], []
+
+    def add_columns(
+        self, n: int, cost=0.0, lower=0.0, upper=np.inf, integer: bool = False
+    ) -> int:
+        """Add n columns and return the position of the first one
+        :param n: number of columns
+        :param cost: objective coefficients (scalar or array of n values)
+        :param lower: lower bounds (scalar or array)
+        :param upper: upper bounds (scalar or array)
+        :param integer: whether the columns are integer
+        """
+        start = self.num_columns
+        self._cost.append(np.broadcast_to(np.asarray(cost, dtype=float), (n,)))
+        self._lower.append(np.broadcast_to(np.asarray(lower, dtype=float), (n,)))
+        self._upper.append(np.broadcast_to(np.asarray(upper, dtype=float), (n,)))
+        self._integer.append(np.full(n, integer))
+        self.num_columns += n
+        return start
+
+    def add_rows(self, n: int, sense: int, rhs=0.0) -> int:
+        """Add n rows and return the position of the first one
+        :param n: number of rows
+        :param sense: pl.LpConstraintEQ, pl.LpConstraintLE or pl.LpConstraintGE
+        :param rhs: right hand sides (scalar or array of n values)
+        """
+        start = self.num_rows
+        self._row_sense.append(np.full(n, _SENSES[sense]))
+        self._rhs.append(np.broadcast_to(np.asarray(rhs, dtype=float), (n,)))
+        self.num_rows += n
+        return start
+
+    def add_entries(self, rows, cols, vals=1.0) -> None:
+        """Add coefficients to the constraint matrix
+        :param rows: row positions
+        :param cols: column positions
+        :param vals: coefficients (scalar or array)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        self._entries_rows.append(rows)
+        self._entries_cols.append(cols)
+        self._entries_vals.append(
+            np.broadcast_to(np.asarray(vals, dtype=float), rows.shape)
+        )
+
+    def set_cost(self, cols, cost) -> None:
+        """Set the objective coefficients of some columns"""
+        c = self.cost.copy()
+        c[np.asarray(cols, dtype=np.int64)] = cost
+        self._cost = [c]
+
+    def set_bounds(self, cols, lower=None, upper=None) -> None:
+        """Change the bounds of some columns"""
+        cols = np.asarray(cols, dtype=np.int64)
+        if lower is not None:
+            lo = self.lower.copy()
+            lo[cols] = lower
+            self._lower = [lo]
+        if upper is not None:
+            up = self.upper.copy()
+            up[cols] = upper
+            self._upper = [up]
+
+    @staticmethod
+    def _concat(blocks, dtype=float) -> np.ndarray:
+        return np.concatenate(blocks) if blocks else np.empty(0, dtype=dtype)
+
+    @property
+    def cost(self) -> np.ndarray:
+        return self._concat(self._cost)
+
+    @property
+    def lower(self) -> np.ndarray:
+        return self._concat(self._lower)
+
+    @property
+    def upper(self) -> np.ndarray:
+        return self._concat(self._upper)
+
+    @property
+    def integer(self) -> np.ndarray:
+        return self._concat(self._integer, dtype=bool)
+
+    @property
+    def row_sense(self) -> np.ndarray:
+        return self._concat(self._row_sense, dtype="<U1")
+
+    @property
+    def rhs(self) -> np.ndarray:
+        return self._concat(self._rhs)
+
+    def coo(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the constraint matrix in COO form (rows, cols, values)"""
+        return (
+            self._concat(self._entries_rows, dtype=np.int64),
+            self._concat(self._entries_cols, dtype=np.int64),
+            self._concat(self._entries_vals),
+        )
+
+    def csc(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the constraint matrix in compressed column form (indptr, rows, values)"""
+        rows, cols, vals = self.coo()
+        order = np.lexsort((rows, cols))
+        indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(cols, minlength=self.num_columns)))
+        )
+        return indptr, rows[order], vals[order]
+
+    def csr(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the constraint matrix in compressed row form (indptr, cols, values)"""
+        rows, cols, vals = self.coo()
+        order = np.lexsort((cols, rows))
+        indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(rows, minlength=self.num_rows)))
+        )
+        return indptr, cols[order], vals[order]
+
+    @property
+    def num_nonzeros(self) -> int:
+        return int(sum(len(each) for each in self._entries_rows))
+
+    def objective_value(self, x: np.ndarray) -> float:
+        """Return the objective value of the solution x"""
+        return float(self.cost @ x)
+
+    def write_mps(self, path: str, relax: bool = False) -> None:
+        """Write the model in (free) MPS format
+        Columns are named C0000000, C0000001, ... and rows R0000000, R0000001, ...
+        :param path: path of the MPS file
+        :param relax: if True write the LP relaxation (all columns continuous)
+        """
+        col_names = _names("C", self.num_columns)
+        row_names = _names("R", self.num_rows)
+
+        # Objective and matrix coefficients, ordered by column. Columns without
+        # coefficients get a zero objective entry, so that they are declared anyway
+        rows, cols, vals = self.coo()
+        cost = self.cost
+        declared = np.zeros(self.num_columns, dtype=bool)
+        declared[cols] = True
+        obj_cols = np.flatnonzero((cost != 0) | ~declared)
+        entry_cols = np.concatenate((obj_cols, cols))
+        entry_rows = np.concatenate((np.full(len(obj_cols), "OBJ"), row_names[rows]))
+        entry_vals = np.concatenate((cost[obj_cols], vals))
+
+        # The integer columns are written first, in a single MARKER block
+        integer = self.integer & (not relax)
+        order = np.lexsort((entry_cols, ~integer[entry_cols]))
+        entry_cols = entry_cols[order]
+        entries = _lines(
+            "    ", col_names[entry_cols], entry_rows[order], _format(entry_vals[order])
+        )
+        num_integer_entries = int(integer[entry_cols].sum())
+
+        rhs = self.rhs
+        nonzero = np.flatnonzero(rhs)
+        lower, upper = self.lower, self.upper
+        fixed = lower == upper
+        has_lower = ~fixed & (lower != 0)
+        has_upper = ~fixed & np.isfinite(upper)
+
+        with open(path, "w") as f:
+            f.write("NAME NETOPT\nROWS\n N  OBJ\n")
+            _write(f, _lines(" ", self.row_sense, row_names))
+            f.write("COLUMNS\n")
+            f.write("    MARKER 'MARKER' 'INTORG'\n")
+            _write(f, entries[:num_integer_entries])
+            f.write("    MARKER 'MARKER' 'INTEND'\n")
+            _write(f, entries[num_integer_entries:])
+            f.write("RHS\n")
+            _write(f, _lines("    RHS", row_names[nonzero], _format(rhs[nonzero])))
+            f.write("BOUNDS\n")
+            _write(f, _lines(" FX BND", col_names[fixed], _format(lower[fixed])))
+            _write(
+                f, _lines(" LO BND", col_names[has_lower], _format(lower[has_lower]))
+            )
+            _write(
+                f, _lines(" UP BND", col_names[has_upper], _format(upper[has_upper]))
+            )
+            f.write("ENDATA\n")
+
+
+def _names(prefix: str, n: int) -> np.ndarray:
+    """Return the array of names prefix0000000, prefix0000001, ..."""
+    return np.char.add(prefix, np.char.zfill(np.arange(n).astype(str), 7))
+
+
+def _format(values: np.ndarray) -> np.ndarray:
+    """Format floats for the MPS file"""
+    return np.char.mod("%.15g", values)
+
+
+def _lines(prefix: str, *fields) -> np.ndarray:
+    """Return the lines made of prefix and fields, separated by spaces"""
+    line = np.asarray(fields[0]).astype(str)
+    if prefix.strip():
+        line = np.char.add(prefix + " ", line)
+    else:
+        line = np.char.add(prefix, line)
+    for each in fields[1:]:
+        line = np.char.add(np.char.add(line, " "), each)
+    return np.char.add(line, "\n")
+
+
+def _write(f, lines: np.ndarray) -> None:
+    f.write("".join(lines.tolist()))
+
+
+def solve_matrix(
+    matrix: ModelMatrix,
+    time_limit: float | None = 120,
+    gap_rel: float | None = None,
+    msg: bool = False,
+    options: list | None = None,
+    relax: bool = False,
+) -> tuple[str, np.ndarray | None]:
+    """Write the model in MPS format and solve it with the CBC executable bundled with PuLP
+    :param matrix: model to be solved
+    :param time_limit: time limit in seconds
+    :param gap_rel: relative optimality gap
+    :param msg: whether to display the solver log
+    :param options: additional CBC options (e.g. ["threads 4"])
+    :param relax: if True solve the LP relaxation
+    :return: tuple (status, values of the columns); values is None if no solution was found
+    """
+    solver = pl.PULP_CBC_CMD()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mps_path = os.path.join(tmp_dir, "model.mps")
+        sol_path = os.path.join(tmp_dir, "model.sol")
+        matrix.write_mps(mps_path, relax=relax)
+
+        args = [solver.path, mps_path]
+        if matrix.sense == pl.LpMaximize:
+            args.append("-max")
+        if time_limit is not None:
+            args += ["-sec", str(time_limit)]
+        if gap_rel is not None:
+            args += ["-ratioGap", str(gap_rel)]
+        for option in options or []:
+            args += ("-" + option).split()
+        args += ["-solve", "-printingOptions", "all", "-solution", sol_path]
+
+        pipe = None if msg else subprocess.DEVNULL
+        if subprocess.call(args, stdout=pipe, stderr=pipe) != 0 or not os.path.exists(
+            sol_path
+        ):
+            raise pl.PulpSolverError(f"Error while executing {solver.path}")
+
+        status, _ = solver.get_status(sol_path)
+        values = _read_solution(sol_path, matrix.num_columns)
+
+    status = pl.LpStatus[status]
+    if status != "Optimal":
+        return status, None
+    return status, values
+
+
+def _read_solution(path: str, num_columns: int) -> np.ndarray:
+    """Read the column values from a CBC solution file"""
+    values = np.zeros(num_columns)
+    with open(path) as f:
+        next(f)  # status line
+        fields = [line.split() for line in f if len(line) > 2]
+    names, vals = [], []
+    for each in fields:
+        if each[0] == "**":
+            each = each[1:]
+        if each[1].startswith("C"):
+            names.append(each[1])
+            vals.append(each[2])
+    if names:
+        positions = np.array([int(name[1:]) for name in names])
+        values[positions] = np.array(vals, dtype=float)
+    return values
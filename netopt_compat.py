@@ -1,4 +1,6 @@
+from data_structures import DistanceMatrix
 from network_factory import solve_network_optimization
+from solver_config import NOT_SET, SolverConfig
 
 
 def netopt(
@@ -6,7 +8,7 @@ def netopt(
     warehouses: dict,
     customers: dict,
     factories: dict | None = None,
-    distance: dict | None = None,
+    distance: dict | DistanceMatrix | None = None,
     distance_ranges: list | None = None,
     objective: str = "",
     high_service_distance: float | None = None,
@@ -25,6 +27,9 @@ def netopt(
     solver_log: bool = False,
     unit_transport_cost: float = 0.1,
     mutually_exclusive: list | None = None,
+    solver_config: SolverConfig | dict | None = None,
+    threads: int | None = NOT_SET,
+    time_limit: float | None = NOT_SET,
     **kwargs,
 ):
     """
@@ -57,5 +62,8 @@ def netopt(
         unit_transport_cost=unit_transport_cost,
         mutually_exclusive=mutually_exclusive,
         distance_ranges=distance_ranges,
+        solver_config=solver_config,
+        threads=threads,
+        time_limit=time_limit,
         **kwargs,
     )
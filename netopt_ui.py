@@ -346,7 +346,8 @@ def netopt_ui(warehouses: dict, customers: dict, distance: dict | None = None):
                 factories=None,
                 warehouses=warehouses,
                 customers=customers,
-                distance=None,
+                distance=distance,
+                distance_cache=True,
                 distance_ranges=params.get("distance_ranges", []),
                 objective=params.get("objective", "p-median"),
                 objective_function=params.get("objective_function", "mindistance"),
@@ -1,11 +1,16 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+from matplotlib.collections import LineCollection, PatchCollection
 from matplotlib.patches import Circle
 import pprint
 
+from data_structures import NetworkData, SpatialIndex
+from solution import assignments_frame
 
 dpi = 136
+# Distance (pixels) from a marker within which the hover shows its label
+HOVER_PIXELS = 5
 
 
 def print_dict(data):
@@ -23,32 +28,17 @@ def show_assignments(results):
     """Display the customers assigned to each active warehouse in a tabular format
     :param results: the results of an optimization run
     """
-    data = []
-    for each in results["customers_assignment"]:
-        data.append(
-            [
-                each["Warehouse_id"],
-                each["Warehouse"],
-                each["Customer_id"],
-                each["Customer"],
-                each["Customer Demand"],
-                each["Distance"],
-                each["Flow"],
-            ]
-        )
-
-    data = pd.DataFrame(
-        data=data,
-        columns=[
+    data = assignments_frame(results)[
+        [
             "Warehouse_id",
             "Warehouse",
             "Customer_id",
             "Customer",
-            "Customer_demand",
+            "Customer Demand",
             "Distance",
             "Flow",
-        ],
-    )
+        ]
+    ].rename(columns={"Customer Demand": "Customer_demand"})
     with pd.option_context("display.max_rows", 100):
         print(data.to_markdown())
 
@@ -101,73 +91,110 @@ def plot_map(
 
     ax.set_aspect("equal")
 
+    # Each group of markers, flows and circles is drawn as a single artist, so that the
+    # rendering time does not grow with the number of matplotlib objects
+    w_data = NetworkData.from_dict(warehouses, kind="warehouse") if warehouses else None
+    c_data = NetworkData.from_dict(customers, kind="customer") if customers else None
+    active = (
+        np.isin(w_data.ids, list(active_warehouses))
+        if w_data is not None
+        else np.empty(0, dtype=bool)
+    )
+
     # Check if radius is defined and should be plotted
-    if radius := options.get("radius", None):
+    if (radius := options.get("radius", None)) and active.any():
         print(f"PLOTTING RADIUS {radius}...")
-        for k, each in warehouses.items():
-            if k in active_warehouses:
-                circle = Circle(
-                    (each.longitude, each.latitude),
-                    radius / 100,
-                    edgecolor="blue",
-                    facecolor="lightblue",
-                    fill=True,
-                    alpha=0.2,
-                    linestyle="-",
-                )
-                ax.add_patch(circle)
+        circles = [
+            Circle((lon, lat), radius / 100)
+            for lat, lon in zip(w_data.latitude[active], w_data.longitude[active])
+        ]
+        ax.add_collection(
+            PatchCollection(
+                circles,
+                edgecolor="blue",
+                facecolor="lightblue",
+                alpha=0.2,
+                linestyle="-",
+            )
+        )
     # Plot flows
     if flows and not hide_flows:
-        for flow in flows:
-            plt.plot(
-                [warehouses[flow[0]].longitude, customers[flow[1]].longitude],
-                [warehouses[flow[0]].latitude, customers[flow[1]].latitude],
-                color="k",
-                linestyle="-",
-                linewidth=0.3,
+        w = w_data.positions(flow[0] for flow in flows)
+        c = c_data.positions(flow[1] for flow in flows)
+        segments = np.stack(
+            (
+                np.column_stack((w_data.longitude[w], w_data.latitude[w])),
+                np.column_stack((c_data.longitude[c], c_data.latitude[c])),
+            ),
+            axis=1,
+        )
+        ax.add_collection(
+            LineCollection(segments, colors="k", linestyles="-", linewidths=0.3)
+        )
+
+    # Points shown by the hover, with their labels
+    latitude, longitude, labels = [], [], []
+
+    def scatter(data, where, prefix, marker, color, size):
+        if not where.any():
+            return
+        ax.scatter(
+            data.longitude[where],
+            data.latitude[where],
+            marker=marker,
+            color=color,
+            s=size**2,
+        )
+        latitude.append(data.latitude[where])
+        longitude.append(data.longitude[where])
+        labels.extend(
+            f"{prefix} {each}: {city}"
+            for each, city in zip(
+                np.asarray(data.ids, dtype=object)[where], data.column("city")[where]
             )
+        )
 
     # Plot customers
-    if customers:
-        for c_id, each in customers.items():
-            # Highlight customers served by multiple suppliers
-            if c_id in multi_sourced.keys():
-                plt.plot(
-                    each.longitude,
-                    each.latitude,
-                    marker=kwargs.get("customer_multisourced_marker", "*"),
-                    color=kwargs.get("customer_multisourced_markercolor", "yellow"),
-                    markersize=kwargs.get("customer_multisourced_markersize", 5),
-                )
-            else:
-                plt.plot(
-                    each.longitude,
-                    each.latitude,
-                    marker=kwargs.get("customer_marker", "o"),
-                    color=kwargs.get("customer_markercolor", "blue"),
-                    markersize=kwargs.get("customer_markersize", 4),
-                )
+    if c_data is not None:
+        # Highlight customers served by multiple suppliers
+        multi = np.isin(c_data.ids, list(multi_sourced))
+        scatter(
+            c_data,
+            ~multi,
+            "Customer",
+            kwargs.get("customer_marker", "o"),
+            kwargs.get("customer_markercolor", "blue"),
+            kwargs.get("customer_markersize", 4),
+        )
+        scatter(
+            c_data,
+            multi,
+            "Customer",
+            kwargs.get("customer_multisourced_marker", "*"),
+            kwargs.get("customer_multisourced_markercolor", "yellow"),
+            kwargs.get("customer_multisourced_markersize", 5),
+        )
 
     # Plot warehouses
-    if warehouses:
-        for k, each in warehouses.items():
-            if k in active_warehouses:
-                plt.plot(
-                    each.longitude,
-                    each.latitude,
-                    marker=kwargs.get("warehouse_active_marker", "v"),
-                    color=kwargs.get("warehouse_active_markercolor", "green"),
-                    markersize=kwargs.get("warehouse_active_markersize", 5),
-                )
-            else:
-                if not hide_inactive:
-                    plt.plot(
-                        each.longitude,
-                        each.latitude,
-                        marker=kwargs.get("warehouse_marker", "s"),
-                        color=kwargs.get("warehouse_markercolor", "red"),
-                        markersize=kwargs.get("warehouse_markersize", 4),
-                    )
+    if w_data is not None:
+        scatter(
+            w_data,
+            active,
+            "Warehouse",
+            kwargs.get("warehouse_active_marker", "v"),
+            kwargs.get("warehouse_active_markercolor", "green"),
+            kwargs.get("warehouse_active_markersize", 5),
+        )
+        if not hide_inactive:
+            scatter(
+                w_data,
+                ~active,
+                "Warehouse",
+                kwargs.get("warehouse_marker", "s"),
+                kwargs.get("warehouse_markercolor", "red"),
+                kwargs.get("warehouse_markersize", 4),
+            )
+    ax.autoscale_view()
 
     # Remove axes
     plt.gca().axes.get_xaxis().set_visible(False)
@@ -184,28 +211,33 @@ def plot_map(
     )
     annot.set_visible(False)
 
-    def update_annot(ind):
-        x, y = line.get_data()
-        annot.xy = (x[ind["ind"][0]], y[ind["ind"][0]])
-        text = "{}, {}".format(
-            " ".join(list(map(str, ind["ind"]))),
-            " ".join([names[n] for n in ind["ind"]]),
+    if labels:
+        latitude = np.concatenate(latitude)
+        longitude = np.concatenate(longitude)
+        # Nearest plotted point of the mouse (the axes have equal aspect, so that the
+        # euclidean distance on (latitude, longitude) follows the distance on screen)
+        index = SpatialIndex(
+            NetworkData("customer", latitude=latitude, longitude=longitude),
+            use_haversine=False,
         )
-        annot.set_text(text)
-        annot.get_bbox_patch().set_alpha(0.4)
 
     def hover(event):
-        vis = annot.get_visible()
-        if event.inaxes == ax:
-            cont, ind = line.contains(event)
-            if cont:
-                update_annot(ind)
-                annot.set_visible(True)
-                fig.canvas.draw_idle()
-            else:
-                if vis:
-                    annot.set_visible(False)
-                    fig.canvas.draw_idle()
+        if event.inaxes != ax or not labels:
+            return
+        _, (n,), (distance,) = index.query([event.ydata], [event.xdata], k=1)
+        # Tolerance of HOVER_PIXELS on screen, in data units
+        inverse = ax.transData.inverted()
+        x0, _ = inverse.transform((0, 0))
+        x1, _ = inverse.transform((HOVER_PIXELS, 0))
+        if distance <= abs(x1 - x0):
+            annot.xy = (longitude[n], latitude[n])
+            annot.set_text(labels[n])
+            annot.get_bbox_patch().set_alpha(0.4)
+            annot.set_visible(True)
+            fig.canvas.draw_idle()
+        elif annot.get_visible():
+            annot.set_visible(False)
+            fig.canvas.draw_idle()
 
     fig.canvas.mpl_connect("motion_notify_event", hover)
 
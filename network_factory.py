@@ -1,4 +1,33 @@
-from data_structures import calculate_dm
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aggregation import Aggregation, aggregate_customers
+from data_structures import (
+    DistanceMatrix,
+    NetworkData,
+    SparseDistanceMatrix,
+    get_values,
+)
+from decomposition import (
+    DEFAULT_REGION_SIZE,
+    allocate_facilities,
+    bisect_regions,
+    interchange_repair,
+    subset,
+)
+from distance_cache import cached_dm
+from instrumentation import Instrumentation
+from solution import assignments_frame
+from solution_cache import get_solution_cache
+from solver_config import NOT_SET, SolverConfig, get_solver_config
 from network_optimizer import (
     NetworkOptimizer,
     PMedianOptimizer,
@@ -7,13 +36,22 @@ from network_optimizer import (
     CapacitatedFLPOptimizer,
 )
 
+# Model assembly and solution backends, with the objectives they support (None = all)
+BACKENDS = {
+    "pulp": None,
+    "mps": None,
+    "heuristic": ("p-median",),
+    "lagrangian": ("UFLP", "CFLP"),
+    "decomposition": ("p-median", "UFLP"),
+}
+
 
 def create_network_optimizer(
     objective: str,
     objective_function: str,  # only for p-median
     warehouses: dict,
     customers: dict,
-    distance: dict | None = None,
+    distance: dict | DistanceMatrix | None = None,
     factories: dict | None = None,
     num_warehouses: int = 0,
     high_service_distance: float = 0,
@@ -28,6 +66,14 @@ def create_network_optimizer(
     unit_transport_cost: float = 0.1,
     distance_ranges: list = None,
     mutually_exclusive: list = None,
+    distance_dtype=None,
+    distance_cache=None,
+    solver_config: SolverConfig | dict | None = None,
+    threads: int | None = NOT_SET,
+    time_limit: float | None = NOT_SET,
+    stats: Instrumentation | None = None,
+    hooks: list | None = None,
+    trace_memory: bool = False,
     **kwargs,
 ) -> NetworkOptimizer:
     """
@@ -37,7 +83,8 @@ def create_network_optimizer(
         objective: The objective function type ('mindistance', 'maxcover', 'mincost')
         warehouses: Dictionary of warehouse objects
         customers: Dictionary of customer objects
-        distance: Distance matrix between warehouses and customers
+        distance: Distance matrix between warehouses and customers, either a dict keyed by
+            (warehouse_id, customer_id) or a DistanceMatrix
         factories: Optional dictionary of factory objects
         num_warehouses: Number of warehouses to open (p) for p-median and p-cover models
         high_service_distance: Distance within which demand is considered covered (for p-cover)
@@ -52,16 +99,47 @@ def create_network_optimizer(
         unit_transport_cost: Cost per unit per distance (for FLP)
         distance_ranges: List of distances for calculating demand percentages
         mutually_exclusive: List of warehouse ID pairs that cannot be open simultaneously
+        distance_dtype: Optional dtype of the distance matrix (e.g. np.float32 to halve its memory).
+            A distance dict passed by the caller is converted into a DistanceMatrix of this dtype
+        distance_cache: On-disk cache used when the distance matrix must be computed:
+            True (default cache directory), a directory or a DistanceCache. None disables it
+        solver_config: Solver parameters, as a SolverConfig or a dict (see SolverConfig)
+        threads: Number of CBC threads, overrides the one of solver_config (None: CBC default)
+        time_limit: Time limit in seconds, overrides the one of solver_config (None: no limit)
+        stats: Instrumentation collecting the time and memory of each phase, including the
+            computation of the distance matrix (see Instrumentation). A new one is created
+            if not given
+        hooks: Callables hook(name, metrics) called at the end of each phase
+        trace_memory: Whether to record the peak of the Python allocations of each phase
 
     Returns:
         An instance of a NetworkOptimizer subclass based on the specified objective
     """
 
+    if stats is None:
+        stats = Instrumentation(trace_memory=trace_memory)
+    for hook in hooks or []:
+        stats.add_hook(hook)
+
     # Compute distance matrix if not provided
     if not distance and warehouses and customers:
         # Calculate the distance matrix if not provided
         print("Calculating distance matrix...")
-        distance = calculate_dm(warehouses, customers)
+        with stats.phase("distance_matrix"):
+            distance = cached_dm(
+                warehouses,
+                customers,
+                dtype=np.float64 if distance_dtype is None else distance_dtype,
+                distance_cache=distance_cache,
+            )
+    elif distance_dtype is not None:
+        with stats.phase("distance_matrix"):
+            distance = DistanceMatrix.from_dict(
+                distance,
+                warehouses_id=list(warehouses.keys()),
+                customers_id=list(customers.keys()),
+                dtype=distance_dtype,
+            )
 
     # Common parameters for all optimizers
     common_params = {
@@ -74,6 +152,10 @@ def create_network_optimizer(
         "force_allocations": force_allocations,
         "mutually_exclusive": mutually_exclusive,
         "distance_ranges": distance_ranges,
+        "solver_config": get_solver_config(
+            solver_config, threads=threads, time_limit=time_limit
+        ),
+        "stats": stats,
     }
     # print("=====> KWARGS <=====")
     # print(kwargs)
@@ -158,7 +240,7 @@ def solve_network_optimization(
     objective: str,
     warehouses: dict,
     customers: dict,
-    distance: dict | None = None,
+    distance: dict | DistanceMatrix | None = None,
     **kwargs,
 ) -> dict:
     """
@@ -168,36 +250,122 @@ def solve_network_optimization(
         objective: The objective function type ('mindistance', 'maxcover', 'mincost')
         warehouses: Dictionary of warehouse objects
         customers: Dictionary of customer objects
-        distance: Distance matrix between warehouses and customers
-        **kwargs: Additional parameters for create_network_optimizer
+        distance: Distance matrix between warehouses and customers (dict or DistanceMatrix)
+        **kwargs: Additional parameters for create_network_optimizer. backend selects how the
+            model is assembled and solved: 'pulp' (default), 'mps' (constraint matrix written
+            directly), 'heuristic' (greedy + vertex substitution, p-median only) or
+            'lagrangian' (Lagrangian relaxation, UFLP and CFLP only) or 'decomposition'
+            (regional subproblems solved in parallel, p-median and UFLP only, see
+            _solve_decomposed for its parameters). warm_start passes a
+            starting solution to CBC (pulp backend only, see NetworkOptimizer.solve). aggregate solves the problem
+            on clusters of customers and maps the solution back to them (see
+            solve_aggregated_network_optimization). solution_cache stores the solutions
+            and returns the stored copy when the same inputs are solved again: None (default,
+            no cache), True (in memory), a directory (also stored on disk) or a
+            SolutionCache; force_resolve solves the model even if a solution is cached (the
+            new solution replaces the cached one)
 
     Returns:
         Solution dictionary with optimization results or None if infeasible
     """
+    # Solutions of identical previous runs, see SolutionCache
+    solution_cache = get_solution_cache(kwargs.pop("solution_cache", None))
+    force_resolve = kwargs.pop("force_resolve", False)
+    key = None
+    if solution_cache is not None:
+        key = solution_cache.key(objective, warehouses, customers, distance, **kwargs)
+
     # Extract plotting parameters
     plot = kwargs.pop("plot", False)
     hide_inactive = kwargs.pop("hide_inactive", False)
     hide_flows = kwargs.pop("hide_flows", False)
     plot_size = kwargs.pop("plot_size", (8, 12))
     solver_log = kwargs.pop("solver_log", False)
+    # "pulp" builds the model with PuLP expressions, "mps" writes the constraint matrix directly,
+    # "heuristic" uses the greedy + vertex substitution heuristic (p-median only),
+    # "lagrangian" uses the Lagrangian relaxation (UFLP and CFLP only),
+    # "decomposition" solves geographic regions in parallel (p-median and UFLP only)
+    backend = kwargs.pop("backend", "pulp")
+    # Starting solution for CBC (pulp backend), see NetworkOptimizer.solve
+    warm_start = kwargs.pop("warm_start", None)
+    # Customer aggregation, see solve_aggregated_network_optimization
+    aggregate = kwargs.pop("aggregate", None)
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend: {backend}. Must be one of: {', '.join(BACKENDS)}."
+        )
+    if BACKENDS[backend] and objective not in BACKENDS[backend]:
+        raise ValueError(
+            f"The {backend} backend is available only for {', '.join(BACKENDS[backend])}"
+        )
+    if warm_start is not None and backend != "pulp":
+        raise ValueError(
+            f"warm_start is available only with the pulp backend, not with {backend}"
+        )
+    if key is not None and not force_resolve:
+        solution = solution_cache.get(key)
+        if solution is not None:
+            print(f"Solution read from the cache (key {key[:12]})")
+            _print_cached_solution(solution)
+            if plot:
+                _plot_cached_solution(
+                    solution,
+                    objective,
+                    warehouses,
+                    customers,
+                    hide_inactive=hide_inactive,
+                    hide_flows=hide_flows,
+                    plot_size=plot_size,
+                    **kwargs,
+                )
+            return solution
+
+    aggregation = None
+    if aggregate:
+        aggregation = _aggregation(aggregate, customers, distance, kwargs)
+        customers = aggregation.customers
 
     # Create and build the model
-    optimizer = create_network_optimizer(
-        objective=objective,
-        warehouses=warehouses,
-        customers=customers,
-        distance=distance,
-        **kwargs,
-    )
+    if backend == "decomposition":
+        # The model of each region is built and solved by a worker process
+        optimizer = _solve_decomposed(
+            objective, warehouses, customers, distance=distance, **kwargs
+        )
+    else:
+        optimizer = create_network_optimizer(
+            objective=objective,
+            warehouses=warehouses,
+            customers=customers,
+            distance=distance,
+            **kwargs,
+        )
 
-    # Build the optimization model
-    optimizer.build_model()
+    if backend == "decomposition":
+        solution = optimizer.solution
+    elif backend == "heuristic":
+        solution = optimizer.solve_heuristic()
+    elif backend == "lagrangian":
+        solution = optimizer.solve_lagrangian()
+    elif backend == "mps":
+        # Build the model as a matrix and solve it
+        solution = optimizer.solve_mps(solver_log=solver_log)
+    else:
+        # Build the optimization model
+        optimizer.build_model()
 
-    # if kwargs.get("print_model", False):
-    #     print(optimizer.model)
+        # if kwargs.get("print_model", False):
+        #     print(optimizer.model)
 
-    # Solve the model
-    solution = optimizer.solve(solver_log=solver_log)
+        # Solve the model
+        solution = optimizer.solve(solver_log=solver_log, warm_start=warm_start)
+
+    if solution and aggregation is not None:
+        with optimizer.stats.phase("disaggregate"):
+            solution = disaggregate_solution(optimizer, aggregation)
+        solution["stats"] = optimizer.stats.to_dict()
+
+    if solution and key is not None:
+        solution_cache.put(key, solution)
 
     # If requested, print detailed solution and plot
     if solution:
@@ -212,3 +380,586 @@ def solve_network_optimization(
             )
 
     return solution
+
+
+def _print_cached_solution(solution: dict):
+    """Print the main results of a solution read from the cache"""
+    print(f"Status: {solution['status']}")
+    print(f"Objective value: {solution['objective_value']}")
+    print(
+        f"Active warehouses ({len(solution['active_warehouses_id'])}): "
+        f"{', '.join(str(w) for w in sorted(solution['active_warehouses_id'], key=str))}"
+    )
+
+
+def _plot_cached_solution(
+    solution: dict, objective: str, warehouses: dict, customers: dict, **kwargs
+):
+    """Plot a solution read from the cache, as NetworkOptimizer.plot_solution"""
+    from netopt_utils import plot_map
+
+    assignments = assignments_frame(solution)
+    suppliers = assignments["Customer_id"].value_counts()
+    plot_map(
+        warehouses=warehouses,
+        customers=customers,
+        flows=set(zip(assignments["Warehouse_id"], assignments["Customer_id"])),
+        active_warehouses=solution["active_warehouses_id"],
+        multi_sourced=suppliers[suppliers > 1].to_dict(),
+        options=(
+            {"radius": kwargs["high_service_distance"]}
+            if objective == "p-cover"
+            else {}
+        ),
+        **kwargs,
+    )
+
+
+def _aggregation(aggregate, customers: dict, distance, kwargs: dict) -> Aggregation:
+    """Return the Aggregation of the customers requested by the aggregate parameter"""
+    if distance:
+        raise ValueError(
+            "A distance matrix cannot be used with aggregate: the distances are computed "
+            "from the centroids of the clusters"
+        )
+    if kwargs.get("force_allocations"):
+        raise ValueError("force_allocations cannot be used with aggregate")
+    if isinstance(aggregate, Aggregation):
+        aggregation = aggregate
+    elif isinstance(aggregate, dict):
+        aggregation = aggregate_customers(customers, **aggregate)
+    else:
+        raise ValueError(
+            "aggregate must be a dict of parameters of aggregate_customers or an Aggregation"
+        )
+    requested = aggregate.get("num_clusters") if isinstance(aggregate, dict) else None
+    if requested and not aggregate.get("cell_size"):
+        print(f"Aggregating customers: {aggregation} ({requested} requested)")
+    else:
+        print(f"Aggregating customers: {aggregation}")
+    return aggregation
+
+
+def disaggregate_solution(
+    optimizer: NetworkOptimizer, aggregation: Aggregation
+) -> dict:
+    """
+    Map the solution of a model built on aggregated customers back to the original customers.
+
+    In uncapacitated models each customer is served by its nearest open warehouse, in
+    capacitated models it is assigned as its cluster. The objective is then evaluated on the
+    original customers. Since each customer is at most its offset away from the centroid of
+    its cluster, for any set of open warehouses the objectives of the aggregated and of the
+    original problem differ by at most the aggregation error bound (weighted distance
+    objectives only; None for p-cover).
+
+    Args:
+        optimizer: Solved optimizer of the aggregated customers
+        aggregation: Aggregation of the customers used to build the optimizer
+
+    Returns:
+        Solution dictionary for the original customers, with the additional keys
+        aggregated_objective_value, aggregation_error_bound and aggregation (summary of the
+        clusters). For uncapacitated models solved to optimality, aggregation_lower_bound
+        is a lower bound of the optimum of the original problem: the aggregated objective,
+        less the optimality gaps of the solver configuration (CBC reports the solutions
+        within gap_rel or gap_abs as optimal) and the error bound
+    """
+    solution = optimizer.solution.copy()
+    active = optimizer.active_warehouses
+    _, flows = optimizer._current_values()
+    uncapacitated = not optimizer._is_capacitated()
+    df = aggregation.disaggregate(
+        flows, optimizer.warehouses, open_warehouses=active if uncapacitated else None
+    )
+
+    total_demand = aggregation.demand.sum()
+    flow = df["Share"].to_numpy() * df["Customer Demand"].to_numpy()
+    distance = df["Distance"].to_numpy()
+    weighted_distance = float(np.dot(flow, distance))
+    if optimizer.objective == "p-cover":
+        covered = distance <= optimizer.high_service_distance
+        objective_value = float(flow[covered].sum() / total_demand)
+        error_bound = None
+    elif getattr(optimizer, "objective_function", None) == "mindistance":
+        objective_value = weighted_distance / total_demand
+        error_bound = aggregation.error_bound(1 / total_demand)
+    else:
+        objective_value = optimizer.unit_transport_cost * weighted_distance
+        if not optimizer.ignore_fixed_cost:
+            fixed_costs = get_values(optimizer.warehouses, "fixed_cost", list(active))
+            objective_value += float(np.nansum(fixed_costs))
+        error_bound = aggregation.error_bound(optimizer.unit_transport_cost)
+
+    solution.update(
+        {
+            "objective_value": objective_value,
+            "aggregated_objective_value": optimizer.solution["objective_value"],
+            "aggregation_error_bound": error_bound,
+            "aggregation": aggregation.summary(),
+        }
+    )
+    if error_bound is not None and uncapacitated and solution["status"] == "Optimal":
+        # CBC stops as soon as one of the gaps is closed
+        incumbent = solution["aggregated_objective_value"]
+        config = optimizer.solver_config
+        gap = max(abs(incumbent) * (config.gap_rel or 0), config.gap_abs or 0)
+        solution["aggregation_lower_bound"] = incumbent - gap - error_bound
+
+    if "customers_assignment" in solution and len(df):
+        suppliers = df["Customer_id"].value_counts()
+        ranges = optimizer.distance_ranges
+        bands = pd.cut(distance, bins=ranges, labels=False, include_lowest=True)
+        within = ~np.isnan(bands)
+        by_band = np.bincount(
+            bands[within].astype(int), weights=flow[within], minlength=len(ranges) - 1
+        )
+        warehouses = NetworkData.from_dict(optimizer.warehouses)
+        w = warehouses.positions(df["Warehouse_id"])
+        c = aggregation.original.positions(df["Customer_id"])
+        solution.update(
+            {
+                "avg_weighted_distance": weighted_distance / flow.sum(),
+                "most_distant_customer": distance.max(),
+                "demand_perc_by_ranges": dict(
+                    zip(zip(ranges[:-1], ranges[1:]), by_band / flow.sum())
+                ),
+                "avg_customer_distance": distance.mean(),
+                "multi_sourced_customers": suppliers.index[suppliers > 1].tolist(),
+                "customers_assignment": pd.DataFrame(
+                    {
+                        "Warehouse": warehouses.column("city")[w].astype(str),
+                        "Warehouse_id": df["Warehouse_id"],
+                        "Customer": aggregation.original.column("city")[c].astype(str),
+                        "Customer_id": df["Customer_id"],
+                        "Customer Demand": df["Customer Demand"],
+                        "Distance": distance,
+                        "Warehouse Latitude": warehouses.latitude[w],
+                        "Warehouse Longitude": warehouses.longitude[w],
+                        "Customers Latitude": aggregation.latitude[c],
+                        "Customers Longitude": aggregation.longitude[c],
+                        "Flow": flow,
+                    }
+                ),
+            }
+        )
+
+    optimizer.solution = solution
+    bound = "n/a" if error_bound is None else f"{error_bound:.4g}"
+    print(
+        f"Disaggregated {aggregation.num_clusters} clusters to {len(aggregation.labels)} "
+        f"customers: objective {objective_value:.4g} (aggregated "
+        f"{solution['aggregated_objective_value']:.4g}, error bound {bound})"
+    )
+    return solution
+
+
+def _region_solve(task: dict) -> dict:
+    """Solve the subproblem of one region of a decomposition and return a row of the results"""
+    params = dict(task["params"])
+    verbose = params.pop("verbose", False)
+    row = {
+        "region": task["region"],
+        "customers": len(task["customers"]),
+        "warehouses": len(task["warehouses"]),
+        "num_warehouses": params.get("num_warehouses"),
+    }
+    start = time.perf_counter()
+    try:
+        quiet = contextlib.redirect_stdout(io.StringIO())
+        with contextlib.nullcontext() if verbose else quiet:
+            solution = solve_network_optimization(
+                warehouses=task["warehouses"],
+                customers=task["customers"],
+                plot=False,
+                **params,
+            )
+        error = None
+    except Exception as e:
+        solution, error = None, str(e)
+    row["solve_time"] = time.perf_counter() - start
+    solution = solution or {}
+    row.update(
+        {
+            "status": solution.get("status", "Error" if error else "Infeasible"),
+            "objective_value": solution.get("objective_value"),
+            "active_warehouses_id": sorted(solution.get("active_warehouses_id", [])),
+            "error": error,
+        }
+    )
+    return row
+
+
+def _solve_decomposed(
+    objective: str,
+    warehouses: dict,
+    customers: dict,
+    distance=None,
+    num_regions: int | None = None,
+    max_workers: int | None = None,
+    region_backend: str = "pulp",
+    repair: bool = True,
+    num_neighbors: int | None = None,
+    verbose: bool = False,
+    **kwargs,
+) -> NetworkOptimizer:
+    """
+    Solve an uncapacitated p-median or UFLP instance by geographic decomposition.
+
+    Customers and warehouses are partitioned by recursive bisection on latitude and
+    longitude into regions of equal demand. The subproblem of each region (with a number of
+    warehouses proportional to its demand for p-median) is solved by a worker process, then
+    the union of the regional solutions is improved by a local search with swap moves
+    between nearby warehouses (see interchange_repair), which repairs the assignments and
+    locations near the region borders. Only the distances of each region and of the nearest
+    warehouses of each customer are computed, so no model of the full instance is built.
+
+    Args:
+        objective: 'p-median' or 'UFLP'
+        warehouses: Dictionary of warehouse objects
+        customers: Dictionary of customer objects
+        distance: Not supported, the distances are computed by the regional subproblems
+        num_regions: Number of regions (default: one every DEFAULT_REGION_SIZE customers,
+            at most num_warehouses for p-median)
+        max_workers: Number of worker processes (None = number of CPUs, 1 = solve in this process)
+        region_backend: Backend of the regional subproblems (see solve_network_optimization)
+        repair: Whether to run the local search across the region borders
+        num_neighbors: Number of nearest warehouses of each customer used by the local search
+            (see interchange_repair)
+        verbose: Whether to show the messages of each regional solve
+        **kwargs: Parameters of the model, as in create_network_optimizer. CBC runs
+            single-threaded in each worker unless threads is passed. stats, hooks and
+            trace_memory instrument the phases of the full instance (regions, repair and the
+            analysis of the solution), not the regional solves
+
+    Returns:
+        Optimizer of the full instance with the solution loaded. The solution includes
+        decomposition, a dict with the results of each region (regions), the objective
+        before the local search (objective_before_repair) and the number of its moves
+    """
+    if distance:
+        raise ValueError(
+            "A distance matrix cannot be used with the decomposition backend: the "
+            "distances are computed by region"
+        )
+    if kwargs.get("mutually_exclusive") or kwargs.get("force_allocations"):
+        raise ValueError(
+            "mutually_exclusive and force_allocations cannot be used with the "
+            "decomposition backend"
+        )
+    if objective == "p-median" and not kwargs.get("force_uncapacitated"):
+        raise ValueError(
+            "The decomposition backend solves uncapacitated models: "
+            "set force_uncapacitated=True"
+        )
+    if region_backend not in BACKENDS or region_backend == "decomposition":
+        raise ValueError(f"Unknown region backend: {region_backend}")
+
+    warehouses_data = NetworkData.from_dict(warehouses)
+    customers_data = NetworkData.from_dict(customers)
+    demand = np.nan_to_num(customers_data.demand)
+    num_warehouses = kwargs.get("num_warehouses")
+    if num_regions is None:
+        num_regions = -(-len(customers) // DEFAULT_REGION_SIZE)
+    if objective == "p-median":
+        if not num_warehouses:
+            raise ValueError(
+                "num_warehouses must be specified for p-median optimization"
+            )
+        num_regions = min(num_regions, num_warehouses)
+
+    c_region, w_region = bisect_regions(
+        customers_data.latitude,
+        customers_data.longitude,
+        demand,
+        num_regions,
+        warehouses_data.latitude,
+        warehouses_data.longitude,
+    )
+    num_regions = int(c_region.max()) + 1
+    is_forced = np.zeros(len(warehouses_data), dtype=bool)
+    is_forced[warehouses_data.positions(kwargs.get("force_open") or [])] = True
+    allowed = np.ones(len(warehouses_data), dtype=bool)
+    allowed[warehouses_data.positions(kwargs.get("force_closed") or [])] = False
+    if objective == "p-median":
+        counts = allocate_facilities(
+            np.bincount(c_region, weights=demand, minlength=num_regions),
+            num_warehouses,
+            np.bincount(w_region[allowed], minlength=num_regions),
+            np.maximum(np.bincount(w_region[is_forced], minlength=num_regions), 1),
+        )
+    stats = kwargs.pop("stats", None) or Instrumentation(
+        trace_memory=kwargs.pop("trace_memory", False)
+    )
+    for hook in kwargs.pop("hooks", None) or []:
+        stats.add_hook(hook)
+    print(f"Solving {num_regions} regions...")
+
+    params = {"objective": objective, "backend": region_backend, "verbose": verbose}
+    params.update(kwargs)
+    params.setdefault("threads", 1)
+    params.setdefault("distance_cache", None)
+    tasks = []
+    for region in range(num_regions):
+        sub_warehouses = subset(warehouses_data, np.flatnonzero(w_region == region))
+        task_params = dict(params)
+        for key in ("force_open", "force_closed"):
+            if params.get(key):
+                task_params[key] = [w for w in params[key] if w in sub_warehouses]
+        if objective == "p-median":
+            task_params["num_warehouses"] = int(counts[region])
+        tasks.append(
+            {
+                "region": region,
+                "warehouses": sub_warehouses,
+                "customers": subset(customers_data, np.flatnonzero(c_region == region)),
+                "params": task_params,
+            }
+        )
+    with stats.phase("regions"):
+        if max_workers == 1:
+            rows = [_region_solve(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                rows = list(executor.map(_region_solve, tasks))
+
+    failed = [row for row in rows if not row["active_warehouses_id"]]
+    if failed:
+        raise Exception(
+            "No solution for regions "
+            + ", ".join(
+                f"{row['region']} ({row['error'] or row['status']})" for row in failed
+            )
+        )
+
+    # Local search on the union of the regional solutions
+    objective_function = kwargs.get("objective_function")
+    if objective == "p-median" and objective_function == "mindistance":
+        weight = demand / demand.sum()
+    else:
+        weight = demand * kwargs.get("unit_transport_cost", 0.1)
+    if kwargs.get("ignore_fixed_cost") or (
+        objective == "p-median" and objective_function != "mincost"
+    ):
+        fixed_cost = np.zeros(len(warehouses_data))
+    else:
+        fixed_cost = np.nan_to_num(warehouses_data.fixed_cost)
+    is_open = np.zeros(len(warehouses_data), dtype=bool)
+    is_open[
+        warehouses_data.positions(
+            [w for row in rows for w in row["active_warehouses_id"]]
+        )
+    ] = True
+    print("Repairing the solution across the region borders...")
+    with stats.phase("repair"):
+        open_positions, nearest, assigned_distance, objective_value, before, moves = (
+            interchange_repair(
+                warehouses_data.latitude,
+                warehouses_data.longitude,
+                customers_data.latitude,
+                customers_data.longitude,
+                weight,
+                is_open,
+                fixed_cost=fixed_cost,
+                fixed_number=objective == "p-median",
+                force_open=np.flatnonzero(is_forced),
+                force_closed=np.flatnonzero(~allowed),
+                num_neighbors=num_neighbors,
+                max_iterations=20 if repair else 0,
+            )
+        )
+    print(
+        f"==> Objective {objective_value:.2f} after {moves} moves "
+        f"(regional solutions: {before:.2f}) <=="
+    )
+
+    # The optimizer of the full instance only stores the distances of the assignments
+    w_ids = list(warehouses_data.keys())
+    c_ids = list(customers_data.keys())
+    optimizer = create_network_optimizer(
+        objective=objective,
+        warehouses=warehouses,
+        customers=customers,
+        distance=SparseDistanceMatrix(
+            indptr=np.arange(len(c_ids) + 1),
+            rows=nearest,
+            data=assigned_distance,
+            warehouses_index=warehouses_data.index,
+            customers_index=customers_data.index,
+        ),
+        stats=stats,
+        **kwargs,
+    )
+    optimizer.status = "Decomposition"
+    optimizer.objective_value = objective_value
+    solution = optimizer._load_solution(
+        [w_ids[n] for n in open_positions],
+        [(w_ids[w], c) for w, c in zip(nearest, c_ids)],
+    )
+    solution["decomposition"] = {
+        "regions": rows,
+        "objective_before_repair": before,
+        "repair_moves": moves,
+    }
+    return optimizer
+
+
+# Distance matrix and parameters shared by the solves of a sweep in each worker process
+_SWEEP_STATE = {}
+
+
+def parameter_grid(grid: dict | list) -> list[dict]:
+    """
+    Expand a parameter grid into the list of parameter combinations.
+
+    Args:
+        grid: Either a dict mapping each parameter to a list of values (all the combinations
+            are generated, the last parameter varying fastest) or a list of parameter dicts
+
+    Returns:
+        List of dicts, one per solve
+    """
+    if isinstance(grid, dict):
+        names = list(grid.keys())
+        values = [
+            v if isinstance(v, (list, tuple, range, np.ndarray)) else [v]
+            for v in grid.values()
+        ]
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    return [dict(params) for params in grid]
+
+
+def _memmap_path(data: np.ndarray) -> str | None:
+    """Return the file backing a memory mapped array (or one of its views), if any"""
+    while data is not None:
+        if isinstance(data, np.memmap) and data.filename:
+            return data.filename
+        data = data.base if isinstance(data, np.ndarray) else None
+    return None
+
+
+def _sweep_init(distance_path, warehouses_index, customers_index, params):
+    """Initialize a worker: open the shared distance matrix as a read-only memory map"""
+    _SWEEP_STATE["distance"] = DistanceMatrix(
+        np.load(distance_path, mmap_mode="r"), warehouses_index, customers_index
+    )
+    _SWEEP_STATE["params"] = params
+
+
+def _sweep_solve(point: dict) -> dict:
+    """Solve one point of the sweep and return a row of the results"""
+    params = {**_SWEEP_STATE["params"], **point}
+    verbose = params.pop("verbose", False)
+    row = dict(point)
+    start = time.perf_counter()
+    try:
+        quiet = contextlib.redirect_stdout(io.StringIO())
+        with contextlib.nullcontext() if verbose else quiet:
+            solution = solve_network_optimization(
+                distance=_SWEEP_STATE["distance"], plot=False, **params
+            )
+        error = None
+    except Exception as e:
+        solution, error = None, str(e)
+    row["solve_time"] = time.perf_counter() - start
+    solution = solution or {}
+    active = solution.get("active_warehouses_id", set())
+    row.update(
+        {
+            "status": solution.get("status", "Error" if error else "Infeasible"),
+            "objective_value": solution.get("objective_value"),
+            "avg_weighted_distance": solution.get("avg_weighted_distance"),
+            "most_distant_customer": solution.get("most_distant_customer"),
+            "num_active_warehouses": len(active),
+            "active_warehouses_id": sorted(active),
+            "error": error,
+        }
+    )
+    return row
+
+
+def sweep_network_optimization(
+    objective: str,
+    warehouses: dict,
+    customers: dict,
+    grid: dict | list,
+    distance: dict | DistanceMatrix | None = None,
+    max_workers: int | None = None,
+    distance_cache=None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Solve the model for every combination of a parameter grid, in parallel.
+
+    The distance matrix is computed (or read from the cache) once and shared by the worker
+    processes as a read-only memory map, so each solve only builds and solves its model.
+    CBC runs single-threaded in each worker unless threads is passed.
+
+    Args:
+        objective: The objective function type ('p-median', 'p-cover', 'UFLP', 'CFLP')
+        warehouses: Dictionary of warehouse objects
+        customers: Dictionary of customer objects
+        grid: Parameters to sweep, either a dict of lists (e.g. {"num_warehouses": range(1, 21)})
+            or a list of parameter dicts
+        distance: Distance matrix between warehouses and customers (dict or DistanceMatrix)
+        max_workers: Number of worker processes (None = number of CPUs, 1 = solve in this process)
+        distance_cache: On-disk cache used when the distance matrix must be computed:
+            True (default cache directory), a directory or a DistanceCache. None (default)
+            disables it, the workers then share a temporary copy of the matrix
+        **kwargs: Parameters common to all the solves, as in solve_network_optimization.
+            verbose=True shows the messages of each solve
+
+    Returns:
+        DataFrame with one row per point of the grid: the swept parameters, status,
+        objective_value, avg_weighted_distance, most_distant_customer,
+        num_active_warehouses, active_warehouses_id, solve_time and error
+    """
+    points = parameter_grid(grid)
+    if not points:
+        return pd.DataFrame()
+    kwargs.pop("plot", None)
+    kwargs.setdefault("threads", 1)
+    params = {"objective": objective, "warehouses": warehouses, "customers": customers}
+    params.update(kwargs)
+
+    if not distance:
+        print("Calculating distance matrix...")
+        distance = cached_dm(
+            warehouses,
+            customers,
+            dtype=kwargs.get("distance_dtype") or np.float64,
+            distance_cache=distance_cache,
+        )
+    elif not isinstance(distance, DistanceMatrix):
+        distance = DistanceMatrix.from_dict(
+            distance,
+            warehouses_id=list(warehouses.keys()),
+            customers_id=list(customers.keys()),
+            dtype=kwargs.get("distance_dtype") or np.float64,
+        )
+
+    print(f"Solving {len(points)} models...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Workers share the pages of a .npy file: the cached one or a temporary copy
+        distance_path = _memmap_path(distance.data)
+        if distance_path is None:
+            distance_path = os.path.join(tmp_dir, "distance.npy")
+            np.save(distance_path, distance.data)
+        init_args = (
+            distance_path,
+            distance.warehouses_index,
+            distance.customers_index,
+            params,
+        )
+
+        if max_workers == 1:
+            _sweep_init(*init_args)
+            rows = [_sweep_solve(point) for point in points]
+            _SWEEP_STATE.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_sweep_init, initargs=init_args
+            ) as executor:
+                rows = list(executor.map(_sweep_solve, points))
+
+    return pd.DataFrame.from_records(rows)
@@ -1,9 +1,32 @@
+import os
+import tempfile
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
 import pulp as pl
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from data_structures import calculate_dm
+import numpy as np
+
+from data_structures import (
+    calculate_dm,
+    get_values,
+    DistanceMatrix,
+    NetworkData,
+    SparseDistanceMatrix,
+)
+from mps_backend import ModelMatrix, SolutionValue, solve_matrix
+from solver_config import (
+    NOT_SET,
+    SolverConfig,
+    first_solution,
+    follow_log,
+    get_solver_config,
+)
+from heuristics import greedy_interchange
+from lagrangian import lagrangian_flp
+from instrumentation import Instrumentation, timed_phase
+from solution import Solution
 
 
 # Define color codes
@@ -31,7 +54,7 @@ class NetworkOptimizer(ABC):
         objective: str,
         warehouses: dict,
         customers: dict,
-        distance: dict | None = None,
+        distance: dict | DistanceMatrix | SparseDistanceMatrix | None = None,
         factories: dict | None = None,
         distance_ranges: list | None = None,
         force_open: list | None = None,
@@ -40,6 +63,15 @@ class NetworkOptimizer(ABC):
         force_uncapacitated: bool = False,
         force_allocations: list[tuple] | None = None,
         mutually_exclusive: list[tuple[int, int]] | None = None,
+        sparse: bool = False,
+        arcs: list[tuple] | None = None,
+        max_arcs_per_customer: int | None = None,
+        linking: str = "strong",
+        max_cut_rounds: int = 20,
+        solver_config: SolverConfig | dict | None = None,
+        stats: Instrumentation | None = None,
+        hooks: list | None = None,
+        trace_memory: bool = False,
         **kwargs,
     ):
         """Initialize the base network optimizer
@@ -47,7 +79,8 @@ class NetworkOptimizer(ABC):
         Args:
             warehouses: Dictionary of warehouse objects
             customers: Dictionary of customer objects
-            distance: Distance matrix between warehouses and customers
+            distance: Distance matrix between warehouses and customers, either a dict keyed by
+                (warehouse_id, customer_id), a DistanceMatrix or a SparseDistanceMatrix
             factories: Optional dictionary of factory objects
             distance_ranges: List of distances for calculating demand percentages
             force_open: List of warehouse IDs that must be open
@@ -56,7 +89,40 @@ class NetworkOptimizer(ABC):
             force_uncapacitated: Whether to ignore warehouse capacities
             force_allocations: List of (warehouse_id, customer_id) pairs forcing allocations
             mutually_exclusive: List of warehouse ID pairs that cannot be open simultaneously
+            sparse: Whether to create assignment variables and constraints only for the admissible
+                (warehouse, customer) arcs. Admissible arcs exclude closed warehouses, warehouses
+                beyond the maximum service distance and, if max_arcs_per_customer is set, all but
+                the closest warehouses of each customer
+            arcs: Optional list of (warehouse_id, customer_id) admissible arcs (implies sparse)
+            max_arcs_per_customer: Optional number of closest warehouses admissible for each
+                customer (implies sparse)
+            linking: Formulation of the constraints linking assignment and facility variables:
+                'strong' (Flow[w,c] <= Open[w] for each arc), 'weak' (sum_c Flow[w,c] <= |C| * Open[w]
+                for each warehouse) or 'lazy' (weak, plus the strong constraints violated by the
+                LP relaxation, added in a cut loop before solving)
+            max_cut_rounds: Maximum number of LP relaxations solved by the 'lazy' cut loop
+            solver_config: Solver parameters (threads, time limit, gaps, presolve, cuts,
+                heuristics, warm start), as a SolverConfig or a dict. The gapRel keyword,
+                if given, overrides the relative gap
+            stats: Instrumentation collecting the time and memory of each phase (distance
+                matrix, model building, solve, solution extraction and analysis) and the size
+                of the model, returned in the stats entry of the solution. A new one is created
+                if not given
+            hooks: Callables hook(name, metrics) called at the end of each phase, e.g. to push
+                the metrics into a monitoring system (see Instrumentation)
+            trace_memory: Whether to record the peak of the Python allocations of each phase
+                with tracemalloc (slower)
         """
+        if linking not in ("strong", "weak", "lazy"):
+            raise ValueError(
+                f"Unknown linking: {linking}. Must be 'strong', 'weak' or 'lazy'."
+            )
+        self.stats = (
+            stats if stats is not None else Instrumentation(trace_memory=trace_memory)
+        )
+        for hook in hooks or []:
+            self.stats.add_hook(hook)
+
         # Store input parameters
         self.objective = objective
         self.warehouses = warehouses
@@ -65,7 +131,8 @@ class NetworkOptimizer(ABC):
             self.distance = distance
         else:
             print("Calculating distance matrix...")
-            distance = calculate_dm(self.warehouses, self.customers)
+            with self.stats.phase("distance_matrix"):
+                self.distance = calculate_dm(self.warehouses, self.customers)
 
         self.factories = factories if factories else {}
         self.force_open = force_open if force_open else []
@@ -74,8 +141,22 @@ class NetworkOptimizer(ABC):
         self.force_uncapacitated = force_uncapacitated
         self.force_allocations = force_allocations if force_allocations else []
         self.mutually_exclusive = mutually_exclusive if mutually_exclusive else []
+        self.user_arcs = arcs
+        self.max_arcs_per_customer = max_arcs_per_customer
+        self.linking = linking
+        self.max_cut_rounds = max_cut_rounds
+        self.linking_cuts = []
+        self.sparse = (
+            sparse
+            or arcs is not None
+            or max_arcs_per_customer is not None
+            or isinstance(self.distance, SparseDistanceMatrix)
+        )
 
-        self.gapRel = kwargs.get("gapRel", 0.05)  # Default gap tolerance
+        self.solver_config = get_solver_config(
+            solver_config, gap_rel=kwargs.get("gapRel", NOT_SET)
+        )
+        self.gapRel = self.solver_config.gap_rel
         # Set up distance ranges
         if not distance_ranges:
             self.distance_ranges = [0, 99999]
@@ -93,15 +174,27 @@ class NetworkOptimizer(ABC):
 
         # Initialize variables for model
         self.model = None
+        self.arcs = None
+        self.customer_arcs = None
+        self.warehouse_arcs = None
         self.assignment_vars = None
         self.facility_status_vars = None
+        self.matrix = None
 
         # Initialize solution storage
+        self.status = None
+        self.objective_value = None
+        self.lower_bound = None
+        self.time_to_first_feasible = None
+        self.first_feasible_objective = None
+        self.first_feasible_times = {}
         self.active_warehouses = set()
         self.flows = set()
+        self.flow_arrays = None
         self.multi_sourced = {}
         self.solution = None
 
+    @timed_phase("build_model")
     def build_model(self, is_maximization: bool = False):
         """Build the base optimization model
 
@@ -112,6 +205,9 @@ class NetworkOptimizer(ABC):
         problem_type = pl.LpMaximize if is_maximization else pl.LpMinimize
         self.model = pl.LpProblem("NetworkOptimizationModel", problem_type)
 
+        # Compute the admissible (warehouse, customer) arcs
+        self._compute_arcs()
+
         # Create decision variables
         self._create_decision_vars()
 
@@ -123,15 +219,123 @@ class NetworkOptimizer(ABC):
         self._add_allocation_constraints()
 
         # Specific constraints for each model type and objective function
-        if self.objective == "CFLP" or (
-            self.objective in ("p-median", "p-cover") and not self.force_uncapacitated
-        ):
+        if self._is_capacitated():
             # print("Adding capacity constraints...")
             print("- Capacitated model.")
             self._add_capacity_constraints()
         else:
             print("- Uncapacitated model.")
 
+    def _is_capacitated(self) -> bool:
+        """Whether the model includes the warehouse capacity constraints"""
+        return self.objective == "CFLP" or (
+            self.objective in ("p-median", "p-cover") and not self.force_uncapacitated
+        )
+
+    def _arc_distance_limit(self) -> float | None:
+        """Maximum distance of an admissible arc, to be overridden by subclasses"""
+        return None
+
+    def _compute_arcs(self):
+        """Compute the (warehouse, customer) arcs for which assignment variables are created
+
+        In the dense formulation all the pairs are arcs. In the sparse formulation only
+        the admissible pairs are kept: arcs to closed warehouses, beyond the maximum service
+        distance or beyond the max_arcs_per_customer closest warehouses are discarded.
+        Forced allocations are always admissible.
+        """
+        if not self.sparse:
+            self.arcs = [(w, c) for w in self.warehouses_id for c in self.customers_id]
+        elif self.user_arcs is None and isinstance(self.distance, DistanceMatrix):
+            self.arcs = self._compute_dense_matrix_arcs()
+        else:
+            self.arcs = self._compute_generic_arcs()
+
+        if self.sparse:
+            arcs = set(self.arcs)
+            for w, c in self.force_allocations:
+                if (w, c) not in arcs and (w, c) in self.distance:
+                    self.arcs.append((w, c))
+                    arcs.add((w, c))
+            print(
+                f"- Sparse model: {len(self.arcs)} arcs out of "
+                f"{len(self.warehouses_id) * len(self.customers_id)} pairs."
+            )
+
+        self.customer_arcs = {c: [] for c in self.customers_id}
+        self.warehouse_arcs = {w: [] for w in self.warehouses_id}
+        for w, c in self.arcs:
+            self.customer_arcs[c].append(w)
+            self.warehouse_arcs[w].append(c)
+
+        unreachable = [c for c, ws in self.customer_arcs.items() if not ws]
+        if unreachable:
+            print(
+                f"{Colors.RED}WARNING: customers {unreachable} have no admissible warehouse, "
+                f"the model is infeasible{Colors.RESET}"
+            )
+
+    def _compute_dense_matrix_arcs(self) -> list[tuple]:
+        """Compute the admissible arcs with vectorized operations on a DistanceMatrix"""
+        dm = self.distance
+        closed = set(self.force_closed)
+        rows = np.array(
+            [w in self.warehouses_id and w not in closed for w in dm.warehouses_id]
+        )
+        cols = np.array([c in self.customers_id for c in dm.customers_id])
+
+        admissible = np.outer(rows, cols)
+        limit = self._arc_distance_limit()
+        if limit is not None:
+            admissible &= dm.data <= limit
+
+        k = self.max_arcs_per_customer
+        if k and k < admissible.sum(axis=0).max(initial=0):
+            masked = np.where(admissible, dm.data, np.inf)
+            nearest = np.argpartition(masked, k - 1, axis=0)[:k]
+            keep = np.zeros_like(admissible)
+            np.put_along_axis(keep, nearest, True, axis=0)
+            admissible &= keep
+
+        w_pos, c_pos = np.nonzero(admissible)
+        return list(
+            zip(dm.warehouses_id[w_pos].tolist(), dm.customers_id[c_pos].tolist())
+        )
+
+    def _compute_generic_arcs(self) -> list[tuple]:
+        """Compute the admissible arcs from the user arcs, the stored pairs of a sparse
+        distance matrix or all the pairs"""
+        if self.user_arcs is not None:
+            candidates = self.user_arcs
+        elif isinstance(self.distance, SparseDistanceMatrix):
+            candidates = self.distance.arcs()
+        else:
+            candidates = ((w, c) for w in self.warehouses_id for c in self.customers_id)
+
+        closed = set(self.force_closed)
+        limit = self._arc_distance_limit()
+        arcs = [
+            (w, c)
+            for w, c in candidates
+            if w in self.warehouses_id
+            and c in self.customers_id
+            and w not in closed
+            and (limit is None or self.distance[w, c] <= limit)
+        ]
+
+        k = self.max_arcs_per_customer
+        if k:
+            by_customer = {}
+            for w, c in arcs:
+                by_customer.setdefault(c, []).append(w)
+            arcs = [
+                (w, c)
+                for c, ws in by_customer.items()
+                for w in sorted(ws, key=lambda w: self.distance[w, c])[:k]
+            ]
+
+        return arcs
+
     def _create_decision_vars(self):
         """Create common decision variables for the model"""
         # Create facility status variables
@@ -148,7 +352,7 @@ class NetworkOptimizer(ABC):
             print("- Single sourcing model.")  # using integer variables for assignment
             self.assignment_vars = pl.LpVariable.dicts(
                 name="Flow",
-                indices=[(w, c) for w in self.warehouses_id for c in self.customers_id],
+                indices=self.arcs,
                 lowBound=0,
                 upBound=1,
                 cat=pl.LpInteger,
@@ -159,7 +363,7 @@ class NetworkOptimizer(ABC):
             )  # using continuous variables for assignment
             self.assignment_vars = pl.LpVariable.dicts(
                 name="Flow",
-                indices=[(w, c) for w in self.warehouses_id for c in self.customers_id],
+                indices=self.arcs,
                 lowBound=0.0,
                 upBound=1.0,
                 cat=pl.LpContinuous,
@@ -170,7 +374,7 @@ class NetworkOptimizer(ABC):
         Used in all optimization models"""
         for c in self.customers_id:
             self.model += pl.LpConstraint(
-                e=pl.lpSum([self.assignment_vars[w, c] for w in self.warehouses_id]),
+                e=pl.lpSum([self.assignment_vars[w, c] for w in self.customer_arcs[c]]),
                 sense=pl.LpConstraintEQ,
                 rhs=1,
                 name=f"Customer_{c}_served",
@@ -179,15 +383,67 @@ class NetworkOptimizer(ABC):
     def _add_logical_constraints(self):
         """Add logical constraints linking assignment and facility variables
         Used in all optimization models"""
+        self.linking_cuts = []
+        if self.linking == "strong":
+            for w, c in self.arcs:
+                self._add_strong_logical_constraint(w, c)
+            return
+
+        # Aggregated constraints, one per warehouse
         for w in self.warehouses_id:
-            for c in self.customers_id:
+            customers = self.warehouse_arcs[w]
+            if customers:
                 self.model += pl.LpConstraint(
-                    e=self.assignment_vars[w, c] - self.facility_status_vars[w],
+                    e=pl.lpSum([self.assignment_vars[w, c] for c in customers])
+                    - len(customers) * self.facility_status_vars[w],
                     sense=pl.LpConstraintLE,
                     rhs=0,
-                    name=f"Logical_constraint_between_customer_{c}_and_warehouse_{w}",
+                    name=f"Aggregated_logical_constraint_warehouse_{w}",
                 )
 
+    def _add_strong_logical_constraint(self, w, c):
+        """Add the logical constraint between customer c and warehouse w"""
+        self.model += pl.LpConstraint(
+            e=self.assignment_vars[w, c] - self.facility_status_vars[w],
+            sense=pl.LpConstraintLE,
+            rhs=0,
+            name=f"Logical_constraint_between_customer_{c}_and_warehouse_{w}",
+        )
+
+    def _add_lazy_logical_constraints(self, config: SolverConfig):
+        """Cut loop adding the strong logical constraints violated by the LP relaxation
+
+        The LP relaxation of the model is solved repeatedly; the strong constraints
+        Flow[w,c] <= Open[w] violated by its solution are added to the model, until
+        none is violated or max_cut_rounds relaxations are solved.
+
+        Args:
+            config: Solver configuration, the time limit applies to each LP relaxation
+        """
+        added = set()
+        rounds = 0
+        for rounds in range(1, self.max_cut_rounds + 1):
+            self.model.solve(
+                config.replace(warm_start=False).pulp_solver(msg=False, mip=False)
+            )
+            if pl.LpStatus[self.model.status] != "Optimal":
+                break
+            violated = [
+                (w, c)
+                for (w, c), var in self.assignment_vars.items()
+                if (w, c) not in added
+                and var.varValue > self.facility_status_vars[w].varValue + 1e-6
+            ]
+            if not violated:
+                break
+            for w, c in violated:
+                self._add_strong_logical_constraint(w, c)
+                added.add((w, c))
+                self.linking_cuts.append((w, c))
+        print(
+            f"- Lazy linking: {len(self.linking_cuts)} strong constraints added in {rounds} rounds."
+        )
+
     def _add_capacity_constraints(self):
         """Add capacity constraints for warehouses"""
         for w_id, w in self.warehouses.items():
@@ -196,7 +452,7 @@ class NetworkOptimizer(ABC):
                     e=pl.lpSum(
                         [
                             self.customers[c].demand * self.assignment_vars[w_id, c]
-                            for c in self.customers_id
+                            for c in self.warehouse_arcs[w_id]
                         ]
                     ),
                     sense=pl.LpConstraintLE,
@@ -251,153 +507,778 @@ class NetworkOptimizer(ABC):
         """Set the objective function for the model - must be implemented by subclasses"""
         pass
 
-    def solve(self, solver_log=False, time_limit=120):
+    def solve(self, solver_log=False, time_limit=None, warm_start=None):
         """Solve the optimization model
 
         Args:
             solver_log: Whether to display solver log
-            time_limit: Time limit for solving in seconds
+            time_limit: Time limit for solving in seconds, overrides the one of solver_config
+            warm_start: Starting solution passed to CBC. Either a previous solution dict
+                (active_warehouses_id and customers_assignment), a pair (open warehouse IDs,
+                assignments) where assignments are (warehouse_id, customer_id) pairs or a
+                {customer_id: warehouse_id} dict, or a bool to use (or not) the initial values
+                already set on the variables. None keeps the setting of solver_config
 
         Returns:
-            Solution dictionary or None if infeasible
+            Solution dictionary or None if infeasible. The time and the objective of the
+            first feasible solution found by CBC are stored in the time_to_first_feasible
+            and first_feasible_objective attributes
         """
+        config = self._get_solver_config(time_limit)
+        initial_values = None
+        if isinstance(warm_start, bool):
+            config = config.replace(warm_start=warm_start)
+        elif warm_start is not None:
+            config = config.replace(warm_start=True)
+            initial_values = self._warm_start_values(warm_start)
+        if self.linking == "lazy":
+            if config.warm_start and initial_values is None:
+                # The LP relaxations of the cut loop overwrite the initial values
+                initial_values = self._current_values()
+            with self.stats.phase("build_model"):
+                self._add_lazy_logical_constraints(config)
+        if initial_values is not None:
+            self._set_initial_values(*initial_values)
+        self._record_model_size()
+
+        # The log is written to a file to find the first solution, and shown while CBC runs
+        show_log = bool(solver_log or config.msg)
         print()
-        print("SOLVING (time limit = 120 seconds)...", end="")
-        _solver = pl.PULP_CBC_CMD(
-            keepFiles=False,
-            gapRel=self.gapRel,
-            timeLimit=time_limit,
-            msg=True,
-            options=[
-                "preprocess on",  # run CBC’s presolver
-                "secHeuristics on",  # enable secondary heuristics
-                "cuts on",  # turn on all cut generators
-                f"ratioGap {self.gapRel}",  # stop when gap <1%
-                "improveStart 1",  # invest more in finding good start solutions
-            ],
+        print(
+            f"SOLVING ({self._time_limit_message(config)})...",
+            end="\n" if show_log else "",
         )
-        self.model.solve(solver=_solver)
+        with self.stats.phase("solve"), tempfile.TemporaryDirectory() as tmp_dir:
+            log_path = os.path.join(tmp_dir, "cbc.log")
+            with follow_log(log_path, show=show_log):
+                self.model.solve(solver=config.pulp_solver(log_path=log_path))
+            log = ""
+            if os.path.exists(log_path):
+                with open(log_path) as f:
+                    log = f.read()
         print("OK")
+        self._report_first_solution(log, config.warm_start)
+
+        if not self._check_status(pl.LpStatus[self.model.status]):
+            return None
+
+        return self._collect_solution()
 
-        if pl.LpStatus[self.model.status] == "Optimal":
+    def _collect_solution(self, values: np.ndarray | None = None) -> dict:
+        """Extract and analyze the solution of the model and add the stats of the phases
+
+        Args:
+            values: Optional values of the assignment variables, in the order of
+                assignment_vars (see _extract_solution)
+
+        Returns:
+            Solution dictionary
+        """
+        self._extract_solution(values)
+        self._analyze_solution()
+        self.solution["stats"] = self.stats.to_dict()
+
+        return self.solution
+
+    def _record_model_size(self):
+        """Record the number of variables, constraints and nonzeros of the PuLP model"""
+        self.stats.record_model(
+            variables=self.model.numVariables(),
+            constraints=self.model.numConstraints(),
+            nonzeros=sum(len(c) for c in self.model.constraints.values()),
+        )
+
+    def _report_first_solution(self, log: str, warm_start: bool):
+        """Read the first feasible solution from the CBC log and print its time, compared
+        with the last solve of the other kind (cold or warm) if any"""
+        seconds, objective = first_solution(log)
+        self.time_to_first_feasible = seconds
+        self.first_feasible_objective = objective
+        if seconds is None:
+            print("- No feasible solution found.")
+            return
+        kind = "warm" if warm_start else "cold"
+        message = f"- First feasible solution ({kind} start): {objective:.6g} after {seconds:.2f} seconds"
+        other = self.first_feasible_times.get(not warm_start)
+        if other is not None:
+            message += (
+                f" ({'cold' if warm_start else 'warm'} start: {other:.2f} seconds)"
+            )
+        print(message)
+        self.first_feasible_times[warm_start] = seconds
+
+    def _warm_start_values(self, warm_start) -> tuple[set, dict]:
+        """Return the open warehouses and the assignment values of a starting solution
+
+        Args:
+            warm_start: A solution dict or a pair (open warehouse IDs, assignments), see solve
+
+        Returns:
+            Tuple (open warehouse IDs, {(warehouse_id, customer_id): assigned share})
+        """
+        if isinstance(warm_start, Mapping):
+            open_warehouses = set(warm_start["active_warehouses_id"])
+            flows = {}
+            for each in warm_start.get("customers_assignment", []):
+                c = each["Customer_id"]
+                demand = self.customers[c].demand
+                share = each.get("Flow", demand) / demand if demand else 1
+                flows[each["Warehouse_id"], c] = share
+        else:
+            open_warehouses, assignments = warm_start
+            open_warehouses = set(open_warehouses)
+            if isinstance(assignments, dict):
+                assignments = [(w, c) for c, w in assignments.items()]
+            flows = {arc: 1 for arc in assignments}
+
+        missing = [arc for arc in flows if arc not in self.assignment_vars]
+        if missing:
+            print(
+                f"{Colors.RED}WARNING: {len(missing)} assignments of the warm start are not "
+                f"in the model and are ignored{Colors.RESET}"
+            )
+        flows = {arc: v for arc, v in flows.items() if arc in self.assignment_vars}
+        if not flows:
+            flows = dict.fromkeys(self._nearest_assignments(open_warehouses), 1)
+        return open_warehouses, flows
+
+    def _nearest_assignments(self, open_warehouses) -> set:
+        """Assign the customers to the closest open warehouse, respecting the forced
+        allocations"""
+        flows = {(w, c) for w, c in self.force_allocations}
+        allocated = {c for _, c in flows}
+        for c, ws in self.customer_arcs.items():
+            candidates = [w for w in ws if w in open_warehouses]
+            if c not in allocated and candidates:
+                flows.add((min(candidates, key=lambda w: self.distance[w, c]), c))
+        return flows
+
+    def _current_values(self) -> tuple[set, dict]:
+        """Return the open warehouses and assignments currently set on the variables"""
+        open_warehouses = {
+            w for w, var in self.facility_status_vars.items() if var.varValue
+        }
+        flows = {
+            arc: var.varValue
+            for arc, var in self.assignment_vars.items()
+            if var.varValue
+        }
+        return open_warehouses, flows
+
+    def _set_initial_values(self, open_warehouses, flows):
+        """Set the initial values of the variables (used by the CBC warm start)
+
+        Args:
+            open_warehouses: IDs of the open warehouses
+            flows: (warehouse_id, customer_id) pairs of the assignments, or a dict mapping
+                them to the assigned share of the demand
+        """
+        open_warehouses = set(open_warehouses)
+        if not isinstance(flows, dict):
+            flows = dict.fromkeys(flows, 1)
+        for w, var in self.facility_status_vars.items():
+            var.setInitialValue(1 if w in open_warehouses else 0)
+        for arc, var in self.assignment_vars.items():
+            var.setInitialValue(flows.get(arc, 0))
+
+    def _load_solution(self, open_warehouses, flows) -> dict:
+        """Store a solution found without solving the model (e.g. by a heuristic) and analyze it
+
+        Args:
+            open_warehouses: IDs of the open warehouses
+            flows: (warehouse_id, customer_id) pairs of the assignments, or a dict mapping
+                them to the assigned share of the demand
+
+        Returns:
+            Solution dictionary
+        """
+        open_warehouses = set(open_warehouses)
+        if not isinstance(flows, dict):
+            flows = dict.fromkeys(flows, 1)
+        self.facility_status_vars = {
+            w: SolutionValue(1 if w in open_warehouses else 0)
+            for w in self.warehouses_id
+        }
+        if self.arcs is None:
+            # Without a model, the arcs are the assignments of the solution
+            self.arcs = list(flows)
+            self.customer_arcs = {c: [] for c in self.customers_id}
+            self.warehouse_arcs = {w: [] for w in self.warehouses_id}
+            for w, c in self.arcs:
+                self.customer_arcs[c].append(w)
+                self.warehouse_arcs[w].append(c)
+        self.assignment_vars = {
+            arc: SolutionValue(flows.get(arc, 0)) for arc in self.arcs
+        }
+
+        return self._collect_solution()
+
+    def _get_solver_config(self, time_limit=None) -> SolverConfig:
+        """Return the solver configuration, with the time limit overridden if given"""
+        if time_limit is None:
+            return self.solver_config
+        return self.solver_config.replace(time_limit=time_limit)
+
+    @staticmethod
+    def _time_limit_message(config: SolverConfig) -> str:
+        if config.time_limit is None:
+            return "no time limit"
+        return f"time limit = {config.time_limit} seconds"
+
+    def _check_status(self, status: str) -> bool:
+        """Print the optimization status, return False if the results can't be used"""
+        if status == "Optimal":
             print(
-                f"==> Optimization Status: {Colors.GREEN}{Colors.BOLD}{pl.LpStatus[self.model.status]} {Colors.RESET} ({self.gapRel} tolerance)<==",
+                f"==> Optimization Status: {Colors.GREEN}{Colors.BOLD}{status} {Colors.RESET} ({self.gapRel} tolerance)<==",
             )
-        elif pl.LpStatus[self.model.status] == "Infeasible":
+        elif status == "Infeasible":
             print(
                 f"{Colors.RED}{Colors.BOLD}********* ERROR: Model not feasible, don't use the results. ********* {Colors.RESET}"
             )
-            return None
-        elif pl.LpStatus[self.model.status] == "Not Solved":
+            return False
+        elif status == "Not Solved":
             print(
                 f"{Colors.RED}{Colors.BOLD}********* ERROR: Model not solved, time limit probably exceeded. ********* {Colors.RESET}"
             )
+            return False
+        return True
+
+    def update_model(self, force_open=None, force_closed=None, warm_start=True):
+        """Re-parameterize the built model in place, without rebuilding it
+
+        Only the bounds of the affected facility variables are changed. If the model was
+        already solved, the previous solution, adjusted to the new parameters, becomes
+        the starting point of the next solve (CBC warm start).
+
+        Args:
+            force_open: New list of warehouse IDs that must be open (None = unchanged)
+            force_closed: New list of warehouse IDs that must be closed (None = unchanged)
+            warm_start: Whether to warm start the next solve from the previous solution
+        """
+        self._require_model()
+        if force_open is not None or force_closed is not None:
+            self._update_force_bounds(
+                self.force_open if force_open is None else list(force_open),
+                self.force_closed if force_closed is None else list(force_closed),
+            )
+        if warm_start and self.active_warehouses:
+            self._warm_start_from_incumbent()
+
+    def _require_model(self):
+        if self.model is None:
+            raise Exception("The model must be built before it can be updated")
+
+    def _update_force_bounds(self, force_open: list, force_closed: list):
+        """Change the bounds of the warehouses whose forced status changed"""
+        if self.sparse:
+            # Arcs to closed warehouses are not in the sparse model
+            reopened = [
+                w
+                for w in set(self.force_closed) - set(force_closed)
+                if w in self.warehouse_arcs and not self.warehouse_arcs[w]
+            ]
+            if reopened:
+                raise Exception(
+                    f"Warehouses {reopened} have no arcs in the sparse model, "
+                    "build the model again to reopen them"
+                )
+        for w in set(self.force_open) - set(force_open):
+            if w in self.facility_status_vars:
+                self.facility_status_vars[w].lowBound = 0
+        for w in set(self.force_closed) - set(force_closed):
+            if w in self.facility_status_vars:
+                self.facility_status_vars[w].upBound = 1
+        self.force_open = force_open
+        self.force_closed = force_closed
+        self._add_warehouse_force_constraints()
+
+    def _warm_start_from_incumbent(self, num_open: int | None = None):
+        """Set the previous solution, adjusted to the current parameters, as initial values
+
+        Closed warehouses are removed from the previous solution and forced ones added.
+        If num_open is given, the warehouses serving the least demand are closed, or those
+        reducing the most the weighted distance are opened, until num_open are open.
+        Customers are then assigned to the closest open warehouse.
+
+        Args:
+            num_open: Number of warehouses to open (None = no limit)
+        """
+        closed = set(self.force_closed)
+        forced = set(self.force_open)
+        open_warehouses = (set(self.active_warehouses) - closed) | forced
+        demand = {c: self.customers[c].demand for c in self.customers_id}
+
+        if num_open is not None:
+            served = {w: 0 for w in open_warehouses}
+            for w, c in self.flows:
+                if w in served:
+                    served[w] += demand[c]
+            while len(open_warehouses) > num_open:
+                removable = open_warehouses - forced
+                if not removable:
+                    break
+                open_warehouses.remove(min(removable, key=lambda w: served[w]))
+
+            nearest = {
+                c: min(
+                    (self.distance[w, c] for w in ws if w in open_warehouses),
+                    default=np.inf,
+                )
+                for c, ws in self.customer_arcs.items()
+            }
+            while len(open_warehouses) < num_open:
+                candidates = [
+                    w
+                    for w in self.warehouses_id - open_warehouses - closed
+                    if not any(
+                        w in seq and open_warehouses.intersection(seq)
+                        for seq in self.mutually_exclusive
+                    )
+                ]
+                if not candidates:
+                    break
+                saving = {
+                    w: sum(
+                        demand[c] * max(0, nearest[c] - self.distance[w, c])
+                        for c in self.warehouse_arcs[w]
+                    )
+                    for w in candidates
+                }
+                best = max(candidates, key=lambda w: saving[w])
+                open_warehouses.add(best)
+                for c in self.warehouse_arcs[best]:
+                    nearest[c] = min(nearest[c], self.distance[best, c])
+
+        self._set_initial_values(
+            open_warehouses, self._nearest_assignments(open_warehouses)
+        )
+        self.solver_config = self.solver_config.replace(warm_start=True)
+
+    def _arcs_within(self, lower: float, upper: float) -> list[tuple]:
+        """Return the arcs of the model with lower < distance <= upper"""
+        dm = self.distance
+        if isinstance(dm, (DistanceMatrix, SparseDistanceMatrix)):
+            positions = np.flatnonzero((dm.data > lower) & (dm.data <= upper))
+            if isinstance(dm, DistanceMatrix):
+                w_pos, c_pos = np.unravel_index(positions, dm.data.shape)
+            else:
+                w_pos = dm.rows[positions]
+                c_pos = np.repeat(np.arange(len(dm.customers_index)), dm.counts())
+                c_pos = c_pos[positions]
+            pairs = zip(
+                dm.warehouses_id[w_pos].tolist(), dm.customers_id[c_pos].tolist()
+            )
+            return [arc for arc in pairs if arc in self.assignment_vars]
+        return [arc for arc in self.arcs if lower < dm[arc] <= upper]
+
+    def _update_num_warehouses(self, num_warehouses: int):
+        """Change the right hand side of the constraint opening exactly p warehouses"""
+        self.model.constraints["Num_of_active_warehouses"].changeRHS(num_warehouses)
+        self.num_warehouses = num_warehouses
+
+    @timed_phase("build_model")
+    def build_matrix(self, is_maximization: bool = False) -> ModelMatrix:
+        """Build the base optimization model as a ModelMatrix, without PuLP expressions
+
+        The columns are the facility status variables (one per warehouse, in the order of
+        self.matrix_warehouses) followed by the assignment variables (one per arc, in the
+        order of self.arcs). Subclasses add their specific rows and the objective.
+
+        Args:
+            is_maximization: Whether the objective is to be maximized
+
+        Returns:
+            The model matrix, also stored in self.matrix
+        """
+        self.model = None
+        w_index = self._compute_arc_arrays()
+        num_warehouses = len(self.matrix_warehouses)
+        num_arcs = len(self.arcs)
+
+        matrix = ModelMatrix(pl.LpMaximize if is_maximization else pl.LpMinimize)
+
+        # Facility status variables, with forced open/closed warehouses as bounds
+        lower = np.zeros(num_warehouses)
+        upper = np.ones(num_warehouses)
+        for w in self.force_open:
+            if w in w_index:
+                lower[w_index[w]] = 1
+            else:
+                print(f"Warehouse {w} does not exist")
+        for w in self.force_closed:
+            if w in w_index:
+                upper[w_index[w]] = 0
+            else:
+                print(f"Warehouse {w} does not exist")
+        matrix.add_columns(num_warehouses, lower=lower, upper=upper, integer=True)
+
+        # Assignment variables
+        if self.force_single_sourcing:
+            print("- Single sourcing model.")
+        else:
+            print("- Multi-sourcing model.")
+        self.flow_start = matrix.add_columns(
+            num_arcs, upper=1.0, integer=self.force_single_sourcing
+        )
+        flow_cols = self.flow_start + np.arange(num_arcs)
+        arc_index = {arc: n for n, arc in enumerate(self.arcs)}
+        forced = [
+            arc_index[each]
+            for each in map(tuple, self.force_allocations)
+            if each in arc_index
+        ]
+        matrix.set_bounds(self.flow_start + np.array(forced, dtype=np.int64), 1, 1)
+
+        # Each customer is fully served
+        start = matrix.add_rows(len(self.matrix_customers), pl.LpConstraintEQ, 1)
+        matrix.add_entries(start + self.arcs_customer, flow_cols)
+
+        # Logical constraints between assignment and facility variables
+        if self.linking == "strong":
+            self._add_matrix_strong_logical_constraints(matrix, np.arange(num_arcs))
+        else:
+            # Aggregated constraints, one per warehouse with arcs
+            count = np.bincount(self.arcs_warehouse, minlength=num_warehouses)
+            linked = np.flatnonzero(count)
+            rows = np.full(num_warehouses, -1)
+            rows[linked] = matrix.add_rows(
+                len(linked), pl.LpConstraintLE, 0
+            ) + np.arange(len(linked))
+            matrix.add_entries(rows[self.arcs_warehouse], flow_cols)
+            matrix.add_entries(rows[linked], linked, -count[linked])
+
+        # Mutually exclusive warehouses
+        for seq in self.mutually_exclusive:
+            start = matrix.add_rows(1, pl.LpConstraintLE, 1)
+            matrix.add_entries(np.full(len(seq), start), [w_index[w] for w in seq])
+
+        if self._is_capacitated():
+            print("- Capacitated model.")
+            capacity = np.array(
+                [
+                    getattr(self.warehouses[w], "capacity", None) or 0
+                    for w in self.matrix_warehouses
+                ],
+                dtype=float,
+            )
+            capacitated = np.flatnonzero(capacity)
+            rows = np.full(num_warehouses, -1)
+            rows[capacitated] = matrix.add_rows(
+                len(capacitated), pl.LpConstraintLE, capacity[capacitated]
+            ) + np.arange(len(capacitated))
+            selected = rows[self.arcs_warehouse] >= 0
+            matrix.add_entries(
+                rows[self.arcs_warehouse][selected],
+                flow_cols[selected],
+                self.arcs_demand[selected],
+            )
+        else:
+            print("- Uncapacitated model.")
+
+        self.matrix = matrix
+        return matrix
+
+    def _add_matrix_strong_logical_constraints(
+        self, matrix: ModelMatrix, arcs: np.ndarray
+    ):
+        """Add the constraints Flow[w,c] <= Open[w] for the arcs at the given positions"""
+        start = matrix.add_rows(len(arcs), pl.LpConstraintLE, 0)
+        rows = start + np.arange(len(arcs))
+        matrix.add_entries(rows, self.flow_start + arcs)
+        matrix.add_entries(rows, self.arcs_warehouse[arcs], -1)
+
+    def _add_matrix_lazy_logical_constraints(
+        self, matrix: ModelMatrix, config: SolverConfig
+    ):
+        """Cut loop adding to the matrix the strong logical constraints violated by the LP
+        relaxation (see _add_lazy_logical_constraints)"""
+        added = np.zeros(len(self.arcs), dtype=bool)
+        rounds = 0
+        for rounds in range(1, self.max_cut_rounds + 1):
+            status, values = solve_matrix(
+                matrix,
+                time_limit=config.time_limit,
+                options=config.cbc_options(parameters=True),
+                relax=True,
+            )
+            if values is None:
+                break
+            flows = values[self.flow_start : self.flow_start + len(self.arcs)]
+            violated = np.flatnonzero(
+                ~added & (flows > values[self.arcs_warehouse] + 1e-6)
+            )
+            if not len(violated):
+                break
+            self._add_matrix_strong_logical_constraints(matrix, violated)
+            added[violated] = True
+        self.linking_cuts = [self.arcs[n] for n in np.flatnonzero(added)]
+        print(
+            f"- Lazy linking: {len(self.linking_cuts)} strong constraints added in {rounds} rounds."
+        )
+
+    @timed_phase("build_model")
+    def _compute_arc_arrays(self) -> dict:
+        """Compute the arcs and describe them with arrays of positions, distances and demands
+
+        Warehouses and customers are numbered in the order of self.matrix_warehouses and
+        self.matrix_customers.
+
+        Returns:
+            The map from warehouse ID to position
+        """
+        self._compute_arcs()
+        self.matrix_warehouses = list(self.warehouses_id)
+        self.matrix_customers = list(self.customers_id)
+        w_index = {w: n for n, w in enumerate(self.matrix_warehouses)}
+        c_index = {c: n for n, c in enumerate(self.matrix_customers)}
+        num_arcs = len(self.arcs)
+
+        self.arcs_warehouse = np.fromiter(
+            (w_index[w] for w, _ in self.arcs), dtype=np.int64, count=num_arcs
+        )
+        self.arcs_customer = np.fromiter(
+            (c_index[c] for _, c in self.arcs), dtype=np.int64, count=num_arcs
+        )
+        self.arcs_distance = self._arcs_distance()
+        demand = get_values(self.customers, "demand", self.matrix_customers)
+        self.arcs_demand = demand[self.arcs_customer]
+        return w_index
+
+    def _arcs_distance(self, arcs: list | None = None) -> np.ndarray:
+        """Return the distance of each arc (default: self.arcs) as an array"""
+        arcs = self.arcs if arcs is None else arcs
+        if isinstance(self.distance, DistanceMatrix):
+            w_index = self.distance.warehouses_index
+            c_index = self.distance.customers_index
+            return self.distance.data[
+                [w_index[w] for w, _ in arcs], [c_index[c] for _, c in arcs]
+            ].astype(float)
+        return np.fromiter(
+            (self.distance[arc] for arc in arcs), dtype=float, count=len(arcs)
+        )
+
+    def _add_matrix_num_warehouses(self, matrix: ModelMatrix):
+        """Add the constraint opening exactly num_warehouses warehouses to the matrix"""
+        start = matrix.add_rows(1, pl.LpConstraintEQ, self.num_warehouses)
+        num_warehouses = len(self.matrix_warehouses)
+        matrix.add_entries(np.full(num_warehouses, start), np.arange(num_warehouses))
+
+    def _exclusive_matrix(self, w_index: dict) -> np.ndarray:
+        """Return the boolean matrix of the mutually exclusive warehouses (matrix order)"""
+        num_warehouses = len(w_index)
+        exclusive = np.zeros((num_warehouses, num_warehouses), dtype=bool)
+        for seq in self.mutually_exclusive:
+            positions = [w_index[w] for w in seq if w in w_index]
+            exclusive[np.ix_(positions, positions)] = True
+        np.fill_diagonal(exclusive, False)
+        return exclusive
+
+    def _total_demand(self) -> float:
+        """Return the total demand of the customers"""
+        return float(get_values(self.customers, "demand", self.customers_id).sum())
+
+    def _fixed_costs(self) -> np.ndarray:
+        """Return the fixed cost of the warehouses in the matrix order"""
+        return get_values(self.warehouses, "fixed_cost", self.matrix_warehouses)
+
+    def solve_mps(self, solver_log=False, time_limit=None):
+        """Build the model as a matrix, write it in MPS format and solve it with CBC
+
+        Alternative to build_model() and solve() for large models: the model is assembled
+        with NumPy arrays instead of PuLP expressions. The solution is mapped back into the
+        same structures (flows, active_warehouses, solution).
+
+        Args:
+            solver_log: Whether to display solver log
+            time_limit: Time limit for solving in seconds, overrides the one of solver_config
+
+        Returns:
+            Solution dictionary or None if infeasible
+        """
+        config = self._get_solver_config(time_limit)
+        matrix = self.build_matrix()
+        if self.linking == "lazy":
+            with self.stats.phase("build_model"):
+                self._add_matrix_lazy_logical_constraints(matrix, config)
+        print(
+            f"- Matrix model: {matrix.num_columns} variables, {matrix.num_rows} constraints, "
+            f"{matrix.num_nonzeros} nonzeros."
+        )
+        self.stats.record_model(
+            variables=matrix.num_columns,
+            constraints=matrix.num_rows,
+            nonzeros=matrix.num_nonzeros,
+        )
+        print()
+        print(f"SOLVING ({self._time_limit_message(config)})...", end="")
+        with self.stats.phase("solve"):
+            status, values = solve_matrix(
+                matrix,
+                time_limit=config.time_limit,
+                gap_rel=config.gap_rel,
+                msg=solver_log or config.msg,
+                options=config.cbc_options(parameters=True),
+            )
+        print("OK")
+
+        self.status = status
+        if not self._check_status(status) or values is None:
             return None
+        self.objective_value = matrix.objective_value(values)
 
-        # Extract solution
-        self._extract_solution()
-        self._analyze_solution()
+        num_warehouses = len(self.matrix_warehouses)
+        self.facility_status_vars = {
+            w: SolutionValue(values[n]) for n, w in enumerate(self.matrix_warehouses)
+        }
+        self.assignment_vars = {
+            arc: SolutionValue(values[num_warehouses + n])
+            for n, arc in enumerate(self.arcs)
+        }
 
-        return self.solution
+        return self._collect_solution(values[num_warehouses:])
 
-    def _extract_solution(self):
-        """Extract solution data from the solved model"""
-        self.flows = {
-            (w, c)
-            for w in self.warehouses_id
-            for c in self.customers_id
-            if self.assignment_vars[w, c].varValue > 0
+    def _solution_status(self) -> tuple[str, float]:
+        """Return the status and the objective value of the solved model"""
+        if self.model is None:
+            return self.status, self.objective_value
+        return pl.LpStatus[self.model.status], pl.value(self.model.objective)
+
+    def _flow_arrays(self, values: np.ndarray | None = None) -> dict:
+        """Read the values of the assignment variables in one pass and describe the flows
+        with arrays
+
+        Args:
+            values: Optional values of the assignment variables, in the order of
+                assignment_vars (e.g. the solution of the matrix model), used instead of
+                reading the variables
+
+        Returns:
+            Dict with the flows, i.e. the assignments with a positive value: arcs (list of
+            (warehouse_id, customer_id) pairs), share (assigned share of the customer demand)
+            and the positions of their warehouse and customer in self.warehouses and
+            self.customers (warehouse, customer)
+        """
+        arcs = list(self.assignment_vars)
+        if values is None:
+            values = np.fromiter(
+                (var.varValue or 0.0 for var in self.assignment_vars.values()),
+                dtype=float,
+                count=len(arcs),
+            )
+        used = np.flatnonzero(values > 0)
+        flow_arcs = [arcs[n] for n in used]
+        w_index, c_index = (
+            (
+                data.index
+                if isinstance(data, NetworkData)
+                else {each: n for n, each in enumerate(data)}
+            )
+            for data in (self.warehouses, self.customers)
+        )
+        return {
+            "arcs": flow_arcs,
+            "share": values[used],
+            "warehouse": np.fromiter(
+                (w_index[w] for w, _ in flow_arcs), dtype=np.int64, count=len(used)
+            ),
+            "customer": np.fromiter(
+                (c_index[c] for _, c in flow_arcs), dtype=np.int64, count=len(used)
+            ),
         }
 
+    def _solution_flows(self) -> dict:
+        """Return the flow arrays of the extracted solution, or read them from the variables
+        if the solution was not extracted"""
+        if self.flow_arrays is None:
+            return self._flow_arrays()
+        return self.flow_arrays
+
+    @timed_phase("extract_solution")
+    def _extract_solution(self, values: np.ndarray | None = None):
+        """Extract solution data from the solved model
+
+        Args:
+            values: Optional values of the assignment variables, in the order of
+                assignment_vars, used instead of reading the variables
+        """
+        self.flow_arrays = self._flow_arrays(values)
+        self.flows = set(self.flow_arrays["arcs"])
+
         self.active_warehouses = {
             w for w in self.warehouses_id if self.facility_status_vars[w].varValue == 1
         }
 
         # Identify multi-sourced customers
-        self.multi_sourced = {}
-        for c in self.customers_id:
-            suppliers = sum(
-                [
-                    1 if self.assignment_vars[w, c].varValue > 0 else 0
-                    for w in self.warehouses_id
-                ]
-            )
-            if suppliers > 1:
-                self.multi_sourced[c] = suppliers
+        suppliers = np.bincount(
+            self.flow_arrays["customer"], minlength=len(self.customers)
+        )
+        customers_id = list(self.customers)
+        self.multi_sourced = {
+            customers_id[n]: int(suppliers[n]) for n in np.flatnonzero(suppliers > 1)
+        }
 
+    @timed_phase("analyze_solution")
     def _analyze_solution(self):
-        """Analyze the solution and create results dictionary"""
-        customers_assignment = []
-        for w, c in self.flows:
-            cust = {
-                "Warehouse": str(self.warehouses[w].city),
-                "Warehouse_id": w,
-                "Customer": str(self.customers[c].city),
-                "Customer_id": c,
-                "Customer Demand": self.customers[c].demand,
-                "Distance": self.distance[w, c],
-                "Warehouse Latitude": self.warehouses[w].latitude,
-                "Warehouse Longitude": self.warehouses[w].longitude,
-                "Customers Latitude": self.customers[c].latitude,
-                "Customers Longitude": self.customers[c].longitude,
-                "Flow": self.assignment_vars[w, c].varValue * self.customers[c].demand,
+        """Analyze the solution and create the Solution with the results"""
+        status, objective_value = self._solution_status()
+        flows = self._solution_flows()
+        self.solution = Solution(
+            distance_ranges=self.distance_ranges,
+            status=status,
+            objective_value=objective_value,
+            active_warehouses_id=self.active_warehouses,
+            active_warehouses_name=[
+                self.warehouses[w].name for w in self.active_warehouses
+            ],
+            multi_sourced_customers=list(self.multi_sourced.keys()),
+        )
+        if not flows["arcs"]:
+            return
+
+        warehouses = NetworkData.from_dict(self.warehouses, kind="warehouse")
+        customers = NetworkData.from_dict(self.customers, kind="customer")
+        w, c = flows["warehouse"], flows["customer"]
+        demand = customers.demand[c]
+        distance = self._arcs_distance(flows["arcs"])
+
+        # Share of the demand of the flows in each distance range
+        ranges = self.distance_ranges
+        bands = pd.cut(distance, bins=ranges, labels=False, include_lowest=True)
+        within = ~np.isnan(bands)
+        by_band = np.bincount(
+            bands[within].astype(int),
+            weights=demand[within],
+            minlength=len(ranges) - 1,
+        )
+        total_demand = demand.sum()
+
+        customers_assignment = pd.DataFrame(
+            {
+                "Warehouse": warehouses.column("city")[w].astype(str),
+                "Warehouse_id": [each for each, _ in flows["arcs"]],
+                "Customer": customers.column("city")[c].astype(str),
+                "Customer_id": [each for _, each in flows["arcs"]],
+                "Customer Demand": demand,
+                "Distance": distance,
+                "Warehouse Latitude": warehouses.latitude[w],
+                "Warehouse Longitude": warehouses.longitude[w],
+                "Customers Latitude": customers.latitude[c],
+                "Customers Longitude": customers.longitude[c],
+                "Flow": flows["share"] * demand,
             }
-            customers_assignment.append(cust)
-
-        df_cu = pd.DataFrame.from_records(customers_assignment)
-
-        if not df_cu.empty:
-            df_cu = df_cu[["Warehouse", "Customer", "Distance", "Customer Demand"]]
-            labels = list(range(1, len(self.distance_ranges)))
-            df_cu["distance_range"] = pd.cut(
-                df_cu["Distance"],
-                bins=self.distance_ranges,
-                labels=labels,
-                include_lowest=True,
-            )
-
-            total_demand = sum(df_cu["Customer Demand"])
-            demand_perc_by_ranges = {}
-            for band in labels:
-                perc_of_demand_in_band = (
-                    sum(df_cu[df_cu["distance_range"] == band]["Customer Demand"])
-                    / total_demand
-                )
-                distance_range_lower_limit = self.distance_ranges[band - 1]
-                distance_range_upper_limit = self.distance_ranges[band]
-                demand_perc_by_ranges[
-                    (distance_range_lower_limit, distance_range_upper_limit)
-                ] = perc_of_demand_in_band
-
-            df_cu["Weighted_Distance"] = df_cu["Distance"] * df_cu["Customer Demand"]
-            avg_weighted_distance = (
-                df_cu["Weighted_Distance"].sum() / df_cu["Customer Demand"].sum()
-            )
-
-            self.solution = {
-                "status": pl.LpStatus[self.model.status],
-                "objective_value": pl.value(self.model.objective),
-                "avg_weighted_distance": avg_weighted_distance,
-                "active_warehouses_id": self.active_warehouses,
-                "active_warehouses_name": [
-                    self.warehouses[w].name for w in self.active_warehouses
-                ],
-                "most_distant_customer": df_cu["Distance"].max(),
-                "demand_perc_by_ranges": demand_perc_by_ranges,
-                "avg_customer_distance": df_cu["Distance"].mean(),
-                "multi_sourced_customers": list(self.multi_sourced.keys()),
+        )
+
+        self.solution.update(
+            {
+                "avg_weighted_distance": float(distance @ demand / total_demand),
+                "most_distant_customer": float(distance.max()),
+                "demand_perc_by_ranges": dict(
+                    zip(zip(ranges[:-1], ranges[1:]), by_band / total_demand)
+                ),
+                "avg_customer_distance": float(distance.mean()),
                 "customers_assignment": customers_assignment,
             }
-        else:
-            self.solution = {
-                "status": pl.LpStatus[self.model.status],
-                "objective_value": pl.value(self.model.objective),
-                "active_warehouses_id": self.active_warehouses,
-                "active_warehouses_name": [
-                    self.warehouses[w].name for w in self.active_warehouses
-                ],
-                "multi_sourced_customers": list(self.multi_sourced.keys()),
-            }
+        )
 
     def plot_solution(
         self, hide_inactive=False, hide_flows=False, plot_size=(8, 12), **kwargs
@@ -436,54 +1317,39 @@ class NetworkOptimizer(ABC):
             print("No solution available. Please solve the model first.")
             return
 
+        # Outflow and number of customers of each warehouse
+        flows = self._solution_flows()
+        demand = np.nan_to_num(get_values(self.customers, "demand"))
+        outflows = np.bincount(
+            flows["warehouse"],
+            weights=flows["share"] * demand[flows["customer"]],
+            minlength=len(self.warehouses),
+        )
+        num_customers = np.bincount(flows["warehouse"], minlength=len(self.warehouses))
+        w_index = {w: n for n, w in enumerate(self.warehouses)}
+
         # Print open warehouses
         print(
             f"Open warehouses: ({len(self.active_warehouses)} out of {len(self.warehouses)})"
         )
-        total_outflow = 0.0
         for w in self.active_warehouses:
-            try:
-                outflow = sum(
-                    [
-                        self.customers[c].demand * self.assignment_vars[w, c].varValue
-                        for c in self.customers_id
-                    ]
-                )
-            except TypeError:
-                outflow = 0
-
-            total_outflow += outflow
-
-            try:
-                assigned_customers = int(
-                    sum(
-                        [
-                            1 if self.assignment_vars[w, c].varValue > 0.0 else 0
-                            for c in self.customers_id
-                        ]
-                    )
-                )
-            except TypeError:
-                assigned_customers = 0
-
+            outflow = outflows[w_index[w]]
+            assigned_customers = int(num_customers[w_index[w]])
             print(
                 f"ID: {w:3} City: {self.warehouses[w].city:20} State: {self.warehouses[w].state:6} "
                 f"Num. customers: {assigned_customers:3}  Outflow: {outflow:11.0f} units"
             )
 
+        total_outflow = sum(outflows[w_index[w]] for w in self.active_warehouses)
         print(f"\nTotal outflow: {total_outflow:.0f} units")
 
         # Check capacity utilization
         print("\nWarehouse capacity utilization:")
         for w in self.active_warehouses:
-            if hasattr(self.warehouses[w], "capacity") and self.warehouses[w].capacity:
-                usage = sum(
-                    [
-                        self.customers[c].demand * self.assignment_vars[w, c].varValue
-                        for c in self.customers_id
-                    ]
-                )
-                utilization = (usage / self.warehouses[w].capacity) * 100
+            capacity = getattr(self.warehouses[w], "capacity", None)
+            if capacity and capacity == capacity:
+                usage = outflows[w_index[w]]
+                utilization = (usage / capacity) * 100
                 print(
                     f"Warehouse {w}: {round(utilization, 1)}% ({int(usage)}/{self.warehouses[w].capacity})"
                 )
@@ -530,7 +1396,7 @@ class PMedianOptimizer(NetworkOptimizer):
         num_warehouses: int,
         warehouses: dict,
         customers: dict,
-        distance: dict | None = None,
+        distance: dict | DistanceMatrix | None = None,
         force_uncapacitated: bool = False,
         force_single_sourcing: bool = True,
         unit_transport_cost: float = 0.1,
@@ -562,6 +1428,7 @@ class PMedianOptimizer(NetworkOptimizer):
         )
         self.ignore_fixed_cost = ignore_fixed_cost
 
+    @timed_phase("build_model")
     def build_model(self, is_maximization: bool = False):
         """Build the P-Median optimization model
 
@@ -582,6 +1449,183 @@ class PMedianOptimizer(NetworkOptimizer):
         # Set objective function
         self.set_objective()
 
+    def update_model(
+        self, num_warehouses=None, force_open=None, force_closed=None, warm_start=True
+    ):
+        """Re-parameterize the built model in place, without rebuilding it
+
+        Args:
+            num_warehouses: New number of warehouses to open (None = unchanged)
+            force_open: New list of warehouse IDs that must be open (None = unchanged)
+            force_closed: New list of warehouse IDs that must be closed (None = unchanged)
+            warm_start: Whether to warm start the next solve from the previous solution
+        """
+        self._require_model()
+        if num_warehouses is not None:
+            self._update_num_warehouses(num_warehouses)
+        super().update_model(force_open, force_closed, warm_start=False)
+        if warm_start and self.active_warehouses:
+            self._warm_start_from_incumbent(self.num_warehouses)
+
+    @timed_phase("build_model")
+    def build_matrix(self, is_maximization: bool = False) -> ModelMatrix:
+        """Build the P-Median optimization model as a ModelMatrix
+
+        Args:
+            is_maximization: Ignored as p-median is always minimization
+        """
+        matrix = super().build_matrix(is_maximization=False)
+        self._add_matrix_num_warehouses(matrix)
+
+        transport = self.arcs_demand * self.arcs_distance
+        if self.objective_function == "mindistance":
+            print("- Objective function: minimize distance")
+            total_demand = self._total_demand()
+            matrix.set_cost(
+                self.flow_start + np.arange(len(self.arcs)), transport / total_demand
+            )
+        elif self.objective_function == "mincost":
+            print("- Objective function: minimize total cost")
+            matrix.set_cost(
+                self.flow_start + np.arange(len(self.arcs)),
+                transport * self.unit_transport_cost,
+            )
+            if not self.ignore_fixed_cost:
+                print("- Include warehouses' fixed costs")
+                matrix.set_cost(
+                    np.arange(len(self.matrix_warehouses)), self._fixed_costs()
+                )
+            else:
+                print("- Ignore warehouses' fixed costs")
+        else:
+            raise ValueError(
+                f"Unknown objective function: {self.objective_function}. Must be 'mindistance' or 'mincost'."
+            )
+        return matrix
+
+    def solve_heuristic(
+        self,
+        max_iterations=100,
+        warm_start=False,
+        solver_log=False,
+        time_limit=None,
+    ):
+        """Solve the model with the greedy add + Teitz-Bart vertex substitution heuristic
+
+        The heuristic gives a good (not proven optimal) solution in a fraction of the time
+        needed by CBC. Forced open/closed warehouses, mutually exclusive warehouses and
+        forced allocations are honored; customers are assigned to the closest open
+        warehouse. Capacities are not enforced: capacitated models (warehouses with a
+        capacity and force_uncapacitated not set) can be solved only with warm_start, where
+        CBC repairs the heuristic solution.
+
+        Args:
+            max_iterations: Maximum number of interchange passes
+            warm_start: Whether to build the model and pass the heuristic solution to CBC as
+                a warm start
+            solver_log: Whether to display solver log (only with warm_start)
+            time_limit: Time limit for solving in seconds (only with warm_start)
+
+        Returns:
+            Solution dictionary or None if infeasible
+        """
+        if self.objective_function not in ("mindistance", "mincost"):
+            raise ValueError(
+                f"Unknown objective function: {self.objective_function}. Must be 'mindistance' or 'mincost'."
+            )
+        if self._is_capacitated() and not warm_start:
+            capacity = get_values(self.warehouses, "capacity")
+            if (np.isfinite(capacity) & (capacity > 0)).any():
+                raise ValueError(
+                    "The heuristic ignores the warehouse capacities: set "
+                    "force_uncapacitated=True, or use warm_start=True (or another "
+                    "backend) to solve the capacitated model"
+                )
+        print()
+        print("SOLVING (heuristic)...", end="")
+        self.model = None
+        w_index = self._compute_arc_arrays()
+        num_warehouses = len(self.matrix_warehouses)
+        num_customers = len(self.matrix_customers)
+        distance = np.full((num_warehouses, num_customers), np.inf)
+        distance[self.arcs_warehouse, self.arcs_customer] = self.arcs_distance
+
+        demand = get_values(self.customers, "demand", self.matrix_customers)
+        if self.objective_function == "mindistance":
+            weight = demand / demand.sum()
+        else:
+            weight = demand * self.unit_transport_cost
+        if self.objective_function == "mincost" and not self.ignore_fixed_cost:
+            fixed_cost = self._fixed_costs()
+        else:
+            fixed_cost = np.zeros(num_warehouses)
+
+        force_open = {w_index[w] for w in self.force_open if w in w_index}
+        force_closed = [w_index[w] for w in self.force_closed if w in w_index]
+        exclusive = self._exclusive_matrix(w_index)
+
+        # Customers with a forced allocation are served by their warehouse, which is opened
+        c_index = {c: n for n, c in enumerate(self.matrix_customers)}
+        allocated = np.full(num_customers, -1)
+        for w, c in self.force_allocations:
+            if w in w_index and c in c_index:
+                allocated[c_index[c]] = w_index[w]
+                force_open.add(w_index[w])
+        free = (allocated < 0) & (weight > 0)
+
+        try:
+            with self.stats.phase("solve"):
+                open_positions, _, iterations = greedy_interchange(
+                    distance[:, free],
+                    weight[free],
+                    self.num_warehouses,
+                    fixed_cost=fixed_cost,
+                    force_open=sorted(force_open),
+                    force_closed=force_closed,
+                    exclusive=exclusive,
+                    max_iterations=max_iterations,
+                )
+        except Exception as e:
+            print("FAILED")
+            print(
+                f"{Colors.RED}{Colors.BOLD}********* ERROR: {e} ********* {Colors.RESET}"
+            )
+            self.status = "Infeasible"
+            return None
+
+        # Assign each customer to the closest open warehouse
+        closest = open_positions[np.argmin(distance[open_positions], axis=0)]
+        assignment = np.where(allocated >= 0, allocated, closest)
+        assigned_distance = distance[assignment, np.arange(num_customers)]
+        print("OK")
+        if not np.isfinite(assigned_distance).all():
+            self.status = "Infeasible"
+            self._check_status(self.status)
+            return None
+
+        self.status = "Heuristic"
+        self.objective_value = float(
+            assigned_distance @ weight + fixed_cost[open_positions].sum()
+        )
+        print(
+            f"==> Heuristic solution: objective {self.objective_value:.2f} "
+            f"after {iterations} interchange passes <=="
+        )
+
+        open_warehouses = {self.matrix_warehouses[n] for n in open_positions}
+        flows = {
+            (self.matrix_warehouses[w], c)
+            for w, c in zip(assignment, self.matrix_customers)
+        }
+        if warm_start:
+            self.build_model()
+            self._set_initial_values(open_warehouses, flows)
+            return self.solve(
+                solver_log=solver_log, time_limit=time_limit, warm_start=True
+            )
+
+        return self._load_solution(open_warehouses, flows)
+
     def set_objective(self):
         """Set the P-Median objective function"""
         if self.objective_function == "mindistance":
@@ -592,8 +1636,7 @@ class PMedianOptimizer(NetworkOptimizer):
                     self.customers[c].demand
                     * self.distance[w, c]
                     * self.assignment_vars[w, c]
-                    for w in self.warehouses_id
-                    for c in self.customers_id
+                    for w, c in self.arcs
                 ]
             ) / pl.lpSum([self.customers[c].demand for c in self.customers_id])
         elif self.objective_function == "mincost":
@@ -605,8 +1648,7 @@ class PMedianOptimizer(NetworkOptimizer):
                     * self.distance[w, c]
                     * self.assignment_vars[w, c]
                     * self.unit_transport_cost
-                    for w in self.warehouses_id
-                    for c in self.customers_id
+                    for w, c in self.arcs
                 ]
             )
             if not self.ignore_fixed_cost:
@@ -664,7 +1706,7 @@ class PCoverOptimizer(NetworkOptimizer):
         num_warehouses: int,
         warehouses: dict,
         customers: dict,
-        distance: dict,
+        distance: dict | DistanceMatrix,
         high_service_distance: float,
         avg_service_distance: float = None,
         max_service_distance: float = None,
@@ -699,18 +1741,28 @@ class PCoverOptimizer(NetworkOptimizer):
         )
 
         # Calculate service distance parameters
-        self.high_service_dist_par = {
-            (w, c): 1 if self.distance[w, c] <= self.high_service_distance else 0
-            for w in self.warehouses_id
-            for c in self.customers_id
-        }
+        if isinstance(self.distance, (DistanceMatrix, SparseDistanceMatrix)):
+            # Vectorized computation, the parameters are stored as 0/1 matrices
+            self.high_service_dist_par = self.distance.mask(
+                self.distance.data <= self.high_service_distance
+            )
+            self.max_service_dist_par = self.distance.mask(
+                self.distance.data <= self.max_service_distance
+            )
+        else:
+            self.high_service_dist_par = {
+                (w, c): 1 if self.distance[w, c] <= self.high_service_distance else 0
+                for w in self.warehouses_id
+                for c in self.customers_id
+            }
 
-        self.max_service_dist_par = {
-            (w, c): 1 if self.distance[w, c] <= self.max_service_distance else 0
-            for w in self.warehouses_id
-            for c in self.customers_id
-        }
+            self.max_service_dist_par = {
+                (w, c): 1 if self.distance[w, c] <= self.max_service_distance else 0
+                for w in self.warehouses_id
+                for c in self.customers_id
+            }
 
+    @timed_phase("build_model")
     def build_model(self, is_maximization: bool = False):
         """Build the P-Cover optimization model
 
@@ -729,9 +1781,8 @@ class PCoverOptimizer(NetworkOptimizer):
         )
 
         # Add max service distance constraint
-        for w in self.warehouses_id:
-            for c in self.customers_id:
-                self.assignment_vars[w, c].upBound = self.max_service_dist_par[w, c]
+        for w, c in self.arcs:
+            self.assignment_vars[w, c].upBound = self.max_service_dist_par[w, c]
 
         # Add avg service distance constraint if specified
         if self.avg_service_distance:
@@ -741,8 +1792,7 @@ class PCoverOptimizer(NetworkOptimizer):
                         self.distance[w, c]
                         * self.customers[c].demand
                         * self.assignment_vars[w, c]
-                        for w in self.warehouses_id
-                        for c in self.customers_id
+                        for w, c in self.arcs
                     ]
                 )
                 / pl.lpSum([self.customers[c].demand for c in self.customers_id]),
@@ -754,6 +1804,99 @@ class PCoverOptimizer(NetworkOptimizer):
         # Set objective function
         self.set_objective()
 
+    def update_model(
+        self,
+        num_warehouses=None,
+        force_open=None,
+        force_closed=None,
+        high_service_distance=None,
+        warm_start=True,
+    ):
+        """Re-parameterize the built model in place, without rebuilding it
+
+        A new high service distance changes only the objective coefficients of the arcs
+        whose coverage changes, i.e. those between the old and the new distance.
+
+        Args:
+            num_warehouses: New number of warehouses to open (None = unchanged)
+            force_open: New list of warehouse IDs that must be open (None = unchanged)
+            force_closed: New list of warehouse IDs that must be closed (None = unchanged)
+            high_service_distance: New distance within which demand is considered covered
+            warm_start: Whether to warm start the next solve from the previous solution
+        """
+        self._require_model()
+        if num_warehouses is not None:
+            self._update_num_warehouses(num_warehouses)
+        if (
+            high_service_distance is not None
+            and high_service_distance != self.high_service_distance
+        ):
+            self._update_high_service_distance(high_service_distance)
+        super().update_model(force_open, force_closed, warm_start=False)
+        if warm_start and self.active_warehouses:
+            self._warm_start_from_incumbent(self.num_warehouses)
+
+    def _update_high_service_distance(self, high_service_distance: float):
+        """Change the coverage parameters and objective coefficients of the arcs between
+        the old and the new high service distance"""
+        covered = high_service_distance > self.high_service_distance
+        lower = min(self.high_service_distance, high_service_distance)
+        upper = max(self.high_service_distance, high_service_distance)
+        changed = self._arcs_within(lower, upper)
+        total_demand = self._total_demand()
+        if isinstance(self.distance, (DistanceMatrix, SparseDistanceMatrix)):
+            self.high_service_dist_par = self.distance.mask(
+                self.distance.data <= high_service_distance
+            )
+        else:
+            for arc in self.high_service_dist_par:
+                if lower < self.distance[arc] <= upper:
+                    self.high_service_dist_par[arc] = int(covered)
+        for w, c in changed:
+            self.model.objective[self.assignment_vars[w, c]] = (
+                self.customers[c].demand * covered / total_demand
+            )
+        self.high_service_distance = high_service_distance
+
+    @timed_phase("build_model")
+    def build_matrix(self, is_maximization: bool = False) -> ModelMatrix:
+        """Build the P-Cover optimization model as a ModelMatrix
+
+        Args:
+            is_maximization: Ignored as p-cover always uses maximization
+        """
+        matrix = super().build_matrix(is_maximization=True)
+        self._add_matrix_num_warehouses(matrix)
+        flow_cols = self.flow_start + np.arange(len(self.arcs))
+        total_demand = self._total_demand()
+
+        # Max service distance as upper bound of the assignment variables
+        matrix.set_bounds(
+            flow_cols,
+            upper=np.minimum(
+                matrix.upper[flow_cols],
+                self.arcs_distance <= self.max_service_distance,
+            ),
+        )
+
+        # Avg service distance constraint
+        if self.avg_service_distance:
+            start = matrix.add_rows(1, pl.LpConstraintLE, self.avg_service_distance)
+            matrix.add_entries(
+                np.full(len(self.arcs), start),
+                flow_cols,
+                self.arcs_distance * self.arcs_demand / total_demand,
+            )
+
+        # Maximize covered demand within high service distance
+        matrix.set_cost(
+            flow_cols,
+            self.arcs_demand
+            * (self.arcs_distance <= self.high_service_distance)
+            / total_demand,
+        )
+        return matrix
+
     def set_objective(self):
         """Set the P-Cover objective function"""
         # Maximize covered demand within high service distance
@@ -762,13 +1905,18 @@ class PCoverOptimizer(NetworkOptimizer):
                 self.customers[c].demand
                 * self.high_service_dist_par[w, c]
                 * self.assignment_vars[w, c]
-                for w in self.warehouses_id
-                for c in self.customers_id
+                for w, c in self.arcs
             ]
         ) / pl.lpSum([self.customers[c].demand for c in self.customers_id])
 
         self.model.setObjective(total_covered_demand_high_service)
 
+    def _arc_distance_limit(self) -> float | None:
+        """In the sparse model, arcs beyond the max service distance are not created"""
+        if self.max_service_distance < 99999:
+            return self.max_service_distance
+        return None
+
     def _get_plot_options(self):
         """Get options for plotting P-Cover model"""
         return {"radius": self.high_service_distance}
@@ -801,7 +1949,7 @@ class UncapacitatedFLPOptimizer(NetworkOptimizer):
         objective: str,
         warehouses: dict,
         customers: dict,
-        distance: dict,
+        distance: dict | DistanceMatrix,
         unit_transport_cost: float = 0.1,
         ignore_fixed_cost: bool = False,
         force_single_sourcing: bool = True,
@@ -830,6 +1978,7 @@ class UncapacitatedFLPOptimizer(NetworkOptimizer):
         self.unit_transport_cost = unit_transport_cost
         self.ignore_fixed_cost = ignore_fixed_cost
 
+    @timed_phase("build_model")
     def build_model(self, is_maximization: bool = False):
         """Build the Uncapacitated FLP optimization model
 
@@ -842,6 +1991,167 @@ class UncapacitatedFLPOptimizer(NetworkOptimizer):
         # Set objective function
         self.set_objective()
 
+    @timed_phase("build_model")
+    def build_matrix(self, is_maximization: bool = False) -> ModelMatrix:
+        """Build the FLP optimization model as a ModelMatrix
+
+        Args:
+            is_maximization: Ignored as FLP always uses minimization
+        """
+        matrix = super().build_matrix(is_maximization=False)
+        matrix.set_cost(
+            self.flow_start + np.arange(len(self.arcs)),
+            self.unit_transport_cost * self.arcs_demand * self.arcs_distance,
+        )
+        if not self.ignore_fixed_cost:
+            matrix.set_cost(np.arange(len(self.matrix_warehouses)), self._fixed_costs())
+        return matrix
+
+    def solve_lagrangian(
+        self,
+        max_iterations=300,
+        gap_tolerance=1e-3,
+        warm_start=False,
+        solver_log=False,
+        time_limit=None,
+    ):
+        """Solve the model with Lagrangian relaxation and subgradient optimization
+
+        The customer service constraints are relaxed and the subproblem is solved per
+        warehouse with NumPy sorting. Besides a feasible solution, built by a repair
+        heuristic, the method gives a lower bound on the optimal cost, stored in the
+        solution as lower_bound together with the gap.
+
+        Args:
+            max_iterations: Maximum number of subgradient iterations
+            gap_tolerance: Stop when the relative gap between the bounds is below this value
+            warm_start: Whether to build the model and pass the Lagrangian solution to CBC as
+                a warm start
+            solver_log: Whether to display solver log (only with warm_start)
+            time_limit: Time limit for solving in seconds (only with warm_start)
+
+        Returns:
+            Solution dictionary or None if no feasible solution is found
+        """
+        print()
+        print("SOLVING (Lagrangian relaxation)...", end="")
+        self.model = None
+        w_index = self._compute_arc_arrays()
+        c_index = {c: n for n, c in enumerate(self.matrix_customers)}
+        num_warehouses = len(self.matrix_warehouses)
+        num_customers = len(self.matrix_customers)
+        cost = np.full((num_warehouses, num_customers), np.inf)
+        cost[self.arcs_warehouse, self.arcs_customer] = (
+            self.unit_transport_cost * self.arcs_demand * self.arcs_distance
+        )
+        demand = get_values(self.customers, "demand", self.matrix_customers)
+        if self.ignore_fixed_cost:
+            fixed_cost = np.zeros(num_warehouses)
+        else:
+            fixed_cost = self._fixed_costs()
+        capacity = None
+        if self._is_capacitated():
+            # Warehouses without capacity can serve all the demand
+            capacity = np.array(
+                [
+                    getattr(self.warehouses[w], "capacity", None) or demand.sum()
+                    for w in self.matrix_warehouses
+                ],
+                dtype=float,
+            )
+
+        # Customers with a forced allocation are served by their warehouse, which is opened
+        force_open = {w_index[w] for w in self.force_open if w in w_index}
+        allocated = np.full(num_customers, -1)
+        for w, c in self.force_allocations:
+            if w in w_index and c in c_index:
+                allocated[c_index[c]] = w_index[w]
+                force_open.add(w_index[w])
+        fixed = np.flatnonzero(allocated >= 0)
+        free = np.flatnonzero(allocated < 0)
+        constant = cost[allocated[fixed], fixed].sum()
+        if capacity is not None:
+            np.subtract.at(capacity, allocated[fixed], demand[fixed])
+
+        try:
+            with self.stats.phase("solve"):
+                result = lagrangian_flp(
+                    cost[:, free],
+                    fixed_cost,
+                    demand=demand[free],
+                    capacity=capacity,
+                    force_open=sorted(force_open),
+                    force_closed=[
+                        w_index[w] for w in self.force_closed if w in w_index
+                    ],
+                    exclusive=self._exclusive_matrix(w_index),
+                    single_sourcing=self.force_single_sourcing,
+                    max_iterations=max_iterations,
+                    gap_tolerance=gap_tolerance,
+                )
+        except Exception as e:
+            print("FAILED")
+            print(
+                f"{Colors.RED}{Colors.BOLD}********* ERROR: {e} ********* {Colors.RESET}"
+            )
+            self.status = "Infeasible"
+            return None
+        print("OK")
+
+        self.lower_bound = result.lower_bound + constant
+        if result.open_positions is None:
+            print(
+                f"{Colors.RED}{Colors.BOLD}********* ERROR: No feasible solution found, "
+                f"lower bound {self.lower_bound:.2f} ********* {Colors.RESET}"
+            )
+            self.status = "Not Solved"
+            return None
+
+        self.status = "Heuristic"
+        self.objective_value = result.upper_bound + constant
+        gap = (self.objective_value - self.lower_bound) / max(
+            abs(self.objective_value), 1e-9
+        )
+        print(
+            f"==> Lagrangian solution: cost {self.objective_value:.2f}, lower bound "
+            f"{self.lower_bound:.2f} (gap {gap:.2%}) after {result.iterations} iterations <=="
+        )
+
+        open_warehouses = {self.matrix_warehouses[n] for n in result.open_positions}
+        open_warehouses |= {self.matrix_warehouses[n] for n in allocated[fixed]}
+        flow_w, flow_c, flow_x = result.flows
+        values = {
+            (self.matrix_warehouses[w], self.matrix_customers[free[c]]): x
+            for w, c, x in zip(flow_w, flow_c, flow_x)
+        }
+        for n in fixed:
+            values[self.matrix_warehouses[allocated[n]], self.matrix_customers[n]] = 1.0
+
+        if warm_start:
+            self.build_model()
+            self._set_initial_values(open_warehouses, [])
+            for arc, var in self.assignment_vars.items():
+                var.setInitialValue(values.get(arc, 0))
+            solution = self.solve(
+                solver_log=solver_log, time_limit=time_limit, warm_start=True
+            )
+            if solution:
+                solution["lower_bound"] = self.lower_bound
+            return solution
+
+        self.facility_status_vars = {
+            w: SolutionValue(1 if w in open_warehouses else 0)
+            for w in self.matrix_warehouses
+        }
+        self.assignment_vars = {
+            arc: SolutionValue(values.get(arc, 0)) for arc in self.arcs
+        }
+        self._collect_solution()
+        self.solution["lower_bound"] = self.lower_bound
+        self.solution["gap"] = gap
+
+        return self.solution
+
     def set_objective(self):
         """Set the Uncapacitated FLP objective function"""
         # Transportation cost
@@ -851,8 +2161,7 @@ class UncapacitatedFLPOptimizer(NetworkOptimizer):
                 * self.customers[c].demand
                 * self.distance[w, c]
                 * self.assignment_vars[w, c]
-                for w in self.warehouses_id
-                for c in self.customers_id
+                for w, c in self.arcs
             ]
         )
 
@@ -867,6 +2176,20 @@ class UncapacitatedFLPOptimizer(NetworkOptimizer):
 
         self.model.setObjective(total_cost)
 
+    def _cost_breakdown(self) -> tuple[float, float]:
+        """Return the transportation cost and the fixed cost of the open warehouses"""
+        flows = self._solution_flows()
+        demand = get_values(self.customers, "demand")[flows["customer"]]
+        transport_cost = self.unit_transport_cost * float(
+            (flows["share"] * demand) @ self._arcs_distance(flows["arcs"])
+        )
+        fixed_cost = float(
+            np.nansum(
+                get_values(self.warehouses, "fixed_cost", list(self.active_warehouses))
+            )
+        )
+        return transport_cost, fixed_cost
+
     def print_solution_details(self):
         """Print Uncapacitated FLP specific solution details"""
         if not self.solution:
@@ -877,26 +2200,10 @@ class UncapacitatedFLPOptimizer(NetworkOptimizer):
         print(f"Total cost: {round(self.solution['objective_value'], 0)}")
 
         # Calculate and print cost breakdown
-        transport_cost = sum(
-            [
-                self.unit_transport_cost
-                * self.customers[c].demand
-                * self.distance[w, c]
-                * self.assignment_vars[w, c].varValue
-                for w in self.warehouses_id
-                for c in self.customers_id
-            ]
-        )
+        transport_cost, fixed_cost = self._cost_breakdown()
         print(f"- Transportation cost: {round(transport_cost, 0)}")
 
         if not self.ignore_fixed_cost:
-            fixed_cost = sum(
-                [
-                    self.warehouses[w].fixed_cost
-                    * self.facility_status_vars[w].varValue
-                    for w in self.warehouses_id
-                ]
-            )
             print(f"- Yearly fixed cost: {round(fixed_cost, 0)}")
         else:
             print("Forced ignoring fixed cost")
@@ -917,7 +2224,7 @@ class CapacitatedFLPOptimizer(UncapacitatedFLPOptimizer):
         objective: str,
         warehouses: dict,
         customers: dict,
-        distance: dict,
+        distance: dict | DistanceMatrix,
         unit_transport_cost: float = 0.1,
         ignore_fixed_cost: bool = False,
         force_single_sourcing: bool = True,
@@ -956,26 +2263,10 @@ class CapacitatedFLPOptimizer(UncapacitatedFLPOptimizer):
         print(f"Total cost: {round(self.solution['objective_value'], 0)}")
 
         # Calculate and print cost breakdown
-        transport_cost = sum(
-            [
-                self.unit_transport_cost
-                * self.customers[c].demand
-                * self.distance[w, c]
-                * self.assignment_vars[w, c].varValue
-                for w in self.warehouses_id
-                for c in self.customers_id
-            ]
-        )
+        transport_cost, fixed_cost = self._cost_breakdown()
         print(f"- Transportation cost: {round(transport_cost, 0)}")
 
         if not self.ignore_fixed_cost:
-            fixed_cost = sum(
-                [
-                    self.warehouses[w].fixed_cost
-                    * self.facility_status_vars[w].varValue
-                    for w in self.warehouses_id
-                ]
-            )
             print(f"- Yearly fixed cost: {round(fixed_cost, 0)}")
         else:
             print("Forced ignoring fixed cost")
@@ -0,0 +1,313 @@
+import json
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+import pandas as pd
+
+# Columns of the assignments, i.e. of the records of solution["customers_assignment"]
+ASSIGNMENT_COLUMNS = (
+    "Warehouse",
+    "Warehouse_id",
+    "Customer",
+    "Customer_id",
+    "Customer Demand",
+    "Distance",
+    "Warehouse Latitude",
+    "Warehouse Longitude",
+    "Customers Latitude",
+    "Customers Longitude",
+    "Flow",
+)
+
+ASSIGNMENTS_KEY = "customers_assignment"
+
+# Key of the schema metadata of the Arrow tables and Parquet files holding the results
+METADATA_KEY = b"network_optimizer.solution"
+
+
+def _pyarrow():
+    """Import pyarrow, needed by the Arrow and Parquet exports"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception(
+            "Exporting solutions to Arrow or Parquet requires pyarrow (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def _encode(value):
+    """Convert the results to JSON types, keeping the sets, the tuples and the dicts with
+    non-string keys (e.g. demand_perc_by_ranges) as tagged objects"""
+    if isinstance(value, Mapping):
+        if all(isinstance(key, str) for key in value):
+            return {key: _encode(v) for key, v in value.items()}
+        return {"__items__": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": [_encode(v) for v in value]}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v) for v in value]}
+    if isinstance(value, (list, np.ndarray)):
+        return [_encode(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    """Inverse of _encode"""
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if set(value) == {"__items__"}:
+        return {_decode(k): _decode(v) for k, v in value["__items__"]}
+    if set(value) == {"__set__"}:
+        return {_decode(v) for v in value["__set__"]}
+    if set(value) == {"__tuple__"}:
+        return tuple(_decode(v) for v in value["__tuple__"])
+    return {key: _decode(v) for key, v in value.items()}
+
+
+class Solution(MutableMapping):
+    """Results of an optimization run, with the assignments stored as a DataFrame
+
+    The class behaves as the solution dict returned by the optimizers: the scalar results
+    (status, objective_value, active_warehouses_id, ...) are stored as they are, while
+    solution["customers_assignment"] returns the list of records of the assignments, built
+    from the DataFrame the first time it is accessed (setting it accepts both a list of
+    records and a DataFrame). The views derived from the assignments (load of the
+    warehouses, distance of the customers, histogram of the distances) are computed when
+    first used and kept until the assignments change.
+
+    The solution is exported to an Arrow table or a Parquet file with one row per
+    assignment, the other results being stored in the metadata of the schema, so that they
+    can be read back without loading the rows (see read_parquet).
+    """
+
+    def __init__(
+        self,
+        assignments: pd.DataFrame | list | None = None,
+        distance_ranges: list | None = None,
+        **results,
+    ):
+        """
+        :param assignments: assignments as a DataFrame with the ASSIGNMENT_COLUMNS or as a
+            list of records, None if the solution has no assignments
+        :param distance_ranges: bounds of the distance ranges of band_histogram
+        :param results: the other results of the run, e.g. status and objective_value
+        """
+        self.distance_ranges = list(distance_ranges) if distance_ranges else None
+        self._results = {}
+        self._assignments = None
+        self._views = {}
+        self.update(results)
+        if assignments is not None:
+            self[ASSIGNMENTS_KEY] = assignments
+
+    def _set_assignments(self, assignments):
+        if not isinstance(assignments, pd.DataFrame):
+            assignments = pd.DataFrame.from_records(
+                assignments, columns=None if len(assignments) else ASSIGNMENT_COLUMNS
+            )
+        if "Warehouse" in assignments and not isinstance(
+            assignments["Warehouse"].dtype, pd.CategoricalDtype
+        ):
+            # Few distinct values repeated on many rows
+            assignments = assignments.astype({"Warehouse": "category"})
+        self._assignments = assignments.reset_index(drop=True)
+        self._views = {}
+
+    def __getitem__(self, key):
+        if key != ASSIGNMENTS_KEY:
+            return self._results[key]
+        if self._assignments is None:
+            raise KeyError(key)
+        if "records" not in self._views:
+            self._views["records"] = self._assignments.to_dict("records")
+        return self._views["records"]
+
+    def __setitem__(self, key, value):
+        if key == ASSIGNMENTS_KEY:
+            self._set_assignments(value)
+        else:
+            self._results[key] = value
+
+    def __delitem__(self, key):
+        if key != ASSIGNMENTS_KEY:
+            del self._results[key]
+        elif self._assignments is None:
+            raise KeyError(key)
+        else:
+            self._assignments = None
+            self._views = {}
+
+    def __iter__(self):
+        yield from self._results
+        if self._assignments is not None:
+            yield ASSIGNMENTS_KEY
+
+    def __len__(self) -> int:
+        return len(self._results) + (self._assignments is not None)
+
+    def __repr__(self) -> str:
+        rows = 0 if self._assignments is None else len(self._assignments)
+        return (
+            f"Solution(status={self._results.get('status')!r}, "
+            f"objective_value={self._results.get('objective_value')!r}, "
+            f"{rows} assignments)"
+        )
+
+    def copy(self) -> "Solution":
+        """Shallow copy, sharing the assignments DataFrame"""
+        solution = Solution(distance_ranges=self.distance_ranges, **self._results)
+        solution._assignments = self._assignments
+        return solution
+
+    def to_dict(self) -> dict:
+        """Return the results as a plain dict, with the assignments as a list of records"""
+        return dict(self.items())
+
+    @property
+    def assignments(self) -> pd.DataFrame:
+        """Assignments with a positive flow, one row per (warehouse, customer) pair"""
+        if self._assignments is None:
+            return pd.DataFrame(columns=ASSIGNMENT_COLUMNS)
+        return self._assignments
+
+    def _view(self, name: str, compute):
+        if name not in self._views:
+            self._views[name] = compute(self.assignments)
+        return self._views[name]
+
+    @property
+    def warehouse_load(self) -> pd.DataFrame:
+        """Flow, number of customers and average distance (weighted by the flow) of each
+        warehouse with assignments, indexed by warehouse id"""
+
+        def compute(df):
+            grouped = df.assign(Weighted=df["Flow"] * df["Distance"]).groupby(
+                "Warehouse_id", sort=False, observed=True
+            )
+            load = grouped.agg(
+                Warehouse=("Warehouse", "first"),
+                Flow=("Flow", "sum"),
+                Customers=("Customer_id", "nunique"),
+                Weighted=("Weighted", "sum"),
+            )
+            load["Avg distance"] = load.pop("Weighted") / load["Flow"]
+            return load
+
+        return self._view("warehouse_load", compute)
+
+    @property
+    def customer_distance(self) -> pd.DataFrame:
+        """Distance of each customer from its warehouses (average weighted by the flow and
+        maximum) and number of warehouses serving it, indexed by customer id"""
+
+        def compute(df):
+            grouped = df.assign(Weighted=df["Flow"] * df["Distance"]).groupby(
+                "Customer_id", sort=False
+            )
+            distance = grouped.agg(
+                Customer=("Customer", "first"),
+                Demand=("Customer Demand", "first"),
+                Suppliers=("Warehouse_id", "size"),
+                Weighted=("Weighted", "sum"),
+                Flow=("Flow", "sum"),
+                Mean=("Distance", "mean"),
+                Max=("Distance", "max"),
+            )
+            # Customers without demand: plain average of the distances
+            weighted = distance.pop("Weighted") / distance.pop("Flow").where(
+                lambda flow: flow > 0
+            )
+            distance["Distance"] = weighted.fillna(distance.pop("Mean"))
+            distance["Max distance"] = distance.pop("Max")
+            return distance
+
+        return self._view("customer_distance", compute)
+
+    @property
+    def band_histogram(self) -> pd.Series:
+        """Share of the flow in each range of distance_ranges, indexed by the intervals"""
+
+        def compute(df):
+            ranges = self.distance_ranges or [0, np.inf]
+            bands = pd.cut(df["Distance"], bins=ranges, include_lowest=True)
+            flow = df["Flow"].groupby(bands, observed=False).sum()
+            total = flow.sum()
+            return flow / total if total else flow
+
+        return self._view("band_histogram", compute)
+
+    def to_arrow(self):
+        """Return the solution as an Arrow table (requires pyarrow)
+
+        The numeric columns of the assignments are passed to Arrow without conversion, the
+        names of the warehouses are dictionary encoded. The other results are stored as JSON
+        in the metadata of the schema.
+        """
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(self.assignments, preserve_index=False)
+        metadata = {
+            "results": _encode(self._results),
+            "distance_ranges": _encode(self.distance_ranges),
+            "assignments": self._assignments is not None,
+        }
+        return table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                METADATA_KEY: json.dumps(metadata, default=str).encode(),
+            }
+        )
+
+    @classmethod
+    def from_arrow(cls, table) -> "Solution":
+        """Build a solution from an Arrow table written by to_arrow"""
+        return cls._from_metadata(table.schema.metadata, table.to_pandas())
+
+    @classmethod
+    def _from_metadata(cls, metadata: dict | None, assignments=None) -> "Solution":
+        if not metadata or METADATA_KEY not in metadata:
+            raise ValueError("The table does not hold the results of a solution")
+        data = json.loads(metadata[METADATA_KEY])
+        return cls(
+            assignments=assignments if data["assignments"] else None,
+            distance_ranges=_decode(data["distance_ranges"]),
+            **_decode(data["results"]),
+        )
+
+    def to_parquet(self, path: str, **kwargs):
+        """Write the solution to a Parquet file (requires pyarrow)
+        :param path: path of the file
+        :param kwargs: options of pyarrow.parquet.write_table, e.g. compression
+        """
+        pa = _pyarrow()
+        pa.parquet.write_table(self.to_arrow(), path, **kwargs)
+
+    @classmethod
+    def read_parquet(cls, path: str, assignments: bool = True) -> "Solution":
+        """Read a solution written by to_parquet (requires pyarrow)
+        :param path: path of the file
+        :param assignments: whether to read the assignments; if False only the schema is
+            read, e.g. to collect the objective values of many runs
+        :return: the solution
+        """
+        pa = _pyarrow()
+        if assignments:
+            return cls.from_arrow(pa.parquet.read_table(path))
+        return cls._from_metadata(pa.parquet.read_schema(path).metadata)
+
+
+def assignments_frame(results) -> pd.DataFrame:
+    """Return the assignments of a solution as a DataFrame
+    :param results: a Solution, or a solution dict with the list of records of the
+        assignments
+    """
+    if isinstance(results, Solution):
+        return results.assignments
+    return pd.DataFrame.from_records(
+        results[ASSIGNMENTS_KEY], columns=list(ASSIGNMENT_COLUMNS)
+    )
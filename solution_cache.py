@@ -0,0 +1,244 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+from data_structures import DistanceMatrix, NetworkData, SparseDistanceMatrix
+from distance_cache import DEFAULT_MAX_SIZE_MB
+
+# Number of solutions kept in memory
+DEFAULT_MAX_ENTRIES = 32
+
+# Changed when the stored solutions are no longer compatible with the code
+CACHE_VERSION = 1
+
+# Parameters of solve_network_optimization that change how the results are shown or
+# recorded, not the solution
+PRESENTATION_PARAMS = frozenset(
+    {
+        "plot",
+        "hide_inactive",
+        "hide_flows",
+        "plot_size",
+        "solver_log",
+        "stats",
+        "hooks",
+        "trace_memory",
+        "distance_cache",
+        "solution_cache",
+        "force_resolve",
+    }
+)
+# Options of plot_map (e.g. warehouse_markercolor)
+PRESENTATION_SUFFIXES = ("_marker", "_markercolor", "_markersize")
+
+
+def _is_presentation(name: str) -> bool:
+    return name in PRESENTATION_PARAMS or name.endswith(PRESENTATION_SUFFIXES)
+
+
+def _update(h, value) -> None:
+    """Feed a canonical representation of a value to a hash: the same content gives the
+    same bytes whatever the identity of the objects and the order of the dict and set items
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        h.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, np.generic):
+        _update(h, value.item())
+    elif isinstance(value, np.ndarray):
+        h.update(f"array:{value.dtype.str}:{value.shape};".encode())
+        if value.dtype == object:
+            h.update(repr(value.tolist()).encode())
+        else:
+            h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, NetworkData):
+        h.update(f"data:{value.kind};".encode())
+        _update(h, value.ids)
+        for field in value.record._fields:
+            _update(h, value.column(field))
+    elif isinstance(value, (DistanceMatrix, SparseDistanceMatrix)):
+        h.update(f"{type(value).__name__};".encode())
+        for name in ("indptr", "rows", "data", "_warehouses_id", "_customers_id"):
+            if hasattr(value, name):
+                _update(h, getattr(value, name))
+    elif isinstance(value, Mapping):
+        h.update(f"mapping:{len(value)};".encode())
+        for key in sorted(value, key=repr):
+            _update(h, key)
+            _update(h, value[key])
+    elif isinstance(value, (set, frozenset)):
+        h.update(f"set:{len(value)};".encode())
+        for each in sorted(value, key=repr):
+            _update(h, each)
+    elif isinstance(value, (list, tuple, range)):
+        h.update(f"{type(value).__name__}:{len(value)};".encode())
+        for each in value:
+            _update(h, each)
+    elif hasattr(value, "__dict__"):
+        h.update(f"{type(value).__qualname__};".encode())
+        _update(h, vars(value))
+    else:
+        h.update(repr(value).encode())
+
+
+def solution_key(
+    objective: str,
+    warehouses: dict,
+    customers: dict,
+    distance=None,
+    **params,
+) -> str:
+    """Return the cache key of a run of solve_network_optimization
+    :param objective: 'p-median', 'p-cover', 'UFLP' or 'CFLP'
+    :param warehouses: dict of warehouses or NetworkData
+    :param customers: dict of customers or NetworkData
+    :param distance: distance matrix passed by the caller, if any
+    :param params: the other parameters of the run (force_* lists, num_warehouses, gap,
+        backend, ...); the ones in PRESENTATION_PARAMS and the plot options are ignored
+    :return: hex digest identifying the run
+    """
+    h = hashlib.sha256(f"solution|{CACHE_VERSION}|{objective}".encode())
+    _update(h, NetworkData.from_dict(warehouses, kind="warehouse"))
+    _update(h, NetworkData.from_dict(customers, kind="customer"))
+    _update(h, distance)
+    _update(h, {k: v for k, v in params.items() if not _is_presentation(k)})
+    return h.hexdigest()
+
+
+class SolutionCache:
+    """Cache of the solutions of solve_network_optimization
+
+    The solutions are stored pickled, so that each get returns a new copy that the caller
+    can modify. The most recently used max_entries solutions are kept in memory; if a
+    cache_dir is given they are also written there (one file per solution, the least
+    recently used files being removed beyond max_size_mb), so that they survive the process
+    and are shared with the other processes.
+    """
+
+    key = staticmethod(solution_key)
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        cache_dir: str | None = None,
+        max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+    ):
+        """
+        :param max_entries: number of solutions kept in memory
+        :param cache_dir: directory where the solutions are stored, None to keep them in
+            memory only
+        :param max_size_mb: maximum size of the directory in MB
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"solution_{key}.pkl")
+
+    def get(self, key: str):
+        """Return a copy of the cached solution, or None if not cached"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+        elif self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            # Mark the entry as recently used
+            os.utime(path)
+            self._remember(key, data)
+        else:
+            return None
+        return pickle.loads(data)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, solution) -> None:
+        """Store a solution in the cache"""
+        data = pickle.dumps(solution, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, data)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        # Atomic rename, other processes never see a partially written file
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self) -> list[tuple[str, int, float]]:
+        """Return the stored files as (path, size, last use), least recently used first"""
+        if not self.cache_dir:
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not (name.startswith("solution_") and name.endswith(".pkl")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda x: x[2])
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the directory fits max_size"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # Always keep the most recent entry, even if it is larger than max_size
+        for path, size, _ in entries[:-1]:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all the cached solutions, in memory and on disk"""
+        self._memory.clear()
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Caches shared by the runs of the process: the default one (memory only) and one per
+# directory, so that their memory tier is reused across the calls
+_CACHES = {}
+
+
+def get_solution_cache(solution_cache) -> SolutionCache | None:
+    """Return a SolutionCache from the value of a solution_cache parameter
+    :param solution_cache: None/False (no cache), True (cache of the process, in memory), a
+        directory (solutions also stored there) or a SolutionCache
+    """
+    if isinstance(solution_cache, SolutionCache):
+        return solution_cache
+    if not solution_cache:
+        return None
+    cache_dir = None if solution_cache is True else os.path.abspath(solution_cache)
+    if cache_dir not in _CACHES:
+        _CACHES[cache_dir] = SolutionCache(cache_dir=cache_dir)
+    return _CACHES[cache_dir]
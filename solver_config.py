@@ -0,0 +1,197 @@
+import re
+import threading
+from contextlib import contextmanager
+
+import pulp as pl
+
+DEFAULT_TIME_LIMIT = 120
+DEFAULT_GAP_REL = 0.05
+
+# Default of the parameters overriding the configuration: unlike None (e.g. no time
+# limit), it keeps the value of the configuration
+NOT_SET = object()
+
+
+class SolverConfig:
+    """Configuration of the CBC solver
+
+    Collects the parameters used to solve the models (threads, time limit, optimality gaps,
+    presolve, cuts, heuristics and warm start) and turns them into a PULP_CBC_CMD solver or
+    into the command line options of the CBC executable.
+    """
+
+    def __init__(
+        self,
+        threads: int | None = None,
+        time_limit: float | None = DEFAULT_TIME_LIMIT,
+        gap_rel: float | None = DEFAULT_GAP_REL,
+        gap_abs: float | None = None,
+        presolve: bool = True,
+        cuts: bool = True,
+        heuristics: bool = True,
+        warm_start: bool = False,
+        msg: bool = False,
+        options: list | None = None,
+    ):
+        """
+        :param threads: number of threads used by CBC (None = CBC default)
+        :param time_limit: time limit in seconds (None = no limit)
+        :param gap_rel: relative optimality gap at which the search stops
+        :param gap_abs: absolute optimality gap at which the search stops
+        :param presolve: whether to run the CBC presolve and MIP preprocessing
+        :param cuts: whether to turn on the cut generators
+        :param heuristics: whether to turn on the primal heuristics
+        :param warm_start: whether to pass the initial values of the variables to CBC
+        :param msg: whether to display the solver log
+        :param options: additional CBC options (e.g. ["maxNodes 1000"])
+        """
+        if threads is not None and threads < 1:
+            raise ValueError(f"threads must be a positive integer, got {threads}")
+        if time_limit is not None and time_limit <= 0:
+            raise ValueError(f"time_limit must be positive, got {time_limit}")
+        self.threads = threads
+        self.time_limit = time_limit
+        self.gap_rel = gap_rel
+        self.gap_abs = gap_abs
+        self.presolve = presolve
+        self.cuts = cuts
+        self.heuristics = heuristics
+        self.warm_start = warm_start
+        self.msg = msg
+        self.options = list(options) if options else []
+
+    def __repr__(self) -> str:
+        params = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"SolverConfig({params})"
+
+    def replace(self, **changes) -> "SolverConfig":
+        """Return a copy of the configuration with some parameters changed"""
+        params = vars(self).copy()
+        params.update(changes)
+        return SolverConfig(**params)
+
+    def cbc_options(self, parameters: bool = False) -> list[str]:
+        """Return the CBC command line options (without the leading dash)
+        :param parameters: if True include also threads and gaps, which PULP_CBC_CMD sets
+            from its own parameters
+        """
+        on_off = {True: "on", False: "off"}
+        options = [
+            f"presolve {on_off[self.presolve]}",
+            f"preprocess {on_off[self.presolve]}",
+            f"cuts {on_off[self.cuts]}",
+            f"heuristicsOnOff {on_off[self.heuristics]}",
+        ]
+        if parameters:
+            if self.threads is not None:
+                options.append(f"threads {self.threads}")
+            if self.gap_abs is not None:
+                options.append(f"allowableGap {self.gap_abs}")
+        return options + self.options
+
+    def pulp_solver(
+        self, msg: bool | None = None, mip: bool = True, log_path: str | None = None
+    ) -> pl.PULP_CBC_CMD:
+        """Return the PuLP solver with this configuration
+        :param msg: whether to display the solver log (default: self.msg)
+        :param mip: if False solve the LP relaxation
+        :param log_path: optional file where the solver log is written instead of displayed
+            (see follow_log to display it while it is written)
+        """
+        return pl.PULP_CBC_CMD(
+            mip=mip,
+            keepFiles=False,
+            msg=False if log_path else (self.msg if msg is None else msg),
+            timeLimit=self.time_limit,
+            gapRel=self.gap_rel,
+            gapAbs=self.gap_abs,
+            threads=self.threads,
+            warmStart=self.warm_start,
+            options=self.cbc_options(),
+            logPath=log_path,
+        )
+
+
+def get_solver_config(solver_config=None, **overrides) -> SolverConfig:
+    """Return a SolverConfig from the value of a solver_config parameter
+    :param solver_config: None (default configuration), a dict of parameters or a SolverConfig
+    :param overrides: parameters replacing those of solver_config, the NOT_SET ones are
+        ignored (None is a value, e.g. time_limit=None removes the time limit)
+    """
+    if solver_config is None:
+        config = SolverConfig()
+    elif isinstance(solver_config, SolverConfig):
+        config = solver_config
+    elif isinstance(solver_config, dict):
+        config = SolverConfig(**solver_config)
+    else:
+        raise ValueError(
+            f"solver_config must be a SolverConfig or a dict, got {type(solver_config).__name__}"
+        )
+    overrides = {k: v for k, v in overrides.items() if v is not NOT_SET}
+    return config.replace(**overrides) if overrides else config
+
+
+@contextmanager
+def follow_log(path: str, show: bool = True, interval: float = 0.1):
+    """Print the text appended to a log file while the block runs, e.g. the CBC log
+    redirected by pulp_solver(log_path=...)
+    :param path: file written by the solver
+    :param show: if False nothing is printed
+    :param interval: seconds between two reads of the file
+    """
+    if not show:
+        yield
+        return
+    done = threading.Event()
+
+    def follow():
+        position = 0
+        while True:
+            # Read once more after the block ends, to get the end of the log
+            finished = done.is_set()
+            try:
+                with open(path) as f:
+                    f.seek(position)
+                    text = f.read()
+                    position = f.tell()
+            except FileNotFoundError:
+                text = ""
+            if text:
+                print(text, end="", flush=True)
+            if finished:
+                return
+            done.wait(interval)
+
+    thread = threading.Thread(target=follow, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+# Lines of the CBC log reporting a feasible solution, and the elapsed time they may contain
+_CBC_SOLUTION = re.compile(
+    r"(?:Integer solution of|Solution found of|MIPStart provided solution with cost)\s+"
+    r"(-?[\d.eE+-]+)"
+)
+_CBC_TIME = re.compile(r"\(?(\d+(?:\.\d+)?) seconds\)?")
+
+
+def first_solution(log: str) -> tuple[float | None, float | None]:
+    """Return the time and the objective of the first feasible solution found by CBC
+    Lines without a time (e.g. the MIP start) take the last time reported before them.
+    :param log: text of the CBC log
+    :return: tuple (seconds, objective), (None, None) if no solution was found
+    """
+    elapsed = 0.0
+    for line in log.splitlines():
+        times = _CBC_TIME.findall(line)
+        if times:
+            elapsed = float(times[-1])
+        found = _CBC_SOLUTION.search(line)
+        if found:
+            return elapsed, float(found.group(1))
+    return None, None
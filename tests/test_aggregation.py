@@ -0,0 +1,260 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from aggregation import (
+    Aggregation,
+    aggregate_customers,
+    grid_cell_size,
+    grid_labels,
+    kmeans_labels,
+    pair_distances,
+)
+from data_structures import NetworkData, calculate_dm
+from network_factory import solve_network_optimization
+
+
+def clustered_customers(seed=0, per_group=30):
+    """Customers in three well separated groups"""
+    rng = np.random.default_rng(seed)
+    centers = [(45.0, 9.0), (41.0, 12.5), (38.0, 15.5)]
+    latitude = np.concatenate([rng.normal(lat, 0.1, per_group) for lat, _ in centers])
+    longitude = np.concatenate([rng.normal(lon, 0.1, per_group) for _, lon in centers])
+    return NetworkData(
+        "customer",
+        city=[f"City {n}" for n in range(len(latitude))],
+        latitude=latitude,
+        longitude=longitude,
+        demand=rng.integers(1, 100, len(latitude)).astype(float),
+    )
+
+
+class TestClustering:
+    """Tests for the grid and k-means clustering of the locations"""
+
+    def test_grid_labels(self):
+        """Locations in the same cell share the label"""
+        latitude = np.array([45.01, 45.02, 45.5, 40.0])
+        longitude = np.array([9.01, 9.02, 9.0, 9.0])
+        labels = grid_labels(latitude, longitude, cell_size=10)
+
+        assert labels[0] == labels[1]
+        assert len(set(labels)) == 3
+
+        labels = grid_labels(latitude, longitude, cell_size=1, use_haversine=False)
+        assert len(set(labels[:3])) == 1
+
+        with pytest.raises(ValueError):
+            grid_labels(latitude, longitude, cell_size=0)
+
+    def test_grid_cell_size(self):
+        """The cell size gives num_clusters non-empty cells on clustered locations"""
+        customers = clustered_customers()
+        for num_clusters in (6, 20):
+            aggregation = aggregate_customers(customers, num_clusters=num_clusters)
+            assert aggregation.num_clusters == num_clusters
+
+        # Fewer distinct locations than clusters: one cell per location
+        latitude = np.array([45.0, 45.0, 41.0])
+        longitude = np.array([9.0, 9.0, 12.5])
+        size = grid_cell_size(latitude, longitude, 5)
+        assert len(set(grid_labels(latitude, longitude, size))) == 2
+
+    def test_kmeans_labels(self):
+        """K-means recovers well separated groups, deterministically for a given seed"""
+        customers = clustered_customers()
+        labels = kmeans_labels(
+            customers.latitude, customers.longitude, customers.demand, 3
+        )
+
+        assert len(set(labels)) == 3
+        for group in range(3):
+            assert len(set(labels[group * 30 : (group + 1) * 30])) == 1
+        again = kmeans_labels(
+            customers.latitude, customers.longitude, customers.demand, 3
+        )
+        np.testing.assert_array_equal(labels, again)
+
+        # One cluster per location
+        labels = kmeans_labels(
+            customers.latitude, customers.longitude, customers.demand, 1000
+        )
+        assert len(set(labels)) == len(customers)
+
+
+class TestAggregation:
+    """Tests for the centroid customers and the disaggregation of the assignments"""
+
+    def test_centroids(self, small_test_customers):
+        """Clusters keep the total demand at the demand-weighted centroid"""
+        labels = np.array([0, 1, 2, 1, 2, 1, 0, 1])
+        aggregation = Aggregation(small_test_customers, labels, use_haversine=False)
+
+        assert aggregation.num_clusters == 3
+        assert aggregation.customers.demand.sum() == pytest.approx(1080)
+        assert aggregation.customers.demand[0] == pytest.approx(190)
+        assert aggregation.customers.latitude[0] == pytest.approx(
+            (39.9526 * 100 + 30.3322 * 90) / 190
+        )
+        # The member with the largest demand names the cluster
+        assert aggregation.customers[1].city == "Dallas"
+        assert aggregation.members(0) == [1, 7]
+
+        expected = sum(
+            c.demand * offset
+            for c, offset in zip(small_test_customers.values(), aggregation.offsets)
+        )
+        assert aggregation.error_bound() == pytest.approx(expected)
+        assert aggregation.error_bound(0.5) == pytest.approx(expected / 2)
+
+    def test_error_bound(self, small_test_warehouses, small_test_customers):
+        """The weighted distance of any assignment changes at most by the error bound"""
+        aggregation = aggregate_customers(
+            small_test_customers, method="grid", cell_size=800
+        )
+        assert aggregation.num_clusters < len(small_test_customers)
+
+        original = calculate_dm(small_test_warehouses, small_test_customers)
+        reduced = calculate_dm(small_test_warehouses, aggregation.customers)
+        for w in small_test_warehouses:
+            exact = sum(
+                c.demand * original[w, c_id] for c_id, c in small_test_customers.items()
+            )
+            approximate = sum(
+                aggregation.customers[k].demand * reduced[w, k]
+                for k in aggregation.customers
+            )
+            assert abs(exact - approximate) <= aggregation.error_bound() + 1e-6
+
+    def test_disaggregate(self, small_test_warehouses, small_test_customers):
+        """Customers inherit the shares of their cluster or go to the nearest open warehouse"""
+        labels = np.array([0, 1, 0, 1, 0, 1, 0, 1])
+        aggregation = Aggregation(small_test_customers, labels)
+
+        df = aggregation.disaggregate(
+            {(1, 0): 1.0, (3, 1): 0.25, (4, 1): 0.75}, small_test_warehouses
+        )
+        assert len(df) == 4 + 2 * 4
+        assert df.groupby("Customer_id")["Share"].sum().tolist() == [1.0] * 8
+        assert set(df[df["Customer_id"] == 2]["Warehouse_id"]) == {3, 4}
+        row = df[(df["Customer_id"] == 1)].iloc[0]
+        assert row["Warehouse_id"] == 1
+        assert row["Distance"] == pytest.approx(
+            calculate_dm(small_test_warehouses, small_test_customers)[1, 1]
+        )
+
+        df = aggregation.disaggregate(
+            {}, small_test_warehouses, open_warehouses=[1, 2, 4]
+        )
+        assigned = dict(zip(df["Customer_id"], df["Warehouse_id"]))
+        assert assigned == {1: 1, 2: 4, 3: 2, 4: 4, 5: 2, 6: 4, 7: 4, 8: 4}
+
+    def test_invalid(self, small_test_customers):
+        with pytest.raises(ValueError):
+            aggregate_customers(small_test_customers, method="hierarchical")
+        with pytest.raises(ValueError):
+            aggregate_customers(small_test_customers, method="kmeans")
+        with pytest.raises(ValueError):
+            aggregate_customers(small_test_customers, method="grid")
+
+    def test_pair_distances(self):
+        d = pair_distances(
+            np.array([45.0, 0.0]),
+            np.array([9.0, 0.0]),
+            np.array([45.0, 0.0]),
+            np.array([9.0, 1.0]),
+        )
+        assert d[0] == pytest.approx(0.0)
+        assert d[1] == pytest.approx(111.195, rel=1e-4)
+
+
+class TestAggregatedSolve:
+    """Tests for the aggregation stage of solve_network_optimization"""
+
+    def solve(self, warehouses, customers, **kwargs):
+        return solve_network_optimization(
+            "p-median",
+            warehouses,
+            customers,
+            objective_function="mindistance",
+            num_warehouses=2,
+            force_uncapacitated=True,
+            distance_cache=None,
+            **kwargs,
+        )
+
+    def test_bounds(self, small_test_warehouses, small_test_customers):
+        """The exact optimum lies between the lower bound and the disaggregated objective"""
+        exact = self.solve(small_test_warehouses, small_test_customers)
+        solution = self.solve(
+            small_test_warehouses,
+            small_test_customers,
+            aggregate={"method": "kmeans", "num_clusters": 4},
+        )
+
+        assert solution["aggregation"]["clusters"] == 4
+        assert solution["aggregation_error_bound"] > 0
+        assert (
+            solution["aggregation_lower_bound"] - 1e-6
+            <= exact["objective_value"]
+            <= solution["objective_value"] + 1e-6
+        )
+        assert solution["objective_value"] <= (
+            solution["aggregated_objective_value"]
+            + solution["aggregation_error_bound"]
+            + 1e-6
+        )
+        assignment = {
+            row["Customer_id"]: row["Warehouse_id"]
+            for row in solution["customers_assignment"]
+        }
+        assert set(assignment) == set(small_test_customers)
+        assert set(assignment.values()) <= solution["active_warehouses_id"]
+
+    def test_bounds_gap(self, small_test_warehouses, small_test_customers):
+        """The lower bound accounts for the optimality gap of the aggregated model"""
+        exact = self.solve(
+            small_test_warehouses, small_test_customers, solver_config={"gap_rel": 0}
+        )
+        solution = self.solve(
+            small_test_warehouses,
+            small_test_customers,
+            aggregate={"method": "kmeans", "num_clusters": 4},
+            solver_config={"gap_rel": 0.2, "gap_abs": 1},
+        )
+
+        assert solution["aggregation_lower_bound"] == pytest.approx(
+            solution["aggregated_objective_value"] * 0.8
+            - solution["aggregation_error_bound"]
+        )
+        assert solution["aggregation_lower_bound"] <= exact["objective_value"] + 1e-6
+
+    def test_no_aggregation(self, small_test_warehouses, small_test_customers):
+        """One cluster per customer gives the exact solution with a zero bound"""
+        exact = self.solve(small_test_warehouses, small_test_customers)
+        solution = self.solve(
+            small_test_warehouses,
+            small_test_customers,
+            aggregate={"method": "kmeans", "num_clusters": 8},
+        )
+
+        assert solution["aggregation_error_bound"] == pytest.approx(0, abs=1e-6)
+        assert solution["objective_value"] == pytest.approx(exact["objective_value"])
+        assert solution["active_warehouses_id"] == exact["active_warehouses_id"]
+
+    def test_invalid(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        with pytest.raises(ValueError):
+            self.solve(
+                small_test_warehouses,
+                small_test_customers,
+                distance=small_test_distance,
+                aggregate={"method": "grid", "cell_size": 500},
+            )
+        with pytest.raises(ValueError):
+            self.solve(small_test_warehouses, small_test_customers, aggregate="grid")
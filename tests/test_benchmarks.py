@@ -0,0 +1,136 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import (
+    compare_results,
+    generate_instance,
+    load_results,
+    results_table,
+    run_benchmark,
+    save_results,
+)
+
+
+class TestGenerator:
+    """Tests for the seeded instance generator"""
+
+    def test_seed(self):
+        """The same seed gives the same instance"""
+        first = generate_instance(20, 300, layout="clustered", seed=3)
+        second = generate_instance(20, 300, layout="clustered", seed=3)
+        other = generate_instance(20, 300, layout="clustered", seed=4)
+
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a.latitude, b.latitude)
+            np.testing.assert_array_equal(a.longitude, b.longitude)
+        np.testing.assert_array_equal(first[1].demand, second[1].demand)
+        assert not np.array_equal(first[1].latitude, other[1].latitude)
+
+    def test_instance(self):
+        warehouses, customers = generate_instance(
+            40, 500, capacity_tightness=0.8, fixed_cost="constant"
+        )
+
+        assert len(warehouses) == 40 and len(customers) == 500
+        assert (customers.demand >= 1).all()
+        assert customers.demand.sum() / warehouses.capacity.sum() == pytest.approx(
+            0.8, rel=0.01
+        )
+        assert np.unique(warehouses.fixed_cost).size == 1
+        assert (-124 <= customers.longitude).all() and (
+            customers.longitude <= -67
+        ).all()
+
+        warehouses, _ = generate_instance(10, 100, fixed_cost="none")
+        assert np.isnan(warehouses.capacity).all()
+        assert (warehouses.fixed_cost == 0).all()
+
+    def test_clustered(self):
+        """Clustered customers are closer to each other than uniform ones"""
+        _, uniform = generate_instance(10, 2000, layout="uniform")
+        _, clustered = generate_instance(10, 2000, layout="clustered")
+        assert np.std(clustered.latitude) < np.std(uniform.latitude)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            generate_instance(10, 100, layout="grid")
+        with pytest.raises(ValueError):
+            generate_instance(10, 100, fixed_cost="random")
+        with pytest.raises(ValueError):
+            generate_instance(10, 100, capacity_tightness=1.5)
+
+
+class TestRunner:
+    """Tests for the benchmark runs and their comparison"""
+
+    def test_run_benchmark(self, tmp_path):
+        results = run_benchmark(
+            sizes=[(5, 30)], layouts=["uniform"], time_limit=30, verbose=False
+        )
+
+        assert [r["model"] for r in results] == ["p-median", "p-cover", "UFLP", "CFLP"]
+        for result in results:
+            assert result["error"] is None
+            assert result["status"] == "Optimal"
+            assert set(result["phases"]) == {
+                "distance_matrix",
+                "build_model",
+                "solve",
+                "extract_solution",
+                "analyze_solution",
+            }
+            assert result["model_size"]["variables"] > 0
+
+        path = str(tmp_path / "run.json")
+        save_results(results, path)
+        save_results(results, str(tmp_path / "run.csv"))
+        loaded, environment = load_results(path)
+        assert loaded == results
+        assert {"commit", "python", "pulp"} <= set(environment)
+        table = results_table(results)
+        assert len(table) == 4
+        assert "solve_wall_time" in table and "model_variables" in table
+
+    def test_backend(self):
+        """Models without the backend are skipped"""
+        results = run_benchmark(
+            sizes=[(5, 30)], layouts=["clustered"], backend="heuristic", verbose=False
+        )
+        assert [r["model"] for r in results] == ["p-median"]
+        assert results[0]["status"] == "Heuristic"
+
+        with pytest.raises(ValueError):
+            run_benchmark(sizes="huge")
+
+    def test_compare_results(self):
+        def result(solve_time):
+            return {
+                "instance": "uniform-5x30-s0",
+                "model": "UFLP",
+                "backend": "pulp",
+                "error": None,
+                "wall_time": solve_time + 1,
+                "phases": {
+                    "build_model": {"wall_time": 1.0},
+                    "solve": {"wall_time": solve_time},
+                    "extract_solution": {"wall_time": 0.001},
+                },
+            }
+
+        table = compare_results(
+            [result(2.0), result(2.2)], [result(3.0), result(0.01)], threshold=1.2
+        ).set_index("phase")
+        assert table.loc["solve", "baseline"] == pytest.approx(2.1)
+        assert table.loc["solve", "current"] == pytest.approx(1.505)
+        assert not table.loc["solve", "regression"]
+
+        table = compare_results([result(2.0)], [result(3.0)]).set_index("phase")
+        assert table.loc["solve", "ratio"] == pytest.approx(1.5)
+        assert table.loc["solve", "regression"]
+        assert not table.loc["build_model", "regression"]
+        assert table.loc["total", "regression"]
@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_loaders import load_customers, load_data, load_warehouses
+from data_structures import NetworkData, Warehouse
+
+WAREHOUSES = pd.DataFrame(
+    {
+        "Identifier": ["Milan", "Rome", "Nowhere", "Naples", ""],
+        "Latitude": [45.46, 41.90, 95.0, 40.85, 44.0],
+        "Longitude": [9.19, 12.50, 10.0, 14.27, 11.0],
+        "Capacity": [1000, -1, 500, -5, 100],
+        "Fixed_cost": [100.0, None, 50.0, 10.0, 5.0],
+    }
+)
+
+
+class TestLoaders:
+    """Tests for the chunked CSV/Excel/Parquet loaders"""
+
+    def check_warehouses(self, warehouses, report):
+        assert isinstance(warehouses, NetworkData)
+        assert list(warehouses) == [0, 1]
+        assert warehouses[0] == Warehouse(
+            "Milan", "Milan", "", "", 45.46, 9.19, 1000.0, 100.0
+        )
+        # -1 means uncapacitated, a missing fixed cost is set to zero with a warning
+        assert warehouses[1].capacity is None
+        assert warehouses[1].fixed_cost == 0
+
+        assert report.rows_read == 5
+        assert report.rows_loaded == 2
+        assert not report.ok
+        assert report.errors["row"].tolist() == [2, 3, 4]
+        assert report.errors["column"].tolist() == [
+            "Latitude",
+            "Capacity",
+            "Identifier",
+        ]
+        assert report.warnings["row"].tolist() == [1]
+
+    def test_csv(self, tmp_path):
+        """Test a CSV file read in small chunks"""
+        path = tmp_path / "warehouses.csv"
+        WAREHOUSES.to_csv(path, sep=";", index=False)
+        warehouses, report = load_warehouses(str(path), chunk_size=2, sep=";")
+        self.check_warehouses(warehouses, report)
+
+    def test_excel(self, tmp_path):
+        """Test an Excel file read in streaming mode"""
+        path = tmp_path / "warehouses.xlsx"
+        WAREHOUSES.to_excel(path, index=False)
+        warehouses, report = load_warehouses(str(path), chunk_size=3)
+        self.check_warehouses(warehouses, report)
+
+    def test_parquet(self, tmp_path):
+        """Test a Parquet file read by record batches"""
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "warehouses.parquet"
+        WAREHOUSES.to_parquet(path, index=False)
+        warehouses, report = load_warehouses(str(path), chunk_size=2)
+        self.check_warehouses(warehouses, report)
+
+    def test_customers_from_dataframes(self):
+        """Test customers from an iterable of DataFrames, with an id column"""
+        chunks = [
+            pd.DataFrame(
+                {"code": [7], "name": ["A"], "lat": [45.0], "lon": [9.0], "qty": [10]}
+            ),
+            pd.DataFrame(
+                {"code": [9], "name": ["B"], "lat": [46.0], "lon": [9.5], "qty": [-3]}
+            ),
+        ]
+        customers, report = load_customers(
+            chunks, columns={"id": "code", "demand": "qty"}
+        )
+        assert list(customers) == [7]
+        assert customers.demand.tolist() == [10]
+        assert report.errors["message"].tolist() == ["demand must be non negative"]
+        assert report.summary()["rows"].tolist() == [1]
+
+    def test_errors(self, tmp_path):
+        """Test missing columns and errors='raise'"""
+        with pytest.raises(Exception, match="Missing columns"):
+            load_customers([WAREHOUSES])
+        with pytest.raises(Exception, match="Invalid warehouse data"):
+            load_warehouses([WAREHOUSES], errors="raise")
+        with pytest.raises(Exception, match="Unknown file format"):
+            load_data(str(tmp_path / "data.json"), "customer")
@@ -0,0 +1,464 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from haversine import haversine, Unit
+from data_structures import (
+    DistanceMatrix,
+    SparseDistanceMatrix,
+    SpatialIndex,
+    calculate_dm,
+    calculate_sparse_dm,
+    calculate_dm_array,
+    dist,
+    add_customer,
+    add_customer_from_data,
+    get_demand,
+    get_values,
+    NetworkData,
+    Registry,
+    scale_demands,
+    set_capacities,
+    set_demands,
+    set_fixed_costs,
+    Warehouse,
+    Customer,
+)
+
+
+class TestCalculateDm:
+    """Tests for the vectorized distance matrix computation"""
+
+    def test_haversine_matches_scalar_formula(
+        self, small_test_warehouses, small_test_customers
+    ):
+        """Test that the vectorized haversine matches the haversine package"""
+        dm = calculate_dm(small_test_warehouses, small_test_customers)
+
+        assert isinstance(dm, DistanceMatrix)
+        assert len(dm) == 40  # 5 warehouses * 8 customers
+        for (w, c), value in dm.items():
+            expected = haversine(
+                (small_test_warehouses[w].latitude, small_test_warehouses[w].longitude),
+                (small_test_customers[c].latitude, small_test_customers[c].longitude),
+                unit=Unit.KILOMETERS,
+            )
+            assert value == pytest.approx(expected, rel=1e-9)
+
+    def test_euclidean_matches_dist(self):
+        """Test that the vectorized euclidean distance matches dist()"""
+        warehouses = {
+            0: Warehouse("W0", "W0", "", "", 10.0, 20.0, None, 0.0),
+            1: Warehouse("W1", "W1", "", "", -5.0, 3.0, None, 0.0),
+        }
+        customers = {
+            7: Customer("C7", "C7", "", "", 0.0, 0.0, 10),
+            9: Customer("C9", "C9", "", "", 10.0, 25.0, 20),
+            3: Customer("C3", "C3", "", "", 1.0, -1.0, 30),
+        }
+        dm = calculate_dm(warehouses, customers, use_haversine=False)
+
+        for w in warehouses:
+            for c in customers:
+                assert dm[w, c] == pytest.approx(dist(warehouses[w], customers[c]))
+
+    def test_array_and_indexes(self, small_test_warehouses, small_test_customers):
+        """Test the dense array and the id to row/column index maps"""
+        data, w_index, c_index = calculate_dm_array(
+            small_test_warehouses, small_test_customers
+        )
+
+        assert data.shape == (5, 8)
+        assert w_index == {w: n for n, w in enumerate(small_test_warehouses)}
+        assert c_index == {c: n for n, c in enumerate(small_test_customers)}
+
+    def test_blocked_computation(
+        self, small_test_warehouses, small_test_customers, monkeypatch
+    ):
+        """Test that computing the matrix in blocks gives the same result"""
+        import data_structures
+
+        full = calculate_dm(small_test_warehouses, small_test_customers)
+        monkeypatch.setattr(data_structures, "DM_BLOCK_SIZE", 3)
+        blocked = calculate_dm(small_test_warehouses, small_test_customers)
+
+        np.testing.assert_allclose(full.data, blocked.data)
+
+    def test_missing_data(self, small_test_warehouses):
+        """Test error when warehouses or customers are missing"""
+        with pytest.raises(Exception, match="You must pass the location"):
+            calculate_dm(small_test_warehouses, {})
+
+
+class TestDistanceMatrix:
+    """Tests for the dict-compatible interface of DistanceMatrix"""
+
+    def test_dict_interface(self, small_test_distance):
+        """Test that DistanceMatrix behaves as the tuple-keyed dict"""
+        w_index = {w: n for n, w in enumerate(range(1, 6))}
+        c_index = {c: n for n, c in enumerate(range(1, 9))}
+        data = np.array(
+            [[small_test_distance[w, c] for c in c_index] for w in w_index],
+            dtype=float,
+        )
+        dm = DistanceMatrix(data, w_index, c_index)
+
+        assert dm == small_test_distance
+        assert set(dm.keys()) == set(small_test_distance.keys())
+        assert (1, 1) in dm
+        assert (9, 1) not in dm
+        assert isinstance(dm[2, 3], float)
+        with pytest.raises(KeyError):
+            dm[9, 1]
+
+    def test_shape_mismatch(self):
+        """Test error when data and indexes do not match"""
+        with pytest.raises(Exception, match="does not match"):
+            DistanceMatrix(np.zeros((2, 3)), {0: 0, 1: 1}, {0: 0, 1: 1})
+
+    def test_from_dict(self, small_test_distance):
+        """Test conversion of a tuple-keyed dict into a DistanceMatrix"""
+        dm = DistanceMatrix.from_dict(small_test_distance, dtype=np.float32)
+
+        assert dm.data.dtype == np.float32
+        assert dm.data.shape == (5, 8)
+        assert dm == small_test_distance
+        assert dm.nbytes == 5 * 8 * 4
+
+    def test_from_dict_missing_pairs(self, small_test_distance):
+        """Test error when the dict does not contain all the pairs"""
+        del small_test_distance[(2, 3)]
+        with pytest.raises(Exception, match="all the pairs"):
+            DistanceMatrix.from_dict(small_test_distance)
+
+    def test_row_and_column(self, small_test_distance):
+        """Test row and column slicing"""
+        dm = DistanceMatrix.from_dict(small_test_distance)
+
+        np.testing.assert_array_equal(
+            dm.row(2), [small_test_distance[2, c] for c in range(1, 9)]
+        )
+        np.testing.assert_array_equal(
+            dm.column(3), [small_test_distance[w, 3] for w in range(1, 6)]
+        )
+
+    def test_min_and_argmin(self, small_test_distance):
+        """Test the closest warehouse for each customer"""
+        dm = DistanceMatrix.from_dict(small_test_distance)
+
+        nearest = dm.argmin()
+        for n, c in enumerate(dm.customers_id):
+            best = min(range(1, 6), key=lambda w: small_test_distance[w, c])
+            assert nearest[n] == best
+            assert dm.min()[n] == small_test_distance[best, c]
+
+        # Restricted to a subset of warehouses
+        nearest = dm.argmin(warehouses_id=[1, 3])
+        assert set(nearest) <= {1, 3}
+        assert list(dm.min(warehouses_id=[1, 3])) == [
+            min(small_test_distance[1, c], small_test_distance[3, c])
+            for c in range(1, 9)
+        ]
+
+    def test_calculate_dm_float32(self, small_test_warehouses, small_test_customers):
+        """Test the float32 storage option"""
+        dm64 = calculate_dm(small_test_warehouses, small_test_customers)
+        dm32 = calculate_dm(
+            small_test_warehouses, small_test_customers, dtype=np.float32
+        )
+
+        assert dm32.data.dtype == np.float32
+        np.testing.assert_allclose(dm32.data, dm64.data, rtol=1e-6)
+
+
+@pytest.fixture
+def random_network():
+    """Random warehouses and customers over Europe"""
+    rng = np.random.default_rng(42)
+    warehouses = {
+        n: Warehouse(f"W{n}", "", "", "", lat, lon, None, 0.0)
+        for n, (lat, lon) in enumerate(
+            zip(rng.uniform(36, 60, 80), rng.uniform(-9, 30, 80))
+        )
+    }
+    customers = {
+        n: Customer(f"C{n}", "", "", "", lat, lon, 1)
+        for n, (lat, lon) in enumerate(
+            zip(rng.uniform(36, 60, 600), rng.uniform(-9, 30, 600))
+        )
+    }
+    return warehouses, customers
+
+
+class TestSparseDistanceMatrix:
+    """Tests for the k-nearest and radius-limited distance computation"""
+
+    @pytest.mark.parametrize("use_haversine", [True, False])
+    def test_k_nearest(self, random_network, use_haversine):
+        """Test that the k nearest warehouses are the same of the dense matrix"""
+        warehouses, customers = random_network
+        dense = calculate_dm(warehouses, customers, use_haversine=use_haversine)
+        sparse = calculate_sparse_dm(
+            warehouses, customers, k=4, use_haversine=use_haversine
+        )
+
+        assert isinstance(sparse, SparseDistanceMatrix)
+        assert len(sparse) == 4 * len(customers)
+        expected = np.sort(dense.data, axis=0)[:4]
+        for n, c in enumerate(customers):
+            w_ids, distances = sparse.customer_arcs(c)
+            np.testing.assert_allclose(np.sort(distances), expected[:, n])
+            for w, d in zip(w_ids, distances):
+                assert sparse[w, c] == pytest.approx(dense[w, c])
+
+        np.testing.assert_array_equal(sparse.argmin(), dense.argmin())
+
+    def test_radius(self, random_network):
+        """Test that all the pairs within radius are stored"""
+        warehouses, customers = random_network
+        dense = calculate_dm(warehouses, customers)
+        sparse = calculate_sparse_dm(warehouses, customers, radius=200)
+
+        assert set(sparse.keys()) == {
+            key for key, value in dense.items() if value <= 200
+        }
+        reached = sparse.counts() > 0
+        np.testing.assert_allclose(sparse.min()[reached], dense.min()[reached])
+        assert np.isinf(sparse.min()[~reached]).all()
+
+    def test_radius_out_of_reach(self):
+        """A customer farther than radius from every warehouse gets no arcs"""
+        rng = np.random.default_rng(0)
+        warehouses = {
+            n: Warehouse(f"W{n}", "", "", "", lat, lon, None, 0.0)
+            for n, (lat, lon) in enumerate(
+                zip(rng.uniform(44, 46, 20), rng.uniform(8, 10, 20))
+            )
+        }
+        customers = {
+            0: Customer("C0", "", "", "", 45.0, 9.0, 1),
+            1: Customer("C1", "", "", "", -30.0, 150.0, 1),
+        }
+        sparse = calculate_sparse_dm(warehouses, customers, radius=100)
+
+        assert sparse.counts()[1] == 0
+        assert sparse.counts()[0] > 0
+        assert np.isinf(sparse.min()[1])
+
+        far_only = calculate_sparse_dm(warehouses, {1: customers[1]}, radius=100)
+        assert len(far_only) == 0
+
+    def test_k_nearest_within_radius(self, random_network):
+        """Test the combination of k and radius"""
+        warehouses, customers = random_network
+        sparse = calculate_sparse_dm(warehouses, customers, k=3, radius=150)
+
+        assert (sparse.counts() <= 3).all()
+        assert (sparse.data <= 150).all()
+
+    def test_dict_interface(self, random_network):
+        """Test the dict-like access to the stored pairs"""
+        warehouses, customers = random_network
+        sparse = calculate_sparse_dm(warehouses, customers, k=2)
+        w_ids, _ = sparse.customer_arcs(0)
+        missing = next(w for w in warehouses if w not in w_ids)
+
+        assert (w_ids[0], 0) in sparse
+        assert (missing, 0) not in sparse
+        with pytest.raises(KeyError):
+            sparse[missing, 0]
+
+        dense = sparse.to_dense()
+        assert dense[w_ids[0], 0] == sparse[w_ids[0], 0]
+        assert np.isinf(dense[missing, 0])
+
+    def test_reuse_index(self, random_network):
+        """Test that a spatial index can be reused across calls"""
+        warehouses, customers = random_network
+        index = SpatialIndex(warehouses)
+
+        first = calculate_sparse_dm(warehouses, customers, k=3, index=index)
+        second = calculate_sparse_dm(warehouses, customers, k=3)
+        assert first == second
+
+        with pytest.raises(Exception, match="different distance metric"):
+            calculate_sparse_dm(
+                warehouses, customers, k=3, index=index, use_haversine=False
+            )
+
+    def test_missing_parameters(self, random_network):
+        """Test error when neither k nor radius is given"""
+        warehouses, customers = random_network
+        with pytest.raises(Exception, match="k and/or radius"):
+            calculate_sparse_dm(warehouses, customers)
+
+
+class TestNetworkData:
+    """Tests for the columnar NetworkData container"""
+
+    def test_from_dict(self, small_test_warehouses, small_test_customers):
+        """Test the columns and the dict interface"""
+        customers = NetworkData.from_dict(small_test_customers)
+        assert customers.kind == "customer"
+        assert list(customers) == list(small_test_customers)
+        assert customers.demand.tolist() == [
+            c.demand for c in small_test_customers.values()
+        ]
+        assert customers[3].city == "San Diego"
+        assert isinstance(customers[3], Customer)
+        assert 9 not in customers
+
+        warehouses = NetworkData.from_dict(small_test_warehouses, kind="warehouse")
+        assert warehouses[1].capacity is None
+        assert np.isnan(warehouses.capacity).all()
+        assert warehouses.column("fixed_cost", [2, 1]).tolist() == [1000, 1000]
+        with pytest.raises(ValueError, match="no field"):
+            warehouses.column("demand")
+
+    def test_roundtrip(self):
+        """Test the conversion from and to a dict of namedtuples"""
+        data = {
+            "a": Warehouse("A", "Milan", "", "", 45.46, 9.19, None, 100.0),
+            "b": Warehouse("B", "Rome", "", "", 41.90, 12.50, 500.0, 200.0),
+        }
+        warehouses = NetworkData.from_dict(data)
+        assert warehouses.kind == "warehouse"
+        assert warehouses.to_dict() == data
+        assert NetworkData.from_dataframe(warehouses.to_dataframe(), "warehouse") == (
+            warehouses
+        )
+
+    def test_mutable(self):
+        """Test setting, adding and removing entries"""
+        customers = NetworkData(
+            "customer",
+            ids=[10, 20],
+            latitude=[45, 46],
+            longitude=[9, 10],
+            demand=[1, 2],
+        )
+        customers[20] = customers[20]._replace(demand=5)
+        customers[30] = Customer("C", "", "", "", 47.0, 11.0, 7.0)
+        assert customers.demand.tolist() == [1, 5, 7]
+        assert get_demand(customers) == 13
+
+        del customers[10]
+        assert list(customers) == [20, 30]
+        assert customers.index == {20: 0, 30: 1}
+        assert customers.latitude.tolist() == [46, 47]
+
+        with pytest.raises(ValueError, match="unique"):
+            NetworkData("customer", ids=[1, 1], demand=[1, 2])
+
+    def test_distance_matrix(self, small_test_warehouses, small_test_customers):
+        """The coordinates are read from the columns, with the same distances"""
+        expected = calculate_dm(small_test_warehouses, small_test_customers)
+        dm = calculate_dm(
+            NetworkData.from_dict(small_test_warehouses),
+            NetworkData.from_dict(small_test_customers),
+        )
+        assert np.array_equal(dm.data, expected.data)
+        assert get_values(small_test_customers, "demand", [2, 1]).tolist() == [150, 100]
+
+
+class TestBulkMutators:
+    """Tests for the vectorized set/scale functions returning snapshots"""
+
+    def test_set_values(self, small_test_warehouses):
+        """Scalars, arrays and mappings, with a selection"""
+        warehouses = set_capacities(small_test_warehouses, 1000)
+        assert warehouses.capacity.tolist() == [1000] * 5
+        assert warehouses.frozen
+        assert warehouses.changed_fields == {"capacity"}
+        # The source dict is not changed
+        assert small_test_warehouses[1].capacity is None
+
+        costs = set_fixed_costs(warehouses, {2: 50, 99: 10})
+        assert costs.fixed_cost.tolist() == [1000, 50, 1000, 1000, 1000]
+        assert costs.changed_fields == {"fixed_cost"}
+        # Unchanged columns are shared between snapshots
+        assert costs.capacity is warehouses.capacity
+
+        west = set_capacities(
+            warehouses, [1, 2, 3, 4, 5], where=lambda w: w.longitude < -100
+        )
+        assert west.capacity.tolist() == [1000, 2, 1000, 1000, 5]
+        with pytest.raises(ValueError, match="Expected 5 values"):
+            set_capacities(warehouses, [1, 2])
+
+    def test_scale_demands(self, small_test_customers):
+        """Regional growth factors"""
+        customers = NetworkData.from_dict(small_test_customers)
+        grown = scale_demands(customers, 1.1, where=customers.latitude > 35)
+        assert grown.demand.tolist() == [110, 150, 120, 200, 198, 130, 90, 110]
+        assert customers.demand[0] == 100
+
+        same = scale_demands(grown, {1: 1.0})
+        assert same.changed_fields == frozenset()
+        assert grown.diff(customers) == {"demand"}
+
+    def test_snapshot_is_immutable(self, small_test_customers):
+        """Snapshots can't be changed in place"""
+        customers = set_demands(small_test_customers, 10)
+        with pytest.raises(TypeError, match="immutable"):
+            customers[1] = customers[1]._replace(demand=5)
+        with pytest.raises(ValueError):
+            customers.demand[0] = 5
+
+
+class TestRegistry:
+    """Tests for the registry of names and ids"""
+
+    def test_add(self):
+        """Names are unique and ids never reused"""
+        customers = Registry()
+        add_customer_from_data(customers, name="A", latitude=45, longitude=9)
+        add_customer_from_data(customers, name="B", latitude=46, longitude=9)
+        add_customer_from_data(customers, name="A", latitude=47, longitude=9)
+        assert list(customers) == [0, 1]
+        assert customers.id_of("B") == 1
+
+        del customers[1]
+        add_customer_from_data(customers, name="C", latitude=47, longitude=9)
+        add_customer_from_data(customers, name="B", latitude=48, longitude=9)
+        assert list(customers) == [0, 2, 3]
+        assert customers[3].latitude == 48
+
+        with pytest.raises(Exception, match="already exists"):
+            customers[0] = customers[2]
+
+    def test_add_many(self):
+        """Batch insert into a dict and a NetworkData"""
+        records = [
+            Customer(name, "", "", "", 45.0, 9.0, 10.0) for name in ["A", "B", "A", "C"]
+        ]
+        for data in ({}, NetworkData("customer")):
+            customers = Registry(data)
+            assert customers.add_many(records) == [0, 1, None, 2]
+            assert customers.add_many(records[3:] + records[:1]) == [None, None]
+            assert [customers[i].name for i in customers] == ["A", "B", "C"]
+            assert customers.id_of("C") == 2
+
+        with pytest.raises(Exception, match="Latitude"):
+            Registry().add_many([records[0]._replace(latitude=100)])
+
+    def test_wrap_existing(self, small_test_customers):
+        """An existing dict is wrapped, with the next id after the largest one"""
+        customers = Registry(small_test_customers)
+        assert customers.next_id == 9
+        assert customers.id_of("Dallas, TX") == 4
+        add_customer(customers, Customer("New", "", "", "", 45.0, 9.0, 1.0))
+        assert 9 in small_test_customers
+
+    def test_plain_dict_after_deletion(self):
+        """add_customer does not overwrite an entry after a deletion"""
+        customers = {}
+        for name in "ABC":
+            add_customer_from_data(customers, name=name, latitude=45, longitude=9)
+        del customers[0]
+        add_customer_from_data(customers, name="D", latitude=45, longitude=9)
+        assert [c.name for c in customers.values()] == ["B", "C", "D"]
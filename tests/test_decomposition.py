@@ -0,0 +1,225 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from decomposition import allocate_facilities, bisect_regions, interchange_repair
+from network_factory import solve_network_optimization
+
+
+def random_instance(num_customers=200, num_warehouses=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(40, 45, num_warehouses),
+        rng.uniform(5, 15, num_warehouses),
+        rng.uniform(40, 45, num_customers),
+        rng.uniform(5, 15, num_customers),
+        rng.integers(1, 100, num_customers).astype(float),
+    )
+
+
+class TestRegions:
+    """Tests for the partition of the instance in regions"""
+
+    def test_bisect_regions(self):
+        """Regions have about the same weight and keep at least one warehouse each"""
+        w_lat, w_lon, c_lat, c_lon, _ = random_instance()
+        c_labels, w_labels = bisect_regions(
+            c_lat, c_lon, np.ones(len(c_lat)), 4, w_lat, w_lon
+        )
+
+        assert set(c_labels) == set(w_labels) == {0, 1, 2, 3}
+        assert np.bincount(c_labels).min() >= 45
+        # The longitude span is wider, so the first cut is by longitude
+        assert c_lon[c_labels <= 1].max() < c_lon[c_labels >= 2].min() or (
+            c_lon[c_labels >= 2].max() < c_lon[c_labels <= 1].min()
+        )
+
+        # No split leaves a region without warehouses
+        c_labels, w_labels = bisect_regions(
+            c_lat, c_lon, np.ones(len(c_lat)), 10, w_lat[:2], w_lon[:2]
+        )
+        assert len(set(c_labels)) <= 2
+        assert set(c_labels) == set(w_labels)
+
+    def test_allocate_facilities(self):
+        counts = allocate_facilities([50, 30, 20], 10, [10, 10, 10])
+        assert counts.tolist() == [5, 3, 2]
+
+        # Bounded by the available warehouses, at least one by region
+        counts = allocate_facilities([90, 5, 5], 6, [3, 10, 10])
+        assert counts.tolist()[0] == 3
+        assert counts.sum() == 6 and counts.min() >= 1
+
+        with pytest.raises(Exception):
+            allocate_facilities([1, 1, 1], 2, [5, 5, 5])
+        with pytest.raises(Exception):
+            allocate_facilities([1, 1], 5, [2, 2])
+
+
+class TestInterchangeRepair:
+    """Tests for the sparse local search on the full instance"""
+
+    def brute_force(self, w_lat, w_lon, c_lat, c_lon, weight, p):
+        from itertools import combinations
+        from aggregation import pair_distances
+
+        distances = np.array(
+            [
+                pair_distances(
+                    np.full(len(c_lat), lat), np.full(len(c_lat), lon), c_lat, c_lon
+                )
+                for lat, lon in zip(w_lat, w_lon)
+            ]
+        )
+        return min(
+            (weight * distances[list(each)].min(axis=0)).sum()
+            for each in combinations(range(len(w_lat)), p)
+        )
+
+    def test_p_median(self):
+        """The repair improves a bad start, keeping the number of open warehouses"""
+        w_lat, w_lon, c_lat, c_lon, weight = random_instance(100, 12)
+        is_open = np.zeros(12, dtype=bool)
+        is_open[:3] = True
+        open_positions, nearest, d1, objective, initial, moves = interchange_repair(
+            w_lat, w_lon, c_lat, c_lon, weight, is_open, num_neighbors=12
+        )
+
+        assert len(open_positions) == 3
+        assert moves > 0 and objective < initial
+        assert set(nearest) <= set(open_positions)
+        assert objective == pytest.approx((weight * d1).sum())
+        optimum = self.brute_force(w_lat, w_lon, c_lat, c_lon, weight, 3)
+        assert optimum - 1e-6 <= objective <= optimum * 1.05
+
+        # Forced warehouses stay open or closed
+        open_positions, *_ = interchange_repair(
+            w_lat,
+            w_lon,
+            c_lat,
+            c_lon,
+            weight,
+            is_open,
+            force_open=[0],
+            force_closed=list(range(6, 12)),
+        )
+        assert 0 in open_positions
+        assert max(open_positions) < 6
+
+    def test_uflp(self):
+        """Without a fixed number the repair closes warehouses with a large fixed cost"""
+        w_lat, w_lon, c_lat, c_lon, weight = random_instance(100, 12)
+        fixed_cost = np.full(12, 1e9)
+        fixed_cost[5] = 0
+        open_positions, _, _, objective, initial, _ = interchange_repair(
+            w_lat,
+            w_lon,
+            c_lat,
+            c_lon,
+            weight,
+            np.ones(12, dtype=bool),
+            fixed_cost=fixed_cost,
+            fixed_number=False,
+        )
+
+        assert open_positions.tolist() == [5]
+        assert objective < initial
+
+
+class TestDecompositionBackend:
+    """Tests for the decomposition backend of solve_network_optimization"""
+
+    def solve(self, objective, warehouses, customers, **kwargs):
+        return solve_network_optimization(
+            objective,
+            warehouses,
+            customers,
+            backend="decomposition",
+            distance_cache=None,
+            num_regions=2,
+            max_workers=1,
+            **kwargs,
+        )
+
+    def test_p_median(self, small_test_warehouses, small_test_customers):
+        exact = solve_network_optimization(
+            "p-median",
+            small_test_warehouses,
+            small_test_customers,
+            objective_function="mincost",
+            num_warehouses=2,
+            force_uncapacitated=True,
+            distance_cache=None,
+        )
+        solution = self.solve(
+            "p-median",
+            small_test_warehouses,
+            small_test_customers,
+            objective_function="mincost",
+            num_warehouses=2,
+            force_uncapacitated=True,
+        )
+
+        assert solution["status"] == "Decomposition"
+        assert len(solution["active_warehouses_id"]) == 2
+        assert len(solution["decomposition"]["regions"]) == 2
+        assert (
+            solution["objective_value"]
+            <= solution["decomposition"]["objective_before_repair"] + 1e-6
+        )
+        assert solution["objective_value"] >= exact["objective_value"] - 1e-6
+        assignment = {
+            row["Customer_id"]: row["Warehouse_id"]
+            for row in solution["customers_assignment"]
+        }
+        assert set(assignment) == set(small_test_customers)
+        assert set(assignment.values()) <= solution["active_warehouses_id"]
+
+    def test_uflp(self, small_test_warehouses, small_test_customers):
+        solution = self.solve(
+            "UFLP", small_test_warehouses, small_test_customers, objective_function=None
+        )
+
+        assert solution["status"] == "Decomposition"
+        assert solution["active_warehouses_id"]
+        assert solution["objective_value"] > 0
+
+    def test_invalid(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        with pytest.raises(ValueError):
+            # The capacity constraints cannot be decomposed
+            self.solve(
+                "p-median",
+                small_test_warehouses,
+                small_test_customers,
+                objective_function="mindistance",
+                num_warehouses=2,
+            )
+        with pytest.raises(ValueError):
+            self.solve(
+                "UFLP",
+                small_test_warehouses,
+                small_test_customers,
+                objective_function=None,
+                distance=small_test_distance,
+            )
+        with pytest.raises(ValueError):
+            self.solve(
+                "UFLP",
+                small_test_warehouses,
+                small_test_customers,
+                objective_function=None,
+                region_backend="decomposition",
+            )
+        with pytest.raises(Exception):
+            self.solve(
+                "CFLP",
+                small_test_warehouses,
+                small_test_customers,
+                objective_function=None,
+            )
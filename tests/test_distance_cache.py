@@ -0,0 +1,114 @@
+import pytest
+import numpy as np
+import os
+import sys
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_structures import calculate_dm, DistanceMatrix
+from distance_cache import DistanceCache, cached_dm
+
+
+class TestDistanceCache:
+    """Tests for the on-disk distance matrix cache"""
+
+    def test_get_or_compute(
+        self, tmp_path, small_test_warehouses, small_test_customers
+    ):
+        """Test that the matrix is stored once and then reopened as a memory map"""
+        cache = DistanceCache(cache_dir=str(tmp_path))
+
+        first = cache.get_or_compute(small_test_warehouses, small_test_customers)
+        assert len(cache.entries()) == 1
+
+        second = cache.get_or_compute(small_test_warehouses, small_test_customers)
+        assert len(cache.entries()) == 1
+        assert isinstance(second, DistanceMatrix)
+        assert isinstance(second.data.base, np.memmap) or isinstance(
+            second.data, np.memmap
+        )
+        np.testing.assert_array_equal(
+            second.data,
+            calculate_dm(small_test_warehouses, small_test_customers).data,
+        )
+        assert second == first
+
+    def test_key_depends_on_metric_and_coordinates(
+        self, small_test_warehouses, small_test_customers
+    ):
+        """Test that the key changes with the metric, the circuity and the coordinates"""
+        key = DistanceCache.key(small_test_warehouses, small_test_customers)
+
+        assert key == DistanceCache.key(small_test_warehouses, small_test_customers)
+        assert key != DistanceCache.key(
+            small_test_warehouses, small_test_customers, use_haversine=False
+        )
+        assert key != DistanceCache.key(
+            small_test_warehouses, small_test_customers, circuity_factor=1.2
+        )
+        assert key != DistanceCache.key(
+            small_test_warehouses, small_test_customers, dtype=np.float32
+        )
+
+        small_test_customers[1].latitude += 0.001
+        assert key != DistanceCache.key(small_test_warehouses, small_test_customers)
+
+    def test_circuity_factor(
+        self, tmp_path, small_test_warehouses, small_test_customers
+    ):
+        """Test that the circuity factor scales the cached distances"""
+        plain = cached_dm(
+            small_test_warehouses, small_test_customers, distance_cache=str(tmp_path)
+        )
+        road = cached_dm(
+            small_test_warehouses,
+            small_test_customers,
+            circuity_factor=1.2,
+            distance_cache=str(tmp_path),
+        )
+
+        np.testing.assert_allclose(road.data, plain.data * 1.2)
+        assert len(DistanceCache(str(tmp_path)).entries()) == 2
+
+    def test_lru_eviction(self, tmp_path, small_test_warehouses, small_test_customers):
+        """Test that the least recently used matrices are evicted"""
+        # Each 5x8 float64 matrix takes a few hundred bytes on disk
+        cache = DistanceCache(cache_dir=str(tmp_path), max_size_mb=0.001)
+
+        first = cache.key(small_test_warehouses, small_test_customers)
+        cache.get_or_compute(small_test_warehouses, small_test_customers)
+        os.utime(cache._path(first), (0, 0))
+        cache.get_or_compute(
+            small_test_warehouses, small_test_customers, use_haversine=False
+        )
+        os.utime(
+            cache._path(
+                cache.key(
+                    small_test_warehouses, small_test_customers, use_haversine=False
+                )
+            ),
+            (1, 1),
+        )
+        cache.get_or_compute(
+            small_test_warehouses, small_test_customers, circuity_factor=1.5
+        )
+
+        paths = [path for path, _, _ in cache.entries()]
+        assert cache.size() <= cache.max_size
+        assert cache._path(first) not in paths
+        assert (
+            cache._path(
+                cache.key(
+                    small_test_warehouses, small_test_customers, circuity_factor=1.5
+                )
+            )
+            in paths
+        )
+
+    def test_cache_disabled(self, small_test_warehouses, small_test_customers):
+        """Test that no cache is used when distance_cache is None"""
+        distance = cached_dm(
+            small_test_warehouses, small_test_customers, distance_cache=None
+        )
+        assert not isinstance(distance.data, np.memmap)
@@ -279,3 +279,68 @@ class TestCapacitatedFLPOptimizer:
         # - Chicago warehouse has capacity 400, using 980 units (245%)
         assert "Warehouse 1:" in captured.out  # NY capacity usage
         assert "Warehouse 3:" in captured.out  # Chicago capacity usage
+
+
+class TestLagrangianRelaxation:
+    """Tests for the Lagrangian relaxation of the FLP models"""
+
+    def solve_cbc(self, optimizer):
+        optimizer.build_model()
+        return optimizer.solve()["objective_value"]
+
+    def test_uflp_bounds(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that the bounds bracket the CBC optimum"""
+
+        def make_optimizer():
+            return UncapacitatedFLPOptimizer(
+                objective="UFLP",
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                distance=small_test_distance,
+                gapRel=0.0,
+            )
+
+        optimum = self.solve_cbc(make_optimizer())
+        optimizer = make_optimizer()
+        solution = optimizer.solve_lagrangian()
+
+        assert solution["status"] == "Heuristic"
+        assert solution["lower_bound"] <= optimum + 1e-6
+        assert solution["objective_value"] >= optimum - 1e-6
+        assert solution["objective_value"] == pytest.approx(optimum, rel=0.01)
+        assert len(optimizer.flows) == len(small_test_customers)
+
+    def test_cflp_bounds(
+        self, capacitated_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test the capacitated model with forced and mutually exclusive warehouses"""
+
+        def make_optimizer():
+            return CapacitatedFLPOptimizer(
+                objective="CFLP",
+                warehouses=capacitated_test_warehouses,
+                customers=small_test_customers,
+                distance=small_test_distance,
+                force_open=[4],
+                mutually_exclusive=[(1, 2)],
+                force_single_sourcing=False,
+                gapRel=0.0,
+            )
+
+        optimum = self.solve_cbc(make_optimizer())
+        optimizer = make_optimizer()
+        solution = optimizer.solve_lagrangian()
+
+        assert solution["lower_bound"] <= optimum + 1e-6
+        assert solution["objective_value"] >= optimum - 1e-6
+        assert 4 in optimizer.active_warehouses
+        assert not {1, 2} <= optimizer.active_warehouses
+        for w in optimizer.active_warehouses:
+            outflow = sum(
+                small_test_customers[c].demand * var.varValue
+                for (v, c), var in optimizer.assignment_vars.items()
+                if v == w
+            )
+            assert outflow <= capacitated_test_warehouses[w].capacity + 1e-6
@@ -0,0 +1,80 @@
+import itertools
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from heuristics import greedy_interchange, nearest_two
+
+
+@pytest.fixture
+def random_instance():
+    """Random euclidean p-median instance"""
+    rng = np.random.default_rng(7)
+    warehouses = rng.uniform(0, 100, (12, 2))
+    customers = rng.uniform(0, 100, (150, 2))
+    distance = np.linalg.norm(warehouses[:, None] - customers[None], axis=2)
+    weight = rng.integers(1, 50, 150).astype(float)
+    return distance, weight
+
+
+class TestGreedyInterchange:
+    """Tests for the greedy + vertex substitution heuristic"""
+
+    def test_nearest_two(self, random_instance):
+        """Test the closest and second closest open warehouse"""
+        distance, _ = random_instance
+        open_positions = np.array([1, 4, 9])
+        d1, nearest, d2 = nearest_two(distance, open_positions)
+
+        ordered = np.sort(distance[open_positions], axis=0)
+        np.testing.assert_array_equal(d1, ordered[0])
+        np.testing.assert_array_equal(d2, ordered[1])
+        np.testing.assert_array_equal(distance[nearest, np.arange(150)], d1)
+
+    def test_local_optimum(self, random_instance):
+        """Test that no single swap improves the heuristic solution"""
+        distance, weight = random_instance
+        open_positions, objective, _ = greedy_interchange(distance, weight, 3)
+
+        assert objective == pytest.approx(distance[open_positions].min(0) @ weight)
+        for i, j in itertools.product(open_positions, range(12)):
+            if j in open_positions:
+                continue
+            swapped = [k for k in open_positions if k != i] + [j]
+            assert distance[swapped].min(0) @ weight >= objective - 1e-6
+
+    def test_close_to_optimum(self, random_instance):
+        """Test the heuristic against the enumeration of all the solutions"""
+        distance, weight = random_instance
+        _, objective, _ = greedy_interchange(distance, weight, 3)
+
+        optimum = min(
+            distance[list(s)].min(0) @ weight
+            for s in itertools.combinations(range(12), 3)
+        )
+        assert objective <= optimum * 1.02
+
+    def test_forced_and_exclusive(self, random_instance):
+        """Test forced open/closed and mutually exclusive warehouses"""
+        distance, weight = random_instance
+        exclusive = np.zeros((12, 12), dtype=bool)
+        exclusive[0, 1] = exclusive[1, 0] = True
+        open_positions, _, _ = greedy_interchange(
+            distance,
+            weight,
+            4,
+            force_open=[0],
+            force_closed=[2, 3],
+            exclusive=exclusive,
+        )
+
+        assert 0 in open_positions
+        assert not {1, 2, 3} & set(open_positions)
+        assert len(open_positions) == 4
+
+        with pytest.raises(Exception, match="forced open"):
+            greedy_interchange(distance, weight, 1, force_open=[0, 5])
@@ -0,0 +1,132 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from instrumentation import Instrumentation
+from network_factory import solve_network_optimization
+
+
+class TestInstrumentation:
+    """Tests for the recording of the phases"""
+
+    def test_phase(self):
+        """Each phase records its time and memory, repeated runs are added up"""
+        stats = Instrumentation()
+        with stats.phase("solve"):
+            sum(range(100000))
+        with stats.phase("solve"):
+            pass
+        with stats.phase("build_model"):
+            # A phase nested in itself is recorded once
+            with stats.phase("build_model"):
+                pass
+
+        result = stats.to_dict()
+        assert list(result["phases"]) == ["build_model", "solve"]
+        solve = result["phases"]["solve"]
+        assert solve["calls"] == 2
+        assert solve["wall_time"] > 0 and solve["cpu_time"] >= 0
+        assert solve["peak_rss_mb"] > 0
+        assert "peak_traced_mb" not in solve
+        assert result["phases"]["build_model"]["calls"] == 1
+        assert result["wall_time"] == pytest.approx(
+            solve["wall_time"] + result["phases"]["build_model"]["wall_time"]
+        )
+
+    def test_trace_memory(self):
+        stats = Instrumentation(trace_memory=True)
+        with stats.phase("build_model"):
+            with stats.phase("solve"):
+                block = np.ones(1_000_000)
+            del block
+
+        phases = stats.to_dict()["phases"]
+        assert phases["solve"]["peak_traced_mb"] >= 7.5
+        # The enclosing phase keeps the peak of the nested one
+        assert phases["build_model"]["peak_traced_mb"] >= 7.5
+
+    def test_hooks(self):
+        events = []
+        stats = Instrumentation(hooks=[lambda name, metrics: events.append(name)])
+        with stats.phase("solve"):
+            pass
+        stats.record_model(variables=10, constraints=5, nonzeros=20)
+
+        assert events == ["solve", "model"]
+        assert stats.to_dict()["model"] == {
+            "variables": 10,
+            "constraints": 5,
+            "nonzeros": 20,
+        }
+
+    def test_exception(self):
+        """The phase is recorded even if it fails"""
+        stats = Instrumentation()
+        with pytest.raises(ValueError):
+            with stats.phase("solve"):
+                raise ValueError()
+        assert stats.phases["solve"]["calls"] == 1
+
+
+class TestSolutionStats:
+    """Tests for the stats entry of the solution"""
+
+    def solve(self, warehouses, customers, **kwargs):
+        return solve_network_optimization(
+            "p-median",
+            warehouses,
+            customers,
+            objective_function="mindistance",
+            num_warehouses=2,
+            distance_cache=None,
+            **kwargs,
+        )
+
+    @pytest.mark.parametrize("backend", ["pulp", "mps"])
+    def test_model_backends(self, small_test_warehouses, small_test_customers, backend):
+        events = []
+        solution = self.solve(
+            small_test_warehouses,
+            small_test_customers,
+            backend=backend,
+            hooks=[lambda name, metrics: events.append((name, metrics))],
+        )
+
+        stats = solution["stats"]
+        assert list(stats["phases"]) == [
+            "distance_matrix",
+            "build_model",
+            "solve",
+            "extract_solution",
+            "analyze_solution",
+        ]
+        # 8 customers x 5 warehouses assignments and 5 facilities
+        assert stats["model"]["variables"] == 45
+        assert stats["model"]["constraints"] > 0
+        assert stats["model"]["nonzeros"] > stats["model"]["variables"]
+        assert stats["phases"]["solve"]["solver_cpu_time"] >= 0
+        assert [name for name, _ in events] == [
+            "distance_matrix",
+            "build_model",
+            "model",
+            "solve",
+            "extract_solution",
+            "analyze_solution",
+        ]
+        assert events[3][1]["wall_time"] == stats["phases"]["solve"]["wall_time"]
+
+    def test_heuristic(self, small_test_warehouses, small_test_customers):
+        solution = self.solve(
+            small_test_warehouses,
+            small_test_customers,
+            backend="heuristic",
+            force_uncapacitated=True,
+        )
+
+        phases = solution["stats"]["phases"]
+        assert {"build_model", "solve", "analyze_solution"} <= set(phases)
+        assert solution["stats"]["model"] == {}
@@ -0,0 +1,109 @@
+import itertools
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from lagrangian import (
+    lagrangian_flp,
+    capacitated_subproblem,
+    repair_capacitated,
+)
+
+
+@pytest.fixture
+def random_flp():
+    """Random euclidean facility location instance"""
+    rng = np.random.default_rng(11)
+    warehouses = rng.uniform(0, 100, (8, 2))
+    customers = rng.uniform(0, 100, (60, 2))
+    demand = rng.integers(1, 30, 60).astype(float)
+    distance = np.linalg.norm(warehouses[:, None] - customers[None], axis=2)
+    cost = 0.1 * demand * distance
+    fixed_cost = rng.uniform(300, 900, 8)
+    capacity = rng.uniform(200, 500, 8)
+    return cost, fixed_cost, demand, capacity
+
+
+def uflp_optimum(cost, fixed_cost):
+    """Optimum of the uncapacitated problem by enumeration of the open warehouses"""
+    return min(
+        cost[list(s)].min(axis=0).sum() + fixed_cost[list(s)].sum()
+        for n in range(1, cost.shape[0] + 1)
+        for s in itertools.combinations(range(cost.shape[0]), n)
+    )
+
+
+class TestLagrangianFLP:
+    """Tests for the Lagrangian relaxation engine"""
+
+    def test_uncapacitated_bounds(self, random_flp):
+        """Test that lower and upper bound bracket the optimum"""
+        cost, fixed_cost, _, _ = random_flp
+        result = lagrangian_flp(cost, fixed_cost)
+        optimum = uflp_optimum(cost, fixed_cost)
+
+        assert result.lower_bound <= optimum + 1e-6
+        assert result.upper_bound >= optimum - 1e-6
+        assert result.upper_bound == pytest.approx(optimum, rel=0.01)
+        w, c, x = result.flows
+        assert np.bincount(c, weights=x).tolist() == [1.0] * 60
+        assert set(w) <= set(result.open_positions)
+
+    def test_forced_and_forbidden(self, random_flp):
+        """Test forced open/closed warehouses and forbidden pairs"""
+        cost, fixed_cost, _, _ = random_flp
+        cost = cost.copy()
+        cost[0, :30] = np.inf
+        result = lagrangian_flp(cost, fixed_cost, force_open=[0], force_closed=[1])
+
+        assert 0 in result.open_positions
+        assert 1 not in result.open_positions
+        w, c, _ = result.flows
+        assert np.isfinite(cost[w, c]).all()
+
+    def test_capacitated_subproblem(self, random_flp):
+        """Test the continuous knapsack of each warehouse"""
+        cost, fixed_cost, demand, capacity = random_flp
+        reduced_cost = cost - cost.mean(axis=0)
+        allowed = np.ones(8, dtype=bool)
+        value, opening, x = capacitated_subproblem(
+            reduced_cost, fixed_cost, demand, capacity, ~allowed, allowed
+        )
+
+        assert (x @ demand <= capacity + 1e-9).all()
+        assert (x[reduced_cost >= 0] == 0).all()
+        assert capacity @ opening >= demand.sum() - 1e-9
+
+    @pytest.mark.parametrize("single_sourcing", [True, False])
+    def test_capacitated_solution(self, random_flp, single_sourcing):
+        """Test that the capacitated solution is feasible and its cost is the upper bound"""
+        cost, fixed_cost, demand, capacity = random_flp
+        result = lagrangian_flp(
+            cost, fixed_cost, demand, capacity, single_sourcing=single_sourcing
+        )
+
+        w, c, x = result.flows
+        assert np.bincount(c, weights=x, minlength=60) == pytest.approx(np.ones(60))
+        assert (
+            np.bincount(w, weights=x * demand[c], minlength=8) <= capacity + 1e-6
+        ).all()
+        if single_sourcing:
+            assert (x == 1).all()
+        total = (cost[w, c] * x).sum() + fixed_cost[result.open_positions].sum()
+        assert result.upper_bound == pytest.approx(total)
+        assert result.lower_bound <= result.upper_bound
+
+    def test_repair_infeasible(self, random_flp):
+        """Test that the repair fails when the capacity can't cover the demand"""
+        cost, fixed_cost, demand, capacity = random_flp
+        allowed = np.zeros(8, dtype=bool)
+        allowed[0] = True
+        total, _, flows = repair_capacitated(
+            cost, fixed_cost, demand, capacity, allowed, allowed, allowed
+        )
+        assert total == np.inf
+        assert flows is None
@@ -0,0 +1,159 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pulp as pl
+from mps_backend import ModelMatrix, solve_matrix
+from network_optimizer import (
+    PMedianOptimizer,
+    PCoverOptimizer,
+    UncapacitatedFLPOptimizer,
+    CapacitatedFLPOptimizer,
+)
+
+
+def solve_both(make_optimizer):
+    """Solve the same model with the PuLP and the MPS backends"""
+    pulp_optimizer = make_optimizer()
+    pulp_optimizer.build_model()
+    pulp_solution = pulp_optimizer.solve()
+
+    mps_optimizer = make_optimizer()
+    mps_solution = mps_optimizer.solve_mps()
+    return pulp_optimizer, pulp_solution, mps_optimizer, mps_solution
+
+
+class TestModelMatrix:
+    """Tests for the array based model"""
+
+    def test_csr_and_csc(self):
+        """Test the compressed forms of the constraint matrix"""
+        matrix = ModelMatrix()
+        matrix.add_columns(3)
+        matrix.add_rows(2, pl.LpConstraintLE, [4, 5])
+        matrix.add_entries([1, 0, 1], [2, 0, 0], [3.0, 1.0, 2.0])
+
+        indptr, cols, vals = matrix.csr()
+        np.testing.assert_array_equal(indptr, [0, 1, 3])
+        np.testing.assert_array_equal(cols, [0, 0, 2])
+        np.testing.assert_array_equal(vals, [1.0, 2.0, 3.0])
+
+        indptr, rows, vals = matrix.csc()
+        np.testing.assert_array_equal(indptr, [0, 2, 2, 3])
+        np.testing.assert_array_equal(rows, [0, 1, 1])
+        assert matrix.num_nonzeros == 3
+
+    def test_solve_small_mip(self):
+        """Test a small knapsack: max 5x + 4y + 3z, 2x + 3y + z <= 5, x, y, z binary"""
+        matrix = ModelMatrix(pl.LpMaximize)
+        matrix.add_columns(3, cost=[5, 4, 3], upper=1, integer=True)
+        row = matrix.add_rows(1, pl.LpConstraintLE, 5)
+        matrix.add_entries([row] * 3, [0, 1, 2], [2, 3, 1])
+
+        status, values = solve_matrix(matrix)
+
+        assert status == "Optimal"
+        np.testing.assert_allclose(values, [1, 1, 0])
+        assert matrix.objective_value(values) == pytest.approx(9)
+
+    def test_infeasible(self):
+        """Test that an infeasible model returns no values"""
+        matrix = ModelMatrix()
+        matrix.add_columns(1, upper=1, integer=True)
+        row = matrix.add_rows(1, pl.LpConstraintGE, 2)
+        matrix.add_entries([row], [0])
+
+        status, values = solve_matrix(matrix)
+
+        assert status == "Infeasible"
+        assert values is None
+
+
+class TestMpsBackend:
+    """Tests comparing the MPS backend with the PuLP model"""
+
+    def test_p_median(self, small_test_warehouses, small_test_customers):
+        """Test the p-median model with forced and mutually exclusive warehouses"""
+        _, pulp_solution, mps_optimizer, mps_solution = solve_both(
+            lambda: PMedianOptimizer(
+                objective="p-median",
+                objective_function="mindistance",
+                num_warehouses=2,
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                force_uncapacitated=True,
+                force_open=[3],
+                mutually_exclusive=[(1, 2)],
+            )
+        )
+
+        assert mps_solution["status"] == "Optimal"
+        assert mps_solution["objective_value"] == pytest.approx(
+            pulp_solution["objective_value"]
+        )
+        assert 3 in mps_optimizer.active_warehouses
+        assert len(mps_optimizer.active_warehouses) == 2
+        assert len(mps_optimizer.flows) == len(small_test_customers)
+
+    def test_p_cover(self, small_test_warehouses, small_test_customers):
+        """Test the p-cover model"""
+        _, pulp_solution, _, mps_solution = solve_both(
+            lambda: PCoverOptimizer(
+                objective="p-cover",
+                num_warehouses=2,
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                distance=None,
+                high_service_distance=800,
+                force_uncapacitated=True,
+            )
+        )
+
+        assert mps_solution["objective_value"] == pytest.approx(
+            pulp_solution["objective_value"]
+        )
+
+    def test_uflp(self, small_test_warehouses, small_test_customers):
+        """Test the uncapacitated FLP model"""
+        _, pulp_solution, mps_optimizer, mps_solution = solve_both(
+            lambda: UncapacitatedFLPOptimizer(
+                objective="UFLP",
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                distance=None,
+                force_closed=[1],
+            )
+        )
+
+        assert mps_solution["objective_value"] == pytest.approx(
+            pulp_solution["objective_value"]
+        )
+        assert 1 not in mps_optimizer.active_warehouses
+
+    def test_cflp(self, capacitated_test_warehouses, small_test_customers):
+        """Test the capacitated FLP model with multi-sourcing"""
+        pulp_optimizer, pulp_solution, mps_optimizer, mps_solution = solve_both(
+            lambda: CapacitatedFLPOptimizer(
+                objective="CFLP",
+                warehouses=capacitated_test_warehouses,
+                customers=small_test_customers,
+                distance=None,
+                force_single_sourcing=False,
+            )
+        )
+
+        assert mps_solution["objective_value"] == pytest.approx(
+            pulp_solution["objective_value"]
+        )
+        for w in mps_optimizer.active_warehouses:
+            capacity = capacitated_test_warehouses[w].capacity
+            outflow = sum(
+                small_test_customers[c].demand * var.varValue
+                for (v, c), var in mps_optimizer.assignment_vars.items()
+                if v == w
+            )
+            assert outflow <= capacity + 1e-6
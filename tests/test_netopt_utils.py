@@ -0,0 +1,74 @@
+import pytest
+import sys
+import os
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from netopt_utils import plot_map
+
+
+class TestPlotMap:
+    """Tests for the map of the warehouses, customers and flows"""
+
+    @pytest.fixture(autouse=True)
+    def close_figures(self):
+        yield
+        plt.close("all")
+
+    def test_artists(self, small_test_warehouses, small_test_customers):
+        """Flows and each group of markers are drawn as a single artist"""
+        flows = {(1, 1), (1, 7), (4, 7)} | {(4, c) for c in (2, 4, 6, 8)}
+        plot_map(
+            small_test_warehouses,
+            small_test_customers,
+            flows=flows,
+            active_warehouses={1, 4},
+            multi_sourced={7: 2},
+            options={"radius": 300},
+        )
+        ax = plt.gcf().axes[0]
+
+        assert not ax.lines
+        # Circles, flows, customers, multi-sourced customers, active and inactive warehouses
+        assert len(ax.collections) == 6
+        assert len(ax.collections[1].get_segments()) == len(flows)
+        assert len(ax.collections[2].get_offsets()) == 7
+        assert len(ax.collections[3].get_offsets()) == 1
+
+        plot_map(
+            small_test_warehouses,
+            small_test_customers,
+            flows=flows,
+            active_warehouses={1, 4},
+            hide_inactive=True,
+            hide_flows=True,
+        )
+        assert len(plt.gcf().axes[0].collections) == 2
+
+    def test_hover(self, small_test_warehouses, small_test_customers):
+        """The label of the nearest marker is shown when the mouse is close to it"""
+        plot_map(small_test_warehouses, small_test_customers, active_warehouses={1})
+        fig = plt.gcf()
+        ax = fig.axes[0]
+        fig.canvas.draw()
+        annotation = ax.texts[0]
+
+        x, y = ax.transData.transform((-87.6298, 41.8781))
+        fig.canvas.callbacks.process(
+            "motion_notify_event", MouseEvent("motion_notify_event", fig.canvas, x, y)
+        )
+        assert annotation.get_visible()
+        assert annotation.get_text() == "Warehouse 3: Chicago"
+
+        x, y = ax.transData.transform((-85.0, 35.0))
+        fig.canvas.callbacks.process(
+            "motion_notify_event", MouseEvent("motion_notify_event", fig.canvas, x, y)
+        )
+        assert not annotation.get_visible()
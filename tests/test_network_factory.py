@@ -6,7 +6,13 @@ from unittest.mock import patch, MagicMock
 # Add the parent directory to sys.path to import the modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from network_factory import create_network_optimizer, solve_network_optimization
+from network_factory import (
+    create_network_optimizer,
+    parameter_grid,
+    solve_network_optimization,
+    sweep_network_optimization,
+)
+from data_structures import NetworkData
 from network_optimizer import (
     PMedianOptimizer,
     PCoverOptimizer,
@@ -199,3 +205,115 @@ class TestNetworkFactory:
 
         # Check that the solution was returned
         assert result == {"status": "Optimal", "objective_value": 100}
+
+
+class TestSweep:
+    """Tests for the parallel parameter sweep"""
+
+    def test_parameter_grid(self):
+        """A dict of lists expands into all the combinations, a list is kept as is"""
+        points = parameter_grid({"num_warehouses": [1, 2], "unit_transport_cost": 0.1})
+        assert points == [
+            {"num_warehouses": 1, "unit_transport_cost": 0.1},
+            {"num_warehouses": 2, "unit_transport_cost": 0.1},
+        ]
+        assert parameter_grid([{"num_warehouses": 3}]) == [{"num_warehouses": 3}]
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_sweep_p_median(
+        self,
+        small_test_warehouses,
+        small_test_customers,
+        small_test_distance,
+        max_workers,
+    ):
+        """The sweep returns one row per p, with the same results of single solves"""
+        results = sweep_network_optimization(
+            objective="p-median",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+            grid={"num_warehouses": [1, 2, 3]},
+            max_workers=max_workers,
+            objective_function="mindistance",
+        )
+
+        assert list(results["num_warehouses"]) == [1, 2, 3]
+        assert (results["status"] == "Optimal").all()
+        assert list(results["num_active_warehouses"]) == [1, 2, 3]
+        # Opening more warehouses never increases the weighted distance
+        assert results["objective_value"].is_monotonic_decreasing
+
+        single = solve_network_optimization(
+            objective="p-median",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+            num_warehouses=2,
+            objective_function="mindistance",
+        )
+        assert results["objective_value"][1] == pytest.approx(single["objective_value"])
+
+    def test_sweep_no_cache(
+        self, small_test_warehouses, small_test_customers, tmp_path, monkeypatch
+    ):
+        """The distance matrix computed by the sweep is not stored on disk by default"""
+        import distance_cache
+
+        cache_dir = tmp_path / "cache"
+        monkeypatch.setattr(distance_cache, "DEFAULT_CACHE_DIR", str(cache_dir))
+        results = sweep_network_optimization(
+            objective="p-median",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            grid={"num_warehouses": [1, 2]},
+            max_workers=1,
+            objective_function="mindistance",
+        )
+
+        assert (results["status"] == "Optimal").all()
+        assert not cache_dir.exists() or not any(cache_dir.iterdir())
+
+    def test_sweep_reports_errors(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """A failing point is reported in the error column without stopping the sweep"""
+        results = sweep_network_optimization(
+            objective="p-median",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+            grid=[{"num_warehouses": 0}, {"num_warehouses": 2}],
+            max_workers=1,
+            objective_function="mindistance",
+        )
+
+        assert results["status"][0] == "Error"
+        assert "num_warehouses" in results["error"][0]
+        assert results["status"][1] == "Optimal"
+
+
+class TestNetworkDataInput:
+    """Tests for the optimizers fed with columnar NetworkData"""
+
+    @pytest.mark.parametrize("backend", ["pulp", "mps"])
+    def test_same_solution(self, small_test_warehouses, small_test_customers, backend):
+        """NetworkData and dicts of objects give the same solution"""
+        params = dict(
+            objective="p-median",
+            objective_function="mincost",
+            num_warehouses=2,
+            distance_cache=None,
+            backend=backend,
+        )
+        expected = solve_network_optimization(
+            warehouses=small_test_warehouses, customers=small_test_customers, **params
+        )
+        solution = solve_network_optimization(
+            warehouses=NetworkData.from_dict(small_test_warehouses),
+            customers=NetworkData.from_dict(small_test_customers),
+            **params,
+        )
+
+        assert solution["objective_value"] == pytest.approx(expected["objective_value"])
+        assert solution["active_warehouses_id"] == expected["active_warehouses_id"]
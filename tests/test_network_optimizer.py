@@ -8,6 +8,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from network_optimizer import NetworkOptimizer
+from data_structures import DistanceMatrix, calculate_sparse_dm
 
 
 # Create a concrete subclass of NetworkOptimizer for testing
@@ -195,3 +196,296 @@ class TestNetworkOptimizer:
 
         # Should return None for infeasible models
         assert result is None
+
+
+class TestSparseFormulation:
+    """Tests for the sparse formulation with admissible arcs only"""
+
+    @staticmethod
+    def count_logical_constraints(optimizer):
+        return sum(
+            1
+            for name in optimizer.model.constraints
+            if name.startswith("Logical_constraint_between_customer_")
+        )
+
+    def test_dense_by_default(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that all the pairs are arcs in the default formulation"""
+        optimizer = TestableNetworkOptimizer(
+            objective="UFLP",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+            force_closed=[2],
+        )
+        optimizer.build_model()
+
+        assert optimizer.sparse is False
+        assert len(optimizer.arcs) == 40
+        assert self.count_logical_constraints(optimizer) == 40
+
+    def test_force_closed(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that no arc is created for closed warehouses"""
+        optimizer = TestableNetworkOptimizer(
+            objective="UFLP",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=DistanceMatrix.from_dict(small_test_distance),
+            force_closed=[2, 4],
+            sparse=True,
+        )
+        optimizer.build_model()
+
+        assert len(optimizer.assignment_vars) == 24  # 3 warehouses * 8 customers
+        assert all(w not in (2, 4) for w, _ in optimizer.arcs)
+        assert self.count_logical_constraints(optimizer) == 24
+
+    @pytest.mark.parametrize("as_matrix", [True, False])
+    def test_max_arcs_per_customer(
+        self,
+        small_test_warehouses,
+        small_test_customers,
+        small_test_distance,
+        as_matrix,
+    ):
+        """Test that only the closest warehouses of each customer are admissible"""
+        distance = (
+            DistanceMatrix.from_dict(small_test_distance)
+            if as_matrix
+            else small_test_distance
+        )
+        optimizer = TestableNetworkOptimizer(
+            objective="UFLP",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=distance,
+            max_arcs_per_customer=2,
+        )
+        optimizer.build_model()
+
+        assert optimizer.sparse is True
+        assert len(optimizer.arcs) == 16
+        for c, ws in optimizer.customer_arcs.items():
+            closest = sorted(range(1, 6), key=lambda w: small_test_distance[w, c])
+            assert set(ws) == set(closest[:2])
+
+    def test_user_arcs(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test a user-supplied list of arcs, forced allocations are always kept"""
+        arcs = [(1, c) for c in range(1, 9)] + [(3, 2), (4, 2)]
+        optimizer = TestableNetworkOptimizer(
+            objective="UFLP",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+            arcs=arcs,
+            force_allocations=[(5, 3)],
+        )
+        optimizer.build_model()
+
+        assert set(optimizer.arcs) == set(arcs) | {(5, 3)}
+        assert optimizer.customer_arcs[2] == [1, 3, 4]
+        assert optimizer.assignment_vars[5, 3].lowBound == 1
+
+    def test_sparse_distance_matrix(self, small_test_warehouses, small_test_customers):
+        """Test that a SparseDistanceMatrix implies the sparse formulation"""
+        distance = calculate_sparse_dm(small_test_warehouses, small_test_customers, k=3)
+        optimizer = TestableNetworkOptimizer(
+            objective="UFLP",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=distance,
+        )
+        optimizer.build_model()
+
+        assert optimizer.sparse is True
+        assert set(optimizer.arcs) == set(distance.keys())
+
+
+class TestLinkingFormulation:
+    """Tests for the strong, weak and lazy linking constraints"""
+
+    def make_optimizer(self, warehouses, customers, linking):
+        from network_optimizer import UncapacitatedFLPOptimizer
+
+        return UncapacitatedFLPOptimizer(
+            objective="UFLP",
+            warehouses=warehouses,
+            customers=customers,
+            distance=None,
+            linking=linking,
+        )
+
+    def test_weak_constraints(self, small_test_warehouses, small_test_customers):
+        """Test that the weak formulation has one linking row per warehouse"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, "weak"
+        )
+        optimizer.build_model()
+
+        names = [n for n in optimizer.model.constraints if "ogical_constraint" in n]
+        assert len(names) == len(small_test_warehouses)
+        row = optimizer.model.constraints["Aggregated_logical_constraint_warehouse_1"]
+        assert row[optimizer.facility_status_vars[1]] == -len(small_test_customers)
+
+    @pytest.mark.parametrize("linking", ["weak", "lazy"])
+    def test_same_solution(self, small_test_warehouses, small_test_customers, linking):
+        """Test that the weak and lazy formulations give the optimum of the strong one"""
+        strong = self.make_optimizer(
+            small_test_warehouses, small_test_customers, "strong"
+        )
+        strong.build_model()
+        expected = strong.solve()["objective_value"]
+
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, linking
+        )
+        optimizer.build_model()
+        assert optimizer.solve()["objective_value"] == pytest.approx(expected)
+
+        matrix_optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, linking
+        )
+        assert matrix_optimizer.solve_mps()["objective_value"] == pytest.approx(
+            expected
+        )
+        if linking == "lazy":
+            assert len(optimizer.linking_cuts) == len(matrix_optimizer.linking_cuts)
+
+    def test_unknown_linking(self, small_test_warehouses, small_test_customers):
+        """Test error on unknown linking formulation"""
+        with pytest.raises(ValueError, match="Unknown linking"):
+            self.make_optimizer(small_test_warehouses, small_test_customers, "medium")
+
+
+class TestWarmStart:
+    """Tests for the warm start of CBC from a previous solution"""
+
+    def make_optimizer(self, warehouses, customers, **kwargs):
+        from network_optimizer import UncapacitatedFLPOptimizer
+
+        optimizer = UncapacitatedFLPOptimizer(
+            objective="UFLP",
+            warehouses=warehouses,
+            customers=customers,
+            distance=None,
+            gapRel=0.0,
+            **kwargs,
+        )
+        optimizer.build_model()
+        return optimizer
+
+    def test_from_solution(self, small_test_warehouses, small_test_customers, capsys):
+        """A previous solution is passed as initial values and gives the same optimum"""
+        cold = self.make_optimizer(small_test_warehouses, small_test_customers)
+        solution = cold.solve()
+        assert cold.time_to_first_feasible is not None
+
+        optimizer = self.make_optimizer(small_test_warehouses, small_test_customers)
+        warm = optimizer.solve(warm_start=solution)
+
+        assert warm["objective_value"] == pytest.approx(solution["objective_value"])
+        assert optimizer.first_feasible_objective == pytest.approx(
+            solution["objective_value"], rel=1e-4
+        )
+        assert "First feasible solution (warm start)" in capsys.readouterr().out
+
+    @pytest.mark.parametrize("linking", ["strong", "lazy"])
+    def test_from_open_warehouses(
+        self, small_test_warehouses, small_test_customers, linking
+    ):
+        """Open warehouses without assignments: customers go to the closest one"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, linking=linking
+        )
+        optimizer.solve(warm_start=({1, 2}, []))
+
+        open_warehouses, flows = optimizer._warm_start_values(({1, 2}, {}))
+        assert open_warehouses == {1, 2}
+        assert len(flows) == len(small_test_customers)
+        assert {w for w, _ in flows} <= {1, 2}
+
+    def test_from_assignments(self, small_test_warehouses, small_test_customers):
+        """Assignments given as a {customer: warehouse} dict"""
+        optimizer = self.make_optimizer(small_test_warehouses, small_test_customers)
+        assignments = {c: 1 for c in small_test_customers}
+        open_warehouses, flows = optimizer._warm_start_values(({1}, assignments))
+        assert flows == {(1, c): 1 for c in small_test_customers}
+
+        optimizer._set_initial_values(open_warehouses, flows)
+        assert optimizer.facility_status_vars[1].varValue == 1
+        assert optimizer.facility_status_vars[2].varValue == 0
+        assert optimizer.assignment_vars[1, 3].varValue == 1
+
+    @pytest.mark.parametrize("backend", ["mps", "heuristic"])
+    def test_other_backends(self, small_test_warehouses, small_test_customers, backend):
+        """The starting solution is not silently ignored by the other backends"""
+        from network_factory import solve_network_optimization
+
+        with pytest.raises(ValueError, match="warm_start"):
+            solve_network_optimization(
+                "p-median",
+                small_test_warehouses,
+                small_test_customers,
+                objective_function="mindistance",
+                num_warehouses=2,
+                backend=backend,
+                warm_start=True,
+            )
+
+
+class TestSolutionAnalysis:
+    """Tests for the extraction and analysis of the solution from the flow arrays"""
+
+    def test_multi_sourced(
+        self, capacitated_test_warehouses, small_test_customers, capsys
+    ):
+        """Split demands are extracted, analyzed and printed consistently"""
+        from network_optimizer import CapacitatedFLPOptimizer
+
+        for warehouse in capacitated_test_warehouses.values():
+            warehouse.capacity = 230
+        optimizer = CapacitatedFLPOptimizer(
+            objective="CFLP",
+            warehouses=capacitated_test_warehouses,
+            customers=small_test_customers,
+            distance=None,
+            force_single_sourcing=False,
+        )
+        optimizer.build_model()
+        solution = optimizer.solve()
+
+        flows = optimizer.flow_arrays
+        assert set(flows["arcs"]) == optimizer.flows
+        shares = {}
+        for (_, c), share in zip(flows["arcs"], flows["share"]):
+            shares[c] = shares.get(c, 0) + share
+        assert shares == pytest.approx({c: 1.0 for c in small_test_customers})
+        assert optimizer.multi_sourced
+        for c, count in optimizer.multi_sourced.items():
+            assert count == sum(1 for _, each in optimizer.flows if each == c)
+
+        assignment = solution["customers_assignment"]
+        assert len(assignment) == len(optimizer.flows)
+        assert sum(row["Flow"] for row in assignment) == pytest.approx(
+            sum(c.demand for c in small_test_customers.values())
+        )
+        row = assignment[0]
+        assert row["Warehouse"] == capacitated_test_warehouses[row["Warehouse_id"]].city
+        assert row["Customer Demand"] == small_test_customers[row["Customer_id"]].demand
+        assert sum(solution["demand_perc_by_ranges"].values()) == pytest.approx(1.0)
+        assert solution["most_distant_customer"] == max(
+            r["Distance"] for r in assignment
+        )
+
+        capsys.readouterr()
+        optimizer.print_solution_details()
+        output = capsys.readouterr().out
+        assert f"Total cost: {round(solution['objective_value'])}" in output
+        for c, count in optimizer.multi_sourced.items():
+            assert f"Customer {c} is served by {count} warehouses" in output
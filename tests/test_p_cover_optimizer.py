@@ -8,6 +8,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from network_optimizer import PCoverOptimizer
+from data_structures import DistanceMatrix
 
 
 class TestPCoverOptimizer:
@@ -208,3 +209,94 @@ class TestPCoverOptimizer:
         assert "P-Cover optimization results" in captured.out
         assert "% covered demand within 1000 distance: 85.0%" in captured.out
         assert "Open warehouses: (2 out of 5)" in captured.out
+
+    def test_init_with_distance_matrix(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that the service distance parameters are vectorized with a DistanceMatrix"""
+        distance = DistanceMatrix.from_dict(small_test_distance)
+        optimizer = PCoverOptimizer(
+            objective="p-cover",
+            num_warehouses=2,
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=distance,
+            high_service_distance=1000,
+            max_service_distance=2000,
+        )
+
+        assert isinstance(optimizer.high_service_dist_par, DistanceMatrix)
+        for w, c in small_test_distance:
+            assert optimizer.high_service_dist_par[w, c] == int(
+                small_test_distance[w, c] <= 1000
+            )
+            assert optimizer.max_service_dist_par[w, c] == int(
+                small_test_distance[w, c] <= 2000
+            )
+
+        optimizer.build_model()
+        assert optimizer.assignment_vars[2, 1].upBound == 0
+        assert optimizer.assignment_vars[1, 1].upBound == 1
+
+    def test_sparse_max_service_distance(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that the sparse model creates no arcs beyond the max service distance"""
+        optimizer = PCoverOptimizer(
+            objective="p-cover",
+            num_warehouses=2,
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+            high_service_distance=1000,
+            max_service_distance=2000,
+            sparse=True,
+        )
+        optimizer.build_model()
+
+        expected = {key for key, value in small_test_distance.items() if value <= 2000}
+        assert set(optimizer.assignment_vars.keys()) == expected
+
+    @pytest.mark.parametrize("as_matrix", [False, True])
+    def test_update_high_service_distance(
+        self,
+        small_test_warehouses,
+        small_test_customers,
+        small_test_distance,
+        as_matrix,
+    ):
+        """A new high service distance changes only the affected objective coefficients"""
+        distance = (
+            DistanceMatrix.from_dict(small_test_distance)
+            if as_matrix
+            else small_test_distance
+        )
+        params = dict(
+            objective="p-cover",
+            num_warehouses=2,
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=distance,
+            force_uncapacitated=True,
+            gapRel=0.0,
+        )
+        optimizer = PCoverOptimizer(high_service_distance=500, **params)
+        optimizer.build_model()
+        optimizer.solve()
+        optimizer.update_model(high_service_distance=1500, num_warehouses=3)
+
+        params["num_warehouses"] = 3
+        fresh = PCoverOptimizer(high_service_distance=1500, **params)
+        fresh.build_model()
+        for w, c in small_test_distance:
+            assert optimizer.high_service_dist_par[w, c] == int(
+                small_test_distance[w, c] <= 1500
+            )
+            assert optimizer.model.objective.get(
+                optimizer.assignment_vars[w, c], 0
+            ) == pytest.approx(
+                fresh.model.objective.get(fresh.assignment_vars[w, c], 0)
+            )
+        assert optimizer.solve()["objective_value"] == pytest.approx(
+            fresh.solve()["objective_value"]
+        )
@@ -187,3 +187,214 @@ class TestPMedianOptimizer:
         assert "Open warehouses: (2 out of 5)" in captured.out
         assert "New York" in captured.out
         assert "Chicago" in captured.out
+
+    def test_sparse_model_same_solution(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that the sparse model without pruning gives the dense solution"""
+        solutions = []
+        for sparse in (False, True):
+            optimizer = PMedianOptimizer(
+                objective="p-median",
+                objective_function="mindistance",
+                num_warehouses=2,
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                distance=small_test_distance,
+                force_uncapacitated=True,
+                sparse=sparse,
+            )
+            optimizer.build_model()
+            solutions.append(optimizer.solve())
+
+        assert solutions[0]["objective_value"] == pytest.approx(
+            solutions[1]["objective_value"]
+        )
+        assert (
+            solutions[0]["active_warehouses_id"] == solutions[1]["active_warehouses_id"]
+        )
+
+
+class TestPMedianHeuristic:
+    """Tests for the greedy + vertex substitution heuristic"""
+
+    def make_optimizer(self, warehouses, customers, distance, **kwargs):
+        return PMedianOptimizer(
+            objective="p-median",
+            objective_function="mindistance",
+            num_warehouses=2,
+            warehouses=warehouses,
+            customers=customers,
+            distance=distance,
+            gapRel=0.0,
+            **{"force_uncapacitated": True, **kwargs},
+        )
+
+    def test_same_solution_as_cbc(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that the heuristic finds the optimum of the small instance"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, small_test_distance
+        )
+        optimizer.build_model()
+        expected = optimizer.solve()
+
+        heuristic = self.make_optimizer(
+            small_test_warehouses, small_test_customers, small_test_distance
+        )
+        solution = heuristic.solve_heuristic()
+
+        assert solution["status"] == "Heuristic"
+        assert solution["objective_value"] == pytest.approx(expected["objective_value"])
+        assert solution["active_warehouses_id"] == expected["active_warehouses_id"]
+        assert set(solution) == set(expected)
+        assert len(heuristic.flows) == len(small_test_customers)
+
+    def test_constraints(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test forced open/closed and mutually exclusive warehouses"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses,
+            small_test_customers,
+            small_test_distance,
+            force_open=[5],
+            force_closed=[1],
+            mutually_exclusive=[(2, 3), (3, 4)],
+            force_allocations=[(5, 1)],
+        )
+        optimizer.solve_heuristic()
+
+        assert 5 in optimizer.active_warehouses
+        assert 1 not in optimizer.active_warehouses
+        assert len(optimizer.active_warehouses & {2, 3}) <= 1
+        assert len(optimizer.active_warehouses & {3, 4}) <= 1
+        assert (5, 1) in optimizer.flows
+
+    def test_warm_start(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test the handoff of the heuristic solution to CBC"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, small_test_distance
+        )
+        solution = optimizer.solve_heuristic(warm_start=True)
+
+        assert solution["status"] == "Optimal"
+        assert optimizer.model is not None
+
+    def test_capacitated(
+        self, capacitated_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that binding capacities are not silently ignored"""
+        for warehouse in capacitated_test_warehouses.values():
+            warehouse.capacity = 600
+        optimizer = self.make_optimizer(
+            capacitated_test_warehouses,
+            small_test_customers,
+            small_test_distance,
+            force_uncapacitated=False,
+        )
+        with pytest.raises(ValueError, match="capacities"):
+            optimizer.solve_heuristic()
+
+        # With the warm start CBC enforces the capacities
+        solution = optimizer.solve_heuristic(warm_start=True)
+        assert solution["status"] == "Optimal"
+        for w in optimizer.active_warehouses:
+            outflow = sum(
+                row["Flow"]
+                for row in solution["customers_assignment"]
+                if row["Warehouse_id"] == w
+            )
+            assert outflow <= 600
+
+    def test_infeasible(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Test that too many closed warehouses give no solution"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses,
+            small_test_customers,
+            small_test_distance,
+            force_closed=[1, 2, 3, 4],
+        )
+        assert optimizer.solve_heuristic() is None
+
+
+class TestPMedianUpdate:
+    """Tests for the in-place re-parameterization of a built model"""
+
+    def make_optimizer(self, warehouses, customers, distance, num_warehouses=2):
+        optimizer = PMedianOptimizer(
+            objective="p-median",
+            objective_function="mindistance",
+            num_warehouses=num_warehouses,
+            warehouses=warehouses,
+            customers=customers,
+            distance=distance,
+            force_uncapacitated=True,
+            gapRel=0.0,
+        )
+        optimizer.build_model()
+        return optimizer
+
+    def test_update_num_warehouses(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Changing p re-solves the same model with the result of a fresh build"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, small_test_distance
+        )
+        optimizer.solve()
+        model = optimizer.model
+        optimizer.update_model(num_warehouses=3)
+
+        assert optimizer.model is model
+        assert -optimizer.model.constraints["Num_of_active_warehouses"].constant == 3
+        assert optimizer.solver_config.warm_start
+        # The warm start opens p warehouses
+        initial = [var.varValue for var in optimizer.facility_status_vars.values()]
+        assert sum(initial) == 3
+
+        solution = optimizer.solve()
+        fresh = self.make_optimizer(
+            small_test_warehouses, small_test_customers, small_test_distance, 3
+        ).solve()
+        assert len(solution["active_warehouses_id"]) == 3
+        assert solution["objective_value"] == pytest.approx(fresh["objective_value"])
+
+    def test_update_force_open_closed(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """Forced warehouses change only the bounds of the facility variables"""
+        optimizer = self.make_optimizer(
+            small_test_warehouses, small_test_customers, small_test_distance
+        )
+        optimizer.update_model(force_open=[1], force_closed=[4])
+        assert optimizer.facility_status_vars[1].lowBound == 1
+        assert optimizer.facility_status_vars[4].upBound == 0
+
+        optimizer.update_model(force_open=[], force_closed=[])
+        assert optimizer.facility_status_vars[1].lowBound == 0
+        assert optimizer.facility_status_vars[4].upBound == 1
+
+        optimizer.update_model(force_closed=[1, 4])
+        solution = optimizer.solve()
+        assert not {1, 4} & set(solution["active_warehouses_id"])
+
+    def test_update_requires_model(
+        self, small_test_warehouses, small_test_customers, small_test_distance
+    ):
+        """The model must be built before it can be updated"""
+        optimizer = PMedianOptimizer(
+            objective="p-median",
+            objective_function="mindistance",
+            num_warehouses=2,
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            distance=small_test_distance,
+        )
+        with pytest.raises(Exception):
+            optimizer.update_model(num_warehouses=3)
@@ -0,0 +1,144 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from solution import ASSIGNMENT_COLUMNS, Solution, assignments_frame
+
+
+def make_solution():
+    records = [
+        {
+            "Warehouse": "New York",
+            "Warehouse_id": 1,
+            "Customer": "Philadelphia",
+            "Customer_id": 1,
+            "Customer Demand": 100,
+            "Distance": 80.0,
+            "Warehouse Latitude": 40.7128,
+            "Warehouse Longitude": -74.0060,
+            "Customers Latitude": 39.9526,
+            "Customers Longitude": -75.1652,
+            "Flow": 100.0,
+        },
+        {
+            "Warehouse": "New York",
+            "Warehouse_id": 1,
+            "Customer": "Jacksonville",
+            "Customer_id": 7,
+            "Customer Demand": 90,
+            "Distance": 1500.0,
+            "Warehouse Latitude": 40.7128,
+            "Warehouse Longitude": -74.0060,
+            "Customers Latitude": 30.3322,
+            "Customers Longitude": -81.6557,
+            "Flow": 30.0,
+        },
+        {
+            "Warehouse": "Houston",
+            "Warehouse_id": 4,
+            "Customer": "Jacksonville",
+            "Customer_id": 7,
+            "Customer Demand": 90,
+            "Distance": 1300.0,
+            "Warehouse Latitude": 29.7604,
+            "Warehouse Longitude": -95.3698,
+            "Customers Latitude": 30.3322,
+            "Customers Longitude": -81.6557,
+            "Flow": 60.0,
+        },
+    ]
+    return Solution(
+        assignments=records,
+        distance_ranges=[0, 100, 99999],
+        status="Optimal",
+        objective_value=12345.0,
+        active_warehouses_id={1, 4},
+        multi_sourced_customers=[7],
+        demand_perc_by_ranges={(0, 100): 100 / 280, (100, 99999): 180 / 280},
+    )
+
+
+class TestSolution:
+    """Tests for the columnar results of an optimization run"""
+
+    def test_mapping(self):
+        """The solution behaves as the solution dict"""
+        solution = make_solution()
+
+        assert solution["status"] == "Optimal"
+        assert "customers_assignment" in solution
+        assert len(solution["customers_assignment"]) == 3
+        assert solution["customers_assignment"][1]["Customer"] == "Jacksonville"
+        assert solution.assignments["Warehouse"].dtype == "category"
+        assert set(solution.to_dict()) == set(solution)
+
+        copy = solution.copy()
+        copy["status"] = "Heuristic"
+        copy["customers_assignment"] = solution.assignments.iloc[:1]
+        assert solution["status"] == "Optimal"
+        assert len(solution["customers_assignment"]) == 3
+        assert len(copy["customers_assignment"]) == 1
+
+        del copy["customers_assignment"]
+        assert "customers_assignment" not in copy
+        assert len(copy) == len(solution) - 1
+        assert list(copy.assignments.columns) == list(ASSIGNMENT_COLUMNS)
+
+    def test_views(self):
+        solution = make_solution()
+
+        load = solution.warehouse_load
+        assert load.loc[1, "Flow"] == 130
+        assert load.loc[1, "Customers"] == 2
+        assert load.loc[4, "Avg distance"] == 1300
+        assert solution.warehouse_load is load
+
+        distance = solution.customer_distance
+        assert distance.loc[7, "Suppliers"] == 2
+        assert distance.loc[7, "Distance"] == pytest.approx(
+            (30 * 1500 + 60 * 1300) / 90
+        )
+        assert distance.loc[7, "Max distance"] == 1500
+
+        histogram = solution.band_histogram
+        np.testing.assert_allclose(histogram.to_numpy(), [100 / 190, 90 / 190])
+
+        # The views are computed again when the assignments change
+        solution["customers_assignment"] = solution.assignments.iloc[:1]
+        assert solution.warehouse_load.loc[1, "Flow"] == 100
+        assert solution.band_histogram.iloc[0] == 1
+
+    def test_assignments_frame(self):
+        """Solution dicts with the list of records are accepted too"""
+        solution = make_solution()
+        frame = assignments_frame(solution.to_dict())
+        pd.testing.assert_frame_equal(
+            frame, solution.assignments, check_categorical=False, check_dtype=False
+        )
+        assert assignments_frame(solution) is solution.assignments
+
+    def test_parquet(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        solution = make_solution()
+        path = str(tmp_path / "solution.parquet")
+        solution.to_parquet(path)
+
+        loaded = Solution.read_parquet(path)
+        pd.testing.assert_frame_equal(loaded.assignments, solution.assignments)
+        assert loaded["active_warehouses_id"] == {1, 4}
+        assert loaded["demand_perc_by_ranges"] == solution["demand_perc_by_ranges"]
+        assert loaded.distance_ranges == [0, 100, 99999]
+
+        # Only the results, without reading the assignments
+        results = Solution.read_parquet(path, assignments=False)
+        assert results["objective_value"] == 12345.0
+        assert "customers_assignment" not in results
+
+        table = solution.to_arrow()
+        assert table.num_rows == 3
+        assert Solution.from_arrow(table)["multi_sourced_customers"] == [7]
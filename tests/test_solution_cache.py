@@ -0,0 +1,126 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_structures import Customer, NetworkData
+from network_factory import solve_network_optimization
+from solution_cache import SolutionCache, get_solution_cache, solution_key
+
+
+class TestSolutionKey:
+    """Tests for the stable hash of the inputs of a run"""
+
+    def test_same_content(self, small_test_warehouses, small_test_customers):
+        """Equal inputs give the same key, whatever their type and the order of the items"""
+        key = solution_key(
+            "UFLP",
+            small_test_warehouses,
+            small_test_customers,
+            force_open={1, 2},
+            gapRel=0.01,
+        )
+        customers = NetworkData.from_dict(small_test_customers, kind="customer")
+        assert key == solution_key(
+            "UFLP",
+            small_test_warehouses,
+            customers,
+            gapRel=0.01,
+            force_open={2, 1},
+            plot=True,
+            warehouse_markercolor="blue",
+        )
+
+    def test_changes(self, small_test_warehouses, small_test_customers):
+        key = solution_key("UFLP", small_test_warehouses, small_test_customers)
+        assert key != solution_key("CFLP", small_test_warehouses, small_test_customers)
+        assert key != solution_key(
+            "UFLP", small_test_warehouses, small_test_customers, force_closed=[3]
+        )
+        assert key != solution_key(
+            "UFLP", small_test_warehouses, small_test_customers, gapRel=0.01
+        )
+
+        customers = NetworkData.from_dict(small_test_customers, kind="customer")
+        customers[1] = Customer("1", "Philadelphia", "PA", "", 39.9526, -75.1652, 101)
+        assert key != solution_key("UFLP", small_test_warehouses, customers)
+
+
+class TestSolutionCache:
+    """Tests for the memory and disk tiers of the cache"""
+
+    def test_memory(self):
+        cache = SolutionCache(max_entries=2)
+        cache.put("a", {"objective_value": 1, "active_warehouses_id": {1}})
+        cache.put("b", {"objective_value": 2})
+
+        # The caller gets a copy
+        solution = cache.get("a")
+        solution["active_warehouses_id"].add(2)
+        assert cache.get("a")["active_warehouses_id"] == {1}
+
+        # "a" was used last, "b" is evicted
+        cache.put("c", {"objective_value": 3})
+        assert cache.get("b") is None
+        assert cache.get("a")["objective_value"] == 1
+        assert len(cache) == 2
+
+    def test_disk(self, tmp_path):
+        cache = SolutionCache(cache_dir=str(tmp_path))
+        cache.put("a", {"objective_value": 1})
+        assert len(cache.entries()) == 1
+
+        # A new process reads the stored solution
+        other = SolutionCache(cache_dir=str(tmp_path))
+        assert other.get("a") == {"objective_value": 1}
+        other.clear()
+        assert other.entries() == [] and other.get("a") is None
+
+        assert get_solution_cache(None) is None
+        assert get_solution_cache(str(tmp_path)) is get_solution_cache(str(tmp_path))
+        assert get_solution_cache(cache) is cache
+
+    def test_solve(self, small_test_warehouses, small_test_customers, capsys):
+        """An identical run returns the stored solution, force_resolve solves again"""
+        cache = SolutionCache()
+
+        def solve(num_warehouses=2, **kwargs):
+            return solve_network_optimization(
+                objective="p-median",
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                objective_function="mindistance",
+                num_warehouses=num_warehouses,
+                solution_cache=cache,
+                **kwargs,
+            )
+
+        solution = solve()
+        assert len(cache) == 1
+        capsys.readouterr()
+
+        cached = solve(hide_inactive=True)
+        assert "Solution read from the cache" in capsys.readouterr().out
+        assert cached is not solution
+        assert cached["objective_value"] == pytest.approx(solution["objective_value"])
+        assert cached["customers_assignment"] == solution["customers_assignment"]
+
+        solve(force_resolve=True)
+        assert "Solution read from the cache" not in capsys.readouterr().out
+        solve(num_warehouses=3)
+        assert "Solution read from the cache" not in capsys.readouterr().out
+        assert len(cache) == 2
+
+    def test_opt_in(self, small_test_warehouses, small_test_customers, capsys):
+        """Without solution_cache every run solves the model"""
+        for _ in range(2):
+            solve_network_optimization(
+                objective="p-median",
+                warehouses=small_test_warehouses,
+                customers=small_test_customers,
+                objective_function="mindistance",
+                num_warehouses=2,
+            )
+        assert "Solution read from the cache" not in capsys.readouterr().out
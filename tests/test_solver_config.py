@@ -0,0 +1,151 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from solver_config import (
+    NOT_SET,
+    SolverConfig,
+    first_solution,
+    follow_log,
+    get_solver_config,
+)
+from network_factory import create_network_optimizer
+
+
+class TestSolverConfig:
+    """Tests for the solver configuration"""
+
+    def test_pulp_solver(self):
+        """Test that the parameters reach PULP_CBC_CMD"""
+        config = SolverConfig(
+            threads=8, time_limit=30, gap_rel=0.01, gap_abs=5, cuts=False
+        )
+        solver = config.pulp_solver(msg=True)
+
+        assert solver.timeLimit == 30
+        assert solver.msg
+        assert solver.optionsDict["threads"] == 8
+        assert solver.optionsDict["gapRel"] == 0.01
+        assert solver.optionsDict["gapAbs"] == 5
+        assert "cuts off" in solver.options
+        assert "heuristicsOnOff on" in solver.options
+
+    def test_cbc_options(self):
+        """Test the command line options of the CBC executable"""
+        config = SolverConfig(threads=4, presolve=False, options=["maxNodes 10"])
+
+        options = config.cbc_options(parameters=True)
+        assert "presolve off" in options
+        assert "threads 4" in options
+        assert options[-1] == "maxNodes 10"
+        assert "threads 4" not in config.cbc_options()
+
+    def test_get_solver_config(self):
+        """Test the conversion of the solver_config parameter"""
+        assert get_solver_config().time_limit == 120
+
+        config = get_solver_config({"threads": 2}, time_limit=10, gap_rel=NOT_SET)
+        assert config.threads == 2
+        assert config.time_limit == 10
+        assert config.gap_rel == 0.05
+
+        # An explicit None is a value: no time limit
+        assert get_solver_config({"threads": 2}, time_limit=None).time_limit is None
+
+        with pytest.raises(ValueError, match="must be a SolverConfig"):
+            get_solver_config(32)
+        with pytest.raises(ValueError, match="threads"):
+            SolverConfig(threads=0)
+
+    def test_threaded_from_factory(
+        self, small_test_warehouses, small_test_customers, capfd
+    ):
+        """Test that the configuration is passed from the factory to the solve"""
+        optimizer = create_network_optimizer(
+            objective="p-median",
+            objective_function="mindistance",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            num_warehouses=2,
+            force_uncapacitated=True,
+            solver_config={"threads": 2, "gap_rel": 0.0},
+            time_limit=15,
+        )
+        assert optimizer.solver_config.threads == 2
+        assert optimizer.gapRel == 0.0
+
+        optimizer.build_model()
+        solution = optimizer.solve()
+
+        assert solution["status"] == "Optimal"
+        out = capfd.readouterr().out
+        assert "time limit = 15 seconds" in out
+        assert "Welcome to the CBC" not in out
+
+    def test_no_time_limit(self, small_test_warehouses, small_test_customers):
+        """Test that time_limit=None removes the default time limit"""
+        params = dict(
+            objective="p-median",
+            objective_function="mindistance",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            num_warehouses=2,
+        )
+        assert create_network_optimizer(**params).solver_config.time_limit == 120
+        optimizer = create_network_optimizer(time_limit=None, **params)
+        assert optimizer.solver_config.time_limit is None
+        optimizer = create_network_optimizer(
+            solver_config={"time_limit": 30}, threads=2, **params
+        )
+        assert optimizer.solver_config.time_limit == 30
+
+    def test_solver_log(self, small_test_warehouses, small_test_customers, capfd):
+        """Test that the solver log is shown while the first solution is still read"""
+        optimizer = create_network_optimizer(
+            objective="p-median",
+            objective_function="mindistance",
+            warehouses=small_test_warehouses,
+            customers=small_test_customers,
+            num_warehouses=2,
+            force_uncapacitated=True,
+        )
+        optimizer.build_model()
+        solution = optimizer.solve(solver_log=True)
+
+        assert solution["status"] == "Optimal"
+        assert "Welcome to the CBC" in capfd.readouterr().out
+        assert optimizer.first_feasible_objective is not None
+
+    def test_follow_log(self, tmp_path, capsys):
+        """Test that the text appended to the log file is printed"""
+        path = str(tmp_path / "cbc.log")
+        with follow_log(path, interval=0.01):
+            with open(path, "w") as f:
+                f.write("Welcome to the CBC\n")
+                f.flush()
+                f.write("Result - Optimal solution found\n")
+        assert capsys.readouterr().out == (
+            "Welcome to the CBC\nResult - Optimal solution found\n"
+        )
+
+        with follow_log(path, show=False):
+            pass
+        assert capsys.readouterr().out == ""
+
+    def test_first_solution(self):
+        """Test reading the first feasible solution from the CBC log"""
+        log = "\n".join(
+            [
+                "Cbc0038I Pass   1: (0.25 seconds) suminf.    1.5 (3) obj. 10 iterations 4",
+                "Cbc0038I Solution found of 476104",
+                "Cbc0012I Integer solution of 439972.66 found by feasibility pump after 0 iterations and 0 nodes (1.86 seconds)",
+            ]
+        )
+        assert first_solution(log) == (0.25, 476104.0)
+
+        warm = "Cbc0045I MIPStart provided solution with cost 439973"
+        assert first_solution(warm) == (0.0, 439973.0)
+        assert first_solution("Result - Problem proven infeasible") == (None, None)